@@ -0,0 +1,309 @@
+"""
+Admission control for the API's expensive endpoints.
+
+`AdmissionMiddleware` checks each matching request against live load signals
+before the route runs, and answers 429 with a Retry-After header when the
+request should be shed:
+
+- job backlog: uploads, OCR re-runs, flashcard and quiz generation only
+  enqueue work, so they are refused while their queue has more than ADMISSION_QUEUE_MAX_READY
+  ready jobs or its oldest job has waited ADMISSION_QUEUE_MAX_AGE_SECONDS.
+  Retry-After estimates when the excess will have drained at the queue's
+  recent completion rate;
+- database pool: low-priority (bulk) requests are shed once
+  ADMISSION_DB_WAITING_BULK requests wait for a pooled connection, or when the
+  average wait for a connection exceeds ADMISSION_DB_WAIT_MS_BULK. All
+  requests are shed once ADMISSION_DB_WAITING_MAX are waiting;
+- LLM calls: chat is refused while ADMISSION_LLM_IN_FLIGHT_MAX provider calls
+  are outstanding in this process;
+- per-user concurrency: at most `user_concurrency` requests per user and
+  endpoint run at once (per API process).
+
+Queue signals come from Postgres and are cached for ADMISSION_SIGNAL_TTL_SECONDS.
+If a signal can't be read, the request is admitted. Limits, admissions and
+rejections are exported as notescape_admission_* metrics.
+"""
+import asyncio
+import base64
+import json
+import logging
+import math
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from app.core.db import pool_stats
+from app.core.job_scheduling import JOB_QUEUE_TABLES, queue_stats
+from app.core.llm_tracing import llm_calls_in_flight
+from app.core.metrics import Counter, Gauge
+
+log = logging.getLogger("uvicorn.error")
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+ADMISSION_SIGNAL_TTL_SECONDS = max(0.5, float(os.getenv("ADMISSION_SIGNAL_TTL_SECONDS", "5")))
+ADMISSION_QUEUE_MAX_READY = max(1, int(os.getenv("ADMISSION_QUEUE_MAX_READY", "300")))
+ADMISSION_QUEUE_MAX_AGE_SECONDS = max(1.0, float(os.getenv("ADMISSION_QUEUE_MAX_AGE_SECONDS", "1800")))
+ADMISSION_DB_WAITING_BULK = max(1, int(os.getenv("ADMISSION_DB_WAITING_BULK", "5")))
+ADMISSION_DB_WAITING_MAX = max(ADMISSION_DB_WAITING_BULK, int(os.getenv("ADMISSION_DB_WAITING_MAX", "30")))
+ADMISSION_DB_WAIT_MS_BULK = max(1.0, float(os.getenv("ADMISSION_DB_WAIT_MS_BULK", "500")))
+ADMISSION_LLM_IN_FLIGHT_MAX = max(1, int(os.getenv("ADMISSION_LLM_IN_FLIGHT_MAX", "24")))
+ADMISSION_USER_CONCURRENCY = max(1, int(os.getenv("ADMISSION_USER_CONCURRENCY", "2")))
+# Retry-After for transient overload (pool, LLM, per-user caps) and the clamp for queue estimates.
+ADMISSION_RETRY_AFTER_SECONDS = max(1, int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5")))
+ADMISSION_RETRY_AFTER_MAX_SECONDS = 300
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+ADMISSION_DECISIONS = Counter(
+    "notescape_admission_requests_total",
+    "Requests to admission-controlled endpoints by decision and reason.",
+    ("endpoint", "decision", "reason"),
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "notescape_admission_in_flight", "Admitted requests currently running.", ("endpoint",)
+)
+ADMISSION_LIMIT = Gauge(
+    "notescape_admission_limit", "Configured admission limits.", ("limit",)
+)
+DB_POOL_WAITING = Gauge(
+    "notescape_db_pool_requests_waiting", "Requests waiting for a pooled database connection."
+)
+DB_POOL_WAIT_MS = Gauge(
+    "notescape_db_pool_wait_ms", "Average wait for a pooled connection since the previous sample."
+)
+
+for _name, _value in {
+    "queue_max_ready": ADMISSION_QUEUE_MAX_READY,
+    "queue_max_age_seconds": ADMISSION_QUEUE_MAX_AGE_SECONDS,
+    "db_waiting_bulk": ADMISSION_DB_WAITING_BULK,
+    "db_waiting_max": ADMISSION_DB_WAITING_MAX,
+    "db_wait_ms_bulk": ADMISSION_DB_WAIT_MS_BULK,
+    "llm_in_flight_max": ADMISSION_LLM_IN_FLIGHT_MAX,
+    "user_concurrency": ADMISSION_USER_CONCURRENCY,
+}.items():
+    ADMISSION_LIMIT.set(_value, limit=_name)
+
+
+@dataclass(frozen=True)
+class AdmissionPolicy:
+    endpoint: str
+    priority: str
+    queue: Optional[str] = None
+    uses_llm: bool = False
+    user_concurrency: int = ADMISSION_USER_CONCURRENCY
+
+
+_FILE_ID = r"[0-9a-fA-F-]{32,36}"
+_FLASHCARD_GENERATE = AdmissionPolicy("flashcard_generate", BULK, queue="flashcard")
+_QUIZ_JOB = AdmissionPolicy("quiz_job", BULK, queue="quiz")
+
+# Every route that enqueues a job is listed, so the per-user caps and backlog shedding bound each queue.
+_ROUTES: List[Tuple[str, Pattern[str], AdmissionPolicy]] = [
+    ("POST", re.compile(r"^/api/files/\d+(/handwritten)?/?$"), AdmissionPolicy("upload", BULK, queue="ocr")),
+    # Re-running OCR on one document: queued in the interactive lane, the user is waiting on it.
+    (
+        "POST",
+        re.compile(rf"^/api/files/{_FILE_ID}/ocr(/retry)?/?$"),
+        AdmissionPolicy("ocr_retry", INTERACTIVE, queue="ocr"),
+    ),
+    ("POST", re.compile(r"^/api/chat/ask/?$"), AdmissionPolicy("chat_ask", INTERACTIVE, uses_llm=True)),
+    ("POST", re.compile(r"^/api/flashcards/generate(_async)?/?$"), _FLASHCARD_GENERATE),
+    ("POST", re.compile(rf"^/api/files/{_FILE_ID}/generate-flashcards-from-ocr/?$"), _FLASHCARD_GENERATE),
+    ("POST", re.compile(r"^/api/quizzes/jobs/?$"), _QUIZ_JOB),
+    ("POST", re.compile(rf"^/api/files/{_FILE_ID}/generate-quiz-from-ocr/?$"), _QUIZ_JOB),
+]
+
+
+def policy_for(method: str, path: str) -> Optional[AdmissionPolicy]:
+    for route_method, pattern, policy in _ROUTES:
+        if method == route_method and pattern.match(path):
+            return policy
+    return None
+
+
+@dataclass
+class Rejection:
+    reason: str
+    retry_after: int
+    detail: str
+
+
+class AdmissionController:
+    def __init__(self) -> None:
+        self._queue_stats: Dict[str, Tuple[float, Dict[str, float]]] = {}
+        self._queue_locks: Dict[str, asyncio.Lock] = {}
+        self._db_sample: Tuple[float, float, float] = (0.0, 0.0, 0.0)  # (at, requests_num, requests_wait_ms)
+        self._db_wait_ms = 0.0
+        self._per_user: Dict[Tuple[str, str], int] = {}
+
+    # -- signals ------------------------------------------------------------------
+
+    async def queue_signal(self, queue: str) -> Optional[Dict[str, float]]:
+        cached = self._queue_stats.get(queue)
+        if cached and time.monotonic() - cached[0] < ADMISSION_SIGNAL_TTL_SECONDS:
+            return cached[1]
+        lock = self._queue_locks.setdefault(queue, asyncio.Lock())
+        async with lock:
+            cached = self._queue_stats.get(queue)
+            if cached and time.monotonic() - cached[0] < ADMISSION_SIGNAL_TTL_SECONDS:
+                return cached[1]
+            try:
+                stats = await queue_stats(JOB_QUEUE_TABLES[queue])
+            except Exception as exc:
+                log.warning("[admission] queue signal failed queue=%s err=%s", queue, exc)
+                return cached[1] if cached else None
+            self._queue_stats[queue] = (time.monotonic(), stats)
+            return stats
+
+    def db_signal(self) -> Tuple[int, float]:
+        """(requests waiting for a connection now, average wait in ms over the last sample window)."""
+        stats = pool_stats()
+        waiting = int(stats.get("requests_waiting", 0))
+        now = time.monotonic()
+        at, num, wait_ms = self._db_sample
+        if now - at >= ADMISSION_SIGNAL_TTL_SECONDS:
+            total_num = float(stats.get("requests_num", 0))
+            total_wait = float(stats.get("requests_wait_ms", 0))
+            if total_num > num:
+                self._db_wait_ms = (total_wait - wait_ms) / (total_num - num)
+            elif at:
+                self._db_wait_ms = 0.0
+            self._db_sample = (now, total_num, total_wait)
+        DB_POOL_WAITING.set(waiting)
+        DB_POOL_WAIT_MS.set(self._db_wait_ms)
+        return waiting, self._db_wait_ms
+
+    # -- decision -----------------------------------------------------------------
+
+    async def check(self, policy: AdmissionPolicy, user_key: str) -> Optional[Rejection]:
+        if self._per_user.get((policy.endpoint, user_key), 0) >= policy.user_concurrency:
+            return Rejection(
+                "user_concurrency",
+                ADMISSION_RETRY_AFTER_SECONDS,
+                "You already have requests like this in progress. Please wait for them to finish.",
+            )
+
+        waiting, wait_ms = self.db_signal()
+        if waiting >= ADMISSION_DB_WAITING_MAX or (
+            policy.priority == BULK and (waiting >= ADMISSION_DB_WAITING_BULK or wait_ms >= ADMISSION_DB_WAIT_MS_BULK)
+        ):
+            return Rejection("db_pool", ADMISSION_RETRY_AFTER_SECONDS, "The server is busy. Please try again shortly.")
+
+        if policy.uses_llm and llm_calls_in_flight() >= ADMISSION_LLM_IN_FLIGHT_MAX:
+            return Rejection("llm_in_flight", ADMISSION_RETRY_AFTER_SECONDS, "The assistant is busy. Please try again shortly.")
+
+        if policy.queue:
+            stats = await self.queue_signal(policy.queue)
+            if stats:
+                ready = float(stats.get("ready", 0))
+                oldest = float(stats.get("oldest_age_seconds", 0))
+                if ready >= ADMISSION_QUEUE_MAX_READY or oldest >= ADMISSION_QUEUE_MAX_AGE_SECONDS:
+                    return Rejection(
+                        "queue_backlog",
+                        _drain_estimate(ready, float(stats.get("completed_per_second", 0))),
+                        "Processing is backed up right now. Please try again in a few minutes.",
+                    )
+        return None
+
+    def acquire(self, policy: AdmissionPolicy, user_key: str) -> None:
+        key = (policy.endpoint, user_key)
+        self._per_user[key] = self._per_user.get(key, 0) + 1
+        ADMISSION_IN_FLIGHT.inc(endpoint=policy.endpoint)
+
+    def release(self, policy: AdmissionPolicy, user_key: str) -> None:
+        key = (policy.endpoint, user_key)
+        remaining = self._per_user.get(key, 1) - 1
+        if remaining > 0:
+            self._per_user[key] = remaining
+        else:
+            self._per_user.pop(key, None)
+        ADMISSION_IN_FLIGHT.dec(endpoint=policy.endpoint)
+
+
+def _drain_estimate(ready: float, completed_per_second: float) -> int:
+    """Seconds until the queue is back under its limit at the recent completion rate."""
+    excess = max(1.0, ready - ADMISSION_QUEUE_MAX_READY + 1)
+    if completed_per_second <= 0:
+        return ADMISSION_RETRY_AFTER_MAX_SECONDS
+    seconds = math.ceil(excess / completed_per_second)
+    return int(min(ADMISSION_RETRY_AFTER_MAX_SECONDS, max(ADMISSION_RETRY_AFTER_SECONDS, seconds)))
+
+
+def request_user_key(headers: Dict[str, str], client_host: Optional[str]) -> str:
+    """Bucketing key for per-user caps: the token's uid claim, X-User-Id, or the client address.
+
+    The token is not verified here; the route's auth dependency still does that.
+    """
+    authorization = headers.get("authorization") or ""
+    if authorization.lower().startswith("bearer "):
+        parts = authorization.split(" ", 1)[1].split(".")
+        if len(parts) == 3:
+            try:
+                claims = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+                uid = claims.get("user_id") or claims.get("uid") or claims.get("sub")
+                if uid:
+                    return f"uid:{uid}"
+            except Exception:
+                pass
+    if headers.get("x-user-id"):
+        return f"uid:{headers['x-user-id']}"
+    return f"ip:{client_host or 'unknown'}"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying `AdmissionController` to the routes in `_ROUTES`."""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or AdmissionController()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        policy = policy_for(scope.get("method", ""), scope.get("path", ""))
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers") or []}
+        client = scope.get("client")
+        user_key = request_user_key(headers, client[0] if client else None)
+        rejection = await self.controller.check(policy, user_key)
+        if rejection is not None:
+            ADMISSION_DECISIONS.inc(endpoint=policy.endpoint, decision="rejected", reason=rejection.reason)
+            log.warning(
+                "[admission] rejected endpoint=%s reason=%s user=%s retry_after=%d",
+                policy.endpoint,
+                rejection.reason,
+                user_key,
+                rejection.retry_after,
+            )
+            await _send_429(send, rejection)
+            return
+
+        ADMISSION_DECISIONS.inc(endpoint=policy.endpoint, decision="admitted", reason="ok")
+        self.controller.acquire(policy, user_key)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(policy, user_key)
+
+
+async def _send_429(send, rejection: Rejection) -> None:
+    body = json.dumps({"detail": rejection.detail, "reason": rejection.reason}).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(rejection.retry_after).encode("latin-1")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -1,6 +1,7 @@
 from typing import List, Dict, Any, Optional
 
 from groq import Groq
+from app.core.llm_tracing import llm_call_site, trace_llm_call
 from app.core.settings import settings
 
 
@@ -20,6 +21,7 @@ def chat_completion(
     system_prompt: str,
     user_prompt: str,
     temperature: float = 0.2,
+    call_site: str = "chat",
 ) -> str:
     """
     Calls Groq chat completion using CHAT_MODEL.
@@ -28,13 +30,15 @@ def chat_completion(
     client = get_chat_client()
     model = get_chat_model()
 
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=temperature,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-    )
+    with llm_call_site(call_site), trace_llm_call("groq", model) as trace:
+        resp = client.chat.completions.create(
+            model=model,
+            temperature=temperature,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        )
+        trace.record_usage(getattr(resp, "usage", None))
 
     return resp.choices[0].message.content or ""
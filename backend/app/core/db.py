@@ -28,6 +28,10 @@ async def db_conn():
         async with conn.cursor() as cur:
             yield conn, cur
 
+def pool_stats() -> dict:
+    """psycopg_pool counters (requests_waiting, requests_wait_ms, ...); empty before first use."""
+    return _pool.get_stats() if _pool is not None else {}
+
 async def close_pool():
     """Cleanly close the connection pool."""
     global _pool
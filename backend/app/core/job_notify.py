@@ -0,0 +1,101 @@
+"""
+LISTEN/NOTIFY wake-ups for the job queues.
+
+Enqueue paths call `notify_job(cur, channel, job_id)` inside the same
+transaction as their INSERT, so Postgres delivers the notification on commit.
+Workers hold one dedicated autocommit connection per process that LISTENs on
+their channel and block in `JobWakeup.wait()` instead of sleeping a fixed
+interval. The fallback poll still runs (JOB_FALLBACK_POLL_SECONDS) so a missed
+notification - listener reconnecting, job re-queued by hand - is picked up.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import psycopg
+
+from app.core.db import _normalize_conninfo
+from app.core.settings import settings
+
+log = logging.getLogger("uvicorn.error")
+
+OCR_JOBS_CHANNEL = "ocr_jobs"
+QUIZ_JOBS_CHANNEL = "quiz_jobs"
+FLASHCARD_JOBS_CHANNEL = "flashcard_jobs"
+
+JOB_NOTIFY_ENABLED = os.getenv("JOB_NOTIFY_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+JOB_FALLBACK_POLL_SECONDS = float(os.getenv("JOB_FALLBACK_POLL_SECONDS", "30"))
+JOB_DISCONNECTED_POLL_SECONDS = 2.0
+_RECONNECT_BACKOFF_MAX_SECONDS = 30.0
+
+
+async def notify_job(cur, channel: str, job_id: str) -> None:
+    """Queue a NOTIFY on the caller's transaction; it is sent when the caller commits."""
+    if not JOB_NOTIFY_ENABLED:
+        return
+    await cur.execute("SELECT pg_notify(%s, %s)", (channel, str(job_id)))
+
+
+class JobWakeup:
+    def __init__(self, channel: str, fallback_seconds: float = JOB_FALLBACK_POLL_SECONDS):
+        self.channel = channel
+        self.fallback_seconds = fallback_seconds
+        self._event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._connected = False
+
+    def start(self) -> None:
+        if JOB_NOTIFY_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._listen_forever(), name=f"listen:{self.channel}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait(self) -> bool:
+        """Block until a notification arrives or the poll interval elapses; True if notified."""
+        timeout = self.fallback_seconds if self._connected else JOB_DISCONNECTED_POLL_SECONDS
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+            notified = True
+        except asyncio.TimeoutError:
+            notified = False
+        self._event.clear()
+        return notified
+
+    def wake(self) -> None:
+        self._event.set()
+
+    async def _listen_forever(self) -> None:
+        backoff = 1.0
+        conninfo = _normalize_conninfo(settings.database_url)
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.channel}")
+                    self._connected = True
+                    backoff = 1.0
+                    log.info("[job_notify] listening channel=%s", self.channel)
+                    # Anything enqueued while we were (re)connecting is found by the next claim.
+                    self._event.set()
+                    async for _ in conn.notifies():
+                        self._event.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                log.warning(
+                    "[job_notify] listener lost channel=%s retry_in=%.0fs error=%s",
+                    self.channel,
+                    backoff,
+                    exc,
+                )
+            finally:
+                self._connected = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, _RECONNECT_BACKOFF_MAX_SECONDS)
@@ -0,0 +1,290 @@
+"""
+Fast-path progress for long-running jobs (OCR, quiz and flashcard generation).
+
+Workers publish every progress/stage update to Redis: the latest snapshot lives in a
+hash at `jobprogress:{kind}:{job_id}` and each update is announced on a pub/sub
+channel of the same name. The API overlays that snapshot on the durable row and
+long-polls / streams (SSE) on the channel, so clients watching a job no longer
+re-read Postgres every second.
+
+Postgres stays the record of truth, but intermediate progress is written behind:
+`ProgressWriteBehind` keeps the latest pending update per job and writes them all
+through in one transaction every JOB_PROGRESS_FLUSH_SECONDS. Terminal transitions
+(completed, failed, indexed) are written directly; `settle()` drops whatever was
+still pending for the job first, so a late flush cannot overwrite the final state.
+Without Redis every update is written through immediately, as before.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.cache import get_redis
+from app.core.db import db_conn
+from app.core.settings import settings
+
+log = logging.getLogger("uvicorn.error")
+
+JOB_PROGRESS_FLUSH_SECONDS = max(0.0, float(os.getenv("JOB_PROGRESS_FLUSH_SECONDS", "5")))
+JOB_PROGRESS_TTL_SECONDS = max(60, int(os.getenv("JOB_PROGRESS_TTL_SECONDS", "3600")))
+# Upper bound for a single long-poll; stays below common proxy idle timeouts.
+PROGRESS_WAIT_MAX_SECONDS = 25.0
+# Without Redis there is nothing to wait on; long-polls degrade to polling at this pace.
+PROGRESS_FALLBACK_POLL_SECONDS = 2.0
+PROGRESS_STREAM_MAX_SECONDS = max(30, int(os.getenv("PROGRESS_STREAM_MAX_SECONDS", "900")))
+
+_async_redis = None
+
+
+def progress_key(kind: str, job_id: Any) -> str:
+    return f"jobprogress:{kind}:{job_id}"
+
+
+def _get_async_redis():
+    global _async_redis
+    if _async_redis is not None:
+        return _async_redis
+    if not getattr(settings, "redis_url", None):
+        return None
+    try:
+        from redis.asyncio import Redis as AsyncRedis
+
+        _async_redis = AsyncRedis.from_url(settings.redis_url, decode_responses=False)
+        return _async_redis
+    except Exception as exc:
+        log.warning("[progress] async Redis init failed err=%s", exc)
+        return None
+
+
+def publish_progress(kind: str, job_id: Any, fields: Dict[str, Any]) -> Optional[int]:
+    """Merge `fields` into the job's snapshot and announce it. Returns the new version,
+    or None when Redis is unavailable (callers must then write Postgres directly)."""
+    client = get_redis()
+    if client is None:
+        return None
+    key = progress_key(kind, job_id)
+    version = time.time_ns() // 1000
+    mapping = {name: json.dumps(value) for name, value in fields.items() if value is not None}
+    mapping["version"] = str(version)
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, JOB_PROGRESS_TTL_SECONDS)
+        pipe.publish(key, str(version))
+        pipe.execute()
+    except RedisError as exc:
+        log.warning("[progress] publish failed key=%s err=%s", key, exc)
+        return None
+    return version
+
+
+async def publish_progress_async(kind: str, job_id: Any, fields: Dict[str, Any]) -> Optional[int]:
+    """`publish_progress` off the event loop; the shared Redis client is synchronous."""
+    return await asyncio.to_thread(publish_progress, kind, job_id, fields)
+
+
+def _decode(raw: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+    if not raw:
+        return None
+    snapshot: Dict[str, Any] = {}
+    for name, value in raw.items():
+        name = name.decode("utf-8") if isinstance(name, bytes) else str(name)
+        try:
+            snapshot[name] = json.loads(value)
+        except (TypeError, ValueError):
+            continue
+    return snapshot if "version" in snapshot else None
+
+
+def read_progress_many(kind: str, job_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Latest published snapshots by job id; jobs without one are left out."""
+    ids = [str(job_id) for job_id in job_ids if job_id]
+    client = get_redis()
+    if client is None or not ids:
+        return {}
+    try:
+        pipe = client.pipeline(transaction=False)
+        for job_id in ids:
+            pipe.hgetall(progress_key(kind, job_id))
+        raws = pipe.execute()
+    except RedisError as exc:
+        log.warning("[progress] read failed kind=%s err=%s", kind, exc)
+        return {}
+    snapshots = {}
+    for job_id, raw in zip(ids, raws):
+        snapshot = _decode(raw)
+        if snapshot is not None:
+            snapshots[job_id] = snapshot
+    return snapshots
+
+
+def read_progress(kind: str, job_id: Any) -> Optional[Dict[str, Any]]:
+    return read_progress_many(kind, [job_id]).get(str(job_id))
+
+
+async def read_progress_many_async(kind: str, job_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """`read_progress_many` off the event loop, for async routes and long-poll wake-ups."""
+    ids = [str(job_id) for job_id in job_ids if job_id]
+    if not ids or get_redis() is None:
+        return {}
+    return await asyncio.to_thread(read_progress_many, kind, ids)
+
+
+async def read_progress_async(kind: str, job_id: Any) -> Optional[Dict[str, Any]]:
+    return (await read_progress_many_async(kind, [job_id])).get(str(job_id))
+
+
+def latest_version(snapshots: Iterable[Dict[str, Any]], since: int = 0) -> int:
+    return max([since, *(int(s.get("version") or 0) for s in snapshots)])
+
+
+def _newer(snapshots: Dict[str, Dict[str, Any]], since: int) -> Dict[str, Dict[str, Any]]:
+    return {job_id: s for job_id, s in snapshots.items() if int(s.get("version") or 0) > since}
+
+
+async def wait_for_progress(
+    kind: str,
+    job_ids: Iterable[Any],
+    since: int,
+    timeout: float,
+) -> Dict[str, Dict[str, Any]]:
+    """Wait until any of the jobs publishes a snapshot newer than `since`.
+
+    Returns the newer snapshots, or {} when `timeout` passes first. Without Redis this
+    just sleeps PROGRESS_FALLBACK_POLL_SECONDS so callers re-read Postgres at a steady pace.
+    """
+    ids = [str(job_id) for job_id in job_ids if job_id]
+    timeout = max(0.0, min(float(timeout), PROGRESS_WAIT_MAX_SECONDS))
+    client = _get_async_redis()
+    if client is None or get_redis() is None or not ids:
+        await asyncio.sleep(min(timeout, PROGRESS_FALLBACK_POLL_SECONDS))
+        return {}
+    changed = _newer(await read_progress_many_async(kind, ids), since)
+    if changed or timeout <= 0:
+        return changed
+
+    deadline = time.monotonic() + timeout
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(*(progress_key(kind, job_id) for job_id in ids))
+        # Re-read after subscribing so an update published in between is not missed.
+        changed = _newer(await read_progress_many_async(kind, ids), since)
+        while not changed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None:
+                changed = _newer(await read_progress_many_async(kind, ids), since)
+    except RedisError as exc:
+        log.warning("[progress] wait failed kind=%s err=%s", kind, exc)
+        await asyncio.sleep(max(0.0, min(deadline - time.monotonic(), PROGRESS_FALLBACK_POLL_SECONDS)))
+    finally:
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+        except RedisError:
+            pass
+    return changed
+
+
+async def progress_event_stream(
+    kind: str,
+    job_ids: Iterable[Any],
+    load: Callable[[], Awaitable[Tuple[Dict[str, Any], bool]]],
+) -> AsyncIterator[str]:
+    """Server-sent events for a progress endpoint.
+
+    `load()` returns (payload, done) — the durable row with the Redis snapshot applied.
+    An event is sent on every published update (and at least every
+    PROGRESS_WAIT_MAX_SECONDS, doubling as a keepalive) until `done` or
+    PROGRESS_STREAM_MAX_SECONDS, after which the client reconnects.
+    """
+    ids = [str(job_id) for job_id in job_ids]
+    since = latest_version((await read_progress_many_async(kind, ids)).values())
+    deadline = time.monotonic() + PROGRESS_STREAM_MAX_SECONDS
+    while True:
+        payload, done = await load()
+        yield f"data: {json.dumps(payload, default=str)}\n\n"
+        if done or time.monotonic() >= deadline:
+            return
+        changed = await wait_for_progress(kind, ids, since, PROGRESS_WAIT_MAX_SECONDS)
+        since = latest_version(changed.values(), since)
+
+
+class ProgressWriteBehind:
+    """Coalesces intermediate progress writes per job and flushes them periodically.
+
+    `update()` takes an UPDATE statement with named placeholders; a later update for the
+    same job replaces the earlier one, keeping previously set values for placeholders it
+    leaves as None (they are COALESCE'd in SQL anyway).
+    """
+
+    def __init__(self, flush_seconds: float = JOB_PROGRESS_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[Tuple[str, str], Tuple[str, Dict[str, Any]]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def update(self, kind: str, job_id: Any, sql: str, params: Dict[str, Any], *, published: bool) -> None:
+        if not published or self.flush_seconds <= 0:
+            await _execute([(sql, params)])
+            return
+        key = (kind, str(job_id))
+        merged = dict(params)
+        if key in self._pending:
+            merged = {**self._pending[key][1], **{name: v for name, v in params.items() if v is not None}}
+        self._pending[key] = (sql, merged)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def settle(self, kind: str, job_id: Any) -> None:
+        """Drop the pending write for a job whose final state is about to be written directly."""
+        async with self._lock:
+            self._pending.pop((kind, str(job_id)), None)
+
+    async def flush(self) -> int:
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                await _execute(list(pending.values()))
+            except Exception as exc:
+                log.warning("[progress] write-behind flush failed jobs=%d err=%s", len(pending), exc)
+                for key, value in pending.items():
+                    self._pending.setdefault(key, value)
+                return 0
+        return len(pending)
+
+    async def _run(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+
+async def _execute(statements) -> None:
+    async with db_conn() as (conn, cur):
+        for sql, params in statements:
+            await cur.execute(sql, params)
+        await conn.commit()
+
+
+progress_writer = ProgressWriteBehind()
+
+
+async def record_progress(kind: str, job_id: Any, fields: Dict[str, Any], sql: str, params: Dict[str, Any]) -> None:
+    """Publish an intermediate update and queue its coalesced write-through."""
+    published = await publish_progress_async(kind, job_id, fields) is not None
+    await progress_writer.update(kind, job_id, sql, params, published=published)
+
+
+async def record_final(kind: str, job_id: Any, fields: Dict[str, Any], write: Callable[[], Awaitable[None]]) -> None:
+    """Write a terminal state directly, then publish it so waiters wake up and re-read."""
+    await progress_writer.settle(kind, job_id)
+    await write()
+    await publish_progress_async(kind, job_id, fields)
@@ -0,0 +1,192 @@
+"""
+Fair, priority-aware ordering for the worker job queues.
+
+Every queued job has a lane and an owner (the user it runs for):
+
+- lanes are strict priorities: `interactive` (a student is waiting on the
+  result), `bulk` (the tail of a multi-file upload) and `background`
+  (pre-generation nobody is waiting on);
+- aging: a job moves up one lane for every JOB_LANE_AGING_SECONDS it has
+  waited, so bulk work cannot starve behind a steady stream of interactive
+  requests;
+- within a lane users take turns. A job's turn is its position in its owner's
+  queue plus the jobs that owner already has running, so one student's 50
+  uploads interleave with everyone else's instead of running first
+  (round-robin over users, with running work counted against the user).
+
+`claim_candidates_sql` builds the ranked, row-locking candidate query used by
+`PostgresJobStore.claim`. Queue-level gauges (depth, oldest-job age, completions
+per second, wait percentiles per lane) are computed from the queue tables, so the
+workers refresh them on every heartbeat and the API's /metrics can report every
+queue even with no worker running — the signal to scale workers on. The API
+refreshes them at most once per QUEUE_METRICS_TTL_SECONDS, however often it is scraped.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict
+
+from app.core.db import db_conn
+from app.core.metrics import Gauge
+
+log = logging.getLogger("uvicorn.error")
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BULK, BACKGROUND)
+
+JOB_LANE_AGING_SECONDS = max(1.0, float(os.getenv("JOB_LANE_AGING_SECONDS", "300")))
+# A user's uploads beyond this many queued OCR jobs go to the bulk lane.
+OCR_BULK_BACKLOG = max(1, int(os.getenv("OCR_BULK_BACKLOG", "3")))
+JOB_WAIT_WINDOW_MINUTES = max(1, int(os.getenv("JOB_WAIT_WINDOW_MINUTES", "15")))
+QUEUE_METRICS_TTL_SECONDS = max(0.0, float(os.getenv("QUEUE_METRICS_TTL_SECONDS", "10")))
+WAIT_QUANTILES = (0.5, 0.95, 0.99)
+JOB_QUEUE_TABLES = {"ocr": "ocr_jobs", "quiz": "quiz_jobs", "flashcard": "flashcard_jobs"}
+
+JOB_QUEUE_DEPTH = Gauge(
+    "notescape_job_queue_depth", "Jobs per queue by state (ready, delayed, running).", ("queue", "state")
+)
+JOB_QUEUE_OLDEST_AGE = Gauge(
+    "notescape_job_queue_oldest_age_seconds", "Age of the oldest queued job.", ("queue",)
+)
+JOB_QUEUE_THROUGHPUT = Gauge(
+    "notescape_job_queue_completed_per_second",
+    "Jobs finished (done or failed) per second over the last JOB_WAIT_WINDOW_MINUTES.",
+    ("queue",),
+)
+JOB_QUEUE_LANE_WAIT = Gauge(
+    "notescape_job_queue_lane_wait_seconds",
+    "Queue wait percentiles per lane over the last JOB_WAIT_WINDOW_MINUTES, including jobs still waiting.",
+    ("queue", "lane", "quantile"),
+)
+
+_LANE_RANK_SQL = "CASE {col} WHEN 'interactive' THEN 0 WHEN 'bulk' THEN 1 ELSE 2 END"
+
+
+def lane_for_backlog(queued_for_owner: int) -> str:
+    """Lane for a new upload given how many OCR jobs its owner already has queued."""
+    return BULK if queued_for_owner >= OCR_BULK_BACKLOG else INTERACTIVE
+
+
+def claim_candidates_sql(table: str, owner_column: str) -> str:
+    """Ids of claimable jobs in scheduling order, row-locked with SKIP LOCKED.
+
+    Parameters: (aging_seconds, limit).
+    """
+    lane_rank = _LANE_RANK_SQL.format(col="j.lane")
+    return f"""
+        WITH running AS (
+            SELECT {owner_column} AS owner, COUNT(*) AS n
+            FROM {table}
+            WHERE status='running'
+            GROUP BY {owner_column}
+        ),
+        ranked AS (
+            SELECT j.id,
+                   GREATEST(0, {lane_rank}
+                       - FLOOR(EXTRACT(EPOCH FROM (now() - j.created_at)) / %s))::int AS lane_rank,
+                   ROW_NUMBER() OVER (PARTITION BY j.{owner_column}, j.lane ORDER BY j.created_at)
+                       + COALESCE(r.n, 0) AS turn,
+                   j.created_at
+            FROM {table} j
+            LEFT JOIN running r ON r.owner IS NOT DISTINCT FROM j.{owner_column}
+            WHERE j.status='queued'
+              AND (j.next_attempt_at IS NULL OR j.next_attempt_at <= now())
+        )
+        SELECT j.id
+        FROM {table} j
+        JOIN ranked ON ranked.id = j.id
+        WHERE j.status='queued'
+        ORDER BY ranked.lane_rank, ranked.turn, ranked.created_at
+        LIMIT %s
+        FOR UPDATE OF j SKIP LOCKED
+    """
+
+
+async def queue_stats(table: str) -> Dict[str, float]:
+    """Depth by state, oldest queued job age and recent completion rate for one queue table."""
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            f"""
+            SELECT
+                COUNT(*) FILTER (WHERE status='queued' AND (next_attempt_at IS NULL OR next_attempt_at <= now())),
+                COUNT(*) FILTER (WHERE status='queued' AND next_attempt_at > now()),
+                COUNT(*) FILTER (WHERE status='running'),
+                COALESCE(EXTRACT(EPOCH FROM (now() - MIN(created_at) FILTER (WHERE status='queued'))), 0)::float8,
+                COUNT(*) FILTER (WHERE finished_at >= now() - (%s * interval '1 minute'))
+            FROM {table}
+            WHERE status IN ('queued', 'running') OR finished_at >= now() - (%s * interval '1 minute')
+            """,
+            (JOB_WAIT_WINDOW_MINUTES, JOB_WAIT_WINDOW_MINUTES),
+        )
+        ready, delayed, running, oldest, finished = await cur.fetchone()
+    return {
+        "ready": ready,
+        "delayed": delayed,
+        "running": running,
+        "oldest_age_seconds": oldest,
+        "completed_per_second": finished / (JOB_WAIT_WINDOW_MINUTES * 60.0),
+    }
+
+
+def record_queue_stats(queue: str, stats: Dict[str, float]) -> None:
+    for state in ("ready", "delayed", "running"):
+        JOB_QUEUE_DEPTH.set(stats[state], queue=queue, state=state)
+    JOB_QUEUE_OLDEST_AGE.set(stats["oldest_age_seconds"], queue=queue)
+    if "completed_per_second" in stats:
+        JOB_QUEUE_THROUGHPUT.set(stats["completed_per_second"], queue=queue)
+    record_lane_waits(queue, stats.get("lane_wait_seconds") or {})
+
+
+async def lane_wait_percentiles(table: str) -> Dict[str, Dict[float, float]]:
+    """Queue wait percentiles per lane over recently claimed jobs and jobs still waiting."""
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            f"""
+            SELECT lane,
+                   percentile_cont(%s::float8[]) WITHIN GROUP (ORDER BY wait_seconds)
+            FROM (
+                SELECT lane,
+                       EXTRACT(EPOCH FROM (COALESCE(started_at, now()) - created_at))::float8 AS wait_seconds
+                FROM {table}
+                WHERE (status='queued' AND (next_attempt_at IS NULL OR next_attempt_at <= now()))
+                   OR started_at >= now() - (%s * interval '1 minute')
+            ) waits
+            GROUP BY lane
+            """,
+            (list(WAIT_QUANTILES), JOB_WAIT_WINDOW_MINUTES),
+        )
+        rows = await cur.fetchall()
+    return {lane: dict(zip(WAIT_QUANTILES, values or ())) for lane, values in rows}
+
+
+def record_lane_waits(queue: str, waits: Dict[str, Dict[float, float]]) -> None:
+    for lane, quantiles in waits.items():
+        for quantile, seconds in quantiles.items():
+            JOB_QUEUE_LANE_WAIT.set(seconds, queue=queue, lane=lane or INTERACTIVE, quantile=quantile)
+
+
+_QUEUE_METRICS_LOCK = asyncio.Lock()
+_queue_metrics_refreshed_at: float | None = None
+
+
+async def refresh_queue_metrics() -> None:
+    """Refresh the queue gauges for every queue (the API calls this on scrape), at most once per TTL."""
+    global _queue_metrics_refreshed_at
+    async with _QUEUE_METRICS_LOCK:
+        # Concurrent scrapes wait here and reuse the refresh that was in flight.
+        if (
+            _queue_metrics_refreshed_at is not None
+            and time.monotonic() - _queue_metrics_refreshed_at < QUEUE_METRICS_TTL_SECONDS
+        ):
+            return
+        for queue, table in JOB_QUEUE_TABLES.items():
+            try:
+                stats = await queue_stats(table)
+                stats["lane_wait_seconds"] = await lane_wait_percentiles(table)
+                record_queue_stats(queue, stats)
+            except Exception as exc:
+                log.warning("[jobs] queue metrics refresh failed queue=%s err=%s", queue, exc)
+        _queue_metrics_refreshed_at = time.monotonic()
@@ -1,10 +1,22 @@
 # app/core/llm.py
+import asyncio
+import contextvars
 import os
 import json
 import re
+import hashlib
 import logging
+import zlib
 from typing import List, Callable, Dict, Any
 
+from app.core.llm_tracing import (
+    llm_call_site,
+    record_cache_lookup,
+    record_retry,
+    trace_embedding_call,
+    trace_llm_call,
+)
+
 log = logging.getLogger("uvicorn.error")
 
 # -----------------------
@@ -28,6 +40,14 @@ GEN_T          = float(os.getenv("GEN_T", "0.2"))
 QUIZ_MODEL = os.getenv("QUIZ_MODEL", GEN_MODEL)
 QUIZ_T     = float(os.getenv("QUIZ_T", str(GEN_T)))
 
+# Generation cache (opt-in): replays identical prompts from Redis on retries / re-queued jobs
+LLM_CACHE_ENABLED   = os.getenv("LLM_CACHE_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on")
+LLM_CACHE_TTL       = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", "262144"))  # compressed entry cap
+
+# Prompts carrying a variation nonce (see quiz_worker._build_prompt) ask for fresh output on purpose.
+_VARIATION_NONCE_RE = re.compile(r"\bNONCE\s*:", re.I)
+
 
 def _is_billing_or_quota_error_message(message: str) -> bool:
     lowered = (message or "").lower()
@@ -59,16 +79,113 @@ def _pad_to_dim(vecs: List[List[float]], dim: int) -> List[List[float]]:
             out.append(v + [0.0] * (dim - len(v)))
     return out
 
+# -----------------------
+# Generation cache
+# -----------------------
+def _generation_cache_key(provider: str, model: str, temperature: float, system: str, user: str) -> str:
+    system_h = hashlib.sha256((system or "").encode("utf-8")).hexdigest()[:16]
+    user_h = hashlib.sha256((user or "").encode("utf-8")).hexdigest()
+    return f"llmgen:{provider}:{model}:{temperature:g}:{system_h}:{user_h}"
+
+
+def _extract_json_candidate(raw: str) -> str:
+    if not raw:
+        return ""
+    text = raw.strip()
+
+    # If model wrapped JSON in ```json fences
+    fenced = re.search(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", text, re.S | re.I)
+    if fenced:
+        return fenced.group(1).strip()
+
+    # Otherwise attempt to slice from first {..} or [..]
+    start_obj = text.find("{")
+    end_obj = text.rfind("}")
+    if start_obj != -1 and end_obj != -1 and end_obj > start_obj:
+        return text[start_obj:end_obj + 1].strip()
+
+    start_arr = text.find("[")
+    end_arr = text.rfind("]")
+    if start_arr != -1 and end_arr != -1 and end_arr > start_arr:
+        return text[start_arr:end_arr + 1].strip()
+
+    return text
+
+
+def _is_cacheable_output(out: str) -> bool:
+    # Only replay well-formed JSON so a malformed answer is never served again on retry.
+    candidate = _extract_json_candidate(out)
+    if not candidate:
+        return False
+    try:
+        json.loads(candidate)
+    except Exception:
+        return False
+    return True
+
+
+# Set by a provider call that answered with its fallback model; such replies are not cached.
+_FALLBACK_REPLY: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_fallback_reply", default=False)
+
+
+def _with_generation_cache(
+    fn: Callable[[str, str], Any],
+    provider: str,
+    model: str,
+    temperature: float,
+) -> Callable[[str, str], Any]:
+    if not LLM_CACHE_ENABLED:
+        return fn
+
+    from app.core.cache import cache_get, cache_set
+
+    async def _cached(system: str, user: str) -> str:
+        if _VARIATION_NONCE_RE.search(user or "") or _VARIATION_NONCE_RE.search(system or ""):
+            return await fn(system, user)
+
+        key = _generation_cache_key(provider, model, temperature, system, user)
+        hit = await asyncio.to_thread(cache_get, key)
+        if hit is not None:
+            try:
+                out = zlib.decompress(hit).decode("utf-8")
+                log.info("[llm_cache] hit provider=%s model=%s key=%s", provider, model, key[-12:])
+                record_cache_lookup(provider, "hit")
+                return out
+            except Exception as exc:
+                log.warning("[llm_cache] corrupt entry key=%s: %s", key, exc)
+
+        record_cache_lookup(provider, "miss")
+        token = _FALLBACK_REPLY.set(False)
+        try:
+            out = await fn(system, user)
+            fallback = _FALLBACK_REPLY.get()
+        finally:
+            _FALLBACK_REPLY.reset(token)
+        if fallback:
+            log.info("[llm_cache] skip fallback-model reply provider=%s model=%s", provider, model)
+        elif out and _is_cacheable_output(out):
+            packed = zlib.compress(out.encode("utf-8"), 6)
+            if len(packed) <= LLM_CACHE_MAX_BYTES:
+                await asyncio.to_thread(cache_set, key, packed, LLM_CACHE_TTL)
+            else:
+                log.info("[llm_cache] skip oversized entry bytes=%s cap=%s", len(packed), LLM_CACHE_MAX_BYTES)
+        return out
+
+    return _cached
+
 # -----------------------
 # Embeddings
 # -----------------------
 class Embedder:
-    def __init__(self, fn: Callable[[List[str]], Any], dim: int):
+    def __init__(self, fn: Callable[[List[str]], Any], dim: int, provider: str = EMBED_PROVIDER, model: str = EMBED_MODEL):
         self._fn = fn
         self.dim = dim
+        self.provider = provider
+        self.model = model
 
     async def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        return await self._fn(texts)
+        with trace_embedding_call(self.provider, self.model, len(texts)):
+            return await self._fn(texts)
 
 def get_embedder() -> Embedder:
     if EMBED_PROVIDER == "local":
@@ -101,7 +218,7 @@ def get_embedder() -> Embedder:
             vecs = [d.embedding for d in resp.data]
             return _pad_to_dim(vecs, EMBED_DIM)
 
-        return Embedder(_embed, EMBED_DIM)
+        return Embedder(_embed, EMBED_DIM, "together", together_embed_model)
 
     if EMBED_PROVIDER == "openai":
         from openai import OpenAI
@@ -112,12 +229,12 @@ def get_embedder() -> Embedder:
             resp = client.embeddings.create(model=openai_embed_model, input=texts)
             return [d.embedding for d in resp.data]
 
-        return Embedder(_embed, EMBED_DIM)
+        return Embedder(_embed, EMBED_DIM, "openai", openai_embed_model)
 
     async def _fake(texts: List[str]) -> List[List[float]]:
         return [[0.0] * EMBED_DIM for _ in texts]
 
-    return Embedder(_fake, EMBED_DIM)
+    return Embedder(_fake, EMBED_DIM, "fake", "fake")
 
 # -----------------------
 # Card generator (flashcards)
@@ -131,27 +248,7 @@ class CardGenerator:
         return await self._fn(system, user)
 
     def _extract_json_candidate(self, raw: str) -> str:
-        if not raw:
-            return ""
-        text = raw.strip()
-
-        # If model wrapped JSON in ```json fences
-        fenced = re.search(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", text, re.S | re.I)
-        if fenced:
-            return fenced.group(1).strip()
-
-        # Otherwise attempt to slice from first {..} or [..]
-        start_obj = text.find("{")
-        end_obj = text.rfind("}")
-        if start_obj != -1 and end_obj != -1 and end_obj > start_obj:
-            return text[start_obj:end_obj + 1].strip()
-
-        start_arr = text.find("[")
-        end_arr = text.rfind("]")
-        if start_arr != -1 and end_arr != -1 and end_arr > start_arr:
-            return text[start_arr:end_arr + 1].strip()
-
-        return text
+        return _extract_json_candidate(raw)
 
     def _normalize_card(self, c: Dict[str, Any]) -> Dict[str, Any] | None:
         # Accept multiple common key variants
@@ -255,6 +352,7 @@ class CardGenerator:
             '{"cards":[{"front":"...","back":"...","topic":"Short concept label","difficulty":"easy|medium|hard","source":null,"tags":["..."]}]}\n\n'
             f"TEXT TO CONVERT:\n{raw}"
         )
+        record_retry("json_repair")
         raw2 = await self._fn(repair_system, repair_user)
         return self._parse_cards(raw2)
 
@@ -290,29 +388,34 @@ def get_card_generator() -> "CardGenerator":
 
         async def _chat(system: str, user: str) -> str:
             used_model = model
-            try:
-                r = _call_chat(model, system, user)
-            except Exception as e:
-                err_text = str(e)
-                if (
-                    model != fallback_model
-                    and fallback_model
-                    and _is_billing_or_quota_error_message(err_text)
-                ):
-                    log.warning(
-                        "[flashcards][groq] model=%s failed due to quota/billing; retrying with fallback=%s",
-                        model,
-                        fallback_model,
-                    )
-                    used_model = fallback_model
-                    r = _call_chat(fallback_model, system, user)
-                else:
-                    raise
+            with trace_llm_call("groq", model) as trace:
+                try:
+                    r = await asyncio.to_thread(_call_chat, model, system, user)
+                except Exception as e:
+                    err_text = str(e)
+                    if (
+                        model != fallback_model
+                        and fallback_model
+                        and _is_billing_or_quota_error_message(err_text)
+                    ):
+                        log.warning(
+                            "[flashcards][groq] model=%s failed due to quota/billing; retrying with fallback=%s",
+                            model,
+                            fallback_model,
+                        )
+                        trace.retry("fallback_model")
+                        used_model = fallback_model
+                        trace.model = fallback_model
+                        _FALLBACK_REPLY.set(True)
+                        r = await asyncio.to_thread(_call_chat, fallback_model, system, user)
+                    else:
+                        raise
+                trace.record_usage(getattr(r, "usage", None))
             out = (r.choices[0].message.content or "").strip()
             log.info("[flashcards][groq model=%s] raw_out=%s", used_model, out[:1200])
             return out
 
-        return CardGenerator(_chat)
+        return CardGenerator(_with_generation_cache(_chat, "groq", model, temperature))
 
     if LLM_PROVIDER == "together":
         import openai
@@ -322,19 +425,22 @@ def get_card_generator() -> "CardGenerator":
         temperature = float(os.getenv("GEN_T", "0.2"))
 
         async def _chat(system: str, user: str) -> str:
-            r = openai.chat.completions.create(
-                model=model,
-                temperature=temperature,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
-            )
+            with trace_llm_call("together", model) as trace:
+                r = await asyncio.to_thread(
+                    openai.chat.completions.create,
+                    model=model,
+                    temperature=temperature,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                )
+                trace.record_usage(getattr(r, "usage", None))
             out = (r.choices[0].message.content or "").strip()
             log.info("[flashcards][together model=%s] raw_out=%s", model, out[:1200])
             return out
 
-        return CardGenerator(_chat)
+        return CardGenerator(_with_generation_cache(_chat, "together", model, temperature))
 
     if LLM_PROVIDER == "openai":
         from openai import OpenAI
@@ -343,19 +449,22 @@ def get_card_generator() -> "CardGenerator":
         temperature = float(os.getenv("GEN_T", "0.2"))
 
         async def _chat(system: str, user: str) -> str:
-            r = client.chat.completions.create(
-                model=model,
-                temperature=temperature,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
-            )
+            with trace_llm_call("openai", model) as trace:
+                r = await asyncio.to_thread(
+                    client.chat.completions.create,
+                    model=model,
+                    temperature=temperature,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                )
+                trace.record_usage(getattr(r, "usage", None))
             out = (r.choices[0].message.content or "").strip()
             log.info("[flashcards][openai model=%s] raw_out=%s", model, out[:1200])
             return out
 
-        return CardGenerator(_chat)
+        return CardGenerator(_with_generation_cache(_chat, "openai", model, temperature))
 
     async def _fake(system: str, user: str) -> str:
         return '{"cards":[{"question":"Demo?","answer":"Demo","difficulty":"easy","tags":["demo"]}]}'
@@ -504,6 +613,7 @@ def get_quiz_generator() -> Callable[[str], Any]:
                 "Return only the JSON object.\n\n"
                 f"TEXT TO REPAIR:\n{last_candidate or raw}"
             )
+            record_retry("json_repair")
             repaired_raw = await cg.generate_raw(repair_system, repair_user)
             repaired_candidate = cg._extract_json_candidate(repaired_raw)
             parsed = _coerce_json(repaired_candidate)
@@ -559,7 +669,8 @@ async def grade_theory_answer(question: str, expected_answer: str, user_answer:
         "Grade (0/1/2):"
     )
 
-    raw = await cg.generate_raw(system, user_prompt)
+    with llm_call_site("theory_grading"):
+        raw = await cg.generate_raw(system, user_prompt)
     
     # Extract first digit found
     match = re.search(r"[0-2]", raw)
@@ -0,0 +1,194 @@
+"""
+Tracing for outbound LLM and embedding calls.
+
+Every provider call runs inside `trace_llm_call` / `trace_embedding_call`, which
+record wall time, time to first token, token usage and the outcome into the
+shared metrics registry (see app.core.metrics, exported on GET /metrics).
+
+The call site ("quiz_generation", "theory_grading", "chat_rag", ...) is carried
+in a context variable so the provider closures in app.core.llm don't need to
+know who invoked them; set it with `llm_call_site(...)` around the caller.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from app.core.metrics import TOKEN_BUCKETS, Counter, Gauge, Histogram
+
+_CALL_SITE: contextvars.ContextVar[str] = contextvars.ContextVar("llm_call_site", default="unknown")
+
+_CALL_LABELS = ("call_site", "provider", "model", "outcome")
+_USAGE_LABELS = ("call_site", "provider", "model")
+
+LLM_CALL_SECONDS = Histogram(
+    "notescape_llm_call_duration_seconds",
+    "Wall time of LLM chat completion calls.",
+    _CALL_LABELS,
+)
+LLM_CALLS_IN_FLIGHT = Gauge(
+    "notescape_llm_calls_in_flight",
+    "LLM chat completion calls currently waiting on the provider in this process.",
+)
+LLM_TTFT_SECONDS = Histogram(
+    "notescape_llm_time_to_first_token_seconds",
+    "Time until the first completion token was available to the caller.",
+    _USAGE_LABELS,
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "notescape_llm_queue_wait_seconds",
+    "Time a call waited for a local concurrency slot before reaching the provider.",
+    ("call_site",),
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "notescape_llm_prompt_tokens",
+    "Prompt tokens per LLM call, as reported by the provider.",
+    _USAGE_LABELS,
+    buckets=TOKEN_BUCKETS,
+)
+LLM_COMPLETION_TOKENS = Histogram(
+    "notescape_llm_completion_tokens",
+    "Completion tokens per LLM call, as reported by the provider.",
+    _USAGE_LABELS,
+    buckets=TOKEN_BUCKETS,
+)
+LLM_TOKENS_TOTAL = Counter(
+    "notescape_llm_tokens_total",
+    "Tokens consumed by LLM calls.",
+    _USAGE_LABELS + ("kind",),
+)
+LLM_RETRIES_TOTAL = Counter(
+    "notescape_llm_retries_total",
+    "Extra LLM calls made to recover from a failed or unusable response.",
+    ("call_site", "reason"),
+)
+LLM_CACHE_LOOKUPS_TOTAL = Counter(
+    "notescape_llm_generation_cache_total",
+    "Generation cache lookups by result.",
+    ("call_site", "provider", "result"),
+)
+EMBED_CALL_SECONDS = Histogram(
+    "notescape_embedding_call_duration_seconds",
+    "Wall time of embedding provider calls.",
+    _CALL_LABELS,
+)
+EMBED_TEXTS_TOTAL = Counter(
+    "notescape_embedding_texts_total",
+    "Texts sent to the embedding provider.",
+    ("call_site", "provider", "model"),
+)
+
+
+def current_call_site() -> str:
+    return _CALL_SITE.get()
+
+
+def llm_calls_in_flight() -> int:
+    return int(LLM_CALLS_IN_FLIGHT.value())
+
+
+@contextmanager
+def llm_call_site(name: str) -> Iterator[None]:
+    token = _CALL_SITE.set(name)
+    try:
+        yield
+    finally:
+        _CALL_SITE.reset(token)
+
+
+def is_rate_limited_error(exc: BaseException) -> bool:
+    """Provider 429 / rate-limit responses, which are worth retrying later."""
+    text = str(exc)
+    return getattr(exc, "status_code", None) == 429 or "rate limit" in text.lower() or "429" in text
+
+
+def _classify_error(exc: BaseException) -> str:
+    if is_rate_limited_error(exc):
+        return "rate_limited"
+    if isinstance(exc, TimeoutError) or "timeout" in type(exc).__name__.lower():
+        return "timeout"
+    return "error"
+
+
+class LLMCallTrace:
+    def __init__(self, provider: str, model: str):
+        self.call_site = current_call_site()
+        self.provider = provider
+        self.model = model
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.outcome = "ok"
+
+    def first_token(self) -> None:
+        """Mark the first token; streaming callers call this on the first delta."""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def retry(self, reason: str) -> None:
+        LLM_RETRIES_TOTAL.inc(call_site=self.call_site, reason=reason)
+
+    def record_usage(self, usage: Any) -> None:
+        if usage is None:
+            return
+        labels = {"call_site": self.call_site, "provider": self.provider, "model": self.model}
+        prompt = getattr(usage, "prompt_tokens", None)
+        completion = getattr(usage, "completion_tokens", None)
+        if isinstance(prompt, int):
+            LLM_PROMPT_TOKENS.observe(prompt, **labels)
+            LLM_TOKENS_TOTAL.inc(prompt, kind="prompt", **labels)
+        if isinstance(completion, int):
+            LLM_COMPLETION_TOKENS.observe(completion, **labels)
+            LLM_TOKENS_TOTAL.inc(completion, kind="completion", **labels)
+
+
+@contextmanager
+def trace_llm_call(provider: str, model: str) -> Iterator[LLMCallTrace]:
+    trace = LLMCallTrace(provider, model)
+    LLM_CALLS_IN_FLIGHT.inc()
+    try:
+        yield trace
+    except BaseException as exc:
+        trace.outcome = _classify_error(exc)
+        raise
+    finally:
+        LLM_CALLS_IN_FLIGHT.dec()
+        ended = time.perf_counter()
+        labels = {"call_site": trace.call_site, "provider": trace.provider, "model": trace.model}
+        LLM_CALL_SECONDS.observe(ended - trace.started, outcome=trace.outcome, **labels)
+        if trace.outcome == "ok":
+            # Non-streaming responses deliver the first token together with the body.
+            first = trace.first_token_at if trace.first_token_at is not None else ended
+            LLM_TTFT_SECONDS.observe(first - trace.started, **labels)
+
+
+@contextmanager
+def trace_embedding_call(provider: str, model: str, n_texts: int) -> Iterator[None]:
+    call_site = current_call_site()
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException as exc:
+        outcome = _classify_error(exc)
+        raise
+    finally:
+        EMBED_CALL_SECONDS.observe(
+            time.perf_counter() - started,
+            call_site=call_site,
+            provider=provider,
+            model=model,
+            outcome=outcome,
+        )
+        EMBED_TEXTS_TOTAL.inc(n_texts, call_site=call_site, provider=provider, model=model)
+
+
+def observe_queue_wait(seconds: float, call_site: Optional[str] = None) -> None:
+    LLM_QUEUE_WAIT_SECONDS.observe(max(0.0, seconds), call_site=call_site or current_call_site())
+
+
+def record_retry(reason: str) -> None:
+    LLM_RETRIES_TOTAL.inc(call_site=current_call_site(), reason=reason)
+
+
+def record_cache_lookup(provider: str, result: str) -> None:
+    LLM_CACHE_LOOKUPS_TOTAL.inc(call_site=current_call_site(), provider=provider, result=result)
@@ -14,6 +14,14 @@ _DEFAULT_OCR_PIPELINE_SQL_PATH = _REPO_ROOT / "db" / "init" / "20_ocr_pipeline.s
 _DEFAULT_STUDY_PLAN_VOICE_SQL_PATH = _REPO_ROOT / "db" / "init" / "21_study_plan_voice.sql"
 _DEFAULT_DOCUMENT_STORAGE_SQL_PATH = _REPO_ROOT / "db" / "init" / "22_document_storage_filenames.sql"
 _DEFAULT_DOCUMENT_PREVIEW_PIPELINE_SQL_PATH = _REPO_ROOT / "db" / "init" / "23_document_preview_pipeline.sql"
+_DEFAULT_QUIZ_QUESTION_BANK_SQL_PATH = _REPO_ROOT / "db" / "init" / "24_quiz_question_bank.sql"
+_DEFAULT_JOB_RUNTIME_SQL_PATH = _REPO_ROOT / "db" / "init" / "25_job_runtime.sql"
+_DEFAULT_STREAMING_INDEX_SQL_PATH = _REPO_ROOT / "db" / "init" / "26_streaming_index.sql"
+_DEFAULT_OCR_CHECKPOINT_SQL_PATH = _REPO_ROOT / "db" / "init" / "27_ocr_checkpoints.sql"
+_DEFAULT_JOB_SCHEDULING_SQL_PATH = _REPO_ROOT / "db" / "init" / "28_job_scheduling.sql"
+_DEFAULT_OCR_VARIANT_STATS_SQL_PATH = _REPO_ROOT / "db" / "init" / "29_ocr_variant_stats.sql"
+_DEFAULT_DOCUMENT_TEXT_SQL_PATH = _REPO_ROOT / "db" / "init" / "30_document_text.sql"
+_DEFAULT_CONTENT_BLOBS_SQL_PATH = _REPO_ROOT / "db" / "init" / "31_content_blobs.sql"
 
 
 def _migration_candidates(env_var: str, filename: str, default_path: Path) -> list[Path]:
@@ -173,3 +181,195 @@ async def ensure_study_plan_voice_schema() -> None:
         log.info("Ensuring study plan + voice revision schema exists using %s", sql_path.name)
         await cur.execute(sql)
         await conn.commit()
+
+
+async def ensure_quiz_question_bank_schema() -> None:
+    candidates = _migration_candidates(
+        "QUIZ_QUESTION_BANK_MIGRATION_FILE",
+        "24_quiz_question_bank.sql",
+        _DEFAULT_QUIZ_QUESTION_BANK_SQL_PATH,
+    )
+    sql_path = next((candidate for candidate in candidates if candidate.exists()), None)
+    if not sql_path:
+        log.warning(
+            "Quiz question bank migration file not found, tried %s",
+            ", ".join(str(p) for p in candidates),
+        )
+        return
+
+    sql = sql_path.read_text()
+    if not sql.strip():
+        return
+
+    async with db_conn() as (conn, cur):
+        log.info("Ensuring quiz question bank schema exists using %s", sql_path.name)
+        await cur.execute(sql)
+        await conn.commit()
+
+
+async def ensure_job_runtime_schema() -> None:
+    candidates = _migration_candidates(
+        "JOB_RUNTIME_MIGRATION_FILE",
+        "25_job_runtime.sql",
+        _DEFAULT_JOB_RUNTIME_SQL_PATH,
+    )
+    sql_path = next((candidate for candidate in candidates if candidate.exists()), None)
+    if not sql_path:
+        log.warning(
+            "Job runtime migration file not found, tried %s",
+            ", ".join(str(p) for p in candidates),
+        )
+        return
+
+    sql = sql_path.read_text()
+    if not sql.strip():
+        return
+
+    async with db_conn() as (conn, cur):
+        log.info("Ensuring job runtime schema exists using %s", sql_path.name)
+        await cur.execute(sql)
+        await conn.commit()
+
+
+async def ensure_streaming_index_schema() -> None:
+    candidates = _migration_candidates(
+        "STREAMING_INDEX_MIGRATION_FILE",
+        "26_streaming_index.sql",
+        _DEFAULT_STREAMING_INDEX_SQL_PATH,
+    )
+    sql_path = next((candidate for candidate in candidates if candidate.exists()), None)
+    if not sql_path:
+        log.warning(
+            "Streaming index migration file not found, tried %s",
+            ", ".join(str(p) for p in candidates),
+        )
+        return
+
+    sql = sql_path.read_text()
+    if not sql.strip():
+        return
+
+    async with db_conn() as (conn, cur):
+        log.info("Ensuring streaming index columns exist using %s", sql_path.name)
+        await cur.execute(sql)
+        await conn.commit()
+
+
+async def ensure_ocr_checkpoint_schema() -> None:
+    candidates = _migration_candidates(
+        "OCR_CHECKPOINT_MIGRATION_FILE",
+        "27_ocr_checkpoints.sql",
+        _DEFAULT_OCR_CHECKPOINT_SQL_PATH,
+    )
+    sql_path = next((candidate for candidate in candidates if candidate.exists()), None)
+    if not sql_path:
+        log.warning(
+            "OCR checkpoint migration file not found, tried %s",
+            ", ".join(str(p) for p in candidates),
+        )
+        return
+
+    sql = sql_path.read_text()
+    if not sql.strip():
+        return
+
+    async with db_conn() as (conn, cur):
+        log.info("Ensuring OCR checkpoint columns exist using %s", sql_path.name)
+        await cur.execute(sql)
+        await conn.commit()
+
+
+async def ensure_job_scheduling_schema() -> None:
+    candidates = _migration_candidates(
+        "JOB_SCHEDULING_MIGRATION_FILE",
+        "28_job_scheduling.sql",
+        _DEFAULT_JOB_SCHEDULING_SQL_PATH,
+    )
+    sql_path = next((candidate for candidate in candidates if candidate.exists()), None)
+    if not sql_path:
+        log.warning(
+            "Job scheduling migration file not found, tried %s",
+            ", ".join(str(p) for p in candidates),
+        )
+        return
+
+    sql = sql_path.read_text()
+    if not sql.strip():
+        return
+
+    async with db_conn() as (conn, cur):
+        log.info("Ensuring job scheduling columns exist using %s", sql_path.name)
+        await cur.execute(sql)
+        await conn.commit()
+
+
+async def ensure_ocr_variant_stats_schema() -> None:
+    candidates = _migration_candidates(
+        "OCR_VARIANT_STATS_MIGRATION_FILE",
+        "29_ocr_variant_stats.sql",
+        _DEFAULT_OCR_VARIANT_STATS_SQL_PATH,
+    )
+    sql_path = next((candidate for candidate in candidates if candidate.exists()), None)
+    if not sql_path:
+        log.warning(
+            "OCR variant stats migration file not found, tried %s",
+            ", ".join(str(p) for p in candidates),
+        )
+        return
+
+    sql = sql_path.read_text()
+    if not sql.strip():
+        return
+
+    async with db_conn() as (conn, cur):
+        log.info("Ensuring OCR variant stats table exists using %s", sql_path.name)
+        await cur.execute(sql)
+        await conn.commit()
+
+
+async def ensure_document_text_schema() -> None:
+    candidates = _migration_candidates(
+        "DOCUMENT_TEXT_MIGRATION_FILE",
+        "30_document_text.sql",
+        _DEFAULT_DOCUMENT_TEXT_SQL_PATH,
+    )
+    sql_path = next((candidate for candidate in candidates if candidate.exists()), None)
+    if not sql_path:
+        log.warning(
+            "Document text migration file not found, tried %s",
+            ", ".join(str(p) for p in candidates),
+        )
+        return
+
+    sql = sql_path.read_text()
+    if not sql.strip():
+        return
+
+    async with db_conn() as (conn, cur):
+        log.info("Ensuring document text tables exist using %s", sql_path.name)
+        await cur.execute(sql)
+        await conn.commit()
+
+
+async def ensure_content_blobs_schema() -> None:
+    candidates = _migration_candidates(
+        "CONTENT_BLOBS_MIGRATION_FILE",
+        "31_content_blobs.sql",
+        _DEFAULT_CONTENT_BLOBS_SQL_PATH,
+    )
+    sql_path = next((candidate for candidate in candidates if candidate.exists()), None)
+    if not sql_path:
+        log.warning(
+            "Content blobs migration file not found, tried %s",
+            ", ".join(str(p) for p in candidates),
+        )
+        return
+
+    sql = sql_path.read_text()
+    if not sql.strip():
+        return
+
+    async with db_conn() as (conn, cur):
+        log.info("Ensuring content blob tables exist using %s", sql_path.name)
+        await cur.execute(sql)
+        await conn.commit()
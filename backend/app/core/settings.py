@@ -24,6 +24,8 @@ class Settings(BaseSettings):
     s3_bucket: str = Field(alias="S3_BUCKET")
     s3_region: str = Field(default="us-east-1", alias="S3_REGION")
 
+    redis_url: str | None = Field(default=None, alias="REDIS_URL")
+
     chat_provider: str = Field(default="groq", alias="CHAT_PROVIDER")
     chat_model: str = Field(default="llama-3.3-70b-versatile", alias="CHAT_MODEL")
     groq_api_key: str | None = Field(default=None, alias="GROQ_API_KEY")
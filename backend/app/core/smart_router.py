@@ -28,6 +28,7 @@ from app.core.db import db_conn
 from app.core.llm import get_embedder
 from app.core.embedding_cache import embed_texts_cached
 from app.core.chat_llm import chat_completion
+from app.core.llm_tracing import llm_call_site
 
 log = logging.getLogger("uvicorn.error")
 
@@ -46,7 +47,8 @@ def _vec_literal(vec: List[float]) -> str:
 
 async def _embed_query(query: str) -> List[float]:
     embedder = get_embedder()
-    vecs = await embed_texts_cached(embedder, [query])
+    with llm_call_site("chat_query"):
+        vecs = await embed_texts_cached(embedder, [query])
     return vecs[0]
 
 
@@ -182,7 +184,7 @@ async def _rag_answer(
     chunks: List[Dict[str, Any]],
 ) -> Dict[str, Any]:
     system, user = _build_rag_prompt(chunks, question)
-    answer = chat_completion(system, user, temperature=0.15)
+    answer = chat_completion(system, user, temperature=0.15, call_site="chat_rag")
 
     citations = [
         {
@@ -237,7 +239,7 @@ def _build_general_prompt(
 async def _general_answer(question: str) -> Dict[str, Any]:
     web_results = _web_search(question)
     system, user = _build_general_prompt(question, web_results)
-    answer = chat_completion(system, user, temperature=0.3)
+    answer = chat_completion(system, user, temperature=0.3, call_site="chat_general")
 
     web_sources = [
         {"title": r.get("title", ""), "url": r.get("href", "")}
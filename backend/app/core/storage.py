@@ -106,6 +106,18 @@ def put_object(fileobj, key: str, content_type: str | None):
 
     return StoredObject(bucket=bucket, key=key, public_url=public_url, s3_url=f"s3://{bucket}/{key}")
 
+def object_exists(key: str) -> bool:
+    from botocore.exceptions import ClientError
+
+    s3 = get_s3_client()
+    try:
+        s3.head_object(Bucket=settings.s3_bucket, Key=key)
+        return True
+    except ClientError as exc:
+        if str(exc.response.get("Error", {}).get("Code")) in {"404", "NoSuchKey", "NotFound"}:
+            return False
+        raise
+
 def delete_object(key: str):
     s3 = get_s3_client()
     s3.delete_object(Bucket=settings.s3_bucket, Key=key)
@@ -134,16 +146,23 @@ def get_object_bytes(key: str) -> bytes:
     resp = s3.get_object(Bucket=settings.s3_bucket, Key=key)
     return resp["Body"].read()
 
-def put_bytes(key: str, data: bytes, content_type: str = "application/octet-stream"):
+def put_bytes(
+    key: str,
+    data: bytes,
+    content_type: str = "application/octet-stream",
+    content_encoding: str | None = None,
+):
     s3 = get_s3_client()
     bucket = settings.s3_bucket
     with _ensured_buckets_lock:
         if bucket not in _ensured_buckets:
             ensure_bucket(s3, bucket)
             _ensured_buckets.add(bucket)
+    extra = {"ContentEncoding": content_encoding} if content_encoding else {}
     s3.put_object(
         Bucket=bucket,
         Key=key,
         Body=data,
         ContentType=content_type,
+        **extra,
     )
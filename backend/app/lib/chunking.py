@@ -4,19 +4,7 @@ from pathlib import Path
 import logging
 import regex as re
 
-from pypdf import PdfReader
-
-# Optional backends
-try:
-    from pdfminer.high_level import extract_pages as pdfminer_extract_pages
-    from pdfminer.layout import LTTextContainer
-except Exception:
-    pdfminer_extract_pages = None
-
-try:
-    import fitz  # PyMuPDF
-except Exception:
-    fitz = None
+from app.lib.pdf_extractors import extract_pdf_text
 
 log = logging.getLogger("uvicorn.error")
 
@@ -28,94 +16,21 @@ def _normalize(s: str) -> str:
     return s.strip()
 
 
-def _extract_with_pdfminer(pdf_path: Path) -> List[str]:
-    if pdfminer_extract_pages is None:
-        raise RuntimeError("pdfminer.six not installed")
-    pages: List[str] = []
-    for layout in pdfminer_extract_pages(str(pdf_path)):
-        buf = []
-        for el in layout:
-            if isinstance(el, LTTextContainer):
-                buf.append(el.get_text())
-        pages.append(_normalize("".join(buf)))
-    return pages
-
-
-def _extract_with_pymupdf(pdf_path: Path) -> List[str]:
-    if fitz is None:
-        raise RuntimeError("PyMuPDF not installed")
-    out: List[str] = []
-    with fitz.open(pdf_path) as doc:
-        for page in doc:
-            t = page.get_text("text") or ""
-            if len(t) < 5:
-                # fallback: join text blocks if plain text is oddly short
-                blocks = page.get_text("blocks") or []
-                t2 = "\n".join(b[4] for b in blocks if len(b) >= 5 and isinstance(b[4], str))
-                if len(t2) > len(t):
-                    t = t2
-            out.append(_normalize(t))
-    return out
-
-
-def _extract_with_pypdf(pdf_path: Path) -> List[str]:
-    reader = PdfReader(str(pdf_path))
-    if getattr(reader, "is_encrypted", False):
-        try:
-            reader.decrypt("")  # some PDFs are empty-password encrypted
-        except Exception:
-            pass
-    out: List[str] = []
-    for p in reader.pages:
-        try:
-            txt = p.extract_text() or ""
-            if not txt:
-                log.warning(f"Page {p}: No text extracted.")
-            out.append(_normalize(txt))
-        except Exception as e:
-            log.error(f"Error extracting text from page: {p} | {str(e)}")
-            out.append("")
-    return out
-
-
 def extract_page_texts(pdf_path: str) -> List[str]:
     """
     Return plain text for each page (empty string when truly none).
-    Tries: pdfminer -> PyMuPDF -> pypdf.
+    Uses the extractor selection in app.lib.pdf_extractors (PyMuPDF first, per-page fallback).
     """
     p = Path(pdf_path)
     if not p.exists():
         return []
-
-    errors = []
-
-    # 1) pdfminer (best for weird encodings)
-    try:
-        pages = _extract_with_pdfminer(p)
-        if any(x.strip() for x in pages):
-            log.info(f"[lib.chunking] extracted via pdfminer: {p.name}")
-            return pages
-    except Exception as e:
-        errors.append(f"pdfminer: {e}")
-
-    # 2) PyMuPDF (fast & robust)
-    try:
-        pages = _extract_with_pymupdf(p)
-        if any(x.strip() for x in pages):
-            log.info(f"[lib.chunking] extracted via pymupdf: {p.name}")
-            return pages
-    except Exception as e:
-        errors.append(f"pymupdf: {e}")
-
-    # 3) pypdf (fallback)
     try:
-        pages = _extract_with_pypdf(p)
-        log.info(f"[lib.chunking] extracted via pypdf: {p.name}")
-        return pages
+        extracted = extract_pdf_text(p.read_bytes())
     except Exception as e:
-        errors.append(f"pypdf: {e}")
-        log.warning(f"[lib.chunking] all extractors failed for {p.name}: {' | '.join(errors)}")
+        log.warning(f"[lib.chunking] all extractors failed for {p.name}: {e}")
         return []
+    log.info(f"[lib.chunking] extracted via {extracted.extractor}: {p.name} pages={len(extracted.pages)}")
+    return [_normalize(text) for text in extracted.pages]
 
 
 def chunk_by_pages(page_texts: List[str], pages_per_chunk: int = 1, overlap_pages: int = 0) -> List[Dict]:
@@ -1,14 +1,22 @@
-from typing import List, Optional, Dict, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
 import logging
+import os
 import time
 
 from app.core.db import db_conn
 from app.core.llm import get_embedder
 from app.core.embedding_cache import embed_texts_cached
+from app.core.llm_tracing import llm_call_site
 from app.lib.chunking import chunk_by_pages, chunk_by_chars
+from app.lib.question_bank import delete_bank_items
 
 log = logging.getLogger("uvicorn.error")
 
+# Streaming indexing: embed once this many new chunks are buffered; at most this many batches wait for the writer.
+INDEX_STREAM_BATCH_CHUNKS = max(1, int(os.getenv("INDEX_STREAM_BATCH_CHUNKS", "8")))
+INDEX_STREAM_QUEUE_BATCHES = max(1, int(os.getenv("INDEX_STREAM_QUEUE_BATCHES", "2")))
+
 
 def _vec_literal(vec: List[float]) -> str:
     return "[" + ",".join(str(x) for x in vec) + "]"
@@ -46,43 +54,54 @@ def build_deduped_chunks(
     return _dedupe_chunks(_prepare_chunks(page_texts, raw_text))
 
 
-async def persist_chunk_embeddings(file_id: str, chunks: List[Dict[str, Any]]) -> int:
-    """Embed ``chunks`` and write rows to ``file_chunks`` (replaces existing rows for ``file_id``)."""
-    if not chunks:
-        return 0
+async def _embed_chunks(file_id: str, chunks: List[Dict[str, Any]]) -> List[List[float]]:
     started = time.perf_counter()
     embedder = get_embedder()
     texts = [c["content"] for c in chunks]
-    vecs = await embed_texts_cached(embedder, texts, ttl_seconds=86400)
+    with llm_call_site("indexing"):
+        vecs = await embed_texts_cached(embedder, texts, ttl_seconds=86400)
     log.info(
         "[indexing] stage=embeddings file_id=%s chunks=%d elapsed_ms=%d",
         file_id,
         len(chunks),
         int((time.perf_counter() - started) * 1000),
     )
+    return vecs
+
+
+async def _insert_chunk_rows(cur, file_id: str, chunks: List[Dict[str, Any]], vecs: List[List[float]]) -> None:
+    rows = [
+        (
+            file_id,
+            c["idx"],
+            c["content"],
+            c["char_len"],
+            c["page_start"],
+            c["page_end"],
+            _vec_literal(vec),
+        )
+        for c, vec in zip(chunks, vecs)
+    ]
+    await cur.executemany(
+        """
+        INSERT INTO file_chunks (file_id, idx, content, char_len, page_start, page_end, chunk_vector)
+        VALUES (%s, %s, %s, %s, %s, %s, %s::vector)
+        """,
+        rows,
+    )
+
+
+async def persist_chunk_embeddings(file_id: str, chunks: List[Dict[str, Any]]) -> int:
+    """Embed ``chunks`` and write rows to ``file_chunks`` (replaces existing rows and the question bank for ``file_id``)."""
+    if not chunks:
+        return 0
+    vecs = await _embed_chunks(file_id, chunks)
 
     stage_started = time.perf_counter()
     async with db_conn() as (conn, cur):
         await cur.execute("DELETE FROM file_chunks WHERE file_id=%s", (file_id,))
-        rows = [
-            (
-                file_id,
-                c["idx"],
-                c["content"],
-                c["char_len"],
-                c["page_start"],
-                c["page_end"],
-                _vec_literal(vec),
-            )
-            for c, vec in zip(chunks, vecs)
-        ]
-        await cur.executemany(
-            """
-            INSERT INTO file_chunks (file_id, idx, content, char_len, page_start, page_end, chunk_vector)
-            VALUES (%s, %s, %s, %s, %s, %s, %s::vector)
-            """,
-            rows,
-        )
+        await delete_bank_items(cur, file_id)
+        await _insert_chunk_rows(cur, file_id, chunks, vecs)
         await conn.commit()
 
     log.info(
@@ -94,6 +113,111 @@ async def persist_chunk_embeddings(file_id: str, chunks: List[Dict[str, Any]]) -
     return len(chunks)
 
 
+class StreamingIndexer:
+    """
+    Chunk, embed and insert a document page by page while extraction is still running.
+
+    Pages must be added in page order. Chunks are buffered into batches that a
+    writer task embeds and commits; each commit advances ``indexed_through_page``
+    and calls ``on_progress(indexed_through_page, chunk_count)``, so callers can
+    publish how far the file is searchable. The batch queue is bounded, so a slow
+    embedding provider pushes back on extraction instead of piling up chunks.
+    """
+
+    def __init__(
+        self,
+        file_id: str,
+        *,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+        batch_chunks: int = INDEX_STREAM_BATCH_CHUNKS,
+        queue_batches: int = INDEX_STREAM_QUEUE_BATCHES,
+    ):
+        self.file_id = file_id
+        self.on_progress = on_progress
+        self.batch_chunks = max(1, batch_chunks)
+        self._batches: "asyncio.Queue[Optional[Tuple[List[Dict[str, Any]], int]]]" = asyncio.Queue(
+            maxsize=max(1, queue_batches)
+        )
+        self._pending: List[Dict[str, Any]] = []
+        self._seen: set[str] = set()
+        self._next_idx = 0
+        self._through_page = 0
+        self._writer: Optional[asyncio.Task] = None
+        self.chunk_count = 0
+        self.indexed_through_page = 0
+        self.chunking_ms = 0
+        self.embed_and_db_ms = 0
+
+    async def start(self) -> None:
+        async with db_conn() as (conn, cur):
+            await cur.execute("DELETE FROM file_chunks WHERE file_id=%s", (self.file_id,))
+            await delete_bank_items(cur, self.file_id)
+            await conn.commit()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def add_page(self, page_number: int, text: str) -> None:
+        started = time.perf_counter()
+        for chunk in chunk_by_pages([text], pages_per_chunk=1, overlap_pages=0):
+            key = " ".join(str(chunk.get("content") or "").split()).lower()
+            if not key or key in self._seen:
+                continue
+            self._seen.add(key)
+            chunk.update(idx=self._next_idx, page_start=page_number, page_end=page_number)
+            self._next_idx += 1
+            self._pending.append(chunk)
+        self._through_page = max(self._through_page, page_number)
+        self.chunking_ms += int((time.perf_counter() - started) * 1000)
+        if len(self._pending) >= self.batch_chunks:
+            await self._flush()
+
+    async def finish(self) -> int:
+        """Flush the tail, wait for the writer, and return the number of chunks written."""
+        await self._flush()
+        await self._put(None)
+        if self._writer is not None:
+            await self._writer
+        return self.chunk_count
+
+    async def abort(self) -> None:
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+
+    async def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        await self._put((batch, self._through_page))
+
+    async def _put(self, item: Optional[Tuple[List[Dict[str, Any]], int]]) -> None:
+        if self._writer is None:
+            raise RuntimeError("StreamingIndexer.start() was not called")
+        # Don't block forever on a full queue if the writer has died.
+        put = asyncio.ensure_future(self._batches.put(item))
+        await asyncio.wait({put, self._writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+        if self._writer.done() and item is not None:
+            self._writer.result()
+            raise RuntimeError("indexing writer stopped early")
+
+    async def _write_loop(self) -> None:
+        while True:
+            item = await self._batches.get()
+            if item is None:
+                return
+            chunks, through_page = item
+            if chunks:
+                started = time.perf_counter()
+                vecs = await _embed_chunks(self.file_id, chunks)
+                async with db_conn() as (conn, cur):
+                    await _insert_chunk_rows(cur, self.file_id, chunks, vecs)
+                    await conn.commit()
+                self.chunk_count += len(chunks)
+                self.embed_and_db_ms += int((time.perf_counter() - started) * 1000)
+            self.indexed_through_page = through_page
+            if self.on_progress is not None:
+                await self.on_progress(through_page, self.chunk_count)
+
+
 async def index_file(file_id: str, page_texts: Optional[List[str]] = None, raw_text: Optional[str] = None) -> int:
     started = time.perf_counter()
     chunks = build_deduped_chunks(page_texts, raw_text)
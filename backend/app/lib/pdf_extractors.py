@@ -0,0 +1,298 @@
+"""
+Native PDF text extraction with extractor selection and per-page fallback.
+
+Extractors are tried in `PDF_TEXT_EXTRACTORS` order (default PyMuPDF, then pypdf, then
+pdfminer.six). The first one that is installed and opens the file extracts every page;
+only pages it returns no text for are retried with the next extractor, so one odd page
+does not send a whole 200-slide deck through the slowest extractor. Each extractor gets
+all of its pages at once; pdfminer reads them in a single parse of the file. Large files are split
+into contiguous page ranges extracted in parallel by a small process pool.
+
+`scripts/bench_pdf_text.py` compares the extractors on real files.
+"""
+from __future__ import annotations
+
+from collections import Counter as _Tally
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from app.core.metrics import Counter
+
+log = logging.getLogger("uvicorn.error")
+
+PDF_TEXT_EXTRACTORS = tuple(
+    name.strip().lower()
+    for name in os.getenv("PDF_TEXT_EXTRACTORS", "pymupdf,pypdf,pdfminer").split(",")
+    if name.strip()
+)
+PDF_TEXT_WORKERS = max(1, int(os.getenv("PDF_TEXT_WORKERS", "0")) or min(4, os.cpu_count() or 1))
+PDF_TEXT_PARALLEL_MIN_PAGES = max(1, int(os.getenv("PDF_TEXT_PARALLEL_MIN_PAGES", "48")))
+
+PDF_TEXT_PAGES = Counter(
+    "notescape_pdf_text_pages_total",
+    "Native PDF pages by the extractor that produced their text (none = no extractor found text).",
+    ["extractor"],
+)
+
+
+class _PyMuPDFDoc:
+    def __init__(self, data: bytes):
+        import fitz  # PyMuPDF
+
+        self._doc = fitz.open(stream=data, filetype="pdf")
+        self.page_count = self._doc.page_count
+
+    def page_text(self, index: int) -> str:
+        page = self._doc.load_page(index)
+        text = page.get_text("text") or ""
+        if len(text) < 5:
+            # Plain text is occasionally near-empty where the text blocks are not.
+            blocks = page.get_text("blocks") or []
+            joined = "\n".join(b[4] for b in blocks if len(b) >= 5 and isinstance(b[4], str))
+            if len(joined) > len(text):
+                text = joined
+        return text
+
+    def close(self) -> None:
+        self._doc.close()
+
+
+class _PypdfDoc:
+    def __init__(self, data: bytes):
+        from pypdf import PdfReader
+
+        self._reader = PdfReader(io.BytesIO(data))
+        if getattr(self._reader, "is_encrypted", False):
+            try:
+                self._reader.decrypt("")
+            except Exception:
+                pass
+        self.page_count = len(self._reader.pages)
+
+    def page_text(self, index: int) -> str:
+        return self._reader.pages[index].extract_text() or ""
+
+    def close(self) -> None:
+        pass
+
+
+class _PdfminerDoc:
+    def __init__(self, data: bytes):
+        from pdfminer.pdfpage import PDFPage
+
+        self._data = data
+        self.page_count = sum(1 for _ in PDFPage.get_pages(io.BytesIO(data)))
+
+    def page_text(self, index: int) -> str:
+        return self.page_texts([index]).get(index, "")
+
+    def page_texts(self, indices: list[int]) -> dict[int, str]:
+        """Text of several pages from one parse of the file (each extract_pages call re-parses it)."""
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+
+        wanted = sorted(set(indices))
+        texts: dict[int, str] = {}
+        # Layouts come back in page order, one per requested page.
+        for index, layout in zip(wanted, extract_pages(io.BytesIO(self._data), page_numbers=set(wanted))):
+            texts[index] = "".join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+        return texts
+
+    def close(self) -> None:
+        pass
+
+
+_OPENERS: dict[str, Callable[[bytes], Any]] = {
+    "pymupdf": _PyMuPDFDoc,
+    "pypdf": _PypdfDoc,
+    "pdfminer": _PdfminerDoc,
+}
+
+
+@dataclass(slots=True)
+class PdfText:
+    pages: list[str]
+    page_extractors: list[str] = field(default_factory=list)
+    elapsed_ms: int = 0
+    workers: int = 1
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def extractor(self) -> str:
+        """The extractor that produced most pages' text for this file."""
+        tally = _Tally(name for name in self.page_extractors if name != "none")
+        return tally.most_common(1)[0][0] if tally else "none"
+
+    def summary(self) -> dict[str, object]:
+        return {
+            "extractor": self.extractor,
+            "pages_by_extractor": dict(_Tally(self.page_extractors)),
+            "elapsed_ms": self.elapsed_ms,
+            "workers": self.workers,
+            **({"errors": self.errors} if self.errors else {}),
+        }
+
+
+class _Docs:
+    """Extractor documents for one file, opened only when a page needs them."""
+
+    def __init__(self, data: bytes, extractors: tuple[str, ...]):
+        self.data = data
+        self.extractors = [name for name in extractors if name in _OPENERS]
+        self.errors: dict[str, str] = {}
+        self._open: dict[str, Any] = {}
+
+    def get(self, name: str) -> Any | None:
+        if name in self._open:
+            return self._open[name]
+        doc = None
+        if name not in self.errors:
+            try:
+                doc = _OPENERS[name](self.data)
+            except Exception as exc:
+                self.errors[name] = str(exc)[:200]
+        self._open[name] = doc
+        return doc
+
+    def page_count(self) -> int:
+        for name in self.extractors:
+            doc = self.get(name)
+            if doc is not None:
+                return int(doc.page_count)
+        raise RuntimeError("no PDF text extractor could open the file: " + "; ".join(
+            f"{name}: {error}" for name, error in self.errors.items()
+        ))
+
+    def close(self) -> None:
+        for doc in self._open.values():
+            if doc is not None:
+                try:
+                    doc.close()
+                except Exception:
+                    pass
+
+
+def _doc_page_texts(doc: Any, indices: list[int]) -> dict[int, str]:
+    """Text per page; extractors with a `page_texts` batch method handle all pages in one pass."""
+    batch = getattr(doc, "page_texts", None)
+    if batch is not None:
+        try:
+            return batch(indices)
+        except Exception:
+            return {}
+    texts: dict[int, str] = {}
+    for index in indices:
+        try:
+            texts[index] = doc.page_text(index)
+        except Exception:
+            continue
+    return texts
+
+
+def _extract_pages(docs: _Docs, start: int, stop: int) -> tuple[list[str], list[str]]:
+    texts = [""] * (stop - start)
+    used = ["none"] * (stop - start)
+    missing = list(range(start, stop))
+    for name in docs.extractors:
+        if not missing:
+            break
+        doc = docs.get(name)
+        if doc is None:
+            continue
+        for index, candidate in _doc_page_texts(doc, missing).items():
+            if candidate.strip():
+                texts[index - start], used[index - start] = candidate, name
+        missing = [index for index in missing if used[index - start] == "none"]
+    return texts, used
+
+
+def _extract_range(
+    data: bytes, start: int, stop: int, extractors: tuple[str, ...]
+) -> tuple[list[str], list[str], dict[str, str]]:
+    docs = _Docs(data, extractors)
+    try:
+        texts, used = _extract_pages(docs, start, stop)
+        return texts, used, docs.errors
+    finally:
+        docs.close()
+
+
+_POOL: ProcessPoolExecutor | None = None
+_POOL_SIZE = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _POOL, _POOL_SIZE
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_SIZE != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False, cancel_futures=True)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _POOL_SIZE = workers
+            log.info("[pdf_text] pool_started workers=%d", workers)
+        return _POOL
+
+
+def _page_ranges(page_count: int, parts: int) -> list[tuple[int, int]]:
+    size = -(-page_count // parts)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extract_pdf_text(
+    data: bytes,
+    *,
+    extractors: tuple[str, ...] | None = None,
+    workers: int | None = None,
+    parallel_min_pages: int | None = None,
+) -> PdfText:
+    """Text for every page of a PDF; raises only when no extractor can open the file."""
+    started = time.perf_counter()
+    order = tuple(extractors or PDF_TEXT_EXTRACTORS)
+    workers = max(1, workers or PDF_TEXT_WORKERS)
+    min_pages = parallel_min_pages or PDF_TEXT_PARALLEL_MIN_PAGES
+    docs = _Docs(data, order)
+    try:
+        page_count = docs.page_count()
+        used_workers = 1
+        if workers > 1 and page_count >= min_pages:
+            try:
+                pool = _get_pool(workers)
+                futures = [
+                    pool.submit(_extract_range, data, start, stop, order)
+                    for start, stop in _page_ranges(page_count, workers)
+                ]
+                texts: list[str] = []
+                used: list[str] = []
+                for future in futures:
+                    part_texts, part_used, part_errors = future.result()
+                    texts.extend(part_texts)
+                    used.extend(part_used)
+                    for name, error in part_errors.items():
+                        docs.errors.setdefault(name, error)
+                used_workers = min(workers, page_count)
+            except Exception as exc:
+                log.warning("[pdf_text] parallel extraction failed, extracting inline error=%s", exc)
+                texts, used = _extract_pages(docs, 0, page_count)
+        else:
+            texts, used = _extract_pages(docs, 0, page_count)
+    finally:
+        docs.close()
+    for name, count in _Tally(used).items():
+        PDF_TEXT_PAGES.inc(count, extractor=name)
+    return PdfText(
+        pages=texts,
+        page_extractors=used,
+        elapsed_ms=int((time.perf_counter() - started) * 1000),
+        workers=used_workers,
+        errors=dict(docs.errors),
+    )
@@ -0,0 +1,219 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.db import db_conn
+
+QUIZ_BANK_TARGET_PER_STRATUM = max(0, int(os.environ.get("QUIZ_BANK_TARGET_PER_STRATUM", "10")))
+
+BANK_DIFFICULTIES = ("easy", "medium", "hard")
+BANK_TYPE_GROUPS = ("mcq", "theory")
+BANK_THEORY_TYPES = ("conceptual", "definition", "scenario", "short_qa")
+
+Stratum = Tuple[str, str]  # (type group, difficulty)
+
+
+def type_group(qtype: Optional[str]) -> str:
+    return "mcq" if str(qtype or "").strip().lower() == "mcq" else "theory"
+
+
+def bank_strata() -> List[Stratum]:
+    return [(group, difficulty) for group in BANK_TYPE_GROUPS for difficulty in BANK_DIFFICULTIES]
+
+
+def pick_refill_stratum(
+    counts: Dict[Stratum, int],
+    target: int = QUIZ_BANK_TARGET_PER_STRATUM,
+) -> Optional[Stratum]:
+    """Return the most under-filled stratum, or None when every stratum has reached target."""
+    best: Optional[Stratum] = None
+    best_count = target
+    for stratum in bank_strata():
+        count = int(counts.get(stratum, 0))
+        if count < best_count:
+            best, best_count = stratum, count
+    return best
+
+
+async def fetch_bank_counts(file_id: str) -> Dict[Stratum, int]:
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            """
+            SELECT CASE WHEN qtype = 'mcq' THEN 'mcq' ELSE 'theory' END AS type_group,
+                   difficulty,
+                   COUNT(*)::int
+            FROM quiz_question_bank
+            WHERE file_id = %s
+            GROUP BY 1, 2
+            """,
+            (file_id,),
+        )
+        rows = await cur.fetchall()
+    return {(group, difficulty): count for group, difficulty, count in rows}
+
+
+async def fetch_bank_chunk_usage(file_id: str) -> Dict[int, int]:
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            """
+            SELECT source_chunk_id, COUNT(*)::int
+            FROM quiz_question_bank
+            WHERE file_id = %s AND source_chunk_id IS NOT NULL
+            GROUP BY source_chunk_id
+            """,
+            (file_id,),
+        )
+        rows = await cur.fetchall()
+    return {int(chunk_id): count for chunk_id, count in rows}
+
+
+async def delete_bank_items(cur, file_id: str) -> None:
+    """Drop a file's bank; call it in the transaction that replaces the file's chunks.
+
+    The questions were generated from the old text, so the refill loop regenerates them.
+    """
+    await cur.execute("DELETE FROM quiz_question_bank WHERE file_id=%s", (file_id,))
+
+
+async def find_files_needing_refill(limit: int = 5) -> List[Tuple[str, int, Any]]:
+    """Indexed files whose bank is below target, most recently indexed first, with their indexed_at."""
+    full_size = QUIZ_BANK_TARGET_PER_STRATUM * len(bank_strata())
+    if full_size <= 0:
+        return []
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            """
+            SELECT f.id::text, f.class_id, f.indexed_at
+            FROM files f
+            WHERE f.status = 'INDEXED'
+              AND EXISTS (SELECT 1 FROM file_chunks fc WHERE fc.file_id = f.id)
+              AND (SELECT COUNT(*) FROM quiz_question_bank b WHERE b.file_id = f.id) < %s
+            ORDER BY f.indexed_at DESC NULLS LAST
+            LIMIT %s
+            """,
+            (full_size, limit),
+        )
+        rows = await cur.fetchall()
+    return [(file_id, int(class_id), indexed_at) for file_id, class_id, indexed_at in rows]
+
+
+async def fetch_bank_items(
+    file_id: str,
+    difficulty: str,
+    types: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """Bank rows shaped like sanitized generator items (see quiz_worker._sanitize_generated_items)."""
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            """
+            SELECT id, qtype, question, options, correct_index, answer_key, explanation,
+                   difficulty, topic, tags, source_chunk_id, page_start, page_end
+            FROM quiz_question_bank
+            WHERE file_id = %s AND difficulty = %s AND qtype = ANY(%s)
+            ORDER BY served_count ASC, id ASC
+            """,
+            (file_id, difficulty, list(types)),
+        )
+        rows = await cur.fetchall()
+
+    items: List[Dict[str, Any]] = []
+    for (
+        bank_id,
+        qtype,
+        question,
+        options,
+        correct_index,
+        answer_key,
+        explanation,
+        diff,
+        topic,
+        tags,
+        chunk_id,
+        page_start,
+        page_end,
+    ) in rows:
+        items.append(
+            {
+                "bank_id": int(bank_id),
+                "type": qtype,
+                "question": question,
+                "options": list(options) if options is not None else None,
+                "correct_index": correct_index,
+                "answer_key": answer_key,
+                "explanation": explanation,
+                "difficulty": diff,
+                "topic": topic or "",
+                "tags": tags if isinstance(tags, list) else [],
+                "source": {"chunk_id": chunk_id, "page_start": page_start, "page_end": page_end},
+            }
+        )
+    return items
+
+
+async def insert_bank_items(
+    file_id: str,
+    class_id: int,
+    items: Sequence[Dict[str, Any]],
+    origin: str = "pregenerated",
+) -> int:
+    """Insert items carrying a precomputed "fingerprint"; duplicates per file are skipped.
+
+    Returns the number of rows actually inserted.
+    """
+    rows = []
+    for item in items:
+        fingerprint = item.get("fingerprint")
+        if not fingerprint:
+            continue
+        src = item.get("source") or {}
+        rows.append(
+            (
+                file_id,
+                class_id,
+                item.get("type"),
+                item.get("question"),
+                item.get("options"),
+                item.get("correct_index"),
+                item.get("answer_key"),
+                item.get("explanation"),
+                item.get("difficulty") or "medium",
+                str(item.get("topic") or "").strip() or None,
+                json.dumps(item.get("tags") if isinstance(item.get("tags"), list) else []),
+                src.get("chunk_id"),
+                src.get("page_start"),
+                src.get("page_end"),
+                fingerprint,
+                origin,
+            )
+        )
+    if not rows:
+        return 0
+
+    inserted = 0
+    async with db_conn() as (conn, cur):
+        for row in rows:
+            await cur.execute(
+                """
+                INSERT INTO quiz_question_bank
+                  (file_id, class_id, qtype, question, options, correct_index, answer_key, explanation,
+                   difficulty, topic, tags, source_chunk_id, page_start, page_end, fingerprint, origin)
+                SELECT %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb,
+                       (SELECT fc.id FROM file_chunks fc WHERE fc.id = %s), %s, %s, %s, %s
+                ON CONFLICT (file_id, fingerprint) DO NOTHING
+                """,
+                row,
+            )
+            inserted += max(0, cur.rowcount)
+        await conn.commit()
+    return inserted
+
+
+async def mark_bank_items_served(bank_ids: Sequence[int]) -> None:
+    if not bank_ids:
+        return
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            "UPDATE quiz_question_bank SET served_count = served_count + 1 WHERE id = ANY(%s)",
+            (list(bank_ids),),
+        )
+        await conn.commit()
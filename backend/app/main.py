@@ -1,4 +1,5 @@
 # app/main.py
+import asyncio
 from pathlib import Path
 import logging
 from fastapi import FastAPI
@@ -6,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.routing import APIRoute
 
+from app.core.admission import AdmissionMiddleware
 from app.core.settings import settings
 
 # Routers
@@ -28,6 +30,7 @@ from app.routers.study_sessions import router as study_sessions_router
 from app.routers.study_plans import router as study_plans_router, classes_router as study_plan_classes_router
 from app.routers.quizzes import router as quizzes_router
 from app.routers.voice_revision import router as voice_revision_router
+from app.routers.metrics import router as metrics_router
 from app.core.migrations import (
     ensure_quiz_jobs_schema,
     ensure_learning_analytics_schema,
@@ -35,13 +38,25 @@ from app.core.migrations import (
     ensure_study_plan_voice_schema,
     ensure_document_storage_schema,
     ensure_document_preview_pipeline_schema,
+    ensure_quiz_question_bank_schema,
+    ensure_job_runtime_schema,
+    ensure_streaming_index_schema,
+    ensure_ocr_checkpoint_schema,
+    ensure_job_scheduling_schema,
+    ensure_ocr_variant_stats_schema,
+    ensure_document_text_schema,
+    ensure_content_blobs_schema,
 )
 from app.routers.chat_ask import router as chat_ask_router
+from app.services.office_converter import warm_up_office_pool
 from app.services.pptx_preview import log_pptx_preview_status
 
 
 app = FastAPI(title=settings.api_title)
 
+# Admission control for expensive endpoints; added before CORS so 429s still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -66,6 +81,7 @@ async def health():
     return {"status": "ok"}
 
 # Routers (all already prefixed internally)
+app.include_router(metrics_router)
 app.include_router(classes_router)
 app.include_router(files_router)
 app.include_router(contact_router)
@@ -97,8 +113,18 @@ async def startup_hooks():
     await ensure_study_plan_voice_schema()
     await ensure_document_storage_schema()
     await ensure_document_preview_pipeline_schema()
+    await ensure_quiz_question_bank_schema()
+    await ensure_job_runtime_schema()
+    await ensure_streaming_index_schema()
+    await ensure_ocr_checkpoint_schema()
+    await ensure_job_scheduling_schema()
+    await ensure_ocr_variant_stats_schema()
+    await ensure_document_text_schema()
+    await ensure_content_blobs_schema()
     log = logging.getLogger("uvicorn.error")
     log_pptx_preview_status()
+    # Warm LibreOffice in the background so startup does not wait on it.
+    asyncio.get_running_loop().run_in_executor(None, warm_up_office_pool)
     for r in app.routes:
         if isinstance(r, APIRoute):
             log.info(f"ROUTE: {','.join(sorted(r.methods))} {r.path}")
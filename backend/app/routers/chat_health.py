@@ -8,5 +8,5 @@ router = APIRouter(prefix="/api/chat", tags=["chat"])
 def chat_health():
     system = "You are a helpful assistant."
     user = "Reply with exactly: OK"
-    out = chat_completion(system, user, temperature=0.0).strip()
+    out = chat_completion(system, user, temperature=0.0, call_site="chat_health").strip()
     return {"chat_model_reply": out}
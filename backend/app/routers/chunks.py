@@ -6,14 +6,13 @@ from pathlib import Path
 import regex as re
 from uuid import UUID
 import logging
-from io import BytesIO
-
-from pypdf import PdfReader
 
 from app.core.db import db_conn
 from app.core.settings import settings
 from app.core.storage import get_object_bytes
+from app.lib.question_bank import delete_bank_items
 from app.lib.stored_document_paths import resolve_local_original_file
+from app.services.document_text import pdf_page_texts
 
 router = APIRouter(prefix="/api", tags=["chunks"])
 log = logging.getLogger("uvicorn.error")
@@ -98,36 +97,6 @@ def _chunk_text(text: str, size: int, overlap: int) -> List[str]:
     return out
 
 
-def _read_pdf_pages_from_reader(reader: PdfReader) -> List[str]:
-    if getattr(reader, "is_encrypted", False):
-        try:
-            reader.decrypt("")  # empty password PDFs
-        except Exception:
-            pass
-    out: List[str] = []
-    for p in reader.pages:
-        try:
-            page_text = p.extract_text() or ""
-            if not page_text:
-                log.warning(f"Empty page detected!")
-            out.append(page_text)
-        except Exception as e:
-            log.error(f"Error extracting text from page: {p} | {str(e)}")
-            out.append("")
-    return out
-
-def _read_pdf_pages(abs_pdf_path: Path) -> List[str]:
-    if not abs_pdf_path.exists():
-        return []
-    reader = PdfReader(str(abs_pdf_path))
-    return _read_pdf_pages_from_reader(reader)
-
-def _read_pdf_pages_from_bytes(data: bytes) -> List[str]:
-    if not data:
-        return []
-    reader = PdfReader(BytesIO(data))
-    return _read_pdf_pages_from_reader(reader)
-
 # ---------- Routes ----------
 
 @router.get("/files/{file_id}/chunks")
@@ -178,7 +147,7 @@ async def create_chunks(payload: ChunkRequest, request: Request) -> List[ChunkPr
         # Fetch storage_url + storage_key
         async with db_conn() as (conn, cur):
             await cur.execute(
-                "SELECT storage_url, storage_key, storage_backend, mime_type, class_id FROM files WHERE id=%s",
+                "SELECT storage_url, storage_key, storage_backend, mime_type, class_id, content_hash FROM files WHERE id=%s",
                 (fid,),
             )
             row = await cur.fetchone()
@@ -192,6 +161,7 @@ async def create_chunks(payload: ChunkRequest, request: Request) -> List[ChunkPr
         storage_backend: str | None = row[2]
         mime_type: str | None = row[3]
         file_class_id: int = int(row[4])
+        digest: str | None = row[5]
 
         if mime_type and "pdf" not in mime_type.lower():
             async with db_conn() as (conn, cur):
@@ -228,8 +198,7 @@ async def create_chunks(payload: ChunkRequest, request: Request) -> List[ChunkPr
         pages: List[str] = []
         if storage_backend and storage_backend.lower() == "s3" and storage_key:
             try:
-                data = get_object_bytes(storage_key)
-                pages = _read_pdf_pages_from_bytes(data)
+                pages = await pdf_page_texts(digest, lambda key=storage_key: get_object_bytes(key))
             except Exception as e:
                 log.error(f"[chunks] failed to read s3 object for {fid_str}: {e}")
                 results.append(ChunkPreview(
@@ -259,8 +228,8 @@ async def create_chunks(payload: ChunkRequest, request: Request) -> List[ChunkPr
                 )
                 continue
 
-            # Extract page texts
-            pages = _read_pdf_pages(abs_path)
+            # Page texts are stored once per content hash; extracted here only on a miss.
+            pages = await pdf_page_texts(digest, abs_path.read_bytes)
 
         # Build chunks
         chunks: List[str] = []
@@ -290,6 +259,7 @@ async def create_chunks(payload: ChunkRequest, request: Request) -> List[ChunkPr
         # Replace existing chunks
         async with db_conn() as (conn, cur):
             await cur.execute("DELETE FROM file_chunks WHERE file_id=%s", (fid,))
+            await delete_bank_items(cur, fid)
             for idx, content in enumerate(chunks):
                 ps, pe = ranges[idx]
                 await cur.execute(
@@ -1,6 +1,7 @@
 # backend/app/routers/classes.py
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse, Response
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import logging
@@ -12,6 +13,7 @@ from app.core.storage import get_object_bytes, get_s3_client, presign_get_url
 from app.services.document_ingestion import _docx_text_pages, _pptx_text_pages
 from app.services.document_preview_state import generate_office_preview, sync_existing_office_preview, viewer_url
 from app.services.pptx_preview import converted_pdf_path, preview_dir
+from app.services import preview_assets
 from app.lib.stored_document_paths import resolve_local_original_file
 
 log = logging.getLogger("uvicorn.error")
@@ -466,7 +468,10 @@ async def get_document_metadata(
                    files.viewer_status,
                    files.conversion_error,
                    files.original_file_url,
-                   files.original_file_path
+                   files.original_file_path,
+                   files.indexed_page_count,
+                   files.page_count,
+                   files.index_incomplete
             FROM files
             JOIN classes ON classes.id = files.class_id
             LEFT JOIN file_chunks ON file_chunks.file_id = files.id
@@ -475,7 +480,8 @@ async def get_document_metadata(
                      files.indexed_at, files.last_error, files.preview_error, files.document_type,
                      files.preview_type, files.preview_key, files.viewer_file_url, files.viewer_file_path,
                      files.viewer_file_type, files.viewer_status, files.conversion_error,
-                     files.original_file_url, files.original_file_path
+                     files.original_file_url, files.original_file_path, files.indexed_page_count,
+                     files.page_count, files.index_incomplete
             """,
             (document_id, class_id, user_uid),
         )
@@ -539,6 +545,11 @@ async def get_document_metadata(
         "last_error": row[6],
         "preview_error": row[7],
         "chunk_count": row[8],
+        # Streaming indexing watermark: pages 1..indexed_page_count are already searchable.
+        "indexed_page_count": row[19],
+        "page_count": row[20],
+        # Set when processing stopped part way; the indexed pages are searchable, the rest are not.
+        "index_incomplete": bool(row[21]),
         "viewer_file_url": viewer_file_url_db,
         "viewer_file_path": viewer_file_path_db,
         "viewer_file_type": viewer_file_type_db,
@@ -1074,6 +1085,102 @@ async def get_preview_asset(
     return FileResponse(path, media_type=media_type)
 
 
+async def _page_source_pdf(
+    document_id: str,
+    class_id: int,
+    filename: str | None,
+    mime_type: str | None,
+    storage_key: str | None,
+    storage_url: str | None,
+    storage_backend: str | None,
+) -> Path:
+    if _is_pptx(filename, mime_type) or _is_docx(filename, mime_type):
+        path = converted_pdf_path(document_id)
+    elif str(mime_type or "").lower() == "application/pdf" or str(filename or "").lower().endswith(".pdf"):
+        backend = (storage_backend or settings.storage_backend or "local").lower()
+        if backend == "local":
+            path, _rel = resolve_local_original_file(
+                UPLOAD_ROOT,
+                class_id,
+                document_id,
+                storage_key,
+                storage_url,
+                hint_display_filename=filename,
+                context="page_image",
+            )
+            if path is None:
+                raise HTTPException(status_code=404, detail="File not found")
+        else:
+            # Rendering needs random access to the PDF, so S3 originals are cached locally.
+            path = preview_assets.source_pdf(document_id)
+            if path is None:
+                data = await _document_bytes_async(
+                    storage_key,
+                    storage_url,
+                    storage_backend,
+                    document_id=document_id,
+                    class_id=class_id,
+                    display_filename=filename,
+                    context="page_image",
+                )
+                path = await run_in_threadpool(preview_assets.store_source_pdf, document_id, data)
+    else:
+        raise HTTPException(status_code=415, detail="Page images are available for PDF, PowerPoint and Word documents.")
+    if not path.exists() or path.stat().st_size == 0:
+        raise HTTPException(status_code=404, detail="Preview file is not ready")
+    return path
+
+
+@router.get("/{class_id}/documents/{document_id}/pages/{page_number:int}/image")
+async def get_document_page_image(
+    class_id: int,
+    document_id: str,
+    page_number: int,
+    request: Request,
+    size: str = "viewer",
+    user_uid: str = Depends(get_request_user_uid),
+):
+    """One page/slide as WebP at a size tier (thumbnail, viewer, zoom), rendered on first request."""
+    if size not in preview_assets.PREVIEW_TIERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"size must be one of: {', '.join(preview_assets.PREVIEW_TIERS)}",
+        )
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            """
+            SELECT files.filename, files.mime_type, files.storage_key, files.storage_url, files.storage_backend
+            FROM files
+            JOIN classes ON classes.id = files.class_id
+            WHERE files.id=%s AND files.class_id=%s AND classes.owner_uid=%s
+            """,
+            (document_id, class_id, user_uid),
+        )
+        row = await cur.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="File not found")
+    pdf_path = await _page_source_pdf(document_id, class_id, *row)
+
+    try:
+        digest, page_count = await run_in_threadpool(preview_assets.pdf_info, pdf_path)
+    except ImportError:
+        raise HTTPException(status_code=503, detail="Page rendering is not available on this server.")
+    if not 1 <= page_number <= page_count:
+        raise HTTPException(status_code=404, detail="Page not found")
+    headers = {"ETag": preview_assets.page_etag(digest, page_number, size), "Cache-Control": "private, max-age=3600"}
+    if_none_match = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    if headers["ETag"] in if_none_match or "*" in if_none_match:
+        preview_assets.record_not_modified(size)
+        return Response(status_code=304, headers=headers)
+
+    try:
+        path = await run_in_threadpool(preview_assets.page_image, pdf_path, page_number, size)
+    except preview_assets.PreviewPageNotFound:
+        raise HTTPException(status_code=404, detail="Page not found")
+    preview_assets.schedule_prefetch(pdf_path, page_number, size)
+    return FileResponse(path, media_type="image/webp", headers=headers)
+
+
 @router.get("/{class_id}/documents/{document_id}/content")
 async def get_document_content(
     class_id: int,
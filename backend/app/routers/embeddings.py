@@ -4,6 +4,7 @@ from fastapi import APIRouter, Query
 from app.core.db import db_conn
 from app.core.llm import get_embedder
 from app.core.embedding_cache import embed_texts_cached
+from app.core.llm_tracing import llm_call_site
 import time
 import logging
 
@@ -53,7 +54,8 @@ async def build_embeddings(
             sub_ids  = ids[i:i+B]
             sub_txts = txts[i:i+B]
             batch_started = time.perf_counter()
-            vecs = await embed_texts_cached(embedder, sub_txts, ttl_seconds=86400)
+            with llm_call_site("embedding_backfill"):
+                vecs = await embed_texts_cached(embedder, sub_txts, ttl_seconds=86400)
             await cur.executemany(
                 "UPDATE file_chunks SET chunk_vector=%s::vector WHERE id=%s",
                 [(_vec_literal(vec), chunk_id) for chunk_id, vec in zip(sub_ids, vecs)],
@@ -1,3 +1,4 @@
+import os
 import uuid
 import shutil
 import logging
@@ -7,15 +8,27 @@ import time
 import hashlib
 from typing import BinaryIO
 from uuid import UUID
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
 from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from app.core.db import db_conn
+from app.core.job_notify import FLASHCARD_JOBS_CHANNEL, OCR_JOBS_CHANNEL, QUIZ_JOBS_CHANNEL, notify_job
+from app.core.job_progress import (
+    PROGRESS_FALLBACK_POLL_SECONDS,
+    PROGRESS_WAIT_MAX_SECONDS,
+    latest_version,
+    progress_event_stream,
+    read_progress_many_async,
+    wait_for_progress,
+)
+from app.core.job_scheduling import INTERACTIVE, lane_for_backlog
 from pathlib import Path, PurePosixPath
 from app.core.settings import settings
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from app.dependencies import get_request_user_uid
 from app.lib.indexing import index_file
+from app.lib.question_bank import delete_bank_items
+from app.services.content_blobs import CONTENT_DEDUP_ENABLED, acquire_blob, store_local_blob, upload_s3_blob
 from app.services.ocr.providers import ocr_provider_status
 from app.services.document_preview_state import generate_office_preview, sync_existing_office_preview, viewer_url
 from app.services.pptx_preview import converted_pdf_path
@@ -149,19 +162,32 @@ async def _finalize_s3_upload_async(
     local_path: Path,
     skip_processing: bool = False,
     skip_status: str = "INDEXED",
+    blob_storage_key: str | None = None,
+    preview_shared: bool = False,
 ):
     try:
-        upload_id = str(uuid.uuid4())
-        key = build_s3_key_original(
-            "public",
-            owner_uid,
-            class_id,
-            file_id,
-            upload_id,
-            safe_name,
-        )
-        stored = await run_in_threadpool(_upload_local_file_to_s3, local_path, key, content_type)
-        storage_key = stored.key
+        if blob_storage_key:
+            uploaded = await run_in_threadpool(
+                upload_s3_blob,
+                local_path,
+                blob_storage_key,
+                lambda path, key: _upload_local_file_to_s3(path, key, content_type),
+            )
+            storage_key = blob_storage_key
+            if not uploaded:
+                log.info("[files] s3 upload skipped, shared blob exists file_id=%s key=%s", file_id, storage_key)
+        else:
+            upload_id = str(uuid.uuid4())
+            key = build_s3_key_original(
+                "public",
+                owner_uid,
+                class_id,
+                file_id,
+                upload_id,
+                safe_name,
+            )
+            stored = await run_in_threadpool(_upload_local_file_to_s3, local_path, key, content_type)
+            storage_key = stored.key
 
         metadata_key = f"{build_s3_document_prefix('public', owner_uid, class_id, file_id)}/metadata.json"
         metadata_payload = {
@@ -185,7 +211,7 @@ async def _finalize_s3_upload_async(
         if skip_processing:
             await _update_file_status(file_id, skip_status, indexed=skip_status.upper() in {"INDEXED", "READY", "OCR_READY"})
             office_kind = _office_kind(safe_name, content_type)
-            if office_kind:
+            if office_kind and not preview_shared:
                 await generate_office_preview(
                     document_id=file_id,
                     class_id=class_id,
@@ -253,6 +279,9 @@ async def list_files(class_id: int):
                 files.conversion_error,
                 files.original_file_url,
                 files.original_file_path,
+                files.indexed_page_count,
+                files.page_count,
+                files.index_incomplete,
                 COUNT(file_chunks.id)::int AS chunk_count
             FROM files
             LEFT JOIN file_chunks ON file_chunks.file_id = files.id
@@ -263,7 +292,8 @@ async def list_files(class_id: int):
                      files.ocr_confidence, files.ocr_reviewed_at, files.document_type, files.preview_type,
                      files.preview_error, files.viewer_file_url, files.viewer_file_path,
                      files.viewer_file_type, files.viewer_status, files.conversion_error,
-                     files.original_file_url, files.original_file_path
+                     files.original_file_url, files.original_file_path, files.indexed_page_count,
+                     files.page_count, files.index_incomplete
             ORDER BY files.uploaded_at DESC
             """,
             (class_id,)
@@ -316,9 +346,102 @@ async def list_files(class_id: int):
                     item.get("viewer_file_url"),
                 )
             items.append(item)
+        await _apply_live_progress(items)
         return items
 
 
+# Statuses the OCR worker never moves a file out of on its own.
+_SETTLED_FILE_STATUSES = {"INDEXED", "READY", "OCR_DONE", "OCR_READY", "OCR_NEEDS_REVIEW", "FAILED"}
+_LIVE_FILE_FIELDS = ("status", "processing_progress", "last_error", "indexed_page_count", "page_count")
+
+
+async def _apply_live_progress(items: list[dict]) -> int:
+    """Overlay the OCR jobs' Redis progress snapshots on file rows still being processed
+    (the worker writes intermediate stages behind). Returns the newest snapshot version."""
+    active = [
+        item for item in items
+        if item.get("ocr_job_id") and str(item.get("status") or "").upper() not in _SETTLED_FILE_STATUSES
+    ]
+    live = await read_progress_many_async("ocr", [item["ocr_job_id"] for item in active])
+    for item in active:
+        snapshot = live.get(str(item["ocr_job_id"]))
+        if not snapshot:
+            continue
+        for field in _LIVE_FILE_FIELDS:
+            if field in snapshot:
+                item[field] = snapshot[field]
+        if item.get("last_error") == "":
+            item["last_error"] = None
+    return latest_version(live.values())
+
+
+async def _file_progress_rows(class_id: int, file_ids: list[str] | None = None) -> list[dict]:
+    """Progress fields of the class's files still processing, or of `file_ids` (whatever their status)."""
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            """
+            SELECT id::text AS id, ocr_job_id::text AS ocr_job_id, status, processing_progress,
+                   last_error, indexed_page_count, page_count
+            FROM files
+            WHERE class_id=%s
+              AND (
+                  (%s::text[] IS NULL AND NOT (UPPER(COALESCE(status, '')) = ANY(%s)))
+                  OR id::text = ANY(%s::text[])
+              )
+            ORDER BY uploaded_at DESC
+            """,
+            (class_id, file_ids, sorted(_SETTLED_FILE_STATUSES), file_ids),
+        )
+        rows = await cur.fetchall()
+        cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, r)) for r in rows]
+
+
+@router.get("/{class_id:int}/progress")
+async def file_progress(
+    class_id: int,
+    since: int = Query(0, ge=0),
+    wait: float = Query(0, ge=0, le=PROGRESS_WAIT_MAX_SECONDS),
+    user_id: str = Depends(get_request_user_uid),
+):
+    """Status of the class's files that are still being processed.
+
+    With `wait`, long-polls until one of their OCR jobs reports progress newer than `since`
+    (the `version` of the previous response). A file that finished meanwhile is returned
+    once with its final status; clients reload the file list then.
+    """
+    await _ensure_owned_class(class_id, user_id)
+    files = await _file_progress_rows(class_id)
+    job_ids = [f["ocr_job_id"] for f in files if f.get("ocr_job_id")]
+    if wait > 0 and files:
+        if len(job_ids) < len(files):
+            # Files without an OCR job yet only change in Postgres; re-read them at the polling pace.
+            wait = min(wait, PROGRESS_FALLBACK_POLL_SECONDS)
+        await wait_for_progress("ocr", job_ids, since, wait)
+        files = await _file_progress_rows(class_id, [f["id"] for f in files])
+    return {"version": await _apply_live_progress(files), "files": files}
+
+
+@router.get("/{class_id:int}/progress/events")
+async def stream_file_progress(class_id: int, user_id: str = Depends(get_request_user_uid)):
+    """Server-sent events with the processing files' status, until none are left processing."""
+    await _ensure_owned_class(class_id, user_id)
+    files = await _file_progress_rows(class_id)
+    file_ids = [f["id"] for f in files]
+
+    async def _load():
+        rows = await _file_progress_rows(class_id, file_ids)
+        version = await _apply_live_progress(rows)
+        done = all(str(f.get("status") or "").upper() in _SETTLED_FILE_STATUSES for f in rows)
+        return {"version": version, "files": rows}, done
+
+    return StreamingResponse(
+        progress_event_stream("ocr", [f["ocr_job_id"] for f in files if f.get("ocr_job_id")], _load),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 def _progress_for_status(status: str) -> int:
     return {
         "UPLOADING": 5,
@@ -359,27 +482,35 @@ async def _update_file_status(file_id: str, status: str, error: str | None = Non
         await conn.commit()
 
 
-async def _copy_existing_processed_file(new_file_id: str, class_id: int, content_hash: str) -> bool:
+async def _copy_existing_processed_file(new_file_id: str, class_id: int, content_hash: str) -> str | None:
+    """Reuse chunks and embeddings of an indexed file with the same bytes, from any class or user.
+
+    Prefers a file in the same class. Returns the source file id, or None when nothing matched.
+    Only documents whose chunks came straight from extraction qualify: handwritten uploads
+    are indexed from their owner's reviewed text, which must not reach another file.
+    """
     async with db_conn() as (conn, cur):
         await cur.execute(
             """
             SELECT f.id::text
             FROM files f
-            WHERE f.class_id=%s
-              AND f.content_hash=%s
+            WHERE f.content_hash=%s
               AND f.id::text<>%s
               AND f.indexed_at IS NOT NULL
+              AND COALESCE(f.source_type, 'document') = 'document'
+              AND f.ocr_reviewed_at IS NULL
               AND EXISTS (SELECT 1 FROM file_chunks fc WHERE fc.file_id=f.id)
-            ORDER BY f.indexed_at DESC
+            ORDER BY (f.class_id=%s) DESC, f.indexed_at DESC
             LIMIT 1
             """,
-            (class_id, content_hash, new_file_id),
+            (content_hash, new_file_id, class_id),
         )
         row = await cur.fetchone()
         if not row:
-            return False
+            return None
         source_file_id = row[0]
         await cur.execute("DELETE FROM file_chunks WHERE file_id=%s", (new_file_id,))
+        await delete_bank_items(cur, new_file_id)
         await cur.execute(
             """
             INSERT INTO file_chunks (file_id, idx, content, char_len, page_start, page_end, chunk_vector)
@@ -396,6 +527,7 @@ async def _copy_existing_processed_file(new_file_id: str, class_id: int, content
             SET status='INDEXED',
                 processing_progress=100,
                 indexed_at=now(),
+                index_incomplete=FALSE,
                 last_error=NULL,
                 original_file_url=COALESCE(original_file_url, storage_url),
                 original_file_path=COALESCE(original_file_path, storage_key)
@@ -411,10 +543,38 @@ async def _copy_existing_processed_file(new_file_id: str, class_id: int, content
         class_id,
         content_hash[:12],
     )
+    return source_file_id
+
+
+async def _share_office_preview(source_file_id: str, new_file_id: str, class_id: int) -> bool:
+    """Hard-link the source file's converted PDF preview instead of converting again."""
+    source = converted_pdf_path(source_file_id)
+    target = converted_pdf_path(new_file_id)
+
+    def link() -> bool:
+        if not source.is_file() or source.stat().st_size == 0:
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.unlink(missing_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+        return True
+
+    try:
+        if not await run_in_threadpool(link):
+            return False
+        await sync_existing_office_preview(new_file_id, class_id)
+    except Exception as exc:
+        log.warning("[files] preview_share_failed source=%s file_id=%s error=%s", source_file_id, new_file_id, exc)
+        return False
+    log.info("[files] preview shared source_file_id=%s file_id=%s", source_file_id, new_file_id)
     return True
 
 
-async def _queue_ocr_job(file_id: str, output_prefix: str, engine: str = "hybrid"):
+async def _queue_ocr_job(file_id: str, output_prefix: str, engine: str = "hybrid", lane: str | None = None):
+    """Queue OCR for a file. Without an explicit lane, uploads past the owner's first few queued jobs go to the bulk lane."""
     job_id = str(uuid.uuid4())
     output_json_key = f"{output_prefix}/ocr/normalized.json"
     output_text_key = f"{output_prefix}/ocr/markdown.md"
@@ -439,11 +599,25 @@ async def _queue_ocr_job(file_id: str, output_prefix: str, engine: str = "hybrid
             }
         await cur.execute(
             """
-            INSERT INTO ocr_jobs (id, file_id, status, engine, output_json_key, output_text_key)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            SELECT classes.owner_uid,
+                   (SELECT COUNT(*) FROM ocr_jobs q WHERE q.owner_uid = classes.owner_uid AND q.status='queued')
+            FROM files
+            JOIN classes ON classes.id = files.class_id
+            WHERE files.id=%s
             """,
-            (job_id, str(file_id), "queued", engine, output_json_key, output_text_key),
+            (str(file_id),),
         )
+        owner = await cur.fetchone()
+        owner_uid, backlog = (owner[0], int(owner[1] or 0)) if owner else (None, 0)
+        lane = lane or lane_for_backlog(backlog)
+        await cur.execute(
+            """
+            INSERT INTO ocr_jobs (id, file_id, status, engine, output_json_key, output_text_key, owner_uid, lane)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (job_id, str(file_id), "queued", engine, output_json_key, output_text_key, owner_uid, lane),
+        )
+        await notify_job(cur, OCR_JOBS_CHANNEL, job_id)
         await conn.commit()
     return {
         "job_id": job_id,
@@ -686,10 +860,21 @@ async def upload_file(class_id: int, file: UploadFile = File(...)):
     storage_url = f"/api/classes/{class_id}/documents/{file_id}/download"
     storage_key = None
     storage_backend = settings.storage_backend.lower()
-    if storage_backend == "local":
-        storage_key = rel_path.as_posix()
-    elif storage_backend != "s3":
+    if storage_backend not in {"local", "s3"}:
         raise HTTPException(status_code=500, detail="Unsupported storage backend")
+    # Identical bytes uploaded anywhere before share one stored original (see services/content_blobs.py).
+    blob_storage_key = None
+    if CONTENT_DEDUP_ENABLED:
+        try:
+            blob_storage_key = await acquire_blob(content_hash, storage_backend, safe_name, size_bytes, file.content_type)
+        except Exception as exc:
+            log.warning("[files] blob_acquire_failed file_id=%s hash=%s error=%s", file_id, content_hash[:12], exc)
+    if storage_backend == "local":
+        if blob_storage_key:
+            local_path = await run_in_threadpool(store_local_blob, local_path, blob_storage_key)
+            storage_key = blob_storage_key
+        else:
+            storage_key = rel_path.as_posix()
 
     # 3) insert DB row
     initial_status = "UPLOADING" if storage_backend == "s3" else "UPLOADED"
@@ -705,9 +890,9 @@ async def upload_file(class_id: int, file: UploadFile = File(...)):
                 id, class_id, filename, mime_type, storage_url, storage_key, size_bytes, status,
                 storage_backend, content_hash, processing_progress, stored_filename,
                 document_type, preview_type, viewer_status, viewer_file_url, viewer_file_type,
-                original_file_url, original_file_path
+                original_file_url, original_file_path, blob_hash
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """,
             (
                 file_id,
@@ -729,6 +914,7 @@ async def upload_file(class_id: int, file: UploadFile = File(...)):
                 initial_viewer_file_type,
                 storage_url,
                 storage_key,
+                content_hash if blob_storage_key else None,
             )
         )
         await conn.commit()
@@ -746,10 +932,14 @@ async def upload_file(class_id: int, file: UploadFile = File(...)):
     status = initial_status
     ocr_job_id = None
     cache_hit = False
+    preview_shared = False
     if _is_processable_document(safe_name):
-        cache_hit = await _copy_existing_processed_file(file_id, class_id, content_hash)
+        source_file_id = await _copy_existing_processed_file(file_id, class_id, content_hash)
+        cache_hit = source_file_id is not None
         if cache_hit:
             status = "INDEXED"
+            if office_kind:
+                preview_shared = await _share_office_preview(source_file_id, file_id, class_id)
 
     if storage_backend == "s3":
         asyncio.create_task(
@@ -763,6 +953,8 @@ async def upload_file(class_id: int, file: UploadFile = File(...)):
                 content_type=file.content_type,
                 local_path=local_path,
                 skip_processing=cache_hit,
+                blob_storage_key=blob_storage_key,
+                preview_shared=preview_shared,
             )
         )
     elif _is_processable_document(safe_name) and not cache_hit:
@@ -780,7 +972,7 @@ async def upload_file(class_id: int, file: UploadFile = File(...)):
             )
         )
 
-    if storage_backend == "local" and cache_hit and office_kind:
+    if storage_backend == "local" and cache_hit and office_kind and not preview_shared:
         asyncio.create_task(
             generate_office_preview(
                 document_id=file_id,
@@ -954,9 +1146,10 @@ async def delete_file(file_id: UUID):
     # delete local file (best effort)
     try:
         async with db_conn() as (conn, cur):
-            await cur.execute("SELECT storage_key, storage_url FROM files WHERE id=%s", (str(file_id),))
+            await cur.execute("SELECT storage_key, storage_url, blob_hash FROM files WHERE id=%s", (str(file_id),))
             row = await cur.fetchone()
-        if row and row[0]:
+        # Shared blobs are removed by content_blobs.collect_garbage once nothing references them.
+        if row and row[0] and not row[2]:
             storage_key = str(row[0])
             storage_url = str(row[1] or "")
             rel = None
@@ -1051,7 +1244,8 @@ async def queue_ocr(file_id: UUID, engine: str = "hybrid"):
 
     # processed layer output keys
     output_prefix = build_s3_document_prefix("public", owner_uid, class_id, str(file_id))
-    queued = await _queue_ocr_job(str(file_id), output_prefix, engine=engine)
+    # "Retry processing": the user is waiting on this one document.
+    queued = await _queue_ocr_job(str(file_id), output_prefix, engine=engine, lane=INTERACTIVE)
 
     async with db_conn() as (conn, cur):
         await cur.execute(
@@ -1115,6 +1309,9 @@ async def get_ocr_jobs(file_id: UUID, user_id: str = Depends(get_request_user_ui
     return jobs
 
 
+_OCR_PAGE_IMAGE_TYPES = {".png": "image/png", ".webp": "image/webp", ".jpg": "image/jpeg", ".jpeg": "image/jpeg"}
+
+
 @router.get("/{file_id}/ocr/pages/{page_number:int}/image")
 async def get_ocr_page_image(file_id: UUID, page_number: int, user_id: str = Depends(get_request_user_uid)):
     await _ensure_owned_file(str(file_id), user_id)
@@ -1127,16 +1324,19 @@ async def get_ocr_page_image(file_id: UUID, page_number: int, user_id: str = Dep
     if not row or not row[0]:
         raise HTTPException(status_code=404, detail="OCR page image not found")
     key = str(row[0])
+    # Page images are WebP/JPEG since artifact compression; older pages are still PNG.
+    suffix = PurePosixPath(key).suffix.lower() or ".png"
+    media_type = _OCR_PAGE_IMAGE_TYPES.get(suffix, "image/png")
     if settings.storage_backend.lower() == "s3" or key.startswith("notescape/"):
         data = get_object_bytes(key)
-        tmp = UPLOAD_ROOT / "ocr-page-cache" / str(file_id) / f"page-{page_number}.png"
+        tmp = UPLOAD_ROOT / "ocr-page-cache" / str(file_id) / f"page-{page_number}{suffix}"
         tmp.parent.mkdir(parents=True, exist_ok=True)
         tmp.write_bytes(data)
-        return FileResponse(tmp, media_type="image/png")
+        return FileResponse(tmp, media_type=media_type)
     path = (UPLOAD_ROOT / Path(PurePosixPath(key).as_posix())).resolve()
     if not path.exists():
         raise HTTPException(status_code=404, detail="OCR page image not found")
-    return FileResponse(path, media_type="image/png")
+    return FileResponse(path, media_type=media_type)
 
 
 @router.patch("/{file_id}/ocr/cleaned-text")
@@ -1180,6 +1380,7 @@ async def save_ocr_cleaned_text(
             SET status='OCR_READY',
                 processing_progress=100,
                 indexed_at=now(),
+                index_incomplete=FALSE,
                 last_error=NULL
             WHERE id=%s
             """,
@@ -1193,7 +1394,7 @@ async def save_ocr_cleaned_text(
 async def retry_handwritten_ocr(file_id: UUID, user_id: str = Depends(get_request_user_uid)):
     info = await _ensure_owned_file(str(file_id), user_id)
     output_prefix = build_s3_document_prefix("public", info["owner_uid"], info["class_id"], str(file_id))
-    queued = await _queue_ocr_job(str(file_id), output_prefix, engine="handwritten")
+    queued = await _queue_ocr_job(str(file_id), output_prefix, engine="handwritten", lane=INTERACTIVE)
     await _update_file_status(str(file_id), "OCR_QUEUED", ocr_job_id=queued["job_id"])
     return {"job_id": queued["job_id"], "file_id": str(file_id), "status": "OCR_QUEUED"}
 
@@ -1230,6 +1431,7 @@ async def generate_flashcards_from_ocr(
             (job_id, user_id, info["class_id"], json.dumps(job_payload), correlation_id),
         )
         row = await cur.fetchone()
+        await notify_job(cur, FLASHCARD_JOBS_CHANNEL, row[0])
         await conn.commit()
     return {
         "job_id": row[0],
@@ -1285,6 +1487,7 @@ async def generate_quiz_from_ocr(
             ),
         )
         row = await cur.fetchone()
+        await notify_job(cur, QUIZ_JOBS_CHANNEL, row[0])
         await conn.commit()
     return {
         "job_id": row[0],
@@ -7,11 +7,20 @@ import uuid
 from typing import Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Path as ApiPath, Query, Depends, UploadFile, File, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.core.db import db_conn
 from app.core.embedding_cache import embed_texts_cached
+from app.core.job_notify import FLASHCARD_JOBS_CHANNEL, notify_job
+from app.core.job_progress import (
+    PROGRESS_WAIT_MAX_SECONDS,
+    progress_event_stream,
+    read_progress_async,
+    wait_for_progress,
+)
 from app.core.llm import get_embedder, grade_theory_answer
+from app.core.llm_tracing import llm_call_site
 from app.core.settings import settings
 from app.dependencies import get_request_user_uid
 from app.lib.flashcard_generation import insert_flashcards, pick_relevant_chunks, vec_literal
@@ -318,6 +327,8 @@ class FlashcardJobOut(BaseModel):
     cardCountMode: Optional[str] = None
     warning: Optional[str] = None
     sourceDocumentIds: List[str] = Field(default_factory=list)
+    # Progress snapshot version; pass it back as `since` to long-poll for the next update.
+    version: int = 0
 
 
 def _job_from_row(row: Tuple) -> FlashcardJobOut:
@@ -1081,6 +1092,7 @@ async def _enqueue_flashcard_job(req: GenerateReq, user_id: str) -> FlashcardJob
             (user_id, req.class_id, json.dumps(payload), correlation_id),
         )
         row = await cur.fetchone()
+        await notify_job(cur, FLASHCARD_JOBS_CHANNEL, row[0])
         await conn.commit()
 
     log.info(
@@ -1112,7 +1124,8 @@ async def ensure_embeddings(class_id: int, body: EnsureEmbeddingsReq):
     for i in range(0, len(txts), B):
         sub_ids = ids[i : i + B]
         sub_txts = txts[i : i + B]
-        vecs = await embed_texts_cached(embedder, sub_txts, ttl_seconds=86400)
+        with llm_call_site("embedding_backfill"):
+            vecs = await embed_texts_cached(embedder, sub_txts, ttl_seconds=86400)
         await _insert_embeddings(list(zip(sub_ids, vecs)))
         inserted += len(sub_ids)
     return {"inserted": inserted}
@@ -1127,8 +1140,10 @@ async def generate_async(req: GenerateReq, user_id: str = Depends(get_request_us
     return await _enqueue_flashcard_job(req, user_id)
 
 
-@router.get("/job_status/{job_id}", response_model=FlashcardJobOut)
-async def get_flashcard_job_status(job_id: str, user_id: str = Depends(get_request_user_uid)):
+_FLASHCARD_JOB_DONE = {"completed", "failed"}
+
+
+async def _load_flashcard_job(job_id: str, user_id: str) -> FlashcardJobOut:
     async with db_conn() as (conn, cur):
         await cur.execute(
             """
@@ -1141,7 +1156,47 @@ async def get_flashcard_job_status(job_id: str, user_id: str = Depends(get_reque
         row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Job not found")
-    return _job_from_row(row)
+    job = _job_from_row(row)
+    # The worker writes intermediate progress behind; its Redis snapshot is fresher.
+    live = await read_progress_async("flashcard", job.job_id)
+    if live:
+        job.version = int(live["version"])
+        if job.status not in _FLASHCARD_JOB_DONE and live.get("status") not in _FLASHCARD_JOB_DONE:
+            job.status = live.get("status") or job.status
+            job.progress = int(live.get("progress", job.progress))
+    return job
+
+
+@router.get("/job_status/{job_id}", response_model=FlashcardJobOut)
+async def get_flashcard_job_status(
+    job_id: str,
+    since: int = Query(0, ge=0),
+    wait: float = Query(0, ge=0, le=PROGRESS_WAIT_MAX_SECONDS),
+    user_id: str = Depends(get_request_user_uid),
+):
+    """Job status. With `wait`, long-polls until the job reports progress newer than
+    `since` (the `version` of the previous response) or finishes."""
+    job = await _load_flashcard_job(job_id, user_id)
+    if wait > 0 and job.status not in _FLASHCARD_JOB_DONE:
+        await wait_for_progress("flashcard", [job.job_id], since, wait)
+        job = await _load_flashcard_job(job_id, user_id)
+    return job
+
+
+@router.get("/job_status/{job_id}/events")
+async def stream_flashcard_job_status(job_id: str, user_id: str = Depends(get_request_user_uid)):
+    """Server-sent events with the job status on every progress update, until it finishes."""
+    await _load_flashcard_job(job_id, user_id)
+
+    async def _load():
+        job = await _load_flashcard_job(job_id, user_id)
+        return job.model_dump(), job.status in _FLASHCARD_JOB_DONE
+
+    return StreamingResponse(
+        progress_event_stream("flashcard", [job_id], _load),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{class_id}", response_model=List[FlashcardOut])
@@ -0,0 +1,30 @@
+import os
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response
+
+from app.core.job_scheduling import refresh_queue_metrics
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus
+
+# Scrapers must send "Authorization: Bearer <METRICS_TOKEN>"; unset disables the API's /metrics
+# (each worker still serves its own on WORKER_METRICS_PORT).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+
+router = APIRouter(tags=["metrics"])
+
+
+def _check_metrics_token(authorization: str | None) -> None:
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.strip(), METRICS_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: str | None = Header(default=None)):
+    _check_metrics_token(authorization)
+    # Queue depth, age, throughput and waits live in Postgres, so the API can report them for every worker queue.
+    await refresh_queue_metrics()
+    return Response(content=render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,21 +1,34 @@
+import asyncio
 import json
 import logging
+import os
 import re
+import time
 from datetime import datetime, timezone, date
 from typing import List, Optional, Literal, Dict, Any, Tuple
 from uuid import UUID
 from zoneinfo import ZoneInfo
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.core.db import db_conn
+from app.core.job_notify import QUIZ_JOBS_CHANNEL, notify_job
+from app.core.job_progress import (
+    PROGRESS_WAIT_MAX_SECONDS,
+    progress_event_stream,
+    read_progress_async,
+    wait_for_progress,
+)
 from app.dependencies import get_request_user_uid
 from app.lib.quiz_counts import resolve_requested_counts
 
 log = logging.getLogger("uvicorn.error")
 router = APIRouter(prefix="/api/quizzes", tags=["quizzes"])
 KARACHI_TZ = ZoneInfo("Asia/Karachi")
+QUIZ_GRADING_CONCURRENCY = max(1, int(os.getenv("QUIZ_GRADING_CONCURRENCY", "4")))
+QUIZ_GRADING_TIMEOUT_SECONDS = float(os.getenv("QUIZ_GRADING_TIMEOUT_SECONDS", "20"))
 
 # helper sets
 SHORT_ANSWER_TYPES = {"short_qa"}
@@ -178,6 +191,8 @@ class QuizJobOut(BaseModel):
     actual_mcq_count: Optional[int] = None
     actual_theory_count: Optional[int] = None
     timing_ms: Optional[Dict[str, int]] = None
+    # Progress snapshot version; pass it back as `since` to long-poll for the next update.
+    version: int = 0
 
 class QuizListItem(BaseModel):
     id: str
@@ -477,6 +492,7 @@ async def create_quiz_job(req: CreateQuizJobReq, user_id: str = Depends(get_requ
             ),
         )
         row = await cur.fetchone()
+        await notify_job(cur, QUIZ_JOBS_CHANNEL, row[0])
         await conn.commit()
 
     return QuizJobOut(
@@ -489,8 +505,10 @@ async def create_quiz_job(req: CreateQuizJobReq, user_id: str = Depends(get_requ
     )
 
 # 2) Poll job status
-@router.get("/jobs/{job_id}", response_model=QuizJobOut)
-async def get_quiz_job(job_id: UUID, user_id: str = Depends(get_request_user_uid)):
+_QUIZ_JOB_DONE = {"completed", "failed"}
+
+
+async def _load_quiz_job(job_id: UUID, user_id: str) -> QuizJobOut:
     async with db_conn() as (conn, cur):
         await _ensure_quiz_count_columns(cur)
         await cur.execute(
@@ -515,7 +533,7 @@ async def get_quiz_job(job_id: UUID, user_id: str = Depends(get_request_user_uid
         row = await cur.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Job not found")
-    return QuizJobOut(
+    job = QuizJobOut(
         job_id=row[0],
         status=row[1],
         progress=row[2],
@@ -528,6 +546,48 @@ async def get_quiz_job(job_id: UUID, user_id: str = Depends(get_request_user_uid
         actual_theory_count=row[9],
         timing_ms=row[10],
     )
+    # The worker writes intermediate progress behind; its Redis snapshot is fresher.
+    live = await read_progress_async("quiz", job.job_id)
+    if live:
+        job.version = int(live["version"])
+        if job.status not in _QUIZ_JOB_DONE and live.get("status") not in _QUIZ_JOB_DONE:
+            job.status = live.get("status") or job.status
+            job.progress = int(live.get("progress", job.progress))
+            job.status_message = live.get("status_message") or job.status_message
+            job.timing_ms = live.get("timing_ms") or job.timing_ms
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=QuizJobOut)
+async def get_quiz_job(
+    job_id: UUID,
+    since: int = Query(0, ge=0),
+    wait: float = Query(0, ge=0, le=PROGRESS_WAIT_MAX_SECONDS),
+    user_id: str = Depends(get_request_user_uid),
+):
+    """Job status. With `wait`, long-polls until the job reports progress newer than
+    `since` (the `version` of the previous response) or finishes."""
+    job = await _load_quiz_job(job_id, user_id)
+    if wait > 0 and job.status not in _QUIZ_JOB_DONE:
+        await wait_for_progress("quiz", [job.job_id], since, wait)
+        job = await _load_quiz_job(job_id, user_id)
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_quiz_job(job_id: UUID, user_id: str = Depends(get_request_user_uid)):
+    """Server-sent events with the job status on every progress update, until it finishes."""
+    await _load_quiz_job(job_id, user_id)
+
+    async def _load():
+        job = await _load_quiz_job(job_id, user_id)
+        return job.model_dump(), job.status in _QUIZ_JOB_DONE
+
+    return StreamingResponse(
+        progress_event_stream("quiz", [str(job_id)], _load),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/history", response_model=List[QuizHistoryItem])
 async def get_quiz_history(user_id: str = Depends(get_request_user_uid)):
@@ -1011,9 +1071,108 @@ async def start_attempt(quiz_id: UUID, user_id: str = Depends(get_request_user_u
 
 # 7) Submit an attempt (partial or full)
 from app.core.llm import grade_theory_answer
+from app.core.llm_tracing import observe_queue_wait
 
 # ... imports ...
 
+def _conclusive_local_marks(written: str, answer_key: Optional[str], qtype: str) -> Optional[int]:
+    """Full marks when the deterministic grader already matches the key; None means ask the LLM."""
+    score, is_correct, _feedback, _missing = grade_written_answer(written, answer_key, qtype)
+    if is_correct and score >= 1.0:
+        return 2
+    return None
+
+
+def _fallback_local_marks(written: str, answer_key: Optional[str], qtype: str) -> int:
+    score, is_correct, _feedback, _missing = grade_written_answer(written, answer_key, qtype)
+    if is_correct:
+        return 2
+    return 1 if score > 0 else 0
+
+
+async def _grade_theory_marks(qmeta: Dict[str, Any], written: str, semaphore: asyncio.Semaphore) -> int:
+    qtype = qmeta["qtype"]
+    answer_key = qmeta["answer_key"]
+    local_marks = _conclusive_local_marks(written, answer_key, qtype)
+    if local_marks is not None:
+        return local_marks
+
+    queued_at = time.perf_counter()
+    async with semaphore:
+        observe_queue_wait(time.perf_counter() - queued_at, call_site="theory_grading")
+        try:
+            return await asyncio.wait_for(
+                grade_theory_answer(
+                    question=qmeta["question"],
+                    expected_answer=answer_key or "",
+                    user_answer=written,
+                ),
+                timeout=QUIZ_GRADING_TIMEOUT_SECONDS,
+            )
+        except Exception as exc:
+            log.warning("[quizzes] LLM grading failed, using local rubric qtype=%s error=%r", qtype, exc)
+            return _fallback_local_marks(written, answer_key, qtype)
+
+
+async def _grade_submitted_answers(
+    answers: List[Dict[str, Any]],
+    key: Dict[int, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(QUIZ_GRADING_CONCURRENCY)
+    graded: List[Dict[str, Any]] = []
+    pending: List[Tuple[Dict[str, Any], Any]] = []
+
+    for a in answers:
+        qid = int(a.get("question_id"))
+        if qid not in key:
+            continue
+
+        qmeta = key[qid]
+        qtype = qmeta["qtype"]
+        selected_index = a.get("selected_index")
+        written = a.get("written_answer")
+        entry: Dict[str, Any] = {
+            "question_id": qid,
+            "qtype": qtype,
+            "selected_index": selected_index,
+            "written": written,
+            "response_time_ms": a.get("response_time_ms"),
+            "user_answer_text": (
+                str(written).strip()
+                if written is not None
+                else (str(selected_index) if selected_index is not None else "")
+            ),
+            "missing_points": [],
+            "marks": 0,
+        }
+        graded.append(entry)
+
+        if qtype == "mcq":
+            is_correct = selected_index is not None and int(selected_index) == qmeta["correct_index"]
+            entry["marks"] = 1 if is_correct else 0
+            entry["score"] = 1.0 if is_correct else 0.0
+            entry["is_correct"] = is_correct
+            entry["feedback"] = "Correct." if is_correct else "Review the explanation and related flashcards."
+        elif written and written.strip():
+            # Theory marking: local rubric when conclusive, otherwise AI grading (0, 1 or 2)
+            pending.append((entry, _grade_theory_marks(qmeta, written, semaphore)))
+
+    if pending:
+        marks_list = await asyncio.gather(*(coro for _, coro in pending))
+        for (entry, _), marks in zip(pending, marks_list):
+            entry["marks"] = marks
+
+    for entry in graded:
+        if entry["qtype"] == "mcq":
+            continue
+        marks = entry["marks"]
+        entry["is_correct"] = bool(marks >= 2)
+        entry["score"] = max(0.0, min(1.0, float(marks or 0) / 2.0))
+        entry["feedback"] = "Strong answer." if entry["is_correct"] else "Review the key answer and retry this topic."
+
+    return graded
+
+
 @router.post("/attempts/{attempt_id}/submit", response_model=SubmitAttemptOut)
 async def submit_attempt(
     attempt_id: UUID,
@@ -1076,57 +1235,13 @@ async def submit_attempt(
             for r in qrows
         }
 
-        # insert/update attempt answers
-        results: List[Dict[str, Any]] = []
-
-        for a in req.answers:
-            qid = int(a.get("question_id"))
-            if qid not in key:
-                continue
+    # Grade outside the DB connection: MCQs and conclusive local matches resolve
+    # immediately, the remaining theory answers fan out to the LLM concurrently.
+    graded = await _grade_submitted_answers(req.answers, key)
 
-            qmeta = key[qid]
-            qtype = qmeta["qtype"]
-
-            selected_index = a.get("selected_index")
-            written = a.get("written_answer")
-            response_time_ms = a.get("response_time_ms")
-            user_answer_text = (
-                str(written).strip()
-                if written is not None
-                else (str(selected_index) if selected_index is not None else "")
-            )
-
-            question_score = 0.0
-            feedback: Optional[str] = None
-            missing_points: List[str] = []
-            is_correct: bool = False
-
-            is_correct = None
-            marks = 0
-            
-            if qtype == "mcq":
-                is_correct = (selected_index is not None and int(selected_index) == qmeta["correct_index"])
-                if is_correct:
-                    marks = 1
-                question_score = 1.0 if is_correct else 0.0
-                feedback = "Correct." if is_correct else "Review the explanation and related flashcards."
-            else:
-                # Theory marking logic using LLM
-                # - Empty = 0
-                # - AI Grading: 0, 1, or 2
-                if written and written.strip():
-                    marks = await grade_theory_answer(
-                        question=qmeta["question"],
-                        expected_answer=qmeta["answer_key"] or "",
-                        user_answer=written
-                    )
-                else:
-                    marks = 0
-                question_score = max(0.0, min(1.0, float(marks or 0) / 2.0))
-                is_correct = bool(marks >= 2)
-                feedback = "Strong answer." if is_correct else "Review the key answer and retry this topic."
-
-            await cur.execute(
+    async with db_conn() as (conn, cur):
+        if graded:
+            await cur.executemany(
                 """
                 INSERT INTO quiz_attempt_answers (attempt_id, question_id, selected_index, written_answer, is_correct, marks_awarded)
                 VALUES (%s, %s, %s, %s, %s, %s)
@@ -1136,9 +1251,12 @@ async def submit_attempt(
                               is_correct=EXCLUDED.is_correct,
                               marks_awarded=EXCLUDED.marks_awarded
                 """,
-                (str(attempt_id), qid, selected_index, written, is_correct, marks),
+                [
+                    (str(attempt_id), g["question_id"], g["selected_index"], g["written"], g["is_correct"], g["marks"])
+                    for g in graded
+                ],
             )
-            await cur.execute(
+            await cur.executemany(
                 """
                 INSERT INTO quiz_question_attempts
                   (attempt_id, question_id, user_answer, score, is_correct, missing_points, feedback, graded_at, response_time_ms)
@@ -1153,62 +1271,72 @@ async def submit_attempt(
                               graded_at=EXCLUDED.graded_at,
                               response_time_ms=EXCLUDED.response_time_ms
                 """,
-                (
-                    str(attempt_id),
-                    qid,
-                    user_answer_text,
-                    float(question_score),
-                    bool(is_correct),
-                    json.dumps(missing_points or []),
-                    feedback,
-                    response_time_ms,
-                ),
+                [
+                    (
+                        str(attempt_id),
+                        g["question_id"],
+                        g["user_answer_text"],
+                        float(g["score"]),
+                        bool(g["is_correct"]),
+                        json.dumps(g["missing_points"] or []),
+                        g["feedback"],
+                        g["response_time_ms"],
+                    )
+                    for g in graded
+                ],
             )
-            if not bool(is_correct):
-                await cur.execute(
-                    """
-                    INSERT INTO mistake_notebook
-                      (user_id, class_id, document_id, quiz_id, question_id, topic, question,
-                       student_answer, correct_answer, explanation)
-                    SELECT
-                      %s,
-                      q.class_id,
-                      q.file_id,
-                      q.id,
-                      qq.id,
-                      %s,
-                      qq.question,
-                      %s,
-                      COALESCE(qq.answer_key, CASE WHEN qq.correct_index IS NOT NULL AND qq.options IS NOT NULL THEN qq.options[qq.correct_index + 1] ELSE NULL END),
-                      COALESCE(qq.explanation, %s)
-                    FROM quiz_questions qq
-                    JOIN quizzes q ON q.id = qq.quiz_id
-                    WHERE qq.id = %s
-                    """,
+        mistakes = [g for g in graded if not bool(g["is_correct"])]
+        if mistakes:
+            await cur.executemany(
+                """
+                INSERT INTO mistake_notebook
+                  (user_id, class_id, document_id, quiz_id, question_id, topic, question,
+                   student_answer, correct_answer, explanation)
+                SELECT
+                  %s,
+                  q.class_id,
+                  q.file_id,
+                  q.id,
+                  qq.id,
+                  %s,
+                  qq.question,
+                  %s,
+                  COALESCE(qq.answer_key, CASE WHEN qq.correct_index IS NOT NULL AND qq.options IS NOT NULL THEN qq.options[qq.correct_index + 1] ELSE NULL END),
+                  COALESCE(qq.explanation, %s)
+                FROM quiz_questions qq
+                JOIN quizzes q ON q.id = qq.quiz_id
+                WHERE qq.id = %s
+                """,
+                [
                     (
                         user_id,
-                        qmeta["topic"],
-                        user_answer_text,
-                        feedback,
-                        qid,
-                    ),
-                )
+                        key[g["question_id"]]["topic"],
+                        g["user_answer_text"],
+                        g["feedback"],
+                        g["question_id"],
+                    )
+                    for g in mistakes
+                ],
+            )
 
+        results: List[Dict[str, Any]] = []
+        for g in graded:
+            qmeta = key[g["question_id"]]
             item = {
-                "question_id": qid,
-                "qtype": qtype,
-                "is_correct": is_correct,
-                "marks": marks,
-                "score": question_score,
+                "question_id": g["question_id"],
+                "qtype": g["qtype"],
+                "is_correct": g["is_correct"],
+                "marks": g["marks"],
+                "score": g["score"],
                 "topic": qmeta["topic"],
             }
             if req.reveal_answers:
                 item["correct_index"] = qmeta["correct_index"]
                 item["answer_key"] = qmeta["answer_key"]
-            if feedback:
-                item["feedback"] = feedback
-            if missing_points:
-                item["missing_points"] = missing_points
+            if g["feedback"]:
+                item["feedback"] = g["feedback"]
+            if g["missing_points"]:
+                item["missing_points"] = g["missing_points"]
             results.append(item)
 
         # Update status and time based on section
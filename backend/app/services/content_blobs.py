@@ -0,0 +1,134 @@
+"""
+Content-addressed storage for uploaded originals, shared across classes and users.
+
+An upload whose bytes were seen before (same SHA-256, any class or user) points its
+`files.storage_key` at the existing blob instead of storing another copy; the first
+upload of some content moves its bytes into the blob location. `files.blob_hash`
+marks rows that use a blob, and a trigger on `files` keeps `content_blobs.ref_count`
+in step however rows are deleted (single file, class, account).
+
+Unreferenced blobs are removed by `collect_garbage` once they have been unreferenced
+and unused for BLOB_GC_GRACE_SECONDS. The grace period and the row lock taken while a
+blob is removed keep an upload that is reusing the blob from losing it: `acquire_blob`
+waits on that lock and then finds the row gone, so it stores its own bytes again.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from pathlib import Path, PurePosixPath
+
+from app.core.db import db_conn
+from app.core.settings import settings
+from app.core.storage import delete_object, object_exists
+
+log = logging.getLogger("uvicorn.error")
+
+CONTENT_DEDUP_ENABLED = os.getenv("CONTENT_DEDUP_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+BLOB_GC_GRACE_SECONDS = max(0, int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600")))
+BLOB_GC_BATCH = max(1, int(os.getenv("BLOB_GC_BATCH", "50")))
+
+
+def blob_key(content_hash: str, filename: str, storage_backend: str) -> str:
+    suffix = PurePosixPath(filename or "").suffix.lower()
+    relative = f"blobs/sha256/{content_hash[:2]}/{content_hash}{suffix}"
+    # S3 keys keep the notescape/ prefix that tells them apart from local relative paths.
+    return f"notescape/v1/{relative}" if storage_backend == "s3" else relative
+
+
+def _local_blob_path(storage_key: str) -> Path:
+    return (Path(settings.upload_root) / Path(PurePosixPath(storage_key).as_posix())).resolve()
+
+
+async def acquire_blob(
+    content_hash: str,
+    storage_backend: str,
+    filename: str,
+    size_bytes: int | None,
+    mime_type: str | None,
+) -> str | None:
+    """Register (or reuse) the blob for `content_hash`; returns its storage key.
+
+    Returns None when the existing blob lives on another storage backend (the deployment
+    switched backends); the upload is then stored per file as before.
+
+    The blob's object may not exist yet (a new blob, or a concurrent first upload that
+    has not finished); callers store their bytes with `store_local_blob` / `upload_s3_blob`,
+    which skip the write when the object is already there.
+    """
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            """
+            INSERT INTO content_blobs (content_hash, storage_backend, storage_key, size_bytes, mime_type)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (content_hash) DO UPDATE
+            SET last_used_at = now(), released_at = NULL
+            RETURNING storage_key, storage_backend, ref_count
+            """,
+            (content_hash, storage_backend, blob_key(content_hash, filename, storage_backend), size_bytes, mime_type),
+        )
+        key, backend, ref_count = await cur.fetchone()
+        await conn.commit()
+    if backend != storage_backend:
+        return None
+    log.info("[blobs] acquired hash=%s key=%s refs_before=%d", content_hash[:12], key, int(ref_count))
+    return str(key)
+
+
+def store_local_blob(staged_path: Path, storage_key: str) -> Path:
+    """Move a freshly saved upload into its blob location, or drop it if the blob exists."""
+    target = _local_blob_path(storage_key)
+    if target.is_file():
+        staged_path.unlink(missing_ok=True)
+        return target
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(staged_path, target)
+    return target
+
+
+def upload_s3_blob(staged_path: Path, storage_key: str, upload) -> bool:
+    """Upload the staged file unless the blob object already exists; True when uploaded."""
+    if object_exists(storage_key):
+        return False
+    upload(staged_path, storage_key)
+    return True
+
+
+def _delete_blob_object(storage_backend: str, storage_key: str) -> None:
+    if storage_backend == "s3":
+        delete_object(storage_key)
+        return
+    _local_blob_path(storage_key).unlink(missing_ok=True)
+
+
+async def collect_garbage(limit: int = BLOB_GC_BATCH) -> int:
+    """Delete blobs nothing has referenced or acquired for the grace period; returns how many."""
+    removed = 0
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            """
+            SELECT content_hash, storage_backend, storage_key
+            FROM content_blobs b
+            WHERE b.ref_count <= 0
+              AND COALESCE(b.released_at, b.last_used_at) < now() - make_interval(secs => %s)
+              AND NOT EXISTS (SELECT 1 FROM files f WHERE f.blob_hash = b.content_hash)
+            ORDER BY COALESCE(b.released_at, b.last_used_at)
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (BLOB_GC_GRACE_SECONDS, limit),
+        )
+        rows = await cur.fetchall()
+        for content_hash, backend, key in rows:
+            try:
+                await asyncio.to_thread(_delete_blob_object, str(backend), str(key))
+            except Exception as exc:
+                log.warning("[blobs] gc_delete_failed hash=%s key=%s error=%s", str(content_hash)[:12], key, exc)
+                continue
+            await cur.execute("DELETE FROM content_blobs WHERE content_hash=%s", (content_hash,))
+            removed += 1
+        await conn.commit()
+    if removed:
+        log.info("[blobs] gc removed=%d", removed)
+    return removed
@@ -1,28 +1,49 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import CancelledError, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+import hashlib
 import io
+import itertools
 import json
 import logging
 import mimetypes
+import multiprocessing
+import os
 import re
 from pathlib import Path
 import tempfile
+import threading
 import time
-from typing import Callable
+from typing import Callable, Generator, Iterable, Iterator
 import zipfile
 import xml.etree.ElementTree as ET
 
-from pypdf import PdfReader
-
+from app.lib.pdf_extractors import PdfText, extract_pdf_text
 from app.services.flashcards.source_builder import build_flashcard_source_pages
-from app.services.image_enhancement import EnhancementVariant, build_enhancement_variants
+from app.services.image_enhancement import (
+    ENHANCEMENT_VARIANT_NAMES,
+    EnhancementVariant,
+    PageImage,
+    decode_image,
+    image_size,
+    iter_enhancement_variants,
+)
+from app.services.ocr.artifacts import decode_artifact, encode_json_artifact, page_image_artifacts
 from app.services.ocr.config import OCRConfig, load_ocr_config
-from app.services.ocr.formula_ocr import FormulaOCR
-from app.services.ocr.handwriting_ocr import HandwritingOCR
+from app.services.ocr.engine_pool import (
+    drain_engine_loads,
+    formula_engine,
+    handwriting_engine,
+    observe_engine_loads,
+    printed_engine,
+    warm_up_engines,
+)
 from app.services.ocr.normalize import document_markdown, normalize_whitespace, page_to_markdown
 from app.services.ocr.postprocess import postprocess_blocks
-from app.services.ocr.printed_ocr import PaddlePrintedOCR, PrintedOCREngine, TesseractPrintedOCR
+from app.services.ocr.printed_ocr import PrintedOCREngine
 from app.services.ocr.quality import aggregate_metrics, page_metrics, printable_ratio
 from app.services.ocr.schema import (
     BoundingBox,
@@ -36,6 +57,11 @@ from app.services.page_router import classify_page, route_regions
 log = logging.getLogger("uvicorn.error")
 
 ArtifactWriter = Callable[[str, bytes, str], str]
+ArtifactReader = Callable[[str], "bytes | None"]
+
+CHECKPOINT_DIR = "ocr/checkpoints"
+# Bump when the checkpointed page format changes so older checkpoints are ignored.
+_CHECKPOINT_VERSION = 1
 
 
 @dataclass(slots=True)
@@ -182,20 +208,10 @@ def _pptx_text_pages(data: bytes) -> list[str]:
     return [str(slide["content"]) for slide in _pptx_slide_pages(data) if str(slide.get("content") or "").strip()]
 
 
-def _native_pdf_pages(pdf_bytes: bytes) -> list[str]:
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    if getattr(reader, "is_encrypted", False):
-        try:
-            reader.decrypt("")
-        except Exception:
-            pass
-    pages: list[str] = []
-    for page in reader.pages:
-        try:
-            pages.append(normalize_whitespace(page.extract_text() or ""))
-        except Exception:
-            pages.append("")
-    return pages
+def _native_pdf_text(pdf_bytes: bytes) -> PdfText:
+    text = extract_pdf_text(pdf_bytes)
+    text.pages = [normalize_whitespace(page) for page in text.pages]
+    return text
 
 
 def _native_pdf_reliable(pages: list[str], config: OCRConfig) -> bool:
@@ -264,51 +280,56 @@ def _native_text_result(
     )
 
 
-def _rasterize_pdf(pdf_path: Path, out_dir: Path, dpi: int, page_numbers: list[int] | None = None) -> list[Path]:
-    out_dir.mkdir(parents=True, exist_ok=True)
+def _iter_rasterized_pdf(
+    pdf_path: Path,
+    out_dir: Path,
+    dpi: int,
+    page_numbers: list[int] | None = None,
+) -> Iterator[tuple[int, PageImage]]:
+    """Yield (page number, RGB array) one page at a time so callers can bound how many are decoded at once."""
     wanted = set(page_numbers or [])
     try:
         import fitz
 
-        paths: list[Path] = []
+        doc = fitz.open(pdf_path)
+    except Exception:
+        doc = None
+    if doc is not None:
+        import numpy as np
+
         zoom = dpi / 72.0
         matrix = fitz.Matrix(zoom, zoom)
-        with fitz.open(pdf_path) as doc:
+        with doc:
             for idx, page in enumerate(doc, 1):
                 if wanted and idx not in wanted:
                     continue
                 pix = page.get_pixmap(matrix=matrix, alpha=False)
-                path = out_dir / f"page-{idx:04d}.png"
-                pix.save(path)
-                paths.append(path)
-        return paths
-    except Exception:
-        pass
+                yield idx, np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        return
 
     import subprocess
 
+    # pdftoppm only writes files; decode each one and drop it straight away.
+    out_dir.mkdir(parents=True, exist_ok=True)
     prefix = out_dir / "page"
     subprocess.check_call(["pdftoppm", "-r", str(dpi), "-png", str(pdf_path), str(prefix)])
-    paths = sorted(out_dir.glob("page-*.png"))
-    if wanted:
-        paths = [path for path in paths if int(re.search(r"(\d+)", path.stem).group(1)) in wanted]
-    return paths
+    for path in sorted(out_dir.glob("page-*.png")):
+        idx = int(re.search(r"(\d+)", path.stem).group(1))
+        if not wanted or idx in wanted:
+            image = decode_image(path.read_bytes())
+            if image is not None:
+                yield idx, image
+        path.unlink(missing_ok=True)
 
 
-def _image_dimensions(image_path: Path) -> tuple[int | None, int | None]:
-    try:
-        from PIL import Image
-
-        with Image.open(image_path) as img:
-            return img.size
-    except Exception:
-        return None, None
+def _rasterize_pdf(
+    pdf_path: Path, out_dir: Path, dpi: int, page_numbers: list[int] | None = None
+) -> list[tuple[int, PageImage]]:
+    return list(_iter_rasterized_pdf(pdf_path, out_dir, dpi, page_numbers))
 
 
 def _select_printed_engine(config: OCRConfig) -> PrintedOCREngine:
-    if config.enable_paddleocr:
-        return PaddlePrintedOCR()
-    return TesseractPrintedOCR()
+    return printed_engine(config)
 
 
 def _score_blocks(blocks: list[OCRBlock]) -> float:
@@ -320,64 +341,110 @@ def _score_blocks(blocks: list[OCRBlock]) -> float:
     return confidence * 0.75 + min(1.0, text_len / 1000) * 0.2 - review_penalty * 0.25
 
 
+def _clears_early_exit(
+    blocks: list[OCRBlock],
+    config: OCRConfig,
+    width: int | None,
+    height: int | None,
+) -> bool:
+    if not any((b.raw_text or "").strip() for b in blocks):
+        return False
+    metrics = page_metrics(blocks, width, height)
+    return (
+        metrics.ocr_confidence >= config.variant_early_exit_confidence
+        and metrics.flashcard_eligibility_score >= config.variant_early_exit_score
+    )
+
+
 def _extract_best_printed(
-    variants: list[EnhancementVariant],
+    variants: Iterable[EnhancementVariant],
     engine: PrintedOCREngine,
-) -> tuple[list[OCRBlock], EnhancementVariant, list[dict[str, object]]]:
+    config: OCRConfig | None = None,
+    width: int | None = None,
+    height: int | None = None,
+) -> tuple[list[OCRBlock], EnhancementVariant, list[dict[str, object]], list[EnhancementVariant]]:
+    """OCR variants in the order given and keep the best-scoring one.
+
+    With a `config`, stop at the first variant whose page metrics clear the early-exit
+    thresholds, so clean pages are OCR'd once instead of once per variant.
+    """
     attempts: list[dict[str, object]] = []
+    tried: list[EnhancementVariant] = []
     best_blocks: list[OCRBlock] = []
-    best_variant = variants[0]
+    best_variant: EnhancementVariant | None = None
     best_score = -1.0
     for variant in variants:
+        tried.append(variant)
         start = time.perf_counter()
-        blocks = engine.extract(variant.path)
+        blocks = engine.extract(variant.image)
         elapsed_ms = int((time.perf_counter() - start) * 1000)
         score = _score_blocks(blocks)
-        attempts.append(
-            {
-                "engine": getattr(engine, "name", "printed_ocr"),
-                "variant": variant.name,
-                "score": round(score, 4),
-                "elapsed_ms": elapsed_ms,
-                "metrics": variant.metrics,
-                "block_count": len(blocks),
-            }
-        )
+        attempt = {
+            "engine": getattr(engine, "name", "printed_ocr"),
+            "variant": variant.name,
+            "score": round(score, 4),
+            "elapsed_ms": elapsed_ms,
+            "metrics": variant.metrics,
+            "block_count": len(blocks),
+        }
+        attempts.append(attempt)
         if score > best_score:
             best_score = score
             best_blocks = blocks
             best_variant = variant
-    return best_blocks, best_variant, attempts
+        if config is not None and _clears_early_exit(blocks, config, width, height):
+            attempt["early_exit"] = True
+            break
+    if best_variant is None:
+        raise ValueError("no enhancement variants to OCR")
+    return best_blocks, best_variant, attempts, tried
 
 
-def _ocr_page(
+def _variant_order(config: OCRConfig) -> list[str]:
+    preferred = [name for name in config.variant_order if name in ENHANCEMENT_VARIANT_NAMES]
+    return preferred + [name for name in ENHANCEMENT_VARIANT_NAMES if name not in preferred]
+
+
+@dataclass(slots=True)
+class _PageRecognition:
+    page: OCRPage
+    attempts: list[dict[str, object]]
+    # (name under the page's artifact prefix, encoded bytes, content type) kept by the artifact policy.
+    artifacts: list[tuple[str, bytes, str]]
+    elapsed_ms: int
+    worker_pid: int
+    engine_loads: list[tuple[str, float]] = field(default_factory=list)
+    peak_rss_mb: float = 0.0
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except (ImportError, OSError):
+        return 0.0
+
+
+def _recognize_page(
     page_number: int,
-    image_path: Path,
+    image: PageImage,
     filename: str,
     config: OCRConfig,
-    artifact_writer: ArtifactWriter,
-    output_prefix: str | None,
-) -> tuple[OCRPage, list[dict[str, object]]]:
-    width, height = _image_dimensions(image_path)
-    variant_dir = image_path.parent / f"{image_path.stem}-enhanced"
-    variants = build_enhancement_variants(image_path, variant_dir)
-    original_key = artifact_writer(
-        f"pages/page-{page_number:04d}/original.png",
-        image_path.read_bytes(),
-        "image/png",
-    )
-    enhanced_keys = [
-        artifact_writer(
-            f"pages/page-{page_number:04d}/enhanced/{variant.name}{variant.path.suffix}",
-            variant.path.read_bytes(),
-            "image/png",
-        )
-        for variant in variants
-        if variant.path.exists()
-    ]
+) -> _PageRecognition:
+    """Enhancement, OCR and postprocessing for one page; runs in the page pool, so no I/O to storage.
+
+    The page and its variants stay decoded in memory; only the images the artifact policy
+    keeps are encoded, here in the pool rather than in the extraction thread.
+    """
+    started = time.perf_counter()
+    width, height = image_size(image)
+    candidates = iter_enhancement_variants(image, _variant_order(config))
 
     printed_engine = _select_printed_engine(config)
-    printed_blocks, selected, attempts = _extract_best_printed(variants, printed_engine)
+    printed_blocks, selected, attempts, variants = _extract_best_printed(
+        candidates, printed_engine, config, width, height
+    )
     text_hint = "\n".join(b.raw_text for b in printed_blocks)
     provisional_conf = _score_blocks(printed_blocks)
     page_type = classify_page(
@@ -392,7 +459,7 @@ def _ocr_page(
 
     if page_type in {"handwritten_page", "mixed_page"}:
         start = time.perf_counter()
-        handwriting_blocks = HandwritingOCR(enabled=config.enable_trocr).extract(selected.path)
+        handwriting_blocks = handwriting_engine(config).extract(selected.image)
         attempts.append(
             {
                 "engine": "trocr",
@@ -405,7 +472,7 @@ def _ocr_page(
 
     if page_type in {"formula_heavy_page", "mixed_page"}:
         start = time.perf_counter()
-        formula_blocks = FormulaOCR(enabled=config.enable_formula_ocr).extract(selected.path, text_hint=text_hint)
+        formula_blocks = formula_engine(config).extract(selected.image, text_hint=text_hint)
         attempts.append(
             {
                 "engine": config.formula_engine_name,
@@ -428,23 +495,358 @@ def _ocr_page(
         blocks=blocks,
         regions=regions,
         selected_preprocessing=selected.name,
-        original_image_key=original_key,
-        enhanced_image_keys=enhanced_keys,
     )
     page.metrics = page_metrics(blocks, width, height)
     if page.metrics.flashcard_eligibility_score < config.flashcard_min_page_score:
         page.warnings.append("Page below flashcard eligibility threshold; low-confidence blocks will be skipped.")
-        page.debug_thumbnail_key = original_key
     page.markdown = page_to_markdown(page, config)
-    return page, attempts
+    artifacts = page_image_artifacts(image, variants, selected, config.artifact_policy, config.artifact_image_format)
+    return _PageRecognition(
+        page=page,
+        attempts=attempts,
+        artifacts=artifacts,
+        elapsed_ms=int((time.perf_counter() - started) * 1000),
+        worker_pid=os.getpid(),
+        engine_loads=drain_engine_loads(),
+        peak_rss_mb=_peak_rss_mb(),
+    )
 
 
-def extract_document(
+def _store_page_artifacts(
+    recognized: _PageRecognition,
+    config: OCRConfig,
+    artifact_writer: ArtifactWriter,
+) -> tuple[OCRPage, int]:
+    """Write the page's encoded images concurrently; returns the page and the number of bytes written."""
+    page = recognized.page
+    prefix = f"pages/page-{page.page_number:04d}"
+    artifacts = recognized.artifacts
+
+    def write(artifact: tuple[str, bytes, str]) -> str:
+        name, data, content_type = artifact
+        return artifact_writer(f"{prefix}/{name}", data, content_type)
+
+    if len(artifacts) > 1:
+        keys = list(_get_artifact_write_pool().map(write, artifacts))
+    else:
+        keys = [write(artifact) for artifact in artifacts]
+    page.original_image_key = None
+    page.enhanced_image_keys = []
+    for (name, _, _), key in zip(artifacts, keys):
+        if name.startswith("original."):
+            page.original_image_key = key
+        else:
+            page.enhanced_image_keys.append(key)
+    if page.metrics.flashcard_eligibility_score < config.flashcard_min_page_score:
+        page.debug_thumbnail_key = page.original_image_key
+    return page, sum(len(data) for _, data, _ in artifacts)
+
+
+def _ocr_page(
+    page_number: int,
+    image: PageImage,
+    filename: str,
+    config: OCRConfig,
+    artifact_writer: ArtifactWriter,
+    output_prefix: str | None,
+) -> tuple[OCRPage, list[dict[str, object]]]:
+    recognized = _recognize_page(page_number, image, filename, config)
+    return _store_page_artifacts(recognized, config, artifact_writer)[0], recognized.attempts
+
+
+_ARTIFACT_WRITE_POOL: ThreadPoolExecutor | None = None
+_ARTIFACT_WRITE_LOCK = threading.Lock()
+_ARTIFACT_WRITE_CONCURRENCY = max(1, int(os.getenv("OCR_ARTIFACT_WRITE_CONCURRENCY", "4")))
+
+
+def _get_artifact_write_pool() -> ThreadPoolExecutor:
+    global _ARTIFACT_WRITE_POOL
+    with _ARTIFACT_WRITE_LOCK:
+        if _ARTIFACT_WRITE_POOL is None:
+            _ARTIFACT_WRITE_POOL = ThreadPoolExecutor(
+                max_workers=_ARTIFACT_WRITE_CONCURRENCY, thread_name_prefix="ocr-artifacts"
+            )
+        return _ARTIFACT_WRITE_POOL
+
+
+_PAGE_POOL: ProcessPoolExecutor | None = None
+_PAGE_POOL_SIZE = 0
+_PAGE_POOL_LOCK = threading.Lock()
+
+
+def _init_page_worker() -> None:
+    # Each pool process OCRs one page; keep Tesseract/OpenMP from spawning a thread per core on top.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    try:
+        warm_up_engines(load_ocr_config())
+    except Exception:
+        log.exception("[ingestion] page_worker_warm_up failed pid=%d", os.getpid())
+
+
+def _page_worker_loads() -> list[tuple[str, float]]:
+    return drain_engine_loads()
+
+
+def _get_page_pool(workers: int) -> Executor:
+    global _PAGE_POOL, _PAGE_POOL_SIZE
+    with _PAGE_POOL_LOCK:
+        if _PAGE_POOL is None or _PAGE_POOL_SIZE != workers:
+            if _PAGE_POOL is not None:
+                _PAGE_POOL.shutdown(wait=False, cancel_futures=True)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _PAGE_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_page_worker)
+            _PAGE_POOL_SIZE = workers
+            log.info("[ingestion] page_pool_started workers=%d", workers)
+        return _PAGE_POOL
+
+
+def _reset_page_pool(broken: Executor | None = None) -> None:
+    """Drop the shared page pool; with `broken`, only if it is still that pool.
+
+    Jobs share the pool, so several may see the same breakage; only the first replaces it.
+    """
+    global _PAGE_POOL
+    with _PAGE_POOL_LOCK:
+        if broken is not None and _PAGE_POOL is not broken:
+            return
+        if _PAGE_POOL is not None:
+            _PAGE_POOL.shutdown(wait=False, cancel_futures=True)
+        _PAGE_POOL = None
+
+
+def warm_up_ocr(config: OCRConfig | None = None) -> None:
+    """Load OCR engines in this process and start the page pool so its processes load theirs."""
+    cfg = config or load_ocr_config()
+    warm_up_engines(cfg)
+    observe_engine_loads(drain_engine_loads())
+    workers = max(1, cfg.page_workers)
+    if workers > 1:
+        pool = _get_page_pool(workers)
+        for future in [pool.submit(_page_worker_loads) for _ in range(workers)]:
+            observe_engine_loads(future.result())
+
+
+def _estimated_page_bytes(image: PageImage) -> int:
+    # Decoded RGB for the original plus the enhancement variants held while OCRing a page.
+    width, height = image_size(image)
+    return int((width or 2550) * (height or 3300) * 3 * 4)
+
+
+def _iter_ocr_pages(
+    numbered_images: Iterable[tuple[int, PageImage]],
+    filename: str,
+    config: OCRConfig,
+    artifact_writer: ArtifactWriter,
+) -> Generator[OCRPage, None, tuple[list[dict[str, object]], dict[str, object]]]:
+    """OCR pages on the page pool, keeping a bounded window in flight; yields pages in page order."""
+    started = time.perf_counter()
+    page_count = 0
+    attempts: list[dict[str, object]] = []
+    workers = max(1, config.page_workers)
+    max_inflight = max(1, config.max_inflight_pages)
+    memory_budget = max(0, config.inflight_page_memory_mb) * 1024 * 1024
+    images = iter(numbered_images)
+    head = list(itertools.islice(images, 2))
+    # A single page isn't worth a round trip through the pool.
+    pool = _get_page_pool(workers) if workers > 1 and len(head) > 1 else None
+    used_pool = pool is not None
+    window: deque[tuple[int, PageImage, Future | None, int, float]] = deque()
+    inflight_bytes = 0
+    peak_inflight = 0
+    peak_inflight_bytes = 0
+    peak_rss_mb = 0.0
+    artifact_bytes = 0
+    busy_ms = 0
+
+    def collect() -> OCRPage:
+        nonlocal inflight_bytes, busy_ms, pool, page_count, peak_rss_mb, artifact_bytes
+        page_number, image, future, cost, submitted = window.popleft()
+        inflight_bytes -= cost
+        recognized: _PageRecognition | None = None
+        if future is not None:
+            try:
+                recognized = future.result()
+            except BrokenProcessPool:
+                log.warning("[ingestion] page_pool_broken page=%d; continuing inline", page_number)
+                _reset_page_pool(pool)
+                pool = None
+            except CancelledError:
+                # Another job replaced the broken shared pool; this page is OCR'd inline below.
+                log.warning("[ingestion] page_cancelled_by_pool_reset page=%d; recognizing inline", page_number)
+        if recognized is None:
+            recognized = _recognize_page(page_number, image, filename, config)
+        observe_engine_loads(recognized.engine_loads)
+        page, written = _store_page_artifacts(recognized, config, artifact_writer)
+        page_count += 1
+        busy_ms += recognized.elapsed_ms
+        artifact_bytes += written
+        peak_rss_mb = max(peak_rss_mb, recognized.peak_rss_mb)
+        attempts.extend({"page": page_number, **attempt} for attempt in recognized.attempts)
+        attempts.append(
+            {
+                "page": page_number,
+                "engine": "page_total",
+                "elapsed_ms": recognized.elapsed_ms,
+                "wall_ms": int((time.perf_counter() - submitted) * 1000),
+                "worker_pid": recognized.worker_pid,
+                "artifact_bytes": written,
+                "peak_rss_mb": recognized.peak_rss_mb,
+            }
+        )
+        return page
+
+    for page_number, image in itertools.chain(head, images):
+        cost = _estimated_page_bytes(image) if memory_budget else 0
+        while window and (len(window) >= max_inflight or (memory_budget and inflight_bytes + cost > memory_budget)):
+            yield collect()
+        future = None
+        if pool is not None:
+            try:
+                future = pool.submit(_recognize_page, page_number, image, filename, config)
+            except RuntimeError as exc:
+                # BrokenProcessPool, or another job shut the shared pool down after it broke.
+                # One retry on the current pool; continue inline if that fails too.
+                if isinstance(exc, BrokenProcessPool):
+                    _reset_page_pool(pool)
+                try:
+                    pool = _get_page_pool(workers)
+                    future = pool.submit(_recognize_page, page_number, image, filename, config)
+                except RuntimeError:
+                    log.warning("[ingestion] page_pool_unavailable page=%d; continuing inline", page_number)
+                    _reset_page_pool(pool)
+                    pool = None
+        window.append((page_number, image, future, cost, time.perf_counter()))
+        inflight_bytes += cost
+        peak_inflight = max(peak_inflight, len(window))
+        peak_inflight_bytes = max(peak_inflight_bytes, inflight_bytes)
+        if pool is None:
+            yield collect()
+    while window:
+        yield collect()
+
+    wall_ms = int((time.perf_counter() - started) * 1000)
+    parallelism = {
+        "workers": workers if used_pool else 1,
+        "max_inflight_pages": max_inflight,
+        "peak_inflight_pages": peak_inflight,
+        "pages": page_count,
+        "wall_ms": wall_ms,
+        "page_busy_ms": busy_ms,
+        "peak_inflight_bytes": peak_inflight_bytes,
+        "peak_rss_mb": peak_rss_mb,
+        "artifact_bytes": artifact_bytes,
+    }
+    return attempts, parallelism
+
+
+def _ocr_pages(
+    numbered_images: Iterable[tuple[int, PageImage]],
+    filename: str,
+    config: OCRConfig,
+    artifact_writer: ArtifactWriter,
+) -> tuple[list[OCRPage], list[dict[str, object]], dict[str, object]]:
+    pages: list[OCRPage] = []
+    stream = _iter_ocr_pages(numbered_images, filename, config, artifact_writer)
+    while True:
+        try:
+            pages.append(next(stream))
+        except StopIteration as stop:
+            attempts, parallelism = stop.value
+            return pages, attempts, parallelism
+
+
+def _checkpoint_fingerprint(payload: ExtractionInput, config: OCRConfig) -> str:
+    """Checkpoints are only reused for the same bytes OCR'd at the same DPI with the same engines."""
+    digest = hashlib.sha256(payload.data)
+    settings = {
+        "version": _CHECKPOINT_VERSION,
+        "raster_dpi": config.raster_dpi,
+        "enable_paddleocr": config.enable_paddleocr,
+        "enable_trocr": config.enable_trocr,
+        "enable_formula_ocr": config.enable_formula_ocr,
+        "enable_nougat": config.enable_nougat,
+        "printed_engine_name": config.printed_engine_name,
+        "handwriting_engine_name": config.handwriting_engine_name,
+        "formula_engine_name": config.formula_engine_name,
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PageCheckpoints:
+    """Per-page OCR results saved under the document's artifact prefix.
+
+    Every OCR'd page is written to `ocr/checkpoints/page-NNNN.json`, followed by a manifest
+    listing the finished pages. A job that timed out or lost its worker keeps those pages;
+    the retry loads them and only OCRs what is still missing. The OCR worker deletes the
+    checkpoints once the job completes. Checkpoint I/O is best effort: a failed write or
+    unreadable checkpoint just means that page is OCR'd again.
+    """
+
+    def __init__(self, writer: ArtifactWriter, reader: ArtifactReader, fingerprint: str):
+        self._writer = writer
+        self._reader = reader
+        self.fingerprint = fingerprint
+        self._saved: set[int] = set()
+
+    @staticmethod
+    def page_name(page_number: int) -> str:
+        return f"{CHECKPOINT_DIR}/page-{page_number:04d}.json"
+
+    def _read_json(self, name: str) -> object:
+        try:
+            data = self._reader(name)
+            return json.loads(decode_artifact(data)) if data else None
+        except Exception as exc:
+            log.warning("[ingestion] checkpoint_read_failed name=%s err=%s", name, exc)
+            return None
+
+    def load(self) -> dict[int, OCRPage]:
+        manifest = self._read_json(f"{CHECKPOINT_DIR}/manifest.json")
+        if not isinstance(manifest, dict) or manifest.get("fingerprint") != self.fingerprint:
+            return {}
+        pages: dict[int, OCRPage] = {}
+        for page_number in manifest.get("pages") or []:
+            data = self._read_json(self.page_name(int(page_number)))
+            if not isinstance(data, dict):
+                continue
+            try:
+                page = OCRPage.from_dict(data)
+            except (KeyError, TypeError, ValueError) as exc:
+                log.warning("[ingestion] checkpoint_invalid page=%s err=%s", page_number, exc)
+                continue
+            pages[page.page_number] = page
+        self._saved = set(pages)
+        return pages
+
+    def save(self, page: OCRPage) -> None:
+        try:
+            self._writer(self.page_name(page.page_number), encode_json_artifact(page.to_dict()), "application/json")
+            self._saved.add(page.page_number)
+            # The manifest is written after the page, so every page it lists exists.
+            manifest = {"fingerprint": self.fingerprint, "pages": sorted(self._saved)}
+            self._writer(f"{CHECKPOINT_DIR}/manifest.json", encode_json_artifact(manifest), "application/json")
+        except Exception as exc:
+            log.warning("[ingestion] checkpoint_write_failed page=%d err=%s", page.page_number, exc)
+
+
+def stream_document(
     payload: ExtractionInput,
     *,
     config: OCRConfig | None = None,
     artifact_writer: ArtifactWriter = default_artifact_writer,
-) -> DocumentOCRResult:
+    on_page_count: Callable[[int], None] | None = None,
+    checkpoint_reader: ArtifactReader | None = None,
+) -> Generator[OCRPage, None, DocumentOCRResult]:
+    """Yield pages in page order as they are extracted; the generator returns the full result.
+
+    Consumers can index each page while later pages are still being OCR'd. `on_page_count`
+    is called once the number of pages is known (before the first page for PDFs). With a
+    `checkpoint_reader`, OCR'd pages are checkpointed through `artifact_writer` and pages
+    checkpointed by an earlier run are reused instead of OCR'd again.
+    """
     cfg = config or load_ocr_config()
     file_type = detect_file_type(payload.filename, payload.mime_type)
     warnings: list[str] = []
@@ -456,12 +858,26 @@ def extract_document(
 
     if file_type == "pdf":
         try:
-            native_pages = _native_pdf_pages(payload.data)
+            native = _native_pdf_text(payload.data)
+            native_pages = native.pages
+            raw["native_pdf_extraction"] = native.summary()
+            log.info(
+                "[ingestion] native_pdf_text file_id=%s pages=%d extractor=%s workers=%d elapsed_ms=%d",
+                payload.file_id,
+                len(native_pages),
+                native.extractor,
+                native.workers,
+                native.elapsed_ms,
+            )
         except Exception as exc:
             native_pages = []
             warnings.append(f"Native PDF extraction failed: {exc}")
+        if native_pages and on_page_count is not None:
+            on_page_count(len(native_pages))
         if _native_pdf_reliable(native_pages, cfg):
-            return _native_text_result(payload, native_pages, ExtractionMethod.NATIVE_PDF, cfg, raw, warnings)
+            result = _native_text_result(payload, native_pages, ExtractionMethod.NATIVE_PDF, cfg, raw, warnings)
+            yield from result.pages
+            return result
         if native_pages and any(text.strip() for text in native_pages):
             raw["native_pdf_pages"] = len(native_pages)
             raw["native_pdf_reliable_pages"] = [
@@ -476,7 +892,11 @@ def extract_document(
             docx_pages = []
             warnings.append(f"DOCX extraction failed: {exc}")
         if docx_pages:
-            return _native_text_result(payload, docx_pages, ExtractionMethod.NATIVE_TEXT, cfg, raw, warnings)
+            result = _native_text_result(payload, docx_pages, ExtractionMethod.NATIVE_TEXT, cfg, raw, warnings)
+            if on_page_count is not None:
+                on_page_count(len(result.pages))
+            yield from result.pages
+            return result
     elif file_type == "pptx":
         try:
             pptx_pages = _pptx_text_pages(payload.data)
@@ -492,9 +912,30 @@ def extract_document(
                 len(pptx_pages),
                 int(raw["extracted_text_length"]),
             )
-            return _native_text_result(payload, pptx_pages, ExtractionMethod.NATIVE_TEXT, cfg, raw, warnings)
+            result = _native_text_result(payload, pptx_pages, ExtractionMethod.NATIVE_TEXT, cfg, raw, warnings)
+            if on_page_count is not None:
+                on_page_count(len(result.pages))
+            yield from result.pages
+            return result
+
+    checkpoints = (
+        PageCheckpoints(artifact_writer, checkpoint_reader, _checkpoint_fingerprint(payload, cfg))
+        if checkpoint_reader is not None and file_type in {"pdf", "image"}
+        else None
+    )
+    resumed = checkpoints.load() if checkpoints is not None else {}
+    if resumed:
+        raw["resumed_pages"] = sorted(resumed)
+        log.info(
+            "[ingestion] resuming_from_checkpoints file_id=%s pages=%d first_missing=%s",
+            payload.file_id,
+            len(resumed),
+            next(idx for idx in itertools.count(1) if idx not in resumed),
+        )
 
     pages: list[OCRPage] = []
+    native_by_page: dict[int, str] = {}
+    first_ocr_page: int | None = None
     with tempfile.TemporaryDirectory() as tmp:
         tmpdir = Path(tmp)
         if file_type == "pdf":
@@ -504,38 +945,64 @@ def extract_document(
                 idx: text
                 for idx, text in enumerate(native_pages, 1)
                 if _native_pdf_page_reliable(text, cfg)
-            } if "native_pages" in locals() else {}
+            }
             ocr_page_numbers = [
                 idx
-                for idx in range(1, (len(native_pages) if "native_pages" in locals() and native_pages else 0) + 1)
-                if idx not in native_by_page
-            ] or None
-            for idx, text in native_by_page.items():
-                pages.append(_page_from_native(payload.file_id, idx, text, cfg))
-            image_paths = _rasterize_pdf(source, tmpdir / "rasterized", cfg.raster_dpi, ocr_page_numbers)
+                for idx in range(1, len(native_pages) + 1)
+                if idx not in native_by_page and idx not in resumed
+            ]
+            page_images: Iterable[tuple[int, PageImage]]
+            if ocr_page_numbers:
+                first_ocr_page = ocr_page_numbers[0]
+            if native_pages and not ocr_page_numbers:
+                page_images = []
+            else:
+                page_images = _iter_rasterized_pdf(
+                    source, tmpdir / "rasterized", cfg.raster_dpi, ocr_page_numbers or None
+                )
         elif file_type == "image":
-            suffix = Path(payload.filename).suffix or ".png"
-            source = tmpdir / f"input-image{suffix}"
-            source.write_bytes(payload.data)
-            image_paths = [source]
+            decoded = decode_image(payload.data)
+            page_images = [(1, decoded)] if decoded is not None else []
+            if decoded is None:
+                warnings.append("Image could not be decoded; no extraction performed.")
+            if on_page_count is not None:
+                on_page_count(1)
         else:
             warnings.append("Unsupported file type for OCR; no extraction performed.")
-            image_paths = []
-
-        all_attempts: list[dict[str, object]] = []
-        for idx, image_path in enumerate(image_paths, 1):
-            page_number = int(re.search(r"(\d+)", image_path.stem).group(1)) if file_type == "pdf" and re.search(r"(\d+)", image_path.stem) else idx
-            page, attempts = _ocr_page(
-                page_number,
-                image_path,
-                payload.filename,
-                cfg,
-                artifact_writer,
-                payload.output_prefix,
-            )
+            page_images = []
+
+        # Reliable native pages and checkpointed pages are interleaved with OCR'd ones so
+        # consumers see page order.
+        ready = sorted(
+            [_page_from_native(payload.file_id, idx, text, cfg) for idx, text in native_by_page.items()]
+            + list(resumed.values()),
+            key=lambda page: page.page_number,
+        )
+        # Pages ahead of the first one that needs OCR can go out before OCR starts.
+        while ready and first_ocr_page is not None and ready[0].page_number < first_ocr_page:
+            pages.append(ready.pop(0))
+            yield pages[-1]
+        stream = _iter_ocr_pages(
+            ((n, image) for n, image in page_images if n not in resumed), payload.filename, cfg, artifact_writer
+        )
+        while True:
+            try:
+                page = next(stream)
+            except StopIteration as stop:
+                all_attempts, parallelism = stop.value
+                break
+            if checkpoints is not None:
+                checkpoints.save(page)
+            while ready and ready[0].page_number < page.page_number:
+                pages.append(ready.pop(0))
+                yield pages[-1]
             pages.append(page)
-            all_attempts.extend({"page": page_number, **attempt} for attempt in attempts)
+            yield page
+        for page in ready:
+            pages.append(page)
+            yield page
         raw["engine_attempts"] = all_attempts
+        raw["ocr_parallelism"] = parallelism
     pages.sort(key=lambda page: page.page_number)
 
     correction_log: list[dict[str, object]] = []
@@ -564,5 +1031,23 @@ def extract_document(
     )
 
 
+def extract_document(
+    payload: ExtractionInput,
+    *,
+    config: OCRConfig | None = None,
+    artifact_writer: ArtifactWriter = default_artifact_writer,
+    checkpoint_reader: ArtifactReader | None = None,
+) -> DocumentOCRResult:
+    stream = stream_document(
+        payload, config=config, artifact_writer=artifact_writer, checkpoint_reader=checkpoint_reader
+    )
+    while True:
+        try:
+            next(stream)
+        except StopIteration as stop:
+            return stop.value
+
+
 def result_json_bytes(result: DocumentOCRResult) -> bytes:
-    return json.dumps(result.to_dict(), ensure_ascii=False, indent=2).encode("utf-8")
+    """The normalized.json artifact: compact, gzip-compressed JSON (see ocr/artifacts.py)."""
+    return encode_json_artifact(result.to_dict())
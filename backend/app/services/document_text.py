@@ -0,0 +1,134 @@
+"""
+Per-page extracted document text, stored once per document content.
+
+Text is keyed by the SHA-256 of the file bytes (`files.content_hash`) and
+`DOCUMENT_TEXT_VERSION`, so duplicate uploads share one copy and a change to how text
+is extracted only needs a version bump. The OCR worker stores what it extracted (native
+PDF text or OCR'd pages); quiz generation and chunk previews read it back, page ranges at
+a time, and only extract (and then store) the PDF themselves when nothing is stored yet.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Callable, Sequence
+
+from app.core.db import db_conn
+from app.lib.pdf_extractors import extract_pdf_text
+from app.services.ocr.schema import OCRPage
+
+log = logging.getLogger("uvicorn.error")
+
+# Bump when extraction changes so text stored by older code is no longer served.
+DOCUMENT_TEXT_VERSION = "1"
+PAGE_BATCH = 64
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_plain_text(page: OCRPage) -> str:
+    return "\n".join(text for block in page.blocks if (text := (block.normalized_text or block.raw_text).strip()))
+
+
+async def store_page_texts(digest: str, pages: Sequence[str], method: str) -> None:
+    """Replace the stored text for `digest`; readers see either the old or the new pages."""
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            "DELETE FROM document_page_texts WHERE content_hash=%s AND version=%s",
+            (digest, DOCUMENT_TEXT_VERSION),
+        )
+        await cur.executemany(
+            """
+            INSERT INTO document_page_texts (content_hash, version, page_number, text)
+            VALUES (%s, %s, %s, %s)
+            """,
+            [(digest, DOCUMENT_TEXT_VERSION, number, text) for number, text in enumerate(pages, 1)],
+        )
+        await cur.execute(
+            """
+            INSERT INTO document_texts (content_hash, version, page_count, method)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (content_hash, version) DO UPDATE
+            SET page_count = EXCLUDED.page_count, method = EXCLUDED.method, created_at = now()
+            """,
+            (digest, DOCUMENT_TEXT_VERSION, len(pages), method),
+        )
+        await conn.commit()
+    log.info("[document_text] stored hash=%s pages=%d method=%s", digest[:12], len(pages), method)
+
+
+async def stored_page_count(digest: str | None) -> int | None:
+    if not digest:
+        return None
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            "SELECT page_count FROM document_texts WHERE content_hash=%s AND version=%s",
+            (digest, DOCUMENT_TEXT_VERSION),
+        )
+        row = await cur.fetchone()
+    return int(row[0]) if row else None
+
+
+async def iter_page_texts(
+    digest: str,
+    start: int = 1,
+    end: int | None = None,
+    batch_size: int = PAGE_BATCH,
+) -> AsyncIterator[tuple[int, str]]:
+    """Stream (page_number, text) for pages `start`..`end` (inclusive), `batch_size` rows per query."""
+    after = start - 1
+    while end is None or after < end:
+        async with db_conn() as (conn, cur):
+            await cur.execute(
+                """
+                SELECT page_number, text
+                FROM document_page_texts
+                WHERE content_hash=%s AND version=%s AND page_number > %s AND page_number <= %s
+                ORDER BY page_number
+                LIMIT %s
+                """,
+                (digest, DOCUMENT_TEXT_VERSION, after, end if end is not None else 2**31 - 1, batch_size),
+            )
+            rows = await cur.fetchall()
+        for number, text in rows:
+            yield int(number), str(text)
+        if len(rows) < batch_size:
+            return
+        after = int(rows[-1][0])
+
+
+async def read_page_texts(digest: str | None, start: int = 1, end: int | None = None) -> list[str] | None:
+    """Stored pages `start`..`end` in order, or None when nothing is stored for `digest`."""
+    page_count = await stored_page_count(digest)
+    if page_count is None:
+        return None
+    last = page_count if end is None else min(end, page_count)
+    pages = [""] * max(0, last - start + 1)
+    async for number, text in iter_page_texts(digest, start, last):
+        pages[number - start] = text
+    return pages
+
+
+async def pdf_page_texts(digest: str | None, load: Callable[[], bytes]) -> list[str]:
+    """Stored page texts for a PDF, extracting and storing them on the first request.
+
+    `load` returns the file bytes and is only called when nothing is stored; it runs in
+    a thread, as does extraction.
+    """
+    try:
+        stored = await read_page_texts(digest)
+    except Exception as exc:
+        log.warning("[document_text] read failed hash=%s error=%s", (digest or "")[:12], exc)
+        stored = None
+    if stored is not None:
+        return stored
+    data = await asyncio.to_thread(load)
+    extracted = await asyncio.to_thread(extract_pdf_text, data)
+    try:
+        await store_page_texts(digest or content_hash(data), extracted.pages, f"native_pdf:{extracted.extractor}")
+    except Exception as exc:
+        log.warning("[document_text] store failed hash=%s error=%s", (digest or "")[:12], exc)
+    return extracted.pages
@@ -1,72 +1,161 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+import io
 from pathlib import Path
-from typing import Callable
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Union
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Pages move through rasterize -> enhance -> OCR as decoded uint8 arrays (RGB, or 2-D
+# grayscale for enhanced variants). Paths are still accepted where a caller only has a file.
+PageImage = Union["np.ndarray", Path]
 
 
 @dataclass(slots=True)
 class EnhancementVariant:
     name: str
-    path: Path
+    image: PageImage
     metrics: dict[str, float | int | str]
 
 
-def _copy_variant(src: Path, dst: Path) -> None:
-    dst.write_bytes(src.read_bytes())
+def decode_image(data: bytes) -> "np.ndarray | None":
+    """Decode encoded image bytes to an RGB array without touching disk."""
+    import cv2
+    import numpy as np
+
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is not None:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    try:
+        from PIL import Image
+
+        # Formats OpenCV does not read (GIF, some TIFFs) still decode through Pillow.
+        with Image.open(io.BytesIO(data)) as pil:
+            return np.asarray(pil.convert("RGB"))
+    except Exception:
+        return None
+
+
+def load_image(image: PageImage) -> "np.ndarray | None":
+    if isinstance(image, Path):
+        try:
+            return decode_image(image.read_bytes())
+        except OSError:
+            return None
+    return image
+
+
+def image_size(image: PageImage) -> tuple[int | None, int | None]:
+    if isinstance(image, Path):
+        try:
+            from PIL import Image
+
+            with Image.open(image) as img:
+                return img.size
+        except Exception:
+            return None, None
+    return int(image.shape[1]), int(image.shape[0])
+
+
+def to_pil(image: PageImage) -> Any:
+    from PIL import Image
+
+    if isinstance(image, Path):
+        return Image.open(image)
+    return Image.fromarray(image)
+
 
+def encode_png(image: PageImage) -> bytes:
+    """PNG bytes for an artifact; the only place page images are encoded."""
+    if isinstance(image, Path):
+        return image.read_bytes()
+    import cv2
 
-def build_enhancement_variants(image_path: Path, output_dir: Path) -> list[EnhancementVariant]:
-    output_dir.mkdir(parents=True, exist_ok=True)
-    variants: list[EnhancementVariant] = []
-    original = output_dir / f"{image_path.stem}-original{image_path.suffix}"
-    _copy_variant(image_path, original)
-    variants.append(EnhancementVariant("original", original, {"strategy": "none"}))
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    ok, buf = cv2.imencode(".png", image)
+    if not ok:
+        raise ValueError("PNG encoding failed")
+    return buf.tobytes()
+
+
+# Default evaluation order; the OCR worker reorders these by historical win rate.
+ENHANCEMENT_VARIANT_NAMES = (
+    "gray-denoise",
+    "contrast",
+    "adaptive-threshold",
+    "stroke-continuity",
+    "upscale-sharpen",
+)
+
+
+def iter_enhancement_variants(
+    image: PageImage,
+    order: Iterable[str] = ENHANCEMENT_VARIANT_NAMES,
+) -> Iterator[EnhancementVariant]:
+    """Yield the original, then each variant in `order`, building it only when requested.
+
+    Variants are arrays kept in memory. Callers that stop early (a clean original page)
+    never pay for the remaining filters; intermediate images shared by several variants
+    are computed once.
+    """
+    yield EnhancementVariant("original", image, {"strategy": "none"})
 
     try:
         import cv2
         import numpy as np
 
-        img = cv2.imread(str(image_path))
+        img = load_image(image)
         if img is None:
-            return variants
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-        def save(name: str, arr, metrics: dict[str, float | int | str]) -> None:
-            path = output_dir / f"{image_path.stem}-{name}.png"
-            cv2.imwrite(str(path), arr)
-            variants.append(EnhancementVariant(name, path, metrics))
-
-        denoised = cv2.fastNlMeansDenoising(gray, None, 18, 7, 21)
-        save("gray-denoise", denoised, {"strategy": "grayscale+denoise"})
-
-        clahe = cv2.createCLAHE(clipLimit=2.2, tileGridSize=(8, 8)).apply(gray)
-        save("contrast", clahe, {"strategy": "grayscale+clahe"})
-
-        thresh = cv2.adaptiveThreshold(
-            clahe,
-            255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY,
-            31,
-            12,
-        )
-        save("adaptive-threshold", thresh, {"strategy": "clahe+adaptive_threshold"})
+            return
+        cache: dict[str, object] = {}
 
-        kernel = np.ones((2, 2), np.uint8)
-        morph = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        save("stroke-continuity", morph, {"strategy": "threshold+morph_close"})
+        def stage(name: str, build: Callable[[], object]):
+            if name not in cache:
+                cache[name] = build()
+            return cache[name]
 
-        upscaled = cv2.resize(clahe, None, fx=1.6, fy=1.6, interpolation=cv2.INTER_CUBIC)
-        sharpen_kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
-        sharp = cv2.filter2D(upscaled, -1, sharpen_kernel)
-        save("upscale-sharpen", sharp, {"strategy": "clahe+upscale+sharpen", "scale": 1.6})
-    except Exception as exc:
-        variants.append(
-            EnhancementVariant(
-                "enhancement-unavailable",
-                original,
-                {"strategy": "none", "error": str(exc)[:200]},
+        def gray():
+            return stage("gray", lambda: img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_RGB2GRAY))
+
+        def clahe():
+            return stage("clahe", lambda: cv2.createCLAHE(clipLimit=2.2, tileGridSize=(8, 8)).apply(gray()))
+
+        def thresh():
+            return stage(
+                "thresh",
+                lambda: cv2.adaptiveThreshold(clahe(), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 12),
             )
+
+        def upscale_sharpen():
+            upscaled = cv2.resize(clahe(), None, fx=1.6, fy=1.6, interpolation=cv2.INTER_CUBIC)
+            sharpen_kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+            return cv2.filter2D(upscaled, -1, sharpen_kernel)
+
+        builders: dict[str, tuple[Callable[[], object], dict[str, float | int | str]]] = {
+            "gray-denoise": (lambda: cv2.fastNlMeansDenoising(gray(), None, 18, 7, 21), {"strategy": "grayscale+denoise"}),
+            "contrast": (clahe, {"strategy": "grayscale+clahe"}),
+            "adaptive-threshold": (thresh, {"strategy": "clahe+adaptive_threshold"}),
+            "stroke-continuity": (
+                lambda: cv2.morphologyEx(thresh(), cv2.MORPH_CLOSE, np.ones((2, 2), np.uint8)),
+                {"strategy": "threshold+morph_close"},
+            ),
+            "upscale-sharpen": (upscale_sharpen, {"strategy": "clahe+upscale+sharpen", "scale": 1.6}),
+        }
+        for name in order:
+            if name not in builders:
+                continue
+            build, metrics = builders[name]
+            yield EnhancementVariant(name, build(), dict(metrics))
+    except Exception as exc:
+        yield EnhancementVariant(
+            "enhancement-unavailable",
+            image,
+            {"strategy": "none", "error": str(exc)[:200]},
         )
-    return variants
+
+
+def build_enhancement_variants(image: PageImage) -> list[EnhancementVariant]:
+    return list(iter_enhancement_variants(image))
@@ -0,0 +1,101 @@
+"""
+What the OCR pipeline persists, and how it is encoded.
+
+`OCR_ARTIFACT_POLICY` picks the page images kept per OCR'd page:
+
+- `minimal`: none (handwritten review jobs still keep the original, the review UI shows it),
+  and only normalized.json and markdown.md per document.
+- `selected` (default): the original page plus the variant whose text was used.
+- `debug`: the original plus every variant that was OCR'd.
+
+Colour page images are stored as lossy WebP, single-channel (enhanced/binarized) ones as
+lossless WebP. JSON artifacts are compact and gzip-compressed; they are uploaded with
+`Content-Encoding: gzip`, so presigned downloads decompress transparently, and
+`decode_artifact` reads both compressed and older uncompressed objects.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+from typing import TYPE_CHECKING, Any
+
+from app.services.image_enhancement import PageImage, encode_png, load_image
+
+if TYPE_CHECKING:
+    from app.services.image_enhancement import EnhancementVariant
+
+MINIMAL = "minimal"
+SELECTED = "selected"
+DEBUG = "debug"
+_POLICY_ALIASES = {
+    "minimal": MINIMAL,
+    "none": MINIMAL,
+    "selected": SELECTED,
+    "selected-only": SELECTED,
+    "selected_only": SELECTED,
+    "debug": DEBUG,
+    "debug-all": DEBUG,
+    "debug_all": DEBUG,
+    "all": DEBUG,
+}
+
+GZIP_MAGIC = b"\x1f\x8b"
+WEBP_LOSSY_QUALITY = 82
+
+
+def normalize_policy(value: str | None) -> str:
+    return _POLICY_ALIASES.get((value or "").strip().lower(), SELECTED)
+
+
+def page_image_artifacts(
+    image: PageImage,
+    variants: list["EnhancementVariant"],
+    selected: "EnhancementVariant",
+    policy: str,
+    image_format: str = "webp",
+) -> list[tuple[str, bytes, str]]:
+    """(name, data, content type) for the page images the policy keeps."""
+    if policy == MINIMAL:
+        return []
+    kept = [v for v in variants if v.image is not image and (policy == DEBUG or v is selected)]
+    data, suffix, content_type = encode_page_image(image, image_format)
+    artifacts = [(f"original{suffix}", data, content_type)]
+    for variant in kept:
+        data, suffix, content_type = encode_page_image(variant.image, image_format)
+        artifacts.append((f"enhanced/{variant.name}{suffix}", data, content_type))
+    return artifacts
+
+
+def encode_page_image(image: PageImage, image_format: str = "webp") -> tuple[bytes, str, str]:
+    """Encode a page image; returns (data, suffix, content type)."""
+    if image_format == "png":
+        return encode_png(image), ".png", "image/png"
+    import cv2
+
+    array = load_image(image)
+    if array is None:
+        return encode_png(image), ".png", "image/png"
+    if array.ndim == 3:
+        bgr = cv2.cvtColor(array, cv2.COLOR_RGB2BGR)
+        if image_format == "jpeg":
+            ok, buf = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, WEBP_LOSSY_QUALITY + 3])
+            suffix, content_type = ".jpg", "image/jpeg"
+        else:
+            ok, buf = cv2.imencode(".webp", bgr, [cv2.IMWRITE_WEBP_QUALITY, WEBP_LOSSY_QUALITY])
+            suffix, content_type = ".webp", "image/webp"
+    else:
+        # Thresholded/grayscale variants compress far better losslessly than with lossy artefacts.
+        ok, buf = cv2.imencode(".webp", array, [cv2.IMWRITE_WEBP_QUALITY, 101])
+        suffix, content_type = ".webp", "image/webp"
+    if not ok:
+        return encode_png(image), ".png", "image/png"
+    return buf.tobytes(), suffix, content_type
+
+
+def encode_json_artifact(payload: Any, *, compress: bool = True) -> bytes:
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    return gzip.compress(data, compresslevel=6, mtime=0) if compress else data
+
+
+def decode_artifact(data: bytes) -> bytes:
+    return gzip.decompress(data) if data[:2] == GZIP_MAGIC else data
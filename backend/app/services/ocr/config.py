@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 import os
 
+from app.services.ocr.artifacts import normalize_policy
+
 
 @dataclass(frozen=True, slots=True)
 class OCRConfig:
@@ -10,12 +12,20 @@ class OCRConfig:
     native_pdf_min_printable_ratio: float = 0.92
     native_pdf_min_unique_chars: int = 20
     raster_dpi: int = 260
+    page_workers: int = 1
+    max_inflight_pages: int = 2
+    inflight_page_memory_mb: int = 1024
     min_block_confidence: float = 0.48
     review_block_confidence: float = 0.68
     flashcard_min_block_confidence: float = 0.58
     flashcard_min_page_score: float = 0.45
     max_correction_edit_distance: int = 2
     max_correction_ratio: float = 0.34
+    variant_early_exit_confidence: float = 0.8
+    variant_early_exit_score: float = 0.6
+    variant_order: tuple[str, ...] = ()
+    artifact_policy: str = "selected"
+    artifact_image_format: str = "webp"
     enable_paddleocr: bool = False
     enable_trocr: bool = False
     enable_formula_ocr: bool = False
@@ -38,6 +48,13 @@ def _csv_words(name: str) -> set[str]:
     return {w.strip() for w in (os.getenv(name) or "").split(",") if w.strip()}
 
 
+def _available_cpus() -> int:
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
 def load_ocr_config() -> OCRConfig:
     academic = {
         "algorithm",
@@ -61,17 +78,25 @@ def load_ocr_config() -> OCRConfig:
         "pdf",
         "url",
     }
+    page_workers = max(1, int(os.getenv("OCR_PAGE_WORKERS", "0")) or _available_cpus())
     return OCRConfig(
         native_pdf_min_chars_per_page=int(os.getenv("OCR_NATIVE_MIN_CHARS_PER_PAGE", "200")),
         native_pdf_min_printable_ratio=float(os.getenv("OCR_NATIVE_MIN_PRINTABLE_RATIO", "0.92")),
         native_pdf_min_unique_chars=int(os.getenv("OCR_NATIVE_MIN_UNIQUE_CHARS", "20")),
         raster_dpi=int(os.getenv("OCR_RASTER_DPI", "260")),
+        page_workers=page_workers,
+        max_inflight_pages=max(1, int(os.getenv("OCR_MAX_INFLIGHT_PAGES", "0")) or page_workers * 2),
+        inflight_page_memory_mb=int(os.getenv("OCR_INFLIGHT_PAGE_MEMORY_MB", "1024")),
         min_block_confidence=float(os.getenv("OCR_MIN_BLOCK_CONFIDENCE", "0.48")),
         review_block_confidence=float(os.getenv("OCR_REVIEW_BLOCK_CONFIDENCE", "0.68")),
         flashcard_min_block_confidence=float(os.getenv("OCR_FLASHCARD_MIN_BLOCK_CONFIDENCE", "0.58")),
         flashcard_min_page_score=float(os.getenv("OCR_FLASHCARD_MIN_PAGE_SCORE", "0.45")),
         max_correction_edit_distance=int(os.getenv("OCR_MAX_CORRECTION_EDIT_DISTANCE", "2")),
         max_correction_ratio=float(os.getenv("OCR_MAX_CORRECTION_RATIO", "0.34")),
+        variant_early_exit_confidence=float(os.getenv("OCR_VARIANT_EARLY_EXIT_CONFIDENCE", "0.8")),
+        variant_early_exit_score=float(os.getenv("OCR_VARIANT_EARLY_EXIT_SCORE", "0.6")),
+        artifact_policy=normalize_policy(os.getenv("OCR_ARTIFACT_POLICY")),
+        artifact_image_format=(os.getenv("OCR_ARTIFACT_IMAGE_FORMAT") or "webp").strip().lower(),
         enable_paddleocr=_flag("OCR_ENABLE_PADDLEOCR"),
         enable_trocr=_flag("OCR_ENABLE_TROCR"),
         enable_formula_ocr=_flag("OCR_ENABLE_FORMULA_OCR"),
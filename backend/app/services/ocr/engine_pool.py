@@ -0,0 +1,99 @@
+"""
+Per-process OCR engine pool.
+
+Engines hold their models (Tesseract API, PaddleOCR, TrOCR, pix2tex) for the life of
+the process, so a scan is recognised with one model load per process instead of one
+per page and enhancement variant. The OCR worker and each page-pool process warm the
+enabled engines up at start; load times are recorded here and drained by whoever
+exports metrics, because page-pool processes have no metrics endpoint of their own.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, TypeVar
+
+from app.core.metrics import Histogram
+from app.services.ocr.config import OCRConfig
+from app.services.ocr.formula_ocr import FormulaOCR
+from app.services.ocr.handwriting_ocr import HandwritingOCR
+from app.services.ocr.printed_ocr import PaddlePrintedOCR, PrintedOCREngine, TesseractPrintedOCR
+
+log = logging.getLogger("uvicorn.error")
+
+OCR_ENGINE_LOAD_SECONDS = Histogram(
+    "notescape_ocr_engine_load_seconds",
+    "Time to load an OCR engine's models, once per engine per process.",
+    ("engine",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+
+E = TypeVar("E")
+
+_ENGINES: dict[tuple[str, bool], object] = {}
+_LOADS: list[tuple[str, float]] = []
+_LOCK = threading.Lock()
+
+
+def _engine(name: str, enabled: bool, factory: Callable[[], E]) -> E:
+    key = (name, enabled)
+    with _LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            engine = _ENGINES[key] = factory()
+    if not engine.loaded:
+        started = time.perf_counter()
+        engine.load()
+        elapsed = time.perf_counter() - started
+        with _LOCK:
+            _LOADS.append((name, elapsed))
+        log.info("[ocr] engine_loaded engine=%s seconds=%.3f", name, elapsed)
+    return engine
+
+
+def tesseract_engine() -> TesseractPrintedOCR:
+    return _engine("tesseract", True, TesseractPrintedOCR)
+
+
+def printed_engine(config: OCRConfig) -> PrintedOCREngine:
+    if config.enable_paddleocr:
+        return _engine("paddleocr", True, lambda: PaddlePrintedOCR(fallback=tesseract_engine()))
+    return tesseract_engine()
+
+
+def handwriting_engine(config: OCRConfig) -> HandwritingOCR:
+    return _engine("trocr", config.enable_trocr, lambda: HandwritingOCR(enabled=config.enable_trocr))
+
+
+def formula_engine(config: OCRConfig) -> FormulaOCR:
+    return _engine("pix2tex", config.enable_formula_ocr, lambda: FormulaOCR(enabled=config.enable_formula_ocr))
+
+
+def warm_up_engines(config: OCRConfig) -> None:
+    """Load every engine the config enables, so the first page does not pay for it."""
+    printed_engine(config)
+    handwriting_engine(config)
+    formula_engine(config)
+
+
+def drain_engine_loads() -> list[tuple[str, float]]:
+    """Load times recorded in this process since the last drain."""
+    with _LOCK:
+        loads, _LOADS[:] = list(_LOADS), []
+    return loads
+
+
+def observe_engine_loads(loads: list[tuple[str, float]]) -> None:
+    for name, seconds in loads:
+        OCR_ENGINE_LOAD_SECONDS.observe(seconds, engine=name)
+
+
+def reset_engines() -> None:
+    with _LOCK:
+        engines = list(_ENGINES.values())
+        _ENGINES.clear()
+    for engine in engines:
+        close = getattr(engine, "close", None)
+        if close is not None:
+            close()
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from pathlib import Path
+from dataclasses import dataclass, field
 import re
+import threading
+from typing import Any
 
+from app.services.image_enhancement import PageImage, to_pil
 from app.services.ocr.schema import OCRBlock
 
 _SIMPLE_EQUATION_RE = re.compile(r"([A-Za-z0-9_{}\\^+\-*/(). ]+\s*=\s*[A-Za-z0-9_{}\\^+\-*/(). ]+)")
@@ -11,17 +13,37 @@ _SIMPLE_EQUATION_RE = re.compile(r"([A-Za-z0-9_{}\\^+\-*/(). ]+\s*=\s*[A-Za-z0-9
 
 @dataclass(slots=True)
 class FormulaOCR:
+    """pix2tex LaTeX OCR, with the model loaded once per instance; regex fallback when disabled."""
+
     name: str = "pix2tex"
     enabled: bool = False
+    _model: Any = field(default=None, init=False, repr=False, compare=False)
+    _load_error: str | None = field(default=None, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
 
-    def extract(self, image_path: Path, text_hint: str = "") -> list[OCRBlock]:
-        if self.enabled:
+    @property
+    def loaded(self) -> bool:
+        return not self.enabled or self._model is not None or self._load_error is not None
+
+    def load(self) -> None:
+        with self._lock:
+            if self.loaded:
+                return
             try:
                 from pix2tex.cli import LatexOCR
-                from PIL import Image
 
-                model = LatexOCR()
-                latex = (model(Image.open(image_path)) or "").strip()
+                self._model = LatexOCR()
+            except Exception as exc:
+                self._load_error = str(exc)[:200]
+
+    def extract(self, image: PageImage, text_hint: str = "") -> list[OCRBlock]:
+        if self.enabled:
+            try:
+                self.load()
+                if self._model is None:
+                    raise RuntimeError(self._load_error or "formula model unavailable")
+                with self._lock:
+                    latex = (self._model(to_pil(image)) or "").strip()
                 return [
                     OCRBlock(
                         type="formula",
@@ -1,17 +1,41 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from pathlib import Path
+from dataclasses import dataclass, field
+import threading
+from typing import Any
 
+from app.services.image_enhancement import PageImage, to_pil
 from app.services.ocr.schema import OCRBlock
 
 
 @dataclass(slots=True)
 class HandwritingOCR:
+    """TrOCR; the processor and model are loaded once per instance."""
+
     name: str = "trocr"
     enabled: bool = False
+    _model: Any = field(default=None, init=False, repr=False, compare=False)
+    _load_error: str | None = field(default=None, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    @property
+    def loaded(self) -> bool:
+        return not self.enabled or self._model is not None or self._load_error is not None
+
+    def load(self) -> None:
+        with self._lock:
+            if self.loaded:
+                return
+            try:
+                from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
+                processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-handwritten")
+                model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-handwritten")
+                self._model = (processor, model)
+            except Exception as exc:
+                self._load_error = str(exc)[:200]
 
-    def extract(self, image_path: Path) -> list[OCRBlock]:
+    def extract(self, image: PageImage) -> list[OCRBlock]:
         if not self.enabled:
             return [
                 OCRBlock(
@@ -25,10 +49,8 @@ class HandwritingOCR:
                     metadata={"skipped": "handwriting model disabled"},
                 )
             ]
-        try:
-            from PIL import Image
-            from transformers import TrOCRProcessor, VisionEncoderDecoderModel
-        except Exception as exc:
+        self.load()
+        if self._model is None:
             return [
                 OCRBlock(
                     type="handwriting",
@@ -38,14 +60,13 @@ class HandwritingOCR:
                     confidence=0.0,
                     engine=self.name,
                     needs_review=True,
-                    metadata={"error": str(exc)[:200]},
+                    metadata={"error": self._load_error},
                 )
             ]
-        processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-handwritten")
-        model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-handwritten")
-        image = Image.open(image_path).convert("RGB")
-        pixel_values = processor(images=image, return_tensors="pt").pixel_values
-        generated_ids = model.generate(pixel_values)
+        processor, model = self._model
+        pixel_values = processor(images=to_pil(image).convert("RGB"), return_tensors="pt").pixel_values
+        with self._lock:
+            generated_ids = model.generate(pixel_values)
         text = processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
         confidence = 0.55 if text else 0.0
         return [
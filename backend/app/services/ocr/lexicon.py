@@ -0,0 +1,105 @@
+"""
+Correction index over the OCR domain lexicon (SymSpell-style deletion dictionary).
+
+Every lexicon word is expanded once into all strings reachable by deleting up to
+`max_distance` characters. Two words within edit distance d always share such a
+delete, so a lookup only generates the deletes of the query word and verifies the
+few lexicon words they point at, instead of comparing against the whole lexicon.
+Lookup cost depends on the query length and distance, not on the lexicon size, which
+keeps large per-class vocabularies affordable.
+
+Indexes are built once per lexicon and reused across pages, blocks and jobs.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+from typing import Iterable
+
+_CACHE_SIZE = 8
+
+
+def edit_distance(a: str, b: str, max_distance: int | None = None) -> int:
+    """Levenshtein distance; stops early once it must exceed `max_distance`."""
+    if abs(len(a) - len(b)) > (4 if max_distance is None else max_distance):
+        return 99
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if max_distance is not None and min(cur) > max_distance:
+            return 99
+        prev = cur
+    return prev[-1]
+
+
+def _deletes(word: str, max_distance: int) -> set[str]:
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1 :] for w in frontier if len(w) > 1 for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+class LexiconIndex:
+    def __init__(self, words: Iterable[str], max_distance: int):
+        self.max_distance = max(0, int(max_distance))
+        self.words: dict[str, str] = {}
+        self._deletes: dict[str, list[str]] = {}
+        for word in sorted(words):
+            low = word.lower()
+            if not low or low in self.words:
+                continue
+            self.words[low] = word
+            for key in _deletes(low, self.max_distance):
+                self._deletes.setdefault(key, []).append(low)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def lookup(self, token: str) -> tuple[str, int] | None:
+        """Closest lexicon word within `max_distance` as (word, distance); ties go to the first word alphabetically."""
+        low = token.lower()
+        if low in self.words:
+            return self.words[low], 0
+        best: tuple[int, str] | None = None
+        seen: set[str] = set()
+        for key in _deletes(low, self.max_distance):
+            for candidate in self._deletes.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                dist = edit_distance(low, candidate, self.max_distance)
+                if dist <= self.max_distance and (best is None or (dist, candidate) < best):
+                    best = (dist, candidate)
+        if best is None:
+            return None
+        return self.words[best[1]], best[0]
+
+
+_INDEXES: OrderedDict[tuple[frozenset[str], int], LexiconIndex] = OrderedDict()
+_BY_IDENTITY: dict[int, tuple[object, int, LexiconIndex]] = {}
+_LOCK = threading.Lock()
+
+
+def lexicon_index(words: set[str] | frozenset[str], max_distance: int) -> LexiconIndex:
+    """Shared index for a lexicon. Repeated calls with the same set object skip hashing its contents."""
+    with _LOCK:
+        hit = _BY_IDENTITY.get(id(words))
+        if hit is not None and hit[0] is words and hit[1] == len(words) and hit[2].max_distance == max_distance:
+            return hit[2]
+        key = (frozenset(words), max_distance)
+        index = _INDEXES.get(key)
+        if index is None:
+            index = LexiconIndex(words, max_distance)
+            _INDEXES[key] = index
+            while len(_INDEXES) > _CACHE_SIZE:
+                _INDEXES.popitem(last=False)
+        else:
+            _INDEXES.move_to_end(key)
+        if len(_BY_IDENTITY) >= _CACHE_SIZE * 4:
+            _BY_IDENTITY.clear()
+        _BY_IDENTITY[id(words)] = (words, len(words), index)
+        return index
@@ -4,6 +4,7 @@ from dataclasses import dataclass
 import re
 
 from app.services.ocr.config import OCRConfig
+from app.services.ocr.lexicon import edit_distance, lexicon_index
 from app.services.ocr.schema import Correction, OCRBlock
 
 _URL_RE = re.compile(r"https?://|www\.|[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
@@ -20,43 +21,27 @@ _COMMON_CORRECTIONS = {
 }
 
 
-def _edit_distance(a: str, b: str) -> int:
-    if abs(len(a) - len(b)) > 4:
-        return 99
-    prev = list(range(len(b) + 1))
-    for i, ca in enumerate(a, 1):
-        cur = [i]
-        for j, cb in enumerate(b, 1):
-            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
-        prev = cur
-    return prev[-1]
-
-
 def _protected(token: str, config: OCRConfig) -> bool:
-    low = token.lower()
     return (
-        low in config.protected_vocabulary
+        token.upper() == token
+        or token.lower() in config.protected_vocabulary
         or _URL_RE.search(token) is not None
         or _CODELIKE_RE.search(token) is not None
-        or token.upper() == token
     )
 
 
-def _candidate(token: str, config: OCRConfig) -> tuple[str, str] | None:
+def _candidate(token: str, config: OCRConfig) -> tuple[str, str, int] | None:
     low = token.lower()
     if low in _COMMON_CORRECTIONS:
-        return _COMMON_CORRECTIONS[low], "common OCR/domain correction"
-    best: tuple[str, int] | None = None
-    for word in config.domain_lexicon:
-        dist = _edit_distance(low, word.lower())
-        if dist <= config.max_correction_edit_distance:
-            if best is None or dist < best[1]:
-                best = (word, dist)
-    if not best:
+        replacement = _COMMON_CORRECTIONS[low]
+        return replacement, "common OCR/domain correction", edit_distance(low, replacement)
+    match = lexicon_index(config.domain_lexicon, config.max_correction_edit_distance).lookup(low)
+    if not match:
         return None
-    ratio = best[1] / max(len(token), len(best[0]), 1)
+    word, dist = match
+    ratio = dist / max(len(token), len(word), 1)
     if ratio <= config.max_correction_ratio:
-        return best[0], "near domain lexicon match"
+        return word, "near domain lexicon match", dist
     return None
 
 
@@ -71,10 +56,10 @@ def postprocess_block(block: OCRBlock, config: OCRConfig) -> OCRBlock:
         token = match.group(0)
         if _protected(token, config):
             return token
-        candidate = _candidate(token, config)
-        if candidate and block.confidence < config.review_block_confidence:
-            replacement, reason = candidate
-            dist = _edit_distance(token.lower(), replacement.lower())
+        # Confident blocks are never corrected, so they skip the lexicon lookup.
+        candidate = _candidate(token, config) if block.confidence < config.review_block_confidence else None
+        if candidate:
+            replacement, reason, dist = candidate
             confidence = max(0.51, 1.0 - (dist / max(len(token), len(replacement), 1)))
             corrections.append(Correction(token, replacement, reason, confidence))
             if token[0].isupper():
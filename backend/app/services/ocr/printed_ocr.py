@@ -1,49 +1,92 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import os
 from pathlib import Path
 import subprocess
-from typing import Protocol
+import threading
+from typing import Any, Protocol
 
+from app.services.image_enhancement import PageImage, encode_png, to_pil
 from app.services.ocr.schema import BoundingBox, OCRBlock
 
 
 class PrintedOCREngine(Protocol):
     name: str
 
-    def extract(self, image_path: Path) -> list[OCRBlock]:
+    def extract(self, image: PageImage) -> list[OCRBlock]:
         ...
 
 
+def _tessdata_path() -> str:
+    return os.getenv("OCR_TESSDATA_PREFIX") or os.getenv("TESSDATA_PREFIX") or ""
+
+
 @dataclass(slots=True)
 class TesseractPrintedOCR:
+    """Tesseract through the in-process API (tesserocr) when installed, else the CLI.
+
+    The API instance keeps the language model loaded between pages; it is not
+    thread-safe, so calls are serialized per instance.
+    """
+
     name: str = "tesseract"
+    _api: Any = field(default=None, init=False, repr=False, compare=False)
+    _loaded: bool = field(default=False, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
 
-    def extract(self, image_path: Path) -> list[OCRBlock]:
+    def load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                from tesserocr import PSM, PyTessBaseAPI
+            except Exception:
+                return
+            try:
+                self._api = PyTessBaseAPI(path=_tessdata_path(), lang="eng", psm=PSM.SINGLE_BLOCK)
+            except Exception:
+                self._api = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._api is not None:
+                self._api.End()
+            self._api = None
+            self._loaded = False
+
+    def extract(self, image: PageImage) -> list[OCRBlock]:
+        self.load()
+        if self._api is not None:
+            with self._lock:
+                if isinstance(image, Path):
+                    self._api.SetImageFile(str(image))
+                else:
+                    self._api.SetImage(to_pil(image))
+                text = (self._api.GetUTF8Text() or "").strip()
+                # Unlike the CLI, the API reports Tesseract's own mean word confidence.
+                confidence = max(0, self._api.MeanTextConf()) / 100 if text else 0.0
+                self._api.Clear()
+            return [self._text_block(text, confidence)]
         try:
+            # In-memory pages are piped to the CLI rather than written to a temp file.
+            source, data = (str(image), None) if isinstance(image, Path) else ("stdin", encode_png(image))
             proc = subprocess.run(
-                ["tesseract", str(image_path), "stdout", "--psm", "6"],
+                ["tesseract", source, "stdout", "--psm", "6"],
                 check=False,
                 capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="ignore",
+                input=data,
             )
-            text = (proc.stdout or "").strip()
+            text = (proc.stdout or b"").decode("utf-8", errors="ignore").strip()
             confidence = 0.62 if text else 0.0
             if proc.returncode != 0:
                 confidence = 0.0
-            return [
-                OCRBlock(
-                    type="text",
-                    bbox=None,
-                    raw_text=text,
-                    normalized_text=text,
-                    confidence=confidence,
-                    engine=self.name,
-                    needs_review=confidence < 0.55,
-                )
-            ]
+            return [self._text_block(text, confidence)]
         except FileNotFoundError:
             return [
                 OCRBlock(
@@ -58,16 +101,50 @@ class TesseractPrintedOCR:
                 )
             ]
 
+    def _text_block(self, text: str, confidence: float) -> OCRBlock:
+        return OCRBlock(
+            type="text",
+            bbox=None,
+            raw_text=text,
+            normalized_text=text,
+            confidence=confidence,
+            engine=self.name,
+            needs_review=confidence < 0.55,
+        )
+
 
 @dataclass(slots=True)
 class PaddlePrintedOCR:
+    """PaddleOCR with its detection/recognition models built once per instance."""
+
     name: str = "paddleocr"
+    fallback: TesseractPrintedOCR | None = None
+    _ocr: Any = field(default=None, init=False, repr=False, compare=False)
+    _load_error: str | None = field(default=None, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
 
-    def extract(self, image_path: Path) -> list[OCRBlock]:
-        try:
-            from paddleocr import PaddleOCR
-        except Exception as exc:
-            return TesseractPrintedOCR().extract(image_path) + [
+    @property
+    def loaded(self) -> bool:
+        return self._ocr is not None or self._load_error is not None
+
+    def load(self) -> None:
+        with self._lock:
+            if self.loaded:
+                return
+            try:
+                from paddleocr import PaddleOCR
+
+                self._ocr = PaddleOCR(use_angle_cls=True, lang="en", show_log=False)
+            except Exception as exc:
+                self._load_error = str(exc)[:200]
+        if self._load_error is not None and self.fallback is not None:
+            self.fallback.load()
+
+    def extract(self, image: PageImage) -> list[OCRBlock]:
+        self.load()
+        if self._ocr is None:
+            fallback = self.fallback or TesseractPrintedOCR()
+            return fallback.extract(image) + [
                 OCRBlock(
                     type="unknown",
                     bbox=None,
@@ -76,11 +153,13 @@ class PaddlePrintedOCR:
                     confidence=0.0,
                     engine=self.name,
                     needs_review=True,
-                    metadata={"fallback": "tesseract", "error": str(exc)[:200]},
+                    metadata={"fallback": "tesseract", "error": self._load_error},
                 )
             ]
-        ocr = PaddleOCR(use_angle_cls=True, lang="en", show_log=False)
-        result = ocr.ocr(str(image_path), cls=True) or []
+        # PaddleOCR takes arrays in OpenCV's BGR order; grayscale variants pass through.
+        source = str(image) if isinstance(image, Path) else (image[:, :, ::-1] if image.ndim == 3 else image)
+        with self._lock:
+            result = self._ocr.ocr(source, cls=True) or []
         blocks: list[OCRBlock] = []
         order = 0
         for page in result:
@@ -6,8 +6,7 @@ from typing import Protocol
 
 from app.core.settings import settings
 from app.services.ocr.config import OCRConfig, load_ocr_config
-from app.services.ocr.handwriting_ocr import HandwritingOCR
-from app.services.ocr.printed_ocr import PaddlePrintedOCR, TesseractPrintedOCR
+from app.services.ocr.engine_pool import handwriting_engine, printed_engine
 from app.services.ocr.schema import OCRBlock
 
 
@@ -28,13 +27,9 @@ class LocalOCRProvider:
     supports_handwriting: bool = True
 
     def extract_from_image(self, image_path: Path) -> list[OCRBlock]:
-        blocks: list[OCRBlock] = []
-        if self.config.enable_paddleocr:
-            blocks.extend(PaddlePrintedOCR().extract(image_path))
-        else:
-            blocks.extend(TesseractPrintedOCR().extract(image_path))
+        blocks: list[OCRBlock] = list(printed_engine(self.config).extract(image_path))
         if self.config.enable_trocr:
-            blocks.extend(HandwritingOCR(enabled=True).extract(image_path))
+            blocks.extend(handwriting_engine(self.config).extract(image_path))
         return blocks
 
 
@@ -34,6 +34,12 @@ class BoundingBox:
     def as_list(self) -> list[float]:
         return [self.x0, self.y0, self.x1, self.y1]
 
+    @classmethod
+    def from_list(cls, values: list[float] | None) -> BoundingBox | None:
+        if not values:
+            return None
+        return cls(*(float(v) for v in values))
+
 
 @dataclass(slots=True)
 class Correction:
@@ -50,6 +56,15 @@ class Correction:
             "confidence": round(self.confidence, 4),
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Correction:
+        return cls(
+            original=data["original"],
+            replacement=data["replacement"],
+            reason=data["reason"],
+            confidence=float(data["confidence"]),
+        )
+
 
 @dataclass(slots=True)
 class OCRBlock:
@@ -87,6 +102,23 @@ class OCRBlock:
             "metadata": self.metadata,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> OCRBlock:
+        return cls(
+            type=data["type"],
+            bbox=BoundingBox.from_list(data.get("bbox")),
+            raw_text=data.get("raw_text") or "",
+            normalized_text=data.get("normalized_text") or "",
+            confidence=float(data.get("confidence") or 0.0),
+            engine=data.get("engine") or "",
+            latex=data.get("latex"),
+            needs_review=bool(data.get("needs_review")),
+            reading_order=int(data.get("reading_order") or 0),
+            corrections=[Correction.from_dict(c) for c in data.get("corrections") or []],
+            uncertain_spans=list(data.get("uncertain_spans") or []),
+            metadata=dict(data.get("metadata") or {}),
+        )
+
 
 @dataclass(slots=True)
 class Region:
@@ -103,6 +135,15 @@ class Region:
             "reason": self.reason,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Region:
+        return cls(
+            type=data["type"],
+            bbox=BoundingBox.from_list(data.get("bbox")),
+            confidence=float(data.get("confidence") or 0.0),
+            reason=data.get("reason") or "",
+        )
+
 
 @dataclass(slots=True)
 class PageMetrics:
@@ -129,6 +170,11 @@ class PageMetrics:
             "uncertain_region_count": self.uncertain_region_count,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> PageMetrics:
+        known = {name: data[name] for name in cls.__dataclass_fields__ if name in data}
+        return cls(**known)
+
 
 @dataclass(slots=True)
 class OCRPage:
@@ -159,6 +205,23 @@ class OCRPage:
             "debug_thumbnail_key": self.debug_thumbnail_key,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> OCRPage:
+        """Inverse of `to_dict`; used to resume OCR from per-page checkpoints."""
+        return cls(
+            page_number=int(data["page_number"]),
+            page_type=data["page_type"],
+            blocks=[OCRBlock.from_dict(b) for b in data.get("blocks") or []],
+            regions=[Region.from_dict(r) for r in data.get("regions") or []],
+            markdown=data.get("markdown") or "",
+            metrics=PageMetrics.from_dict(data.get("metrics") or {}),
+            warnings=list(data.get("warnings") or []),
+            selected_preprocessing=data.get("selected_preprocessing"),
+            original_image_key=data.get("original_image_key"),
+            enhanced_image_keys=list(data.get("enhanced_image_keys") or []),
+            debug_thumbnail_key=data.get("debug_thumbnail_key"),
+        )
+
 
 @dataclass(slots=True)
 class DocumentOCRResult:
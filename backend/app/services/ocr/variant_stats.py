@@ -0,0 +1,77 @@
+"""
+Historical win rates of image enhancement variants, per source type (pdf, image).
+
+After each OCR job the worker tallies, for every OCR'd page, which variants were tried
+and which one was selected, and adds them to `ocr_variant_stats`. Before the next job
+of the same source type it loads the ranking and passes it as `OCRConfig.variant_order`,
+so pages that do not clear the early-exit bar on the original try the usual winners first.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Iterable
+
+from app.core.db import db_conn
+from app.services.image_enhancement import ENHANCEMENT_VARIANT_NAMES
+from app.services.ocr.schema import OCRPage
+
+log = logging.getLogger("uvicorn.error")
+
+
+def rank_variants(stats: dict[str, tuple[int, int]]) -> tuple[str, ...]:
+    """Order variants by smoothed win rate; unseen variants keep their default position."""
+
+    def win_rate(name: str) -> float:
+        attempts, wins = stats.get(name, (0, 0))
+        return (wins + 1) / (attempts + 2)
+
+    return tuple(sorted(ENHANCEMENT_VARIANT_NAMES, key=win_rate, reverse=True))
+
+
+def tally_variant_outcomes(
+    pages: Iterable[OCRPage],
+    attempts: Iterable[dict[str, object]],
+) -> dict[str, tuple[int, int]]:
+    """(attempts, wins) per variant for the pages OCR'd in this run."""
+    selected = {page.page_number: page.selected_preprocessing for page in pages if page.selected_preprocessing}
+    tallies: dict[str, list[int]] = {}
+    for attempt in attempts:
+        # Printed-OCR attempts carry a score; handwriting/formula passes reuse the selected variant.
+        if "score" not in attempt or attempt.get("page") not in selected:
+            continue
+        variant = str(attempt.get("variant") or "")
+        counts = tallies.setdefault(variant, [0, 0])
+        counts[0] += 1
+        counts[1] += int(selected[attempt["page"]] == variant)
+    return {variant: (tried, won) for variant, (tried, won) in tallies.items()}
+
+
+async def load_variant_order(source_type: str) -> tuple[str, ...]:
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            "SELECT variant, attempts, wins FROM ocr_variant_stats WHERE source_type=%s",
+            (source_type,),
+        )
+        rows = await cur.fetchall()
+    if not rows:
+        return ()
+    return rank_variants({variant: (int(attempts), int(wins)) for variant, attempts, wins in rows})
+
+
+async def record_variant_outcomes(source_type: str, tallies: dict[str, tuple[int, int]]) -> None:
+    if not tallies:
+        return
+    async with db_conn() as (conn, cur):
+        await cur.executemany(
+            """
+            INSERT INTO ocr_variant_stats (source_type, variant, attempts, wins)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (source_type, variant) DO UPDATE
+            SET attempts = ocr_variant_stats.attempts + EXCLUDED.attempts,
+                wins = ocr_variant_stats.wins + EXCLUDED.wins,
+                updated_at = now()
+            """,
+            [(source_type, variant, tried, won) for variant, (tried, won) in sorted(tallies.items())],
+        )
+        await conn.commit()
+    log.info("[ocr] variant_stats_recorded source_type=%s variants=%s", source_type, sorted(tallies))
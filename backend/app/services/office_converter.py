@@ -0,0 +1,348 @@
+"""
+Warm pool of LibreOffice instances for PPTX/DOCX → PDF conversion.
+
+Each of the `OFFICE_POOL_SIZE` slots owns an isolated LibreOffice profile, so concurrent
+conversions no longer contend for one profile directory. Conversions wait for an idle
+slot; `OFFICE_QUEUE_TIMEOUT_SECONDS` bounds that wait.
+
+When the system Python can import `uno` (python3-uno, `OFFICE_UNO_PYTHON`), a slot keeps
+LibreOffice running behind `office_uno_bridge.py` and converts over UNO. That removes the
+seconds of LibreOffice start-up from every conversion. A conversion that exceeds its
+timeout, or whose instance crashed, kills that instance, and the slot starts a fresh one
+on its next conversion. Without UNO, a slot runs a one-shot `soffice --convert-to pdf` per
+conversion, still with its own profile.
+
+`notescape_office_conversion_seconds{mode,result}` tracks conversion latency, and
+`notescape_office_queue_wait_seconds` tracks the wait for a slot.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import select
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.core.metrics import Counter, Histogram
+
+log = logging.getLogger("uvicorn.error")
+
+OFFICE_POOL_SIZE = max(1, int(os.getenv("OFFICE_POOL_SIZE", "2")))
+OFFICE_UNO_PYTHON = os.getenv("OFFICE_UNO_PYTHON", "/usr/bin/python3")
+OFFICE_POOL_ENABLED = os.getenv("OFFICE_POOL_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+OFFICE_STARTUP_TIMEOUT_SECONDS = float(os.getenv("OFFICE_STARTUP_TIMEOUT_SECONDS", "60"))
+OFFICE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("OFFICE_QUEUE_TIMEOUT_SECONDS", "300"))
+OFFICE_PROFILE_ROOT = Path(os.getenv("OFFICE_PROFILE_ROOT") or Path(tempfile.gettempdir()) / "notescape-office")
+
+_BRIDGE_SCRIPT = Path(__file__).with_name("office_uno_bridge.py")
+_PDF_FILTERS = {".pptx": "impress_pdf_Export", ".docx": "writer_pdf_Export"}
+
+OFFICE_CONVERSION_SECONDS = Histogram(
+    "notescape_office_conversion_seconds",
+    "PPTX/DOCX to PDF conversion time by mode (warm = pooled UNO instance, oneshot = soffice per file).",
+    ("mode", "result"),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+OFFICE_QUEUE_WAIT_SECONDS = Histogram(
+    "notescape_office_queue_wait_seconds",
+    "Time a conversion waited for an idle LibreOffice slot.",
+    buckets=(0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+OFFICE_INSTANCE_STARTS = Counter(
+    "notescape_office_instance_starts_total",
+    "Warm LibreOffice instances started, by reason (initial, timeout, crash).",
+    ("reason",),
+)
+
+
+class OfficeConversionError(RuntimeError):
+    """A conversion failed; the message is safe to show as the preview error."""
+
+
+class _StartFailed(OfficeConversionError):
+    pass
+
+
+def libreoffice_executable() -> str | None:
+    return shutil.which("soffice") or shutil.which("libreoffice")
+
+
+_UNO_AVAILABLE: bool | None = None
+
+
+def uno_available() -> bool:
+    """True when `OFFICE_UNO_PYTHON` can import uno (checked once per process)."""
+    global _UNO_AVAILABLE
+    if _UNO_AVAILABLE is None:
+        try:
+            subprocess.run([OFFICE_UNO_PYTHON, "-c", "import uno"], check=True, capture_output=True, timeout=20)
+            _UNO_AVAILABLE = True
+        except Exception:
+            _UNO_AVAILABLE = False
+    return _UNO_AVAILABLE
+
+
+class _Slot:
+    """One pool slot: an isolated profile and, in warm mode, a running bridge + LibreOffice."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.profile = OFFICE_PROFILE_ROOT / f"{os.getpid()}-{index}"
+        self.pipe = f"notescape_office_{os.getpid()}_{index}"
+        self.proc: subprocess.Popen | None = None
+        self._buffer = b""
+        self._restart_reason = "initial"
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self, office: str) -> None:
+        self.stop()
+        self.profile.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        self.proc = subprocess.Popen(
+            [
+                OFFICE_UNO_PYTHON,
+                str(_BRIDGE_SCRIPT),
+                "--soffice",
+                office,
+                "--profile",
+                str(self.profile),
+                "--pipe",
+                self.pipe,
+                "--startup-timeout",
+                str(OFFICE_STARTUP_TIMEOUT_SECONDS),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        self._buffer = b""
+        reply = self._read_reply(OFFICE_STARTUP_TIMEOUT_SECONDS + 5)
+        if not reply or not reply.get("ready"):
+            self.stop()
+            raise _StartFailed("LibreOffice could not be started for document conversion.")
+        OFFICE_INSTANCE_STARTS.inc(reason=self._restart_reason)
+        log.info(
+            "[office_pool] instance_started slot=%d pid=%s reason=%s elapsed_ms=%d",
+            self.index,
+            reply.get("pid"),
+            self._restart_reason,
+            int((time.perf_counter() - started) * 1000),
+        )
+        # If it dies before the next conversion, that restart is counted as a crash.
+        self._restart_reason = "crash"
+
+    def stop(self, reason: str | None = None) -> None:
+        if reason:
+            self._restart_reason = reason
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            # The bridge leads its own session, so this takes LibreOffice down with it.
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            proc.wait(timeout=5)
+        except Exception:
+            pass
+        for stream in (proc.stdin, proc.stdout):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _read_reply(self, timeout: float) -> dict | None:
+        """The bridge's next JSON line, or None on timeout or when it exited."""
+        assert self.proc is not None and self.proc.stdout is not None
+        fd = self.proc.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                # EOF: reap the bridge so `running` reports the exit.
+                try:
+                    self.proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    pass
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def convert_warm(self, office: str, source: Path, target: Path, timeout: float) -> None:
+        if not self.running:
+            self.start(office)
+        assert self.proc is not None and self.proc.stdin is not None
+        request = {"src": str(source), "dst": str(target), "filter": _PDF_FILTERS[source.suffix.lower()]}
+        try:
+            self.proc.stdin.write((json.dumps(request) + "\n").encode("utf-8"))
+            self.proc.stdin.flush()
+        except OSError:
+            self.stop("crash")
+            raise OfficeConversionError("LibreOffice stopped unexpectedly during conversion.")
+        reply = self._read_reply(timeout)
+        if reply is None:
+            timed_out = self.running
+            self.stop("timeout" if timed_out else "crash")
+            if timed_out:
+                raise OfficeConversionError("Document preview conversion timed out.")
+            raise OfficeConversionError("LibreOffice stopped unexpectedly during conversion.")
+        if not reply.get("ok"):
+            if reply.get("crashed") or not self.running:
+                self.stop("crash")
+            raise OfficeConversionError(str(reply.get("error") or "LibreOffice could not convert the document."))
+
+    def convert_oneshot(self, office: str, source: Path, target: Path, timeout: float) -> None:
+        self.profile.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            office,
+            "--headless",
+            "--nologo",
+            "--nofirststartwizard",
+            f"-env:UserInstallation={self.profile.resolve().as_uri()}",
+            "--convert-to",
+            "pdf",
+            "--outdir",
+            str(source.parent),
+            str(source),
+        ]
+        log.info("[PPTX_PREVIEW] command = %s", " ".join(shlex.quote(part) for part in cmd))
+        try:
+            result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise OfficeConversionError("Document preview conversion timed out.")
+        stdout = (result.stdout or b"").decode("utf-8", errors="replace").strip()
+        stderr = (result.stderr or b"").decode("utf-8", errors="replace").strip()
+        log.info("[PPTX_PREVIEW] return_code = %s stdout = %s stderr = %s", result.returncode, stdout, stderr)
+        if result.returncode != 0:
+            raise OfficeConversionError(stderr or stdout or f"LibreOffice exited with code {result.returncode}.")
+        produced = source.with_suffix(".pdf")
+        if produced != target and produced.exists():
+            produced.replace(target)
+
+
+class OfficeConverterPool:
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: queue.Queue[_Slot] = queue.Queue()
+        self._slots = [_Slot(index) for index in range(size)]
+        for slot in self._slots:
+            self._idle.put(slot)
+
+    @property
+    def mode(self) -> str:
+        return "warm" if OFFICE_POOL_ENABLED and uno_available() else "oneshot"
+
+    def warm_up(self) -> None:
+        """Start every slot's instance now instead of on its first conversion."""
+        office = libreoffice_executable()
+        if not office or self.mode != "warm":
+            return
+        for _ in range(self.size):
+            slot = self._idle.get()
+            try:
+                if not slot.running:
+                    slot.start(office)
+            except Exception as exc:
+                log.warning("[office_pool] warm_up_failed slot=%d error=%s", slot.index, exc)
+            finally:
+                self._idle.put(slot)
+
+    def convert(self, source: Path, target: Path, timeout: float) -> str:
+        """Convert `source` (.pptx/.docx) to the PDF `target`; returns the mode used."""
+        office = libreoffice_executable()
+        if not office:
+            raise OfficeConversionError(
+                "LibreOffice is not installed or not on PATH, so document preview conversion is unavailable."
+            )
+        waited = time.perf_counter()
+        try:
+            slot = self._idle.get(timeout=OFFICE_QUEUE_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise OfficeConversionError("Document preview conversion is busy; try again shortly.")
+        OFFICE_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - waited)
+        mode = self.mode
+        started = time.perf_counter()
+        result = "error"
+        try:
+            if mode == "warm":
+                try:
+                    slot.convert_warm(office, source, target, timeout)
+                except _StartFailed as exc:
+                    log.warning("[office_pool] start_failed slot=%d, converting one-shot error=%s", slot.index, exc)
+                    mode = "oneshot"
+                    slot.convert_oneshot(office, source, target, timeout)
+            else:
+                slot.convert_oneshot(office, source, target, timeout)
+            if not target.exists() or target.stat().st_size == 0:
+                raise OfficeConversionError("Conversion did not produce a PDF.")
+            result = "ok"
+            return mode
+        finally:
+            elapsed = time.perf_counter() - started
+            OFFICE_CONVERSION_SECONDS.observe(elapsed, mode=mode, result=result)
+            log.info(
+                "[office_pool] conversion slot=%d mode=%s result=%s elapsed_ms=%d",
+                slot.index,
+                mode,
+                result,
+                int(elapsed * 1000),
+            )
+            self._idle.put(slot)
+
+    def shutdown(self) -> None:
+        for slot in self._slots:
+            slot.stop()
+            shutil.rmtree(slot.profile, ignore_errors=True)
+
+
+_POOL: OfficeConverterPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_office_pool() -> OfficeConverterPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = OfficeConverterPool(OFFICE_POOL_SIZE)
+            atexit.register(_POOL.shutdown)
+        return _POOL
+
+
+def convert_office_to_pdf(source: Path, target: Path, *, timeout_seconds: float = 120) -> str:
+    return get_office_pool().convert(source, target, timeout_seconds)
+
+
+def warm_up_office_pool() -> None:
+    """Start the pool's LibreOffice instances; best-effort, conversions start them otherwise."""
+    try:
+        pool = get_office_pool()
+        log.info(
+            "[office_pool] mode=%s size=%d uno_python=%s",
+            pool.mode,
+            pool.size,
+            OFFICE_UNO_PYTHON if pool.mode == "warm" else "",
+        )
+        pool.warm_up()
+    except Exception:
+        log.exception("[office_pool] warm_up failed")
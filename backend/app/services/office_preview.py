@@ -1,26 +1,21 @@
-"""LibreOffice headless conversion of PPTX/DOCX to PDF for in-app preview."""
+"""LibreOffice headless conversion of PPTX/DOCX to PDF for in-app preview (see :mod:`app.services.office_converter`)."""
 
 from __future__ import annotations
 
 import logging
-import shlex
-import shutil
 import subprocess
 import tempfile
 import time
 from pathlib import Path
 
 from app.core.settings import settings
+from app.services.office_converter import OfficeConversionError, convert_office_to_pdf, libreoffice_executable
 
 log = logging.getLogger("uvicorn.error")
 
 _OFFICE_EXT = frozenset({".pptx", ".docx"})
 
 
-def libreoffice_executable() -> str | None:
-    return shutil.which("soffice") or shutil.which("libreoffice")
-
-
 def libreoffice_version() -> str | None:
     office = libreoffice_executable()
     if not office:
@@ -85,13 +80,13 @@ def ensure_office_pdf_preview(
     *,
     source_extension: str,
     timeout_seconds: int = 120,
-    generate_slide_pngs: bool = False,
     original_file_path: str | None = None,
 ) -> tuple[list[Path], str | None]:
     """Convert PPTX or DOCX bytes to ``previews/{document_id}/converted.pdf``.
 
     Returns ``(slide_png_paths, error)``. On success, ``error`` is ``None`` and the PDF exists.
-    Slide PNG generation is optional (PPTX only) and failures do not fail the conversion if PDF exists.
+    Slide images are rendered on request by :mod:`app.services.preview_assets`; the paths
+    returned are slide PNGs left from before that, which are cleared when reconverting.
     """
     ext = _normalize_ext(source_extension)
     out_dir = preview_dir(document_id)
@@ -129,108 +124,29 @@ def ensure_office_pdf_preview(
         tmpdir = Path(tmp)
         source = tmpdir / input_name
         source.write_bytes(file_bytes)
-
-        cmd = [
-            office,
-            "--headless",
-            "--nologo",
-            "--nofirststartwizard",
-            "--convert-to",
-            "pdf",
-            "--outdir",
-            str(tmpdir),
-            str(source),
-        ]
-        tmp_expected_pdf = tmpdir / f"{source.stem}.pdf"
-        log.info("[PPTX_PREVIEW] command = %s", " ".join(shlex.quote(part) for part in cmd))
-        log.info(
-            "[office_preview] conversion_start document_id=%s ext=%s cmd=%s",
-            document_id,
-            ext,
-            " ".join(cmd[:6]) + f" ... {source.name!r}",
-        )
+        pdf_path = tmpdir / f"{source.stem}.pdf"
+        log.info("[office_preview] conversion_start document_id=%s ext=%s", document_id, ext)
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                timeout=timeout_seconds,
+            mode = convert_office_to_pdf(source, pdf_path, timeout_seconds=timeout_seconds)
+        except OfficeConversionError as exc:
+            detail = str(exc)
+            log.warning(
+                "[office_preview] conversion_failed document_id=%s ext=%s detail=%s",
+                document_id,
+                ext,
+                detail[:800],
             )
-            stdout = (result.stdout or b"").decode("utf-8", errors="replace").strip()
-            stderr = (result.stderr or b"").decode("utf-8", errors="replace").strip()
-            log.info("[PPTX_PREVIEW] stdout = %s", stdout)
-            log.info("[PPTX_PREVIEW] stderr = %s", stderr)
-            log.info("[PPTX_PREVIEW] return_code = %s", result.returncode)
-            if result.returncode != 0:
-                detail = stderr or stdout or f"LibreOffice exited with code {result.returncode}."
-                log.warning(
-                    "[office_preview] conversion_failed document_id=%s ext=%s detail=%s",
-                    document_id,
-                    ext,
-                    detail[:800],
-                )
-                return [], detail
-        except subprocess.TimeoutExpired:
-            log.warning("[PPTX_PREVIEW] return_code = timeout")
-            return [], "Document preview conversion timed out."
-
-        stem = source.stem
-        pdf_path = tmpdir / f"{stem}.pdf"
-        log.info("[PPTX_PREVIEW] expected_pdf_path = %s", tmp_expected_pdf)
-        if not pdf_path.exists():
-            converted = list(tmpdir.glob("*.pdf"))
-            pdf_path = converted[0] if converted else pdf_path
-        log.info("[PPTX_PREVIEW] pdf_exists = %s", pdf_path.exists())
-        log.info("[PPTX_PREVIEW] pdf_size = %s", pdf_path.stat().st_size if pdf_path.exists() else 0)
-        if not pdf_path.exists() or pdf_path.stat().st_size == 0:
-            return [], "Conversion did not produce a PDF."
+            return [], detail
+        log.info("[PPTX_PREVIEW] pdf_size = %s", pdf_path.stat().st_size)
 
         pdf_dest.write_bytes(pdf_path.read_bytes())
         log.info(
-            "[office_preview] pdf_written document_id=%s ext=%s bytes=%d elapsed_ms=%d",
+            "[office_preview] pdf_written document_id=%s ext=%s mode=%s bytes=%d elapsed_ms=%d",
             document_id,
             ext,
+            mode,
             pdf_dest.stat().st_size,
             int((time.perf_counter() - started) * 1000),
         )
 
-        image_paths: list[Path] = []
-        if generate_slide_pngs and ext == ".pptx":
-            try:
-                import fitz  # PyMuPDF
-
-                with fitz.open(pdf_path) as doc:
-                    for idx, page in enumerate(doc, 1):
-                        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)
-                        out = out_dir / f"slide_{idx:03d}.png"
-                        pix.save(out)
-                        image_paths.append(out)
-            except Exception as exc:
-                pdftoppm = shutil.which("pdftoppm")
-                if pdftoppm:
-                    try:
-                        prefix = out_dir / "slide"
-                        subprocess.run(
-                            [pdftoppm, "-png", "-r", "144", str(pdf_path), str(prefix)],
-                            check=True,
-                            capture_output=True,
-                            timeout=timeout_seconds,
-                        )
-                        generated = sorted(out_dir.glob("slide-*.png"))
-                        for idx, path in enumerate(generated, 1):
-                            normalized = out_dir / f"slide_{idx:03d}.png"
-                            path.replace(normalized)
-                            image_paths.append(normalized)
-                    except Exception as render_exc:
-                        log.warning(
-                            "[office_preview] optional_slide_png_failed document_id=%s err=%s",
-                            document_id,
-                            render_exc,
-                        )
-                else:
-                    log.warning(
-                        "[office_preview] optional_slide_png_failed document_id=%s err=%s",
-                        document_id,
-                        exc,
-                    )
-
-    return image_paths, None
+    return [], None
@@ -0,0 +1,114 @@
+"""
+UNO bridge for one warm LibreOffice instance, run by the system Python (python3-uno).
+
+Started by :mod:`app.services.office_converter`; it must not import app modules. It
+launches ``soffice`` with its own profile and pipe, connects over UNO, then answers one
+JSON request per stdin line (``{"src", "dst", "filter"}``) with one JSON line on stdout.
+It exits when stdin closes or LibreOffice dies, and the pool starts a new instance.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+
+def _props(**values):
+    props = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+def _reply(**payload) -> None:
+    sys.stdout.write(json.dumps(payload) + "\n")
+    sys.stdout.flush()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--soffice", required=True)
+    parser.add_argument("--profile", required=True)
+    parser.add_argument("--pipe", required=True)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    office = subprocess.Popen(
+        [
+            args.soffice,
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--nodefault",
+            "--norestore",
+            "--nofirststartwizard",
+            f"-env:UserInstallation={uno.systemPathToFileUrl(args.profile)}",
+            f"--accept=pipe,name={args.pipe};urp;StarOffice.ComponentContext",
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+    deadline = time.monotonic() + args.startup_timeout
+    while True:
+        try:
+            ctx = resolver.resolve(f"uno:pipe,name={args.pipe};urp;StarOffice.ComponentContext")
+            break
+        except NoConnectException:
+            if office.poll() is not None or time.monotonic() > deadline:
+                office.kill()
+                _reply(ready=False, error="LibreOffice did not start")
+                return 1
+            time.sleep(0.2)
+    desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+    _reply(ready=True, pid=office.pid)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        try:
+            doc = desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(request["src"]),
+                "_blank",
+                0,
+                _props(Hidden=True, ReadOnly=True),
+            )
+            if doc is None:
+                raise RuntimeError("LibreOffice could not open the document")
+            try:
+                doc.storeToURL(uno.systemPathToFileUrl(request["dst"]), _props(FilterName=request["filter"]))
+            finally:
+                doc.close(True)
+        except Exception as exc:
+            crashed = office.poll() is not None
+            _reply(ok=False, error=str(exc)[:500] or type(exc).__name__, crashed=crashed)
+            if crashed:
+                return 1
+            continue
+        _reply(ok=True)
+
+    try:
+        desktop.terminate()
+    except Exception:
+        pass
+    try:
+        office.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        office.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
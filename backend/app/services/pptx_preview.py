@@ -37,7 +37,6 @@ def ensure_pptx_preview(
         document_id,
         source_extension=".pptx",
         timeout_seconds=timeout_seconds,
-        generate_slide_pngs=False,
         original_file_path=original_file_path,
     )
 
@@ -54,6 +53,5 @@ def ensure_docx_preview(
         document_id,
         source_extension=".docx",
         timeout_seconds=timeout_seconds,
-        generate_slide_pngs=False,
         original_file_path=original_file_path,
     )
@@ -0,0 +1,258 @@
+"""
+Lazily rendered page/slide images for document previews.
+
+Pages of a preview PDF (the converted PPTX/DOCX, or an uploaded PDF) are rendered only
+when first requested. Each request picks a size tier (`thumbnail`, `viewer`, `zoom`),
+and the result is WebP. Renders are cached under `previews/pages/`. Cache keys are the
+PDF's content hash, so duplicate uploads (their converted PDFs are hard-linked) share
+renders.
+
+The cache, including local copies of S3-stored PDFs, is kept under
+`PREVIEW_CACHE_MAX_BYTES`, evicting least recently served files first; a hit refreshes
+the file's mtime. Files used in the last `PREVIEW_EVICT_MIN_AGE_SECONDS` are never
+evicted, so a response about to send one cannot lose it. ETags come from the same key,
+so a client revalidation is answered without rendering or reading the image. Serving page N also
+renders the next `PREVIEW_PREFETCH_PAGES` pages at the same tier in the background.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.core.metrics import Counter, Histogram
+from app.services.office_preview import preview_root
+
+log = logging.getLogger("uvicorn.error")
+
+# Target image width in pixels per tier.
+PREVIEW_TIERS = {"thumbnail": 320, "viewer": 1280, "zoom": 2560}
+PREVIEW_CACHE_MAX_BYTES = max(1, int(os.getenv("PREVIEW_CACHE_MAX_BYTES", str(512 * 1024 * 1024))))
+PREVIEW_PREFETCH_PAGES = max(0, int(os.getenv("PREVIEW_PREFETCH_PAGES", "2")))
+PREVIEW_WEBP_QUALITY = int(os.getenv("PREVIEW_WEBP_QUALITY", "82"))
+PREVIEW_EVICT_MIN_AGE_SECONDS = max(0, int(os.getenv("PREVIEW_EVICT_MIN_AGE_SECONDS", "30")))
+# Bump when rendering changes so cached images and ETags are replaced.
+RENDER_VERSION = "1"
+
+PREVIEW_PAGE_REQUESTS = Counter(
+    "notescape_preview_page_requests_total",
+    "Preview page image requests by tier and outcome (hit, miss, not_modified).",
+    ("tier", "result"),
+)
+PREVIEW_RENDER_SECONDS = Histogram(
+    "notescape_preview_render_seconds",
+    "Time to render one preview page image, by tier.",
+    ("tier",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class PreviewPageNotFound(LookupError):
+    pass
+
+
+def cache_root() -> Path:
+    return preview_root() / "pages"
+
+
+_PDF_INFO: dict[tuple[str, int, int, int], tuple[str, int]] = {}
+_PDF_INFO_LOCK = threading.Lock()
+
+
+def _count_pages(pdf_path: Path) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        return int(doc.page_count)
+
+
+def pdf_info(pdf_path: Path) -> tuple[str, int]:
+    """(content digest, page count) for a preview PDF, memoized by inode, size and mtime."""
+    stat = pdf_path.stat()
+    key = (str(pdf_path), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _PDF_INFO_LOCK:
+        cached = _PDF_INFO.get(key)
+    if cached:
+        return cached
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as src:
+        for block in iter(lambda: src.read(1024 * 1024), b""):
+            digest.update(block)
+    info = (digest.hexdigest(), _count_pages(pdf_path))
+    with _PDF_INFO_LOCK:
+        if len(_PDF_INFO) > 1024:
+            _PDF_INFO.clear()
+        _PDF_INFO[key] = info
+    return info
+
+
+def page_etag(digest: str, page_number: int, tier: str) -> str:
+    return f'"{digest[:20]}-{page_number}-{tier}-r{RENDER_VERSION}"'
+
+
+def _cached_path(digest: str, page_number: int, tier: str) -> Path:
+    return cache_root() / digest[:2] / f"{digest}-{page_number:04d}-{tier}-r{RENDER_VERSION}.webp"
+
+
+def _render_pages(pdf_path: Path, page_numbers: list[int], width: int) -> dict[int, bytes]:
+    """WebP bytes of the given 1-based pages rendered `width` pixels wide."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    images: dict[int, bytes] = {}
+    with fitz.open(pdf_path) as doc:
+        for number in page_numbers:
+            page = doc.load_page(number - 1)
+            scale = width / max(float(page.rect.width), 1.0)
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+            out = io.BytesIO()
+            Image.frombytes("RGB", (pix.width, pix.height), pix.samples).save(
+                out, format="WEBP", quality=PREVIEW_WEBP_QUALITY, method=4
+            )
+            images[number] = out.getvalue()
+    return images
+
+
+# Striped locks so two requests for one image render it once.
+_RENDER_LOCKS = [threading.Lock() for _ in range(64)]
+_CACHE_LOCK = threading.Lock()
+_cache_bytes: int | None = None
+
+
+def _cache_entries() -> list[tuple[int, int, Path]]:
+    entries: list[tuple[int, int, Path]] = []
+    root = cache_root()
+    if not root.is_dir():
+        return entries
+    for pattern in ("*/*.webp", "sources/*.pdf"):
+        for path in root.glob(pattern):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+    return entries
+
+
+def _account(added: int) -> None:
+    """Track the cache size and evict least recently served images past the budget."""
+    global _cache_bytes
+    with _CACHE_LOCK:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, size, _ in _cache_entries())
+        else:
+            _cache_bytes += added
+        if _cache_bytes <= PREVIEW_CACHE_MAX_BYTES:
+            return
+        # Other processes write here too, so evict from a fresh scan, down to 90% of the budget.
+        entries = sorted(_cache_entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(PREVIEW_CACHE_MAX_BYTES * 0.9)
+        # Files written or served moments ago may be about to be read by a response.
+        recent = time.time_ns() - PREVIEW_EVICT_MIN_AGE_SECONDS * 1_000_000_000
+        evicted = 0
+        for mtime_ns, size, path in entries:
+            if total <= target or mtime_ns > recent:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        _cache_bytes = total
+    if evicted:
+        log.info("[preview_assets] cache_evicted files=%d cache_bytes=%d", evicted, total)
+
+
+def _store(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    _account(len(data))
+
+
+def source_pdf(document_id: str) -> Path | None:
+    """The local copy of an S3-stored PDF kept for rendering, if cached; refreshes its LRU age."""
+    path = cache_root() / "sources" / f"{document_id}.pdf"
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def store_source_pdf(document_id: str, data: bytes) -> Path:
+    """Cache a PDF fetched from S3 for rendering; it counts against PREVIEW_CACHE_MAX_BYTES."""
+    path = cache_root() / "sources" / f"{document_id}.pdf"
+    _store(path, data)
+    return path
+
+
+def _ensure_rendered(pdf_path: Path, digest: str, page_numbers: list[int], tier: str) -> bool:
+    """Render and cache any of the pages not cached yet; True when page_numbers[0] was rendered here."""
+    missing = [n for n in page_numbers if not _cached_path(digest, n, tier).is_file()]
+    if not missing:
+        return False
+    first_missed = missing[0] == page_numbers[0]
+    for number in missing:
+        lock = _RENDER_LOCKS[hash((digest, number, tier)) % len(_RENDER_LOCKS)]
+        with lock:
+            target = _cached_path(digest, number, tier)
+            if target.is_file():
+                continue
+            started = time.perf_counter()
+            data = _render_pages(pdf_path, [number], PREVIEW_TIERS[tier])[number]
+            PREVIEW_RENDER_SECONDS.observe(time.perf_counter() - started, tier=tier)
+            _store(target, data)
+    return first_missed
+
+
+def page_image(pdf_path: Path, page_number: int, tier: str) -> Path:
+    """Cached image of a 1-based page at `tier`, rendering it on first request."""
+    if tier not in PREVIEW_TIERS:
+        raise ValueError(f"Unknown preview size {tier!r}")
+    digest, page_count = pdf_info(pdf_path)
+    if not 1 <= page_number <= page_count:
+        raise PreviewPageNotFound(page_number)
+    rendered = _ensure_rendered(pdf_path, digest, [page_number], tier)
+    path = _cached_path(digest, page_number, tier)
+    if not rendered:
+        try:
+            # Mark as recently served for LRU eviction.
+            os.utime(path)
+        except FileNotFoundError:
+            _ensure_rendered(pdf_path, digest, [page_number], tier)
+    PREVIEW_PAGE_REQUESTS.inc(tier=tier, result="miss" if rendered else "hit")
+    return path
+
+
+def record_not_modified(tier: str) -> None:
+    PREVIEW_PAGE_REQUESTS.inc(tier=tier, result="not_modified")
+
+
+_PREFETCH_TASKS: set[asyncio.Task] = set()
+
+
+def _prefetch(pdf_path: Path, page_numbers: list[int], tier: str) -> None:
+    try:
+        digest, _ = pdf_info(pdf_path)
+        _ensure_rendered(pdf_path, digest, page_numbers, tier)
+    except Exception as exc:
+        log.warning("[preview_assets] prefetch_failed pdf=%s pages=%s error=%s", pdf_path, page_numbers, exc)
+
+
+def schedule_prefetch(pdf_path: Path, page_number: int, tier: str) -> None:
+    """Render the next PREVIEW_PREFETCH_PAGES pages in the background (from a running loop)."""
+    if not PREVIEW_PREFETCH_PAGES:
+        return
+    _, page_count = pdf_info(pdf_path)
+    following = list(range(page_number + 1, min(page_count, page_number + PREVIEW_PREFETCH_PAGES) + 1))
+    if not following:
+        return
+    task = asyncio.get_running_loop().create_task(asyncio.to_thread(_prefetch, pdf_path, following, tier))
+    _PREFETCH_TASKS.add(task)
+    task.add_done_callback(_PREFETCH_TASKS.discard)
@@ -3,58 +3,38 @@ import json
 import logging
 from typing import Any, Dict, List
 
-from psycopg import errors as pg_errors
+from psycopg import OperationalError
 
 from app.core.db import db_conn
 from app.core.llm import get_embedder, get_card_generator
 from app.core.embedding_cache import embed_texts_cached
+from app.core.job_notify import FLASHCARD_JOBS_CHANNEL, JobWakeup
+from app.core.job_progress import record_final, record_progress
+from app.core.llm_tracing import is_rate_limited_error, llm_call_site
+from app.core.migrations import ensure_job_runtime_schema, ensure_job_scheduling_schema
 from app.lib.flashcard_generation import pick_relevant_chunks, insert_flashcards
+from app.workers.runtime import WORKER_IO_SLOTS, JobQueue, JobRuntime, PostgresJobStore, RetryableJobError
 
-POLL_SECONDS = 2
 log = logging.getLogger("uvicorn.error")
 
 
-async def _fetch_and_claim_job() -> Dict[str, Any] | None:
-    async with db_conn() as (conn, cur):
-        await cur.execute(
-            """
-            UPDATE flashcard_jobs
-            SET status='running', started_at=now(), progress=5
-            WHERE id = (
-                SELECT id FROM flashcard_jobs
-                WHERE status='queued'
-                ORDER BY created_at
-                LIMIT 1
-                FOR UPDATE SKIP LOCKED
-            )
-            RETURNING id::text, user_id, deck_id, payload
-            """
-        )
-        row = await cur.fetchone()
-        if row:
-            await conn.commit()
-            cols = [d[0] for d in cur.description]
-            job = dict(zip(cols, row))
-            try:
-                await cur.execute(
-                    "SELECT correlation_id::text FROM flashcard_jobs WHERE id::text=%s",
-                    (job["id"],),
-                )
-                corr_row = await cur.fetchone()
-                job["correlation_id"] = corr_row[0] if corr_row else None
-            except pg_errors.UndefinedColumn:
-                job["correlation_id"] = None
-            return job
-    return None
+FLASHCARD_QUEUE = JobQueue(
+    name="flashcard",
+    table="flashcard_jobs",
+    returning="id::text, user_id, deck_id, payload, correlation_id::text",
+    claim_set=", progress=5",
+    requeue_set=", progress=0",
+)
 
 
 async def _update_progress(job_id: str, progress: int, correlation_id: str | None = None):
-    async with db_conn() as (conn, cur):
-        await cur.execute(
-            "UPDATE flashcard_jobs SET progress=%s WHERE id::text=%s",
-            (progress, job_id),
-        )
-        await conn.commit()
+    await record_progress(
+        "flashcard",
+        job_id,
+        {"status": "running", "progress": progress},
+        "UPDATE flashcard_jobs SET progress=%(progress)s WHERE id::text=%(job_id)s AND status='running'",
+        {"progress": progress, "job_id": job_id},
+    )
     log.info(
         "[flashcards] job progress job_id=%s correlation_id=%s progress=%d",
         job_id,
@@ -64,16 +44,19 @@ async def _update_progress(job_id: str, progress: int, correlation_id: str | Non
 
 
 async def _fail_job(job_id: str, error_message: str, correlation_id: str | None = None):
-    async with db_conn() as (conn, cur):
-        await cur.execute(
-            """
-            UPDATE flashcard_jobs
-            SET status='failed', error_message=%s, finished_at=now()
-            WHERE id::text=%s
-            """,
-            (error_message, job_id),
-        )
-        await conn.commit()
+    async def _write() -> None:
+        async with db_conn() as (conn, cur):
+            await cur.execute(
+                """
+                UPDATE flashcard_jobs
+                SET status='failed', error_message=%s, finished_at=now()
+                WHERE id::text=%s
+                """,
+                (error_message, job_id),
+            )
+            await conn.commit()
+
+    await record_final("flashcard", job_id, {"status": "failed", "error_message": error_message}, _write)
     log.error(
         "[flashcards] job failed job_id=%s correlation_id=%s error=%s",
         job_id,
@@ -84,19 +67,23 @@ async def _fail_job(job_id: str, error_message: str, correlation_id: str | None
 
 async def _complete_job(job_id: str, result: Dict[str, Any] | None = None, correlation_id: str | None = None):
     result = result or {}
-    async with db_conn() as (conn, cur):
-        await cur.execute(
-            """
-            UPDATE flashcard_jobs
-            SET status='completed',
-                progress=100,
-                finished_at=now(),
-                payload=COALESCE(payload, '{}'::jsonb) || %s::jsonb
-            WHERE id::text=%s
-            """,
-            (json.dumps(result), job_id),
-        )
-        await conn.commit()
+
+    async def _write() -> None:
+        async with db_conn() as (conn, cur):
+            await cur.execute(
+                """
+                UPDATE flashcard_jobs
+                SET status='completed',
+                    progress=100,
+                    finished_at=now(),
+                    payload=COALESCE(payload, '{}'::jsonb) || %s::jsonb
+                WHERE id::text=%s
+                """,
+                (json.dumps(result), job_id),
+            )
+            await conn.commit()
+
+    await record_final("flashcard", job_id, {"status": "completed", "progress": 100}, _write)
     log.info(
         "[flashcards] job completed job_id=%s correlation_id=%s",
         job_id,
@@ -187,34 +174,50 @@ async def _generate_cards_from_payload(payload: Dict[str, Any], user_id: str, co
     }
 
 
-async def run():
-    while True:
-        job = await _fetch_and_claim_job()
-        if not job:
-            await asyncio.sleep(POLL_SECONDS)
-            continue
-
-        job_id = job["id"]
-        correlation_id = job.get("correlation_id")
-        log.info(
-            "[flashcards] job claimed job_id=%s correlation_id=%s user_id=%s deck_id=%s",
-            job_id,
-            correlation_id,
-            job.get("user_id"),
-            job.get("deck_id"),
-        )
-        try:
-            payload = job.get("payload") or {}
-            if isinstance(payload, str):
-                payload = json.loads(payload)
-            if not payload.get("file_ids"):
-                raise RuntimeError("Job payload missing file_ids")
-
-            await _update_progress(job_id, 20, correlation_id)
+async def _process_job(job: Dict[str, Any]) -> None:
+    job_id = job["id"]
+    correlation_id = job.get("correlation_id")
+    log.info(
+        "[flashcards] job claimed job_id=%s correlation_id=%s user_id=%s deck_id=%s",
+        job_id,
+        correlation_id,
+        job.get("user_id"),
+        job.get("deck_id"),
+    )
+    try:
+        payload = job.get("payload") or {}
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        if not payload.get("file_ids"):
+            raise RuntimeError("Job payload missing file_ids")
+
+        await _update_progress(job_id, 20, correlation_id)
+        with llm_call_site("flashcard_generation"):
             result = await _generate_cards_from_payload(payload, job["user_id"], correlation_id)
-            await _complete_job(job_id, result, correlation_id)
-        except Exception as exc:
-            await _fail_job(job_id, str(exc), correlation_id)
+        await _complete_job(job_id, result, correlation_id)
+    except (RetryableJobError, OperationalError):
+        raise
+    except Exception as exc:
+        if is_rate_limited_error(exc) and int(job.get("attempts") or 1) < FLASHCARD_QUEUE.max_attempts:
+            raise RetryableJobError(str(exc)) from exc
+        await _fail_job(job_id, str(exc), correlation_id)
+
+
+async def _dead_letter_job(job: Dict[str, Any], error: str) -> None:
+    await _fail_job(job["id"], error, job.get("correlation_id"))
+
+
+async def run():
+    await ensure_job_runtime_schema()
+    await ensure_job_scheduling_schema()
+    await JobRuntime(
+        "flashcard_worker",
+        store=PostgresJobStore(FLASHCARD_QUEUE),
+        handle=_process_job,
+        wakeup=JobWakeup(FLASHCARD_JOBS_CHANNEL),
+        slots=WORKER_IO_SLOTS,
+        on_dead_letter=_dead_letter_job,
+    ).run()
 
 
 if __name__ == "__main__":
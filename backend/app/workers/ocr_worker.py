@@ -1,27 +1,61 @@
 import asyncio
+from dataclasses import replace
 import json
 import logging
+import os
+import shutil
+import threading
 import time
 from pathlib import Path, PurePosixPath
-from typing import Any
+from typing import Any, Awaitable, Callable
+
+from psycopg import OperationalError
 
-from app.core.cache import cache_set
 from app.core.db import db_conn
-from app.core.migrations import ensure_ocr_pipeline_schema
+from app.core.job_notify import OCR_JOBS_CHANNEL, JobWakeup
+from app.core.job_progress import progress_writer, publish_progress_async, record_final, record_progress
+from app.core.migrations import (
+    ensure_content_blobs_schema,
+    ensure_document_text_schema,
+    ensure_job_runtime_schema,
+    ensure_job_scheduling_schema,
+    ensure_ocr_checkpoint_schema,
+    ensure_ocr_pipeline_schema,
+    ensure_ocr_variant_stats_schema,
+    ensure_streaming_index_schema,
+)
 from app.core.settings import settings
-from app.core.storage import get_object_bytes, put_bytes
-from app.lib.indexing import build_deduped_chunks, persist_chunk_embeddings
+from app.core.storage import delete_prefix, get_object_bytes, put_bytes
+from app.lib.indexing import StreamingIndexer
+from app.services.content_blobs import collect_garbage
 from app.services.document_preview_state import generate_office_preview
-from app.services.document_ingestion import ExtractionInput, extract_document, result_json_bytes
+from app.services.document_ingestion import (
+    CHECKPOINT_DIR,
+    ExtractionInput,
+    detect_file_type,
+    result_json_bytes,
+    stream_document,
+    warm_up_ocr,
+)
+from app.services.document_text import content_hash, page_plain_text, store_page_texts
 from app.services.flashcards.source_builder import build_flashcard_source_pages
+from app.services.ocr.artifacts import GZIP_MAGIC, MINIMAL, SELECTED, encode_json_artifact
+from app.services.ocr.config import OCRConfig, load_ocr_config
+from app.services.ocr.schema import DocumentOCRResult, OCRPage
+from app.services.ocr.variant_stats import load_variant_order, record_variant_outcomes, tally_variant_outcomes
+from app.services.office_converter import warm_up_office_pool
 from app.lib.stored_document_paths import resolve_local_original_file
+from app.workers.runtime import WORKER_CPU_SLOTS, JobQueue, JobRuntime, PostgresJobStore, observe_stage_timings
 
-POLL_SECONDS = 2
-# Mark uploads stuck in non-terminal states as failed (even if worker died).
+STUCK_RECOVERY_INTERVAL_SECONDS = 30
+# Backstop for files whose job never finished (lost job row, hung conversion); dead worker
+# leases are handled by the job runtime within JOB_LEASE_SECONDS.
 _STUCK_PROCESSING_MINUTES = 45
 _JOB_PROCESSING_TIMEOUT = 1800.0  # seconds; full job guard (large PDFs / slow OCR)
+# Extracted pages waiting for the indexer; bounds memory when embedding falls behind OCR.
+OCR_STREAM_PAGE_BUFFER = max(1, int(os.getenv("OCR_STREAM_PAGE_BUFFER", "4")))
 log = logging.getLogger("uvicorn.error")
-_stuck_recovery_counter = 0
+_last_stuck_recovery = 0.0
 
 
 async def recover_stuck_documents() -> int:
@@ -49,33 +83,13 @@ async def recover_stuck_documents() -> int:
     return int(n)
 
 
-async def fetch_and_claim_job() -> dict[str, Any] | None:
-    async with db_conn() as (conn, cur):
-        await cur.execute(
-            """
-            UPDATE ocr_jobs
-            SET status='running', started_at=now()
-            WHERE id = (
-            SELECT id FROM ocr_jobs
-                WHERE status='queued'
-                   OR (
-                       status='running'
-                       AND finished_at IS NULL
-                       AND started_at < now() - interval '15 minutes'
-                   )
-                ORDER BY created_at
-                LIMIT 1
-                FOR UPDATE SKIP LOCKED
-            )
-            RETURNING id::text, file_id::text, output_text_key, output_json_key, engine
-            """
-        )
-        row = await cur.fetchone()
-        if row:
-            await conn.commit()
-            cols = [d[0] for d in cur.description]
-            return dict(zip(cols, row))
-    return None
+OCR_QUEUE = JobQueue(
+    name="ocr",
+    table="ocr_jobs",
+    returning="id::text, file_id::text, output_text_key, output_json_key, engine",
+    owner_column="owner_uid",
+    error_column="error",
+)
 
 
 async def get_file_info(file_id: str) -> dict[str, Any] | None:
@@ -132,13 +146,19 @@ def _read_file_bytes(info: dict[str, Any], *, file_id: str | None = None) -> byt
     return get_object_bytes(str(storage_key))
 
 
+def _local_path_for_key(key: str) -> Path:
+    return (Path(settings.upload_root) / PurePosixPath(key).as_posix()).resolve()
+
+
 def _write_bytes(key: str, data: bytes, content_type: str, storage_backend: str) -> str:
     if storage_backend.lower() == "local":
         path = _local_path_for_key(key)
         path.parent.mkdir(parents=True, exist_ok=True)
         path.write_bytes(data)
         return key
-    put_bytes(key, data, content_type)
+    # Compressed JSON artifacts keep their JSON content type; the encoding lets presigned
+    # downloads decompress transparently.
+    put_bytes(key, data, content_type, content_encoding="gzip" if data[:2] == GZIP_MAGIC else None)
     return key
 
 
@@ -150,7 +170,51 @@ def _make_artifact_writer(output_prefix: str, storage_backend: str):
     return writer
 
 
-async def update_file_status(file_id: str, status: str, error: str | None = None, indexed: bool = False):
+def _make_artifact_reader(output_prefix: str, storage_backend: str):
+    """Read back artifacts written by `_make_artifact_writer`; missing objects read as None."""
+
+    def reader(name: str) -> bytes | None:
+        key = f"{output_prefix.rstrip('/')}/{name.lstrip('/')}"
+        if storage_backend.lower() == "local":
+            path = _local_path_for_key(key)
+            return path.read_bytes() if path.exists() else None
+        try:
+            return get_object_bytes(key)
+        except Exception:
+            return None
+
+    return reader
+
+
+def _delete_checkpoints(output_prefix: str, storage_backend: str) -> None:
+    """Remove a finished job's page checkpoints; they only exist to resume an interrupted run."""
+    key = f"{output_prefix.rstrip('/')}/{CHECKPOINT_DIR}"
+    try:
+        if storage_backend.lower() == "local":
+            shutil.rmtree(_local_path_for_key(key), ignore_errors=True)
+        else:
+            delete_prefix(f"{key}/")
+    except Exception as exc:
+        log.warning("[ocr] checkpoint_cleanup_failed prefix=%s error=%s", key, exc)
+
+
+# Statuses that end an OCR job's run; these are written to Postgres immediately.
+_FINAL_FILE_STATUSES = {"INDEXED", "OCR_DONE", "OCR_READY", "OCR_NEEDS_REVIEW", "READY", "FAILED"}
+
+
+async def update_file_status(
+    file_id: str,
+    status: str,
+    error: str | None = None,
+    indexed: bool = False,
+    job_id: str | None = None,
+):
+    """Set the file's processing status.
+
+    With `job_id`, intermediate stages are published to the job's progress snapshot and
+    written through to `files` in coalesced batches (see app.core.job_progress); final
+    statuses are always written directly.
+    """
     progress = {
         "UPLOADED": 10,
         "PROCESSING": 20,
@@ -172,19 +236,29 @@ async def update_file_status(file_id: str, status: str, error: str | None = None
         "READY": 100,
         "FAILED": 100,
     }.get(status.upper(), 0)
-    async with db_conn() as (conn, cur):
-        await cur.execute(
-            """
-            UPDATE files
-            SET status=%s,
-                last_error=%s,
-                processing_progress=%s,
-                indexed_at=CASE WHEN %s THEN now() ELSE indexed_at END
-            WHERE id=%s
-            """,
-            (status, error, progress, indexed, str(file_id)),
-        )
-        await conn.commit()
+    sql = """
+        UPDATE files
+        SET status=%(status)s,
+            last_error=%(error)s,
+            processing_progress=%(progress)s,
+            indexed_at=CASE WHEN %(indexed)s THEN now() ELSE indexed_at END,
+            index_incomplete=CASE WHEN %(indexed)s THEN FALSE ELSE index_incomplete END
+        WHERE id=%(file_id)s
+    """
+    params = {"status": status, "error": error, "progress": progress, "indexed": indexed, "file_id": str(file_id)}
+    fields = {"status": status, "last_error": error or "", "processing_progress": progress}
+
+    async def _write() -> None:
+        async with db_conn() as (conn, cur):
+            await cur.execute(sql, params)
+            await conn.commit()
+
+    if job_id is None:
+        await _write()
+    elif indexed or status.upper() in _FINAL_FILE_STATUSES:
+        await record_final("ocr", job_id, fields, _write)
+    else:
+        await record_progress("ocr", job_id, fields, sql, params)
 
 
 def _page_lines(page) -> list[dict[str, object]]:
@@ -272,14 +346,23 @@ async def _store_handwritten_review_pages(file_id: str, info: dict[str, Any], re
         await conn.commit()
 
 
+async def _store_document_text(data: bytes, result: DocumentOCRResult) -> None:
+    """Keep the extracted pages for quiz generation and chunk previews (best effort)."""
+    try:
+        pages = [page_plain_text(page) for page in result.pages]
+        await store_page_texts(await asyncio.to_thread(content_hash, data), pages, result.method.value)
+    except Exception as exc:
+        log.warning("[ocr] document_text_store_failed error=%s", exc)
+
+
 async def _complete_job(
     job_id: str,
     method: str,
     normalized_key: str,
     markdown_key: str,
-    raw_key: str,
-    metrics_key: str,
-    correction_key: str,
+    raw_key: str | None,
+    metrics_key: str | None,
+    correction_key: str | None,
     timing_ms: dict[str, int] | None = None,
 ):
     async with db_conn() as (conn, cur):
@@ -314,8 +397,19 @@ async def _complete_job(
 
 async def _has_indexed_chunks(file_id: str) -> bool:
     async with db_conn() as (conn, cur):
+        # A watermark without indexed_at means a streaming run died part way, and index_incomplete
+        # marks a stopped run whose pages were kept searchable; both still need the rest of the pages.
         await cur.execute(
-            "SELECT 1 FROM file_chunks WHERE file_id=%s AND chunk_vector IS NOT NULL LIMIT 1",
+            """
+            SELECT 1
+            FROM file_chunks fc
+            JOIN files f ON f.id = fc.file_id
+            WHERE fc.file_id=%s
+              AND fc.chunk_vector IS NOT NULL
+              AND (f.indexed_at IS NOT NULL OR f.indexed_page_count IS NULL)
+              AND NOT f.index_incomplete
+            LIMIT 1
+            """,
             (str(file_id),),
         )
         return bool(await cur.fetchone())
@@ -346,7 +440,164 @@ async def _fail_job(job_id: str, file_id: str, error: str):
             (error, str(job_id)),
         )
         await conn.commit()
-    await update_file_status(file_id, "FAILED", error=error)
+    await _fail_file(file_id, error, job_id=job_id)
+
+
+async def _fail_file(file_id: str, error: str, job_id: str | None = None) -> None:
+    """Fail the file, unless the stopped run already indexed some pages.
+
+    Those pages stay searchable: the file is marked INDEXED with index_incomplete set, and
+    "Retry processing" resumes OCR from the page checkpoints instead of starting over.
+    """
+    if job_id is not None:
+        # A buffered stage update must not land on top of the final state.
+        await progress_writer.settle("ocr", job_id)
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            """
+            SELECT f.indexed_page_count, f.page_count
+            FROM files f
+            WHERE f.id=%s
+              AND f.indexed_page_count > 0
+              AND EXISTS (SELECT 1 FROM file_chunks fc WHERE fc.file_id = f.id)
+            """,
+            (str(file_id),),
+        )
+        row = await cur.fetchone()
+        if row:
+            through_page, page_count = int(row[0]), row[1]
+            pages = f"1–{through_page} of {page_count}" if page_count else f"1–{through_page}"
+            await cur.execute(
+                """
+                UPDATE files
+                SET status='INDEXED',
+                    last_error=%s,
+                    processing_progress=100,
+                    indexed_at=now(),
+                    index_incomplete=TRUE
+                WHERE id=%s
+                """,
+                (
+                    f"Only pages {pages} were indexed before processing stopped. "
+                    "Retry processing to finish the remaining pages.",
+                    str(file_id),
+                ),
+            )
+            await conn.commit()
+    if row:
+        if job_id is not None:
+            await publish_progress_async("ocr", job_id, {"status": "INDEXED", "processing_progress": 100})
+        log.warning(
+            "[ocr] partially indexed file_id=%s indexed_through_page=%d page_count=%s error=%s",
+            file_id,
+            int(row[0]),
+            row[1],
+            error,
+        )
+        return
+    await update_file_status(file_id, "FAILED", error=error, job_id=job_id)
+
+
+async def _set_index_watermark(
+    file_id: str,
+    through_page: int,
+    page_count: int | None,
+    job_id: str | None = None,
+) -> None:
+    # Written directly: _fail_file relies on it to keep a partial index searchable.
+    async with db_conn() as (conn, cur):
+        await cur.execute(
+            "UPDATE files SET indexed_page_count=%s, page_count=%s WHERE id=%s",
+            (through_page, page_count, str(file_id)),
+        )
+        await conn.commit()
+    if job_id is not None:
+        await publish_progress_async("ocr", job_id, {"indexed_page_count": through_page, "page_count": page_count})
+
+
+async def _stream_extraction(
+    payload: ExtractionInput,
+    cfg: OCRConfig,
+    artifact_writer,
+    *,
+    on_page_count: Callable[[int], None],
+    on_page: Callable[[OCRPage], Awaitable[None]] | None,
+    checkpoint_reader=None,
+) -> DocumentOCRResult:
+    """Run extraction in a thread and hand each page to `on_page` on the loop as soon as it is ready."""
+    loop = asyncio.get_running_loop()
+    pages: asyncio.Queue[OCRPage | None] = asyncio.Queue(maxsize=OCR_STREAM_PAGE_BUFFER)
+    stop = threading.Event()
+
+    def _produce() -> DocumentOCRResult:
+        stream = stream_document(
+            payload,
+            config=cfg,
+            artifact_writer=artifact_writer,
+            on_page_count=on_page_count,
+            checkpoint_reader=checkpoint_reader,
+        )
+        try:
+            while True:
+                if stop.is_set():
+                    raise RuntimeError("extraction cancelled")
+                try:
+                    page = next(stream)
+                except StopIteration as done:
+                    return done.value
+                asyncio.run_coroutine_threadsafe(pages.put(page), loop).result()
+        finally:
+            stream.close()
+            asyncio.run_coroutine_threadsafe(pages.put(None), loop)
+
+    producer = asyncio.ensure_future(asyncio.to_thread(_produce))
+    try:
+        while (page := await pages.get()) is not None:
+            if on_page is not None:
+                await on_page(page)
+        return await producer
+    except BaseException:
+        # Unblock the extraction thread (it may be waiting on a full queue) and let it wind down.
+        stop.set()
+        while not producer.done():
+            try:
+                await asyncio.wait_for(pages.get(), timeout=0.1)
+            except asyncio.TimeoutError:
+                pass
+        await asyncio.gather(producer, return_exceptions=True)
+        raise
+
+
+async def _load_variant_order(source_type: str) -> tuple[str, ...]:
+    try:
+        return await load_variant_order(source_type)
+    except Exception as exc:
+        log.warning("[ocr] variant_stats_load_failed source_type=%s err=%s", source_type, exc)
+        return ()
+
+
+async def _record_variant_outcomes(source_type: str, result: DocumentOCRResult) -> None:
+    try:
+        tallies = tally_variant_outcomes(result.pages, result.raw.get("engine_attempts") or [])
+        await record_variant_outcomes(source_type, tallies)
+    except Exception as exc:
+        log.warning("[ocr] variant_stats_record_failed source_type=%s err=%s", source_type, exc)
+
+
+def _observe_stages(timings: dict[str, int]) -> None:
+    preview_ms = [v for k, v in timings.items() if "preview" in k and k.endswith("_ms")]
+    observe_stage_timings(
+        "ocr",
+        {
+            "file_read": timings.get("file_read_ms"),
+            "text_extraction": timings.get("text_extraction_ms"),
+            "chunking": timings.get("chunking_only_ms"),
+            "embeddings_and_db": timings.get("embeddings_and_db_ms"),
+            "artifact_write": timings.get("artifact_write_ms"),
+            "review_page_write": timings.get("review_page_write_ms"),
+            "preview": sum(preview_ms) if preview_ms else None,
+        },
+    )
 
 
 async def process_job(job: dict[str, Any]):
@@ -361,7 +612,7 @@ async def process_job(job: dict[str, Any]):
         raise RuntimeError("File not found")
 
     if await _has_indexed_chunks(file_id):
-        await update_file_status(file_id, "INDEXED", indexed=True)
+        await update_file_status(file_id, "INDEXED", indexed=True, job_id=job_id)
         await _complete_job(job_id, "cached", "", "", "", "", "", {"cache_hit": 1})
         log.info("[ocr] skipped already indexed file_id=%s job_id=%s", file_id, job_id)
         return
@@ -370,7 +621,7 @@ async def process_job(job: dict[str, Any]):
     output_json_key = str(job["output_json_key"])
     output_text_key = str(job["output_text_key"])
     output_prefix = str(PurePosixPath(output_json_key).parent.parent)
-    data = _read_file_bytes(info, file_id=file_id)
+    data = await asyncio.to_thread(_read_file_bytes, info, file_id=file_id)
     timings["file_read_ms"] = int((time.perf_counter() - stage_started) * 1000)
     log.info(
         "[ocr] stage=file_read job_id=%s file_id=%s bytes=%d elapsed_ms=%d",
@@ -388,35 +639,87 @@ async def process_job(job: dict[str, Any]):
         storage_backend,
     )
     stage_started = time.perf_counter()
-    await update_file_status(file_id, "RUNNING_OCR" if is_handwritten_review else "EXTRACTING_TEXT")
-    result = extract_document(
-        ExtractionInput(
-            file_id=file_id,
-            filename=str(info.get("filename") or "upload"),
-            mime_type=info.get("mime_type"),
-            data=data,
-            output_prefix=output_prefix,
-        ),
-        artifact_writer=_make_artifact_writer(output_prefix, storage_backend),
-    )
-    timings["text_extraction_ms"] = int((time.perf_counter() - stage_started) * 1000)
-    log.info(
-        "[ocr] stage=text_extraction job_id=%s file_id=%s method=%s pages=%d elapsed_ms=%d",
-        job_id,
-        file_id,
-        result.method.value,
-        len(result.pages),
-        timings["text_extraction_ms"],
-    )
+    await update_file_status(file_id, "RUNNING_OCR" if is_handwritten_review else "EXTRACTING_TEXT", job_id=job_id)
+    source_type = detect_file_type(str(info.get("filename") or "upload"), info.get("mime_type"))
+    cfg = replace(load_ocr_config(), variant_order=await _load_variant_order(source_type))
+    if is_handwritten_review and cfg.artifact_policy == MINIMAL:
+        # The review UI shows the original page next to the recognised lines.
+        cfg = replace(cfg, artifact_policy=SELECTED)
+    page_count: dict[str, int] = {}
+
+    async def _on_indexed(through_page: int, chunk_count: int) -> None:
+        await _set_index_watermark(file_id, through_page, page_count.get("pages"), job_id=job_id)
+
+    # Handwritten uploads go to manual review first; everything else is indexed page by page as it is extracted.
+    indexer = None if is_handwritten_review else StreamingIndexer(file_id, on_progress=_on_indexed)
+    if indexer is not None:
+        await _set_index_watermark(file_id, 0, None, job_id=job_id)
+        await indexer.start()
+    try:
+        result = await _stream_extraction(
+            ExtractionInput(
+                file_id=file_id,
+                filename=str(info.get("filename") or "upload"),
+                mime_type=info.get("mime_type"),
+                data=data,
+                output_prefix=output_prefix,
+            ),
+            cfg,
+            _make_artifact_writer(output_prefix, storage_backend),
+            on_page_count=lambda n: page_count.__setitem__("pages", n),
+            on_page=(
+                (lambda page: indexer.add_page(page.page_number, build_flashcard_source_pages([page], cfg)[0]))
+                if indexer is not None
+                else None
+            ),
+            checkpoint_reader=_make_artifact_reader(output_prefix, storage_backend),
+        )
+        timings["text_extraction_ms"] = int((time.perf_counter() - stage_started) * 1000)
+        timings["resumed_pages"] = len(result.raw.get("resumed_pages") or [])
+        await _record_variant_outcomes(source_type, result)
+        log.info(
+            "[ocr] stage=text_extraction job_id=%s file_id=%s method=%s pages=%d resumed_pages=%d indexed_through_page=%d elapsed_ms=%d",
+            job_id,
+            file_id,
+            result.method.value,
+            len(result.pages),
+            timings["resumed_pages"],
+            indexer.indexed_through_page if indexer is not None else 0,
+            timings["text_extraction_ms"],
+        )
+
+        total = 0
+        if indexer is not None:
+            # Most chunks were embedded while extraction ran; only the last batches remain.
+            await update_file_status(file_id, "GENERATING_EMBEDDINGS", job_id=job_id)
+            stage_started = time.perf_counter()
+            total = await indexer.finish()
+            await _set_index_watermark(file_id, len(result.pages), len(result.pages), job_id=job_id)
+            timings["index_tail_ms"] = int((time.perf_counter() - stage_started) * 1000)
+            timings["chunking_only_ms"] = indexer.chunking_ms
+            timings["embeddings_and_db_ms"] = indexer.embed_and_db_ms
+            log.info(
+                "[ocr] stage=embeddings_and_db job_id=%s file_id=%s chunks=%d busy_ms=%d tail_ms=%d",
+                job_id,
+                file_id,
+                total,
+                timings["embeddings_and_db_ms"],
+                timings["index_tail_ms"],
+            )
+    except BaseException:
+        if indexer is not None:
+            await indexer.abort()
+        raise
 
     if is_handwritten_review:
-        await update_file_status(file_id, "PREPARING_REVIEW")
+        await update_file_status(file_id, "PREPARING_REVIEW", job_id=job_id)
 
     normalized_key = output_json_key
     markdown_key = output_text_key
-    raw_key = f"{output_prefix}/ocr/raw.json"
-    metrics_key = f"{output_prefix}/ocr/metrics.json"
-    correction_key = f"{output_prefix}/ocr/corrections.json"
+    keep_debug_json = cfg.artifact_policy != MINIMAL
+    raw_key = f"{output_prefix}/ocr/raw.json" if keep_debug_json else None
+    metrics_key = f"{output_prefix}/ocr/metrics.json" if keep_debug_json else None
+    correction_key = f"{output_prefix}/ocr/corrections.json" if keep_debug_json else None
 
     result.storage_manifest.update(
         {
@@ -429,38 +732,40 @@ async def process_job(job: dict[str, Any]):
     )
 
     stage_started = time.perf_counter()
-    _write_bytes(normalized_key, result_json_bytes(result), "application/json", storage_backend)
-    _write_bytes(markdown_key, result.markdown.encode("utf-8"), "text/markdown; charset=utf-8", storage_backend)
-    _write_bytes(
-        raw_key,
-        json.dumps(result.raw, ensure_ascii=False, indent=2).encode("utf-8"),
-        "application/json",
-        storage_backend,
-    )
-    _write_bytes(
-        metrics_key,
-        json.dumps(result.metrics, ensure_ascii=False, indent=2).encode("utf-8"),
-        "application/json",
-        storage_backend,
-    )
-    _write_bytes(
-        correction_key,
-        json.dumps(result.correction_log, ensure_ascii=False, indent=2).encode("utf-8"),
-        "application/json",
-        storage_backend,
+    writes = [
+        (normalized_key, result_json_bytes(result), "application/json"),
+        (markdown_key, result.markdown.encode("utf-8"), "text/markdown; charset=utf-8"),
+    ]
+    if keep_debug_json:
+        writes += [
+            (raw_key, encode_json_artifact(result.raw), "application/json"),
+            (metrics_key, encode_json_artifact(result.metrics), "application/json"),
+            (correction_key, encode_json_artifact(result.correction_log), "application/json"),
+        ]
+    # The artifacts are independent objects, so they are uploaded concurrently.
+    await asyncio.gather(
+        *(asyncio.to_thread(_write_bytes, key, payload, content_type, storage_backend) for key, payload, content_type in writes)
     )
     timings["artifact_write_ms"] = int((time.perf_counter() - stage_started) * 1000)
     log.info(
-        "[ocr] stage=artifact_write job_id=%s file_id=%s elapsed_ms=%d",
+        "[ocr] stage=artifact_write job_id=%s file_id=%s policy=%s objects=%d elapsed_ms=%d",
         job_id,
         file_id,
+        cfg.artifact_policy,
+        len(writes),
         timings["artifact_write_ms"],
     )
 
     if is_handwritten_review:
         stage_started = time.perf_counter()
-        await _store_handwritten_review_pages(file_id, info, result)
+        await record_final(
+            "ocr",
+            job_id,
+            {"status": "OCR_NEEDS_REVIEW", "processing_progress": 90, "last_error": ""},
+            lambda: _store_handwritten_review_pages(file_id, info, result),
+        )
         timings["review_page_write_ms"] = int((time.perf_counter() - stage_started) * 1000)
+        _observe_stages(timings)
         await _complete_job(
             job_id,
             f"{result.method.value}:needs_review",
@@ -471,6 +776,7 @@ async def process_job(job: dict[str, Any]):
             correction_key,
             timings,
         )
+        await asyncio.to_thread(_delete_checkpoints, output_prefix, storage_backend)
         log.info(
             "[ocr] handwritten review ready job_id=%s file_id=%s pages=%d confidence=%.3f elapsed_ms=%d",
             job_id,
@@ -481,46 +787,7 @@ async def process_job(job: dict[str, Any]):
         )
         return
 
-    stage_started = time.perf_counter()
-    page_texts = build_flashcard_source_pages(result.pages)
-    timings["chunk_source_build_ms"] = int((time.perf_counter() - stage_started) * 1000)
-    log.info(
-        "[ocr] stage=chunk_source_build job_id=%s file_id=%s pages=%d elapsed_ms=%d",
-        job_id,
-        file_id,
-        len(page_texts),
-        timings["chunk_source_build_ms"],
-    )
-
-    await update_file_status(file_id, "CHUNKING")
-    stage_started = time.perf_counter()
-    chunks = build_deduped_chunks(page_texts)
-    timings["chunking_only_ms"] = int((time.perf_counter() - stage_started) * 1000)
-    log.info(
-        "[ocr] stage=chunking_only job_id=%s file_id=%s chunk_candidates=%d elapsed_ms=%d",
-        job_id,
-        file_id,
-        len(chunks),
-        timings["chunking_only_ms"],
-    )
-
-    stage_started = time.perf_counter()
-    await update_file_status(file_id, "GENERATING_EMBEDDINGS")
-    total = await persist_chunk_embeddings(file_id, chunks) if chunks else 0
-    timings["embeddings_and_db_ms"] = int((time.perf_counter() - stage_started) * 1000)
-    log.info(
-        "[ocr] stage=embeddings_and_db job_id=%s file_id=%s chunks=%d elapsed_ms=%d",
-        job_id,
-        file_id,
-        total,
-        timings["embeddings_and_db_ms"],
-    )
-
-    cache_set(
-        f"filetext:{file_id}:{info['storage_key']}",
-        result.markdown.encode("utf-8"),
-        ttl_seconds=86400,
-    )
+    await _store_document_text(data, result)
     await _complete_job(
         job_id,
         result.method.value,
@@ -531,7 +798,8 @@ async def process_job(job: dict[str, Any]):
         correction_key,
         timings,
     )
-    await update_file_status(file_id, "INDEXED" if total > 0 else "OCR_DONE", indexed=total > 0)
+    await asyncio.to_thread(_delete_checkpoints, output_prefix, storage_backend)
+    await update_file_status(file_id, "INDEXED" if total > 0 else "OCR_DONE", indexed=total > 0, job_id=job_id)
 
     if _is_pptx(info) or _is_docx(info):
         pv_started = time.perf_counter()
@@ -572,9 +840,11 @@ async def process_job(job: dict[str, Any]):
             log.warning("[ocr] post_index office preview failed file_id=%s err=%s", file_id, exc)
 
     ext_ms = timings.get("text_extraction_ms", 0)
-    chunk_ms = timings.get("chunking_only_ms", 0) + timings.get("embeddings_and_db_ms", 0)
+    # Chunking/embedding overlap extraction now; only the tail after extraction adds wall time.
+    chunk_ms = timings.get("index_tail_ms", 0)
     pv_ms = sum(v for k, v in timings.items() if "preview" in k and k.endswith("_ms"))
     total_ms = int((time.perf_counter() - job_started) * 1000)
+    _observe_stages(timings)
     fname = str(info.get("filename") or "upload")
     log.info(
         "[ocr] summary filename=%r extraction_ms=%s chunking_embeddings_ms=%s preview_ms=%s total_ms=%s indexed_chunks=%d",
@@ -598,44 +868,76 @@ async def process_job(job: dict[str, Any]):
     )
 
 
-async def run():
-    global _stuck_recovery_counter
-    await ensure_ocr_pipeline_schema()
-    while True:
-        job = await fetch_and_claim_job()
-        if not job:
-            _stuck_recovery_counter += 1
-            if _stuck_recovery_counter >= 15:
-                _stuck_recovery_counter = 0
-                try:
-                    recovered = await recover_stuck_documents()
-                    if recovered:
-                        log.info("[ocr] stuck_document_recovery updated_rows=%d", recovered)
-                except Exception:
-                    log.exception("[ocr] stuck_document_recovery failed")
-            await asyncio.sleep(POLL_SECONDS)
-            continue
-        _stuck_recovery_counter = 0
+async def _process_claimed_job(job: dict[str, Any]) -> None:
+    try:
+        await asyncio.wait_for(process_job(job), timeout=_JOB_PROCESSING_TIMEOUT)
+    except asyncio.TimeoutError:
+        log.error(
+            "[ocr] job timed out after %ss job_id=%s file_id=%s",
+            int(_JOB_PROCESSING_TIMEOUT),
+            job.get("id"),
+            job.get("file_id"),
+        )
+        await _fail_job(
+            job["id"],
+            job["file_id"],
+            f"Processing exceeded the maximum time ({int(_JOB_PROCESSING_TIMEOUT // 60)} min). Retry to resume from the last finished page.",
+        )
+    except OperationalError:
+        # Database blip; the runtime retries the job with backoff.
+        raise
+    except Exception as exc:
+        log.exception("[ocr] job failed job_id=%s file_id=%s", job.get("id"), job.get("file_id"))
+        await _fail_job(job["id"], job["file_id"], str(exc))
+
+
+async def _dead_letter_job(job: dict[str, Any], error: str) -> None:
+    await _fail_file(job["file_id"], error, job_id=job["id"])
 
+
+async def _recover_stuck_when_due() -> bool:
+    global _last_stuck_recovery
+    if time.monotonic() - _last_stuck_recovery >= STUCK_RECOVERY_INTERVAL_SECONDS:
+        _last_stuck_recovery = time.monotonic()
         try:
-            await asyncio.wait_for(process_job(job), timeout=_JOB_PROCESSING_TIMEOUT)
-        except asyncio.TimeoutError:
-            log.error(
-                "[ocr] job timed out after %ss job_id=%s file_id=%s",
-                int(_JOB_PROCESSING_TIMEOUT),
-                job.get("id"),
-                job.get("file_id"),
-            )
-            await _fail_job(
-                job["id"],
-                job["file_id"],
-                f"Processing exceeded the maximum time ({int(_JOB_PROCESSING_TIMEOUT // 60)} min). Try a smaller file or retry.",
-            )
-        except Exception as exc:
-            log.exception("[ocr] job failed job_id=%s file_id=%s", job.get("id"), job.get("file_id"))
-            await _fail_job(job["id"], job["file_id"], str(exc))
-        await asyncio.sleep(0)
+            recovered = await recover_stuck_documents()
+            if recovered:
+                log.info("[ocr] stuck_document_recovery updated_rows=%d", recovered)
+        except Exception:
+            log.exception("[ocr] stuck_document_recovery failed")
+        try:
+            await collect_garbage()
+        except Exception:
+            log.exception("[ocr] blob_gc failed")
+    return False
+
 
+async def run():
+    global _last_stuck_recovery
+    await ensure_ocr_pipeline_schema()
+    await ensure_job_runtime_schema()
+    await ensure_job_scheduling_schema()
+    await ensure_streaming_index_schema()
+    await ensure_ocr_checkpoint_schema()
+    await ensure_ocr_variant_stats_schema()
+    await ensure_document_text_schema()
+    await ensure_content_blobs_schema()
+    try:
+        # Load OCR models (here and in the page pool) before claiming, not on the first page.
+        await asyncio.to_thread(warm_up_ocr)
+    except Exception:
+        log.exception("[ocr] engine_warm_up failed")
+    await asyncio.to_thread(warm_up_office_pool)
+    _last_stuck_recovery = time.monotonic()
+    await JobRuntime(
+        "ocr_worker",
+        store=PostgresJobStore(OCR_QUEUE),
+        handle=_process_claimed_job,
+        wakeup=JobWakeup(OCR_JOBS_CHANNEL, fallback_seconds=STUCK_RECOVERY_INTERVAL_SECONDS),
+        slots=WORKER_CPU_SLOTS,
+        on_idle=_recover_stuck_when_due,
+        on_dead_letter=_dead_letter_job,
+    ).run()
 
 if __name__ == "__main__":
     asyncio.run(run())
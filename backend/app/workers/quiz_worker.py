@@ -7,28 +7,64 @@ import os
 import random
 import re
 import time
-from collections import defaultdict
-from io import BytesIO
+from collections import Counter, defaultdict, deque
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 
-from pypdf import PdfReader
 
 from app.core.db import db_conn
+from app.core.job_notify import QUIZ_JOBS_CHANNEL, JobWakeup
+from app.core.job_progress import record_final, record_progress
 from app.core.llm import get_quiz_generator  # you will add this in step 3.2
+from app.core.llm_tracing import llm_call_site
 from app.core.settings import settings
 from app.core.storage import get_object_bytes
-from app.core.migrations import ensure_learning_analytics_schema, ensure_quiz_jobs_schema
+from app.core.migrations import (
+    ensure_document_text_schema,
+    ensure_job_runtime_schema,
+    ensure_job_scheduling_schema,
+    ensure_learning_analytics_schema,
+    ensure_quiz_jobs_schema,
+    ensure_quiz_question_bank_schema,
+)
 from app.lib.chunking import chunk_by_pages
+from app.lib.question_bank import (
+    BANK_THEORY_TYPES,
+    delete_bank_items,
+    fetch_bank_chunk_usage,
+    fetch_bank_counts,
+    fetch_bank_items,
+    find_files_needing_refill,
+    insert_bank_items,
+    mark_bank_items_served,
+    pick_refill_stratum,
+)
 from app.lib.quiz_counts import count_items_by_type, resolve_requested_counts, validate_quiz_counts
 from app.lib.tags import normalize_tag_names, sync_quiz_question_tags
 from app.lib.stored_document_paths import resolve_local_original_file
+from app.services.document_text import pdf_page_texts
+from app.workers.runtime import (
+    WORKER_IO_SLOTS,
+    JobQueue,
+    JobRuntime,
+    PostgresJobStore,
+    RetryableJobError,
+    observe_stage_timings,
+)
 
-POLL_SECONDS = 2
 QUIZ_GENERATION_RETRIES = max(1, int(os.environ.get("QUIZ_GENERATION_RETRIES", "2")))
 QUIZ_CHUNK_CACHE_TTL_SECONDS = max(30, int(os.environ.get("QUIZ_CHUNK_CACHE_TTL_SECONDS", "600")))
+QUIZ_BANK_ENABLED = os.environ.get("QUIZ_BANK_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+QUIZ_BANK_BATCH_SIZE = max(1, int(os.environ.get("QUIZ_BANK_BATCH_SIZE", "6")))
+QUIZ_BANK_LLM_CALLS_PER_HOUR = max(0, int(os.environ.get("QUIZ_BANK_LLM_CALLS_PER_HOUR", "30")))
+QUIZ_BANK_RATE_LIMIT_PAUSE_SECONDS = max(60, int(os.environ.get("QUIZ_BANK_RATE_LIMIT_PAUSE_SECONDS", "900")))
+QUIZ_BANK_MAX_EMPTY_BATCHES = 3
 log = logging.getLogger("uvicorn.error")
 _QUIZ_CHUNK_CACHE: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+_BANK_LLM_CALLS: Deque[float] = deque()
+# Keyed by (file_id, indexed_at) so a re-indexed file gets fresh attempts.
+_BANK_EMPTY_BATCHES: Dict[Tuple[str, Any], int] = defaultdict(int)
+_BANK_PAUSED_UNTIL = 0.0
 
 
 def _is_rate_limit_error_message(message: str) -> bool:
@@ -80,34 +116,15 @@ async def _ensure_quiz_count_columns(cur) -> None:
 
 
 # -------------------------
-# 1) Claim a queued quiz job
+# 1) Queue definition (claimed by app.workers.runtime)
 # -------------------------
-async def _fetch_and_claim_job() -> Optional[Dict[str, Any]]:
-    async with db_conn() as (conn, cur):
-        await _ensure_quiz_count_columns(cur)
-        await cur.execute(
-            """
-            UPDATE quiz_jobs
-            SET status='running', started_at=now(), progress=5
-            WHERE id = (
-                SELECT id FROM quiz_jobs
-                WHERE status='queued'
-                ORDER BY created_at
-                LIMIT 1
-                FOR UPDATE SKIP LOCKED
-            )
-            RETURNING id::text, user_id, class_id, file_id::text, payload,
-                      requested_mcq_count, requested_theory_count
-            """
-        )
-        row = await cur.fetchone()
-        if not row:
-            return None
-
-        await conn.commit()
-        cols = [d[0] for d in cur.description]
-        job = dict(zip(cols, row))
-        return job
+QUIZ_QUEUE = JobQueue(
+    name="quiz",
+    table="quiz_jobs",
+    returning="id::text, user_id, class_id, file_id::text, payload, requested_mcq_count, requested_theory_count",
+    claim_set=", progress=5",
+    requeue_set=", progress=0, status_message='Queued for generation'",
+)
 
 
 # -------------------------
@@ -300,27 +317,11 @@ def _filter_chunks_for_topic(chunks: List[Dict[str, Any]], topic: Optional[str])
     return focused or chunks
 
 
-def _extract_pdf_pages(data: bytes) -> List[str]:
-    reader = PdfReader(BytesIO(data))
-    if getattr(reader, "is_encrypted", False):
-        try:
-            reader.decrypt("")
-        except Exception:
-            pass
-    pages: List[str] = []
-    for page in reader.pages:
-        try:
-            pages.append(" ".join((page.extract_text() or "").split()))
-        except Exception:
-            pages.append("")
-    return pages
-
-
 async def _build_chunks_from_pdf_source(file_id: str) -> List[Dict[str, Any]]:
     async with db_conn() as (conn, cur):
         await cur.execute(
             """
-            SELECT filename, mime_type, storage_backend, storage_key, storage_url, class_id
+            SELECT filename, mime_type, storage_backend, storage_key, storage_url, class_id, content_hash
             FROM files
             WHERE id=%s
             """,
@@ -331,12 +332,12 @@ async def _build_chunks_from_pdf_source(file_id: str) -> List[Dict[str, Any]]:
     if not row:
         return []
 
-    filename, mime_type, storage_backend, storage_key, storage_url, class_id = row
+    filename, mime_type, storage_backend, storage_key, storage_url, class_id, digest = row
     is_pdf = str(filename or "").lower().endswith(".pdf") or "pdf" in str(mime_type or "").lower()
     if not is_pdf:
         return []
 
-    try:
+    def _load() -> bytes:
         backend = str(storage_backend or settings.storage_backend).lower()
         if backend == "local":
             path, _rel = resolve_local_original_file(
@@ -349,13 +350,15 @@ async def _build_chunks_from_pdf_source(file_id: str) -> List[Dict[str, Any]]:
                 context="quiz_worker",
             )
             if not path:
-                return []
-            data = path.read_bytes()
-        else:
-            if not storage_key:
-                return []
-            data = get_object_bytes(str(storage_key))
-        page_texts = _extract_pdf_pages(data)
+                raise FileNotFoundError(f"original file for {file_id} not found")
+            return path.read_bytes()
+        if not storage_key:
+            raise FileNotFoundError(f"file {file_id} has no storage key")
+        return get_object_bytes(str(storage_key))
+
+    try:
+        # Usually already stored by the OCR worker; otherwise extracted once here and stored.
+        page_texts = [" ".join(text.split()) for text in await pdf_page_texts(digest, _load)]
     except Exception as err:
         log.warning("[quiz_worker] on-demand PDF text extraction failed file_id=%s error=%s", file_id, err)
         return []
@@ -367,6 +370,7 @@ async def _build_chunks_from_pdf_source(file_id: str) -> List[Dict[str, Any]]:
     saved: List[Dict[str, Any]] = []
     async with db_conn() as (conn, cur):
         await cur.execute("DELETE FROM file_chunks WHERE file_id=%s", (file_id,))
+        await delete_bank_items(cur, file_id)
         for chunk in chunks:
             await cur.execute(
                 """
@@ -738,7 +742,8 @@ async def _generate_exact_batch(
             prompt[:800],
         )
         try:
-            result = await gen(prompt)
+            with llm_call_site("quiz_generation"):
+                result = await gen(prompt)
         except Exception as err:
             if _is_rate_limit_error_message(str(err)):
                 raise
@@ -902,6 +907,185 @@ async def _generate_quiz_items_exact(
 
     title = next((t for t in mcq_titles + theory_titles if t and t.strip()), "Quiz")
     return items, title, validation
+
+
+# -------------------------
+# Question bank (pre-generated per file)
+# -------------------------
+def _filter_items_for_topic(items: List[Dict[str, Any]], topic: Optional[str]) -> List[Dict[str, Any]]:
+    focus = (topic or "").strip().lower()
+    if not focus:
+        return items
+    terms = [term for term in re.split(r"[^a-z0-9]+", focus) if len(term) >= 3]
+    focused = []
+    for item in items:
+        content = " ".join(
+            str(item.get(field) or "") for field in ("topic", "question", "answer_key")
+        ).lower()
+        if focus in content or any(term in content for term in terms):
+            focused.append(item)
+    return focused
+
+
+def _bank_quiz_title(items: List[Dict[str, Any]]) -> str:
+    topics = Counter(
+        str(item.get("topic") or "").strip()
+        for item in items
+        if str(item.get("topic") or "").strip() and str(item.get("topic")).strip().lower() != "general"
+    )
+    if not topics:
+        return "Practice quiz"
+    return f"{topics.most_common(1)[0][0]} practice quiz"
+
+
+async def _draw_quiz_from_bank(
+    *,
+    file_id: str,
+    requested_mcq_count: int,
+    requested_theory_count: int,
+    theory_types: List[str],
+    difficulty: str,
+    topic_focus: str,
+    recent_fps: Set[str],
+    recent_questions: List[str],
+    rng: random.Random,
+) -> Optional[List[Dict[str, Any]]]:
+    """Assemble the quiz from banked questions the user has not seen recently, or None if the bank is short."""
+    if not QUIZ_BANK_ENABLED:
+        return None
+    types = (["mcq"] if requested_mcq_count > 0 else []) + (theory_types if requested_theory_count > 0 else [])
+    if not types:
+        return None
+
+    pool = await fetch_bank_items(file_id, difficulty, types)
+    pool = _filter_items_for_topic(pool, topic_focus)
+    pool = [item for item in pool if _question_fingerprint(item.get("question")) not in recent_fps]
+
+    used_fps: Set[str] = set()
+    picked_mcq = _pick_with_coverage(
+        [item for item in pool if item.get("type") == "mcq"],
+        requested_mcq_count,
+        recent_fps,
+        recent_questions[:120],
+        used_fps,
+        rng,
+    )
+    picked_theory = _pick_with_coverage(
+        [item for item in pool if item.get("type") != "mcq"],
+        requested_theory_count,
+        recent_fps,
+        recent_questions[:120],
+        used_fps,
+        rng,
+    )
+    if len(picked_mcq) < requested_mcq_count or len(picked_theory) < requested_theory_count:
+        log.info(
+            "[quiz_worker] question bank short file_id=%s difficulty=%s mcq=%s/%s theory=%s/%s",
+            file_id,
+            difficulty,
+            len(picked_mcq),
+            requested_mcq_count,
+            len(picked_theory),
+            requested_theory_count,
+        )
+        return None
+
+    return [_shuffle_mcq_options(dict(item), rng) for item in picked_mcq] + [dict(item) for item in picked_theory]
+
+
+async def _store_in_bank(file_id: str, class_id: int, items: List[Dict[str, Any]], origin: str) -> int:
+    rows = [
+        dict(item, fingerprint=_question_fingerprint(item.get("question")))
+        for item in items
+        if item.get("type") and item.get("question")
+    ]
+    return await insert_bank_items(file_id, class_id, rows, origin=origin)
+
+
+def _bank_budget_available(now: float) -> bool:
+    if now < _BANK_PAUSED_UNTIL:
+        return False
+    while _BANK_LLM_CALLS and now - _BANK_LLM_CALLS[0] > 3600:
+        _BANK_LLM_CALLS.popleft()
+    return len(_BANK_LLM_CALLS) < QUIZ_BANK_LLM_CALLS_PER_HOUR
+
+
+def _select_bank_context(
+    chunks: List[Dict[str, Any]],
+    usage: Dict[int, int],
+    size: int,
+    rng: random.Random,
+) -> List[Dict[str, Any]]:
+    # Least-used chunks first so successive refills spread across the document's topics.
+    ranked = sorted(chunks, key=lambda c: (usage.get(c.get("chunk_id"), 0), rng.random()))
+    selected = ranked[:size]
+    return sorted(selected, key=lambda c: (c.get("page_start") or 0, c.get("chunk_id") or 0))
+
+
+async def _refill_question_bank_once(gen) -> bool:
+    """Generate one stratified batch for the emptiest bank during idle time. Returns True if an LLM call was made."""
+    global _BANK_PAUSED_UNTIL
+    now = time.monotonic()
+    if not QUIZ_BANK_ENABLED or not _bank_budget_available(now):
+        return False
+
+    for file_id, class_id, indexed_at in await find_files_needing_refill(limit=5):
+        if _BANK_EMPTY_BATCHES[(file_id, indexed_at)] >= QUIZ_BANK_MAX_EMPTY_BATCHES:
+            continue
+        stratum = pick_refill_stratum(await fetch_bank_counts(file_id))
+        if stratum is None:
+            continue
+        chunks = await _fetch_chunks(file_id=file_id, limit=500)
+        if not chunks:
+            continue
+
+        group, difficulty = stratum
+        rng = random.Random(int.from_bytes(os.urandom(8), byteorder="big"))
+        usage = await fetch_bank_chunk_usage(file_id)
+        context = _select_bank_context(chunks, usage, min(len(chunks), 10), rng)
+        types = ["mcq"] if group == "mcq" else list(BANK_THEORY_TYPES)
+        prompt = _build_prompt(
+            context,
+            requested_count=QUIZ_BANK_BATCH_SIZE,
+            batch_label=group,
+            total_requested_mcq_count=QUIZ_BANK_BATCH_SIZE if group == "mcq" else 0,
+            total_requested_theory_count=QUIZ_BANK_BATCH_SIZE if group == "theory" else 0,
+            types=types,
+            difficulty=difficulty,
+            variation_nonce=f"bank-{group}-{difficulty}-{rng.randint(1000, 999999)}",
+        )
+
+        _BANK_LLM_CALLS.append(now)
+        started_at = time.perf_counter()
+        try:
+            with llm_call_site("quiz_bank_refill"):
+                result = await gen(prompt)
+        except Exception as err:
+            if _is_rate_limit_error_message(str(err)):
+                _BANK_PAUSED_UNTIL = now + QUIZ_BANK_RATE_LIMIT_PAUSE_SECONDS
+            log.warning("[quiz_worker] bank refill failed file_id=%s stratum=%s error=%s", file_id, stratum, err)
+            return True
+
+        sanitized = _sanitize_generated_items(result.get("items", []), allowed_types=types, difficulty=difficulty)
+        for item in sanitized:
+            item["difficulty"] = difficulty
+        inserted = await _store_in_bank(file_id, class_id, _dedupe_candidates(sanitized), origin="pregenerated")
+        key = (file_id, indexed_at)
+        _BANK_EMPTY_BATCHES[key] = 0 if inserted else _BANK_EMPTY_BATCHES[key] + 1
+        log.info(
+            "[quiz_worker] bank refill file_id=%s stratum=%s/%s inserted=%s elapsed_ms=%s",
+            file_id,
+            group,
+            difficulty,
+            inserted,
+            _timing_ms(started_at),
+        )
+        return True
+
+    return False
+
+
+# -------------------------
 # 3) Save quiz + questions
 # -------------------------
 async def _save_quiz(
@@ -1003,69 +1187,84 @@ async def _save_quiz(
 # -------------------------
 async def _set_job_failed(job_id: str, message: str, details: Optional[Dict[str, Any]] = None):
     details = details or {}
-    async with db_conn() as (conn, cur):
-        await _ensure_quiz_count_columns(cur)
-        await cur.execute(
-            """
-            UPDATE quiz_jobs
-            SET status='failed',
-                progress=100,
-                status_message=%s,
-                error_message=%s,
-                failure_reason=%s,
-                requested_mcq_count=COALESCE(%s, requested_mcq_count),
-                requested_theory_count=COALESCE(%s, requested_theory_count),
-                actual_mcq_count=%s,
-                actual_theory_count=%s,
-                timing_ms=COALESCE(%s::jsonb, timing_ms),
-                finished_at=now()
-            WHERE id=%s
-            """,
-            (
-                details.get("status_message", "Generation failed"),
-                message[:1000],
-                details.get("failure_reason"),
-                details.get("requested_mcq_count"),
-                details.get("requested_theory_count"),
-                details.get("actual_mcq_count"),
-                details.get("actual_theory_count"),
-                json.dumps(details.get("timing_ms")) if details.get("timing_ms") is not None else None,
-                job_id,
-            ),
-        )
-        await conn.commit()
+    status_message = details.get("status_message", "Generation failed")
+
+    async def _write() -> None:
+        async with db_conn() as (conn, cur):
+            await _ensure_quiz_count_columns(cur)
+            await cur.execute(
+                """
+                UPDATE quiz_jobs
+                SET status='failed',
+                    progress=100,
+                    status_message=%s,
+                    error_message=%s,
+                    failure_reason=%s,
+                    requested_mcq_count=COALESCE(%s, requested_mcq_count),
+                    requested_theory_count=COALESCE(%s, requested_theory_count),
+                    actual_mcq_count=%s,
+                    actual_theory_count=%s,
+                    timing_ms=COALESCE(%s::jsonb, timing_ms),
+                    finished_at=now()
+                WHERE id=%s
+                """,
+                (
+                    status_message,
+                    message[:1000],
+                    details.get("failure_reason"),
+                    details.get("requested_mcq_count"),
+                    details.get("requested_theory_count"),
+                    details.get("actual_mcq_count"),
+                    details.get("actual_theory_count"),
+                    json.dumps(details.get("timing_ms")) if details.get("timing_ms") is not None else None,
+                    job_id,
+                ),
+            )
+            await conn.commit()
+
+    await record_final(
+        "quiz",
+        job_id,
+        {"status": "failed", "progress": 100, "status_message": status_message, "error_message": message[:1000]},
+        _write,
+    )
 
 
 async def _set_job_completed(job_id: str, details: Dict[str, Any]):
-    async with db_conn() as (conn, cur):
-        await _ensure_quiz_count_columns(cur)
-        await cur.execute(
-            """
-            UPDATE quiz_jobs
-            SET status='completed',
-                progress=100,
-                status_message=%s,
-                error_message=NULL,
-                failure_reason=NULL,
-                requested_mcq_count=COALESCE(%s, requested_mcq_count),
-                requested_theory_count=COALESCE(%s, requested_theory_count),
-                actual_mcq_count=%s,
-                actual_theory_count=%s,
-                timing_ms=COALESCE(%s::jsonb, timing_ms),
-                finished_at=now()
-            WHERE id=%s
-            """,
-            (
-                details.get("status_message", "Quiz ready"),
-                details.get("requested_mcq_count"),
-                details.get("requested_theory_count"),
-                details.get("actual_mcq_count"),
-                details.get("actual_theory_count"),
-                json.dumps(details.get("timing_ms")) if details.get("timing_ms") is not None else None,
-                job_id,
-            ),
-        )
-        await conn.commit()
+    status_message = details.get("status_message", "Quiz ready")
+
+    async def _write() -> None:
+        async with db_conn() as (conn, cur):
+            await _ensure_quiz_count_columns(cur)
+            await cur.execute(
+                """
+                UPDATE quiz_jobs
+                SET status='completed',
+                    progress=100,
+                    status_message=%s,
+                    error_message=NULL,
+                    failure_reason=NULL,
+                    requested_mcq_count=COALESCE(%s, requested_mcq_count),
+                    requested_theory_count=COALESCE(%s, requested_theory_count),
+                    actual_mcq_count=%s,
+                    actual_theory_count=%s,
+                    timing_ms=COALESCE(%s::jsonb, timing_ms),
+                    finished_at=now()
+                WHERE id=%s
+                """,
+                (
+                    status_message,
+                    details.get("requested_mcq_count"),
+                    details.get("requested_theory_count"),
+                    details.get("actual_mcq_count"),
+                    details.get("actual_theory_count"),
+                    json.dumps(details.get("timing_ms")) if details.get("timing_ms") is not None else None,
+                    job_id,
+                ),
+            )
+            await conn.commit()
+
+    await record_final("quiz", job_id, {"status": "completed", "progress": 100, "status_message": status_message}, _write)
 
 
 async def _set_job_progress(
@@ -1075,24 +1274,24 @@ async def _set_job_progress(
     status_message: Optional[str] = None,
     timing_ms: Optional[Dict[str, int]] = None,
 ):
-    async with db_conn() as (conn, cur):
-        await _ensure_quiz_count_columns(cur)
-        await cur.execute(
-            """
-            UPDATE quiz_jobs
-            SET progress=%s,
-                status_message=COALESCE(%s, status_message),
-                timing_ms=COALESCE(%s::jsonb, timing_ms)
-            WHERE id=%s
-            """,
-            (
-                p,
-                status_message,
-                json.dumps(timing_ms) if timing_ms is not None else None,
-                job_id,
-            ),
-        )
-        await conn.commit()
+    await record_progress(
+        "quiz",
+        job_id,
+        {"status": "running", "progress": p, "status_message": status_message, "timing_ms": timing_ms},
+        """
+        UPDATE quiz_jobs
+        SET progress=%(progress)s,
+            status_message=COALESCE(%(status_message)s, status_message),
+            timing_ms=COALESCE(%(timing_ms)s::jsonb, timing_ms)
+        WHERE id=%(job_id)s AND status='running'
+        """,
+        {
+            "progress": p,
+            "status_message": status_message,
+            "timing_ms": json.dumps(timing_ms) if timing_ms is not None else None,
+            "job_id": job_id,
+        },
+    )
 
 
 def _timing_ms(started_at: float) -> int:
@@ -1102,82 +1301,98 @@ def _timing_ms(started_at: float) -> int:
 # -------------------------
 # 5) Main loop
 # -------------------------
-async def run():
-    log.info("[quiz_worker] running migrations before processing jobs")
-    await ensure_quiz_jobs_schema()
-    await ensure_learning_analytics_schema()
-    log.info("[quiz_worker] started")
-    gen = get_quiz_generator()
+async def _process_job(job: Dict[str, Any], gen) -> None:
+    job_id = job["id"]
+    user_id = job["user_id"]
+    class_id = job["class_id"]
+    file_id = job["file_id"]
+    payload = job["payload"] or {}
 
-    while True:
-        job = await _fetch_and_claim_job()
-        if not job:
-            await asyncio.sleep(POLL_SECONDS)
-            continue
+    try:
+        job_started_at = time.perf_counter()
+        timing_ms: Dict[str, int] = {}
+        settings = payload if isinstance(payload, dict) else json.loads(payload)
+        n_questions = int(settings.get("n_questions", 10))
+        mcq_count = settings.get("mcq_count")
+        if mcq_count is not None:
+            mcq_count = int(mcq_count)
+        types = settings.get("types", ["mcq", "conceptual"])
+        difficulty = settings.get("difficulty", "medium")
+        topic_focus = str(settings.get("topic") or "").strip()
+        requested_mcq_count, requested_theory_count = resolve_requested_counts(
+            n_questions=n_questions,
+            mcq_count=mcq_count,
+            types=types,
+        )
+        theory_types = [str(t).strip().lower() for t in types if str(t).strip().lower() != "mcq"]
 
-        job_id = job["id"]
-        user_id = job["user_id"]
-        class_id = job["class_id"]
-        file_id = job["file_id"]
-        payload = job["payload"] or {}
+        await _set_job_progress(job_id, 12, status_message="Loading document context")
 
-        try:
-            job_started_at = time.perf_counter()
-            timing_ms: Dict[str, int] = {}
-            settings = payload if isinstance(payload, dict) else json.loads(payload)
-            n_questions = int(settings.get("n_questions", 10))
-            mcq_count = settings.get("mcq_count")
-            if mcq_count is not None:
-                mcq_count = int(mcq_count)
-            types = settings.get("types", ["mcq", "conceptual"])
-            difficulty = settings.get("difficulty", "medium")
-            topic_focus = str(settings.get("topic") or "").strip()
-            requested_mcq_count, requested_theory_count = resolve_requested_counts(
-                n_questions=n_questions,
-                mcq_count=mcq_count,
-                types=types,
+        load_started_at = time.perf_counter()
+        all_chunks = await _fetch_chunks(file_id=file_id, limit=500)
+        all_chunks = _filter_chunks_for_topic(all_chunks, topic_focus)
+        if not all_chunks:
+            raise QuizSourceUnavailableError(
+                "This document does not have indexed text yet. Please wait for document processing to finish or choose another PDF."
             )
-            theory_types = [str(t).strip().lower() for t in types if str(t).strip().lower() != "mcq"]
+        timing_ms["load_chunks"] = _timing_ms(load_started_at)
+
+        rng = random.Random(int.from_bytes(os.urandom(16), byteorder="big"))
+        history_started_at = time.perf_counter()
+        recent_fps, recent_questions = await _fetch_recent_question_context(
+            user_id=user_id,
+            file_id=file_id,
+            recent_quizzes=12,
+        )
+        timing_ms["load_recent_questions"] = _timing_ms(history_started_at)
 
-            await _set_job_progress(job_id, 12, status_message="Loading document context")
+        await _set_job_progress(
+            job_id,
+            34,
+            status_message="Preparing question plan",
+            timing_ms=timing_ms,
+        )
 
-            load_started_at = time.perf_counter()
-            all_chunks = await _fetch_chunks(file_id=file_id, limit=500)
-            all_chunks = _filter_chunks_for_topic(all_chunks, topic_focus)
-            if not all_chunks:
-                raise QuizSourceUnavailableError(
-                    "This document does not have indexed text yet. Please wait for document processing to finish or choose another PDF."
+        if requested_theory_count > 0 and not theory_types:
+            raise QuizGenerationCountError(
+                _build_failure_details(
+                    requested_mcq_count=requested_mcq_count,
+                    requested_theory_count=requested_theory_count,
+                    actual_mcq_count=0,
+                    actual_theory_count=0,
+                    failure_reason="missing_allowed_theory_types",
                 )
-            timing_ms["load_chunks"] = _timing_ms(load_started_at)
+            )
 
-            rng = random.Random(int.from_bytes(os.urandom(16), byteorder="big"))
-            history_started_at = time.perf_counter()
-            recent_fps, recent_questions = await _fetch_recent_question_context(
-                user_id=user_id,
+        generation_started_at = time.perf_counter()
+        bank_items = None
+        try:
+            bank_items = await _draw_quiz_from_bank(
                 file_id=file_id,
-                recent_quizzes=12,
+                requested_mcq_count=requested_mcq_count,
+                requested_theory_count=requested_theory_count,
+                theory_types=theory_types,
+                difficulty=difficulty,
+                topic_focus=topic_focus,
+                recent_fps=recent_fps,
+                recent_questions=recent_questions,
+                rng=rng,
             )
-            timing_ms["load_recent_questions"] = _timing_ms(history_started_at)
+        except Exception as err:
+            log.warning("[quiz_worker] question bank lookup failed job=%s error=%s", job_id, err)
 
-            await _set_job_progress(
-                job_id,
-                34,
-                status_message="Preparing question plan",
-                timing_ms=timing_ms,
+        if bank_items is not None:
+            items = bank_items
+            title = _bank_quiz_title(items)
+            actual_mcq_count, actual_theory_count = count_items_by_type(items)
+            validation = validate_quiz_counts(
+                requested_mcq_count=requested_mcq_count,
+                requested_theory_count=requested_theory_count,
+                actual_mcq_count=actual_mcq_count,
+                actual_theory_count=actual_theory_count,
             )
-
-            if requested_theory_count > 0 and not theory_types:
-                raise QuizGenerationCountError(
-                    _build_failure_details(
-                        requested_mcq_count=requested_mcq_count,
-                        requested_theory_count=requested_theory_count,
-                        actual_mcq_count=0,
-                        actual_theory_count=0,
-                        failure_reason="missing_allowed_theory_types",
-                    )
-                )
-
-            generation_started_at = time.perf_counter()
+            timing_ms["question_bank"] = _timing_ms(generation_started_at)
+        else:
             await _set_job_progress(
                 job_id,
                 58,
@@ -1195,105 +1410,154 @@ async def run():
                 recent_questions=recent_questions,
                 rng=rng,
             )
-            if topic_focus:
-                for item in items:
-                    if not str(item.get("topic") or "").strip() or str(item.get("topic")).strip().lower() == "general":
-                        item["topic"] = topic_focus
-                title = f"{topic_focus} practice quiz"
-            timing_ms["generate_questions"] = _timing_ms(generation_started_at)
+            try:
+                await _store_in_bank(file_id, int(class_id), items, origin="live")
+            except Exception as err:
+                log.warning("[quiz_worker] storing live questions in bank failed job=%s error=%s", job_id, err)
+        if topic_focus:
+            for item in items:
+                if not str(item.get("topic") or "").strip() or str(item.get("topic")).strip().lower() == "general":
+                    item["topic"] = topic_focus
+            title = f"{topic_focus} practice quiz"
+        timing_ms["generate_questions"] = _timing_ms(generation_started_at)
+
+        await _set_job_progress(
+            job_id,
+            86,
+            status_message="Saving quiz",
+            timing_ms=timing_ms,
+        )
+        save_started_at = time.perf_counter()
+        quiz_id = await _save_quiz(
+            user_id=user_id,
+            class_id=class_id,
+            file_id=file_id,
+            title=title,
+            settings=settings,
+            items=items,
+            requested_mcq_count=requested_mcq_count,
+            requested_theory_count=requested_theory_count,
+            actual_mcq_count=validation["actual_mcq_count"],
+            actual_theory_count=validation["actual_theory_count"],
+        )
+        timing_ms["save_quiz"] = _timing_ms(save_started_at)
+        if bank_items is not None:
+            await mark_bank_items_served([item["bank_id"] for item in bank_items if item.get("bank_id")])
+        timing_ms["total"] = _timing_ms(job_started_at)
+
+        await _set_job_progress(
+            job_id,
+            96,
+            status_message="Finalizing quiz",
+            timing_ms=timing_ms,
+        )
+        validation["timing_ms"] = timing_ms
+        validation["status_message"] = "Quiz ready"
+        await _set_job_completed(job_id, validation)
+        observe_stage_timings("quiz", {stage: ms for stage, ms in timing_ms.items() if stage != "total"})
 
-            await _set_job_progress(
-                job_id,
-                86,
-                status_message="Saving quiz",
-                timing_ms=timing_ms,
-            )
-            save_started_at = time.perf_counter()
-            quiz_id = await _save_quiz(
-                user_id=user_id,
-                class_id=class_id,
-                file_id=file_id,
-                title=title,
-                settings=settings,
-                items=items,
-                requested_mcq_count=requested_mcq_count,
-                requested_theory_count=requested_theory_count,
-                actual_mcq_count=validation["actual_mcq_count"],
-                actual_theory_count=validation["actual_theory_count"],
-            )
-            timing_ms["save_quiz"] = _timing_ms(save_started_at)
-            timing_ms["total"] = _timing_ms(job_started_at)
+        log.info(
+            "[quiz_worker] completed job=%s quiz_id=%s requested_mcq=%s requested_theory=%s actual_mcq=%s actual_theory=%s timing_ms=%s",
+            job_id,
+            quiz_id,
+            requested_mcq_count,
+            requested_theory_count,
+            validation["actual_mcq_count"],
+            validation["actual_theory_count"],
+            timing_ms,
+        )
 
-            await _set_job_progress(
+    except Exception as e:
+        log.exception(f"[quiz_worker] failed job={job_id}: {e}")
+        err_text = str(e)
+        if _is_rate_limit_error_message(err_text):
+            retry_after = _extract_retry_after(err_text)
+            if int(job.get("attempts") or 1) < QUIZ_QUEUE.max_attempts:
+                # Provider limits are usually short-lived; let the runtime retry with backoff.
+                raise RetryableJobError(err_text) from e
+            detail = (
+                "Quiz generation is temporarily limited by the AI provider (rate limit or billing/quota)."
+                + (f" Please try again in about {retry_after}." if retry_after else " Please try again later.")
+            )
+            await _set_job_failed(
                 job_id,
-                96,
-                status_message="Finalizing quiz",
-                timing_ms=timing_ms,
+                detail,
+                {"status_message": "Generation failed", "timing_ms": timing_ms if "timing_ms" in locals() else None},
             )
-            validation["timing_ms"] = timing_ms
-            validation["status_message"] = "Quiz ready"
-            await _set_job_completed(job_id, validation)
-
-            log.info(
-                "[quiz_worker] completed job=%s quiz_id=%s requested_mcq=%s requested_theory=%s actual_mcq=%s actual_theory=%s timing_ms=%s",
+            return
+        if isinstance(e, QuizGenerationCountError):
+            details = e.details
+            details["status_message"] = "Generation failed"
+            if "timing_ms" in locals():
+                details["timing_ms"] = timing_ms
+            await _set_job_failed(
                 job_id,
-                quiz_id,
-                requested_mcq_count,
-                requested_theory_count,
-                validation["actual_mcq_count"],
-                validation["actual_theory_count"],
-                timing_ms,
+                (
+                    f"Quiz generation failed: {details.get('failure_reason')}. "
+                    f"Requested {details.get('requested_mcq_count', 0)} MCQs and "
+                    f"{details.get('requested_theory_count', 0)} theory questions, but got "
+                    f"{details.get('actual_mcq_count', 0)} MCQs and "
+                    f"{details.get('actual_theory_count', 0)} theory questions."
+                ),
+                details,
             )
-
-        except Exception as e:
-            log.exception(f"[quiz_worker] failed job={job_id}: {e}")
-            err_text = str(e)
-            if _is_rate_limit_error_message(err_text):
-                retry_after = _extract_retry_after(err_text)
-                detail = (
-                    "Quiz generation is temporarily limited by the AI provider (rate limit or billing/quota)."
-                    + (f" Please try again in about {retry_after}." if retry_after else " Please try again later.")
-                )
-                await _set_job_failed(
-                    job_id,
-                    detail,
-                    {"status_message": "Generation failed", "timing_ms": timing_ms if "timing_ms" in locals() else None},
-                )
-                continue
-            if isinstance(e, QuizGenerationCountError):
-                details = e.details
-                details["status_message"] = "Generation failed"
-                if "timing_ms" in locals():
-                    details["timing_ms"] = timing_ms
-                await _set_job_failed(
-                    job_id,
-                    (
-                        f"Quiz generation failed: {details.get('failure_reason')}. "
-                        f"Requested {details.get('requested_mcq_count', 0)} MCQs and "
-                        f"{details.get('requested_theory_count', 0)} theory questions, but got "
-                        f"{details.get('actual_mcq_count', 0)} MCQs and "
-                        f"{details.get('actual_theory_count', 0)} theory questions."
-                    ),
-                    details,
-                )
-                continue
-            if isinstance(e, QuizSourceUnavailableError):
-                await _set_job_failed(
-                    job_id,
-                    str(e),
-                    {
-                        "status_message": "Document not ready",
-                        "failure_reason": "source_document_not_indexed",
-                        "timing_ms": timing_ms if "timing_ms" in locals() else None,
-                    },
-                )
-                continue
+            return
+        if isinstance(e, QuizSourceUnavailableError):
             await _set_job_failed(
                 job_id,
-                "Something went wrong while generating quiz. Please try again.",
-                {"status_message": "Generation failed", "timing_ms": timing_ms if "timing_ms" in locals() else None},
+                str(e),
+                {
+                    "status_message": "Document not ready",
+                    "failure_reason": "source_document_not_indexed",
+                    "timing_ms": timing_ms if "timing_ms" in locals() else None,
+                },
             )
+            return
+        await _set_job_failed(
+            job_id,
+            "Something went wrong while generating quiz. Please try again.",
+            {"status_message": "Generation failed", "timing_ms": timing_ms if "timing_ms" in locals() else None},
+        )
+
+
+async def _dead_letter_job(job: Dict[str, Any], error: str) -> None:
+    await _set_job_failed(
+        job["id"],
+        "Something went wrong while generating quiz. Please try again.",
+        {"status_message": "Generation failed", "failure_reason": error[:500]},
+    )
+
+
+async def run():
+    log.info("[quiz_worker] running migrations before processing jobs")
+    await ensure_quiz_jobs_schema()
+    await ensure_learning_analytics_schema()
+    await ensure_quiz_question_bank_schema()
+    await ensure_job_runtime_schema()
+    await ensure_job_scheduling_schema()
+    await ensure_document_text_schema()
+    async with db_conn() as (conn, cur):
+        await _ensure_quiz_count_columns(cur)
+        await conn.commit()
+    log.info("[quiz_worker] started")
+    gen = get_quiz_generator()
 
+    async def _idle() -> bool:
+        try:
+            return await _refill_question_bank_once(gen)
+        except Exception as err:
+            log.warning("[quiz_worker] bank refill error: %s", err)
+            return False
+
+    await JobRuntime(
+        "quiz_worker",
+        store=PostgresJobStore(QUIZ_QUEUE),
+        handle=lambda job: _process_job(job, gen),
+        wakeup=JobWakeup(QUIZ_JOBS_CHANNEL),
+        slots=WORKER_IO_SLOTS,
+        on_idle=_idle,
+        on_dead_letter=_dead_letter_job,
+    ).run()
 
 if __name__ == "__main__":
     asyncio.run(run())
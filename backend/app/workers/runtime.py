@@ -0,0 +1,627 @@
+"""
+Shared job runtime for the worker processes.
+
+Each queue table (ocr_jobs, quiz_jobs, flashcard_jobs) is described by a
+`JobQueue` and driven through `PostgresJobStore`:
+
+- claims are batched and take a short lease (JOB_LEASE_SECONDS) that the
+  runtime renews from a heartbeat task while the job runs; a crashed worker's
+  jobs become claimable again once the lease lapses instead of after 15+ min;
+- a handler that raises `RetryableJobError` (or a transient DB error) is put
+  back with exponential backoff, up to JOB_MAX_ATTEMPTS attempts;
+- jobs that exhaust their attempts, or raise anything else, are dead-lettered:
+  status 'failed' with dead_lettered_at set, and the worker's
+  `on_dead_letter` hook writes the user-facing failure;
+- claims follow the fair, lane-aware order in app.core.job_scheduling rather
+  than plain FIFO, so one user's bulk upload doesn't hold up everyone else.
+
+A `JobRuntime` runs `slots` jobs concurrently in one process. A single
+claimer task keeps at most `slots + claim_ahead` jobs claimed at a time. On
+SIGTERM/SIGINT the claimer stops, buffered jobs are handed back to the queue,
+in-flight jobs get WORKER_DRAIN_SECONDS to finish, and buffered progress
+writes are flushed. `on_idle` work (cache
+refills, recovery sweeps) runs beside the claimer, so a job that arrives
+meanwhile is claimed right away instead of waiting for the idle pass.
+
+With WORKER_METRICS_PORT set, each worker serves its own metrics (slot
+utilization, job outcomes, run time and pipeline stage histograms, queue
+gauges) in Prometheus format at http://<worker>:<port>/metrics.
+"""
+import asyncio
+import logging
+import os
+import random
+import signal
+import socket
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import psycopg
+
+from app.core.db import db_conn
+from app.core.job_notify import JobWakeup
+from app.core.job_progress import progress_writer
+from app.core.job_scheduling import (
+    JOB_LANE_AGING_SECONDS,
+    claim_candidates_sql,
+    lane_wait_percentiles,
+    queue_stats,
+    record_queue_stats,
+)
+from app.core.metrics import Counter, Gauge, Histogram, serve_metrics
+
+log = logging.getLogger("uvicorn.error")
+
+Job = Dict[str, Any]
+
+# I/O-bound jobs (quiz, flashcards) mostly wait on the LLM; CPU-bound ones (OCR) on subprocesses/threads.
+WORKER_IO_SLOTS = max(1, int(os.getenv("WORKER_IO_SLOTS", "4")))
+WORKER_CPU_SLOTS = max(1, int(os.getenv("WORKER_CPU_SLOTS", "1")))
+WORKER_CLAIM_AHEAD = max(0, int(os.getenv("WORKER_CLAIM_AHEAD", "1")))
+WORKER_CLAIM_BATCH = max(1, int(os.getenv("WORKER_CLAIM_BATCH", "4")))
+# Stay under docker-compose's stop_grace_period (30s) so SIGKILL doesn't land mid-drain.
+WORKER_DRAIN_SECONDS = float(os.getenv("WORKER_DRAIN_SECONDS", "25"))
+# Port for the worker's own Prometheus /metrics endpoint; 0 disables it.
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_MAX_ATTEMPTS = max(1, int(os.getenv("JOB_MAX_ATTEMPTS", "3")))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "15"))
+JOB_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_MAX_SECONDS", "600"))
+# Rows claimed before leases existed have no lease_expires_at; keep the old 15 minute reclaim for them.
+_LEGACY_RUNNING_GRACE = "15 minutes"
+LEASE_EXPIRED_ERROR = "Worker stopped responding while processing this job."
+
+TRANSIENT_ERRORS: Tuple[type, ...] = (psycopg.OperationalError, psycopg.InterfaceError, ConnectionError)
+
+WORKER_SLOTS = Gauge("notescape_worker_slots", "Configured concurrent job slots.", ("worker",))
+WORKER_BUSY_SLOTS = Gauge("notescape_worker_busy_slots", "Job slots currently running a job.", ("worker",))
+WORKER_SLOT_UTILIZATION = Gauge(
+    "notescape_worker_slot_utilization", "Busy slots as a fraction of configured slots.", ("worker",)
+)
+WORKER_BUFFERED_JOBS = Gauge(
+    "notescape_worker_buffered_jobs", "Claimed jobs waiting for a free slot.", ("worker",)
+)
+JOB_OUTCOMES = Counter(
+    "notescape_jobs_total",
+    "Job attempts by outcome (processed, retried, dead_lettered, requeued, lease_lost, reaped).",
+    ("queue", "outcome"),
+)
+JOB_QUEUE_WAIT_SECONDS = Histogram(
+    "notescape_job_queue_wait_seconds",
+    "Time from enqueue to claim.",
+    ("queue", "lane"),
+    buckets=(0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+JOB_RUN_SECONDS = Histogram(
+    "notescape_job_run_seconds",
+    "Handler wall time per claimed job.",
+    ("queue",),
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1800),
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "notescape_pipeline_stage_seconds",
+    "Wall time per pipeline stage of a finished job.",
+    ("pipeline", "stage"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+
+
+def observe_stage_timings(pipeline: str, stage_ms: Dict[str, Optional[int]]) -> None:
+    """Record a finished job's per-stage durations (milliseconds; missing stages are skipped)."""
+    for stage, ms in stage_ms.items():
+        if ms is not None:
+            PIPELINE_STAGE_SECONDS.observe(max(0, ms) / 1000.0, pipeline=pipeline, stage=stage)
+
+
+class RetryableJobError(Exception):
+    """Raised by a job handler for transient failures (provider rate limits, outages)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_delay_seconds(attempts: int, retry_after: Optional[float] = None) -> float:
+    if retry_after is not None and retry_after > 0:
+        return min(JOB_RETRY_BACKOFF_MAX_SECONDS, float(retry_after))
+    base = JOB_RETRY_BACKOFF_SECONDS * (2 ** max(0, attempts - 1))
+    return min(JOB_RETRY_BACKOFF_MAX_SECONDS, base * random.uniform(0.8, 1.2))
+
+
+@dataclass(frozen=True)
+class JobQueue:
+    name: str
+    table: str
+    returning: str  # columns handed to the handler; attempts, lane and queue wait are appended
+    owner_column: str = "user_id"  # whose job it is, for fair share between users
+    error_column: str = "error_message"
+    claim_set: str = ""  # extra ", col=value" assignments when a job is claimed
+    requeue_set: str = ""  # extra ", col=value" assignments when a job goes back to 'queued'
+    max_attempts: int = JOB_MAX_ATTEMPTS
+    lease_seconds: float = JOB_LEASE_SECONDS
+
+
+class PostgresJobStore:
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+
+    @property
+    def name(self) -> str:
+        return self.queue.name
+
+    async def claim(self, worker_id: str, limit: int) -> List[Job]:
+        q = self.queue
+        async with db_conn() as (conn, cur):
+            await cur.execute(
+                f"""
+                UPDATE {q.table}
+                SET status='running',
+                    started_at=now(),
+                    attempts=attempts + 1,
+                    lease_owner=%s,
+                    lease_expires_at=now() + (%s * interval '1 second'),
+                    next_attempt_at=NULL{q.claim_set}
+                WHERE id IN ({claim_candidates_sql(q.table, q.owner_column)})
+                RETURNING {q.returning}, attempts, lane,
+                          EXTRACT(EPOCH FROM (now() - created_at))::float8 AS queue_wait_seconds
+                """,
+                (worker_id, q.lease_seconds, JOB_LANE_AGING_SECONDS, limit),
+            )
+            rows = await cur.fetchall()
+            cols = [d[0] for d in cur.description] if rows else []
+            await conn.commit()
+        return [dict(zip(cols, row)) for row in rows]
+
+    async def renew(self, worker_id: str, job_ids: List[str]) -> Set[str]:
+        """Extend leases; returns the ids this worker still holds."""
+        if not job_ids:
+            return set()
+        q = self.queue
+        async with db_conn() as (conn, cur):
+            await cur.execute(
+                f"""
+                UPDATE {q.table}
+                SET lease_expires_at=now() + (%s * interval '1 second')
+                WHERE id::text = ANY(%s) AND lease_owner=%s AND status='running'
+                RETURNING id::text
+                """,
+                (q.lease_seconds, job_ids, worker_id),
+            )
+            held = {row[0] for row in await cur.fetchall()}
+            await conn.commit()
+        return held
+
+    async def _requeue(self, job: Job, worker_id: str, *, delay: Optional[float], error: Optional[str], refund: bool) -> None:
+        q = self.queue
+        async with db_conn() as (conn, cur):
+            await cur.execute(
+                f"""
+                UPDATE {q.table}
+                SET status='queued',
+                    started_at=NULL,
+                    lease_owner=NULL,
+                    lease_expires_at=NULL,
+                    attempts=CASE WHEN %s THEN GREATEST(attempts - 1, 0) ELSE attempts END,
+                    next_attempt_at=CASE WHEN %s::float8 IS NULL THEN NULL
+                                         ELSE now() + (%s::float8 * interval '1 second') END,
+                    last_error=COALESCE(%s, last_error){q.requeue_set}
+                WHERE id::text=%s AND status='running' AND (lease_owner=%s OR lease_owner IS NULL)
+                """,
+                (refund, delay, delay, error, str(job["id"]), worker_id),
+            )
+            await conn.commit()
+
+    async def release(self, job: Job, worker_id: str) -> None:
+        """Hand a job back untouched (shutdown); the attempt is not counted."""
+        await self._requeue(job, worker_id, delay=None, error=None, refund=True)
+
+    async def retry_later(self, job: Job, worker_id: str, error: str, delay: float) -> None:
+        await self._requeue(job, worker_id, delay=delay, error=error[:2000], refund=False)
+
+    async def dead_letter(self, job: Job, error: str) -> None:
+        q = self.queue
+        async with db_conn() as (conn, cur):
+            await cur.execute(
+                f"""
+                UPDATE {q.table}
+                SET status='failed',
+                    finished_at=now(),
+                    dead_lettered_at=now(),
+                    lease_owner=NULL,
+                    lease_expires_at=NULL,
+                    last_error=%s,
+                    {q.error_column}=%s
+                WHERE id::text=%s AND status IN ('queued', 'running')
+                """,
+                (error[:2000], error[:2000], str(job["id"])),
+            )
+            await conn.commit()
+
+    async def reap_expired(self) -> Tuple[int, List[Job]]:
+        """Requeue jobs whose lease lapsed; dead-letter those out of attempts. Returns (requeued, dead)."""
+        q = self.queue
+        async with db_conn() as (conn, cur):
+            await cur.execute(
+                f"""
+                UPDATE {q.table}
+                SET status=CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                    dead_lettered_at=CASE WHEN attempts >= %s THEN now() END,
+                    finished_at=CASE WHEN attempts >= %s THEN now() END,
+                    next_attempt_at=CASE WHEN attempts >= %s THEN NULL
+                        ELSE now() + LEAST(%s, %s * power(2, GREATEST(attempts - 1, 0))) * interval '1 second' END,
+                    {q.error_column}=CASE WHEN attempts >= %s THEN %s ELSE {q.error_column} END,
+                    started_at=CASE WHEN attempts >= %s THEN started_at END,
+                    lease_owner=NULL,
+                    lease_expires_at=NULL,
+                    last_error=%s{q.requeue_set}
+                WHERE id IN (
+                    SELECT id FROM {q.table}
+                    WHERE status='running'
+                      AND COALESCE(lease_expires_at, started_at + interval '{_LEGACY_RUNNING_GRACE}') < now()
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {q.returning}, attempts, status
+                """,
+                (
+                    q.max_attempts,
+                    q.max_attempts,
+                    q.max_attempts,
+                    q.max_attempts,
+                    JOB_RETRY_BACKOFF_MAX_SECONDS,
+                    JOB_RETRY_BACKOFF_SECONDS,
+                    q.max_attempts,
+                    LEASE_EXPIRED_ERROR,
+                    q.max_attempts,
+                    "lease expired",
+                ),
+            )
+            rows = await cur.fetchall()
+            cols = [d[0] for d in cur.description] if rows else []
+            await conn.commit()
+        jobs = [dict(zip(cols, row)) for row in rows]
+        dead = [job for job in jobs if job.get("status") == "failed"]
+        return len(jobs) - len(dead), dead
+
+    async def stats(self) -> Dict[str, float]:
+        stats = await queue_stats(self.queue.table)
+        stats["lane_wait_seconds"] = await lane_wait_percentiles(self.queue.table)
+        return stats
+
+    async def heartbeat(self, worker_id: str, slots: int, busy: int) -> None:
+        async with db_conn() as (conn, cur):
+            await cur.execute(
+                """
+                INSERT INTO worker_heartbeats (worker_id, queue, hostname, pid, slots, busy_slots)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (worker_id) DO UPDATE
+                SET slots=EXCLUDED.slots, busy_slots=EXCLUDED.busy_slots, last_seen_at=now()
+                """,
+                (worker_id, self.queue.name, socket.gethostname(), os.getpid(), slots, busy),
+            )
+            await conn.commit()
+
+    async def forget_worker(self, worker_id: str) -> None:
+        async with db_conn() as (conn, cur):
+            await cur.execute("DELETE FROM worker_heartbeats WHERE worker_id=%s", (worker_id,))
+            await conn.commit()
+
+
+class JobRuntime:
+    def __init__(
+        self,
+        name: str,
+        *,
+        store: PostgresJobStore,
+        handle: Callable[[Job], Awaitable[None]],
+        wakeup: JobWakeup,
+        slots: int,
+        claim_ahead: int = WORKER_CLAIM_AHEAD,
+        claim_batch: int = WORKER_CLAIM_BATCH,
+        on_idle: Optional[Callable[[], Awaitable[bool]]] = None,
+        on_dead_letter: Optional[Callable[[Job, str], Awaitable[None]]] = None,
+        drain_seconds: float = WORKER_DRAIN_SECONDS,
+        heartbeat_seconds: float = JOB_HEARTBEAT_SECONDS,
+        metrics_port: int = WORKER_METRICS_PORT,
+    ):
+        self.name = name
+        self.store = store
+        self.handle = handle
+        self.wakeup = wakeup
+        self.slots = max(1, slots)
+        self.claim_ahead = max(0, claim_ahead)
+        self.claim_batch = max(1, claim_batch)
+        self.on_idle = on_idle
+        self.on_dead_letter = on_dead_letter
+        self.drain_seconds = drain_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.metrics_port = metrics_port
+        self.worker_id = f"{name}:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+        self._queue: "asyncio.Queue[Optional[Job]]" = asyncio.Queue()
+        self._capacity = asyncio.Semaphore(self.slots + self.claim_ahead)
+        self._in_flight: Dict[asyncio.Task, Job] = {}
+        self._lease_lost: Set[str] = set()
+        self._idle_task: Optional[asyncio.Task] = None
+
+    @property
+    def queue_name(self) -> str:
+        return self.store.name
+
+    def _record_busy_slots(self) -> None:
+        busy = len(self._in_flight)
+        WORKER_BUSY_SLOTS.set(busy, worker=self.name)
+        WORKER_SLOT_UTILIZATION.set(busy / self.slots, worker=self.name)
+
+    def stop(self) -> None:
+        if not self._stopping.is_set():
+            log.info("[%s] shutdown requested; draining in_flight=%d", self.name, len(self._in_flight))
+            self._stopping.set()
+
+    def _install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    def _remove_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.remove_signal_handler(sig)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    async def _until_stopped(self, aw: Awaitable[Any]) -> bool:
+        """Await `aw` unless shutdown starts first; True if `aw` completed."""
+        task = asyncio.ensure_future(aw)
+        stopper = asyncio.ensure_future(self._stopping.wait())
+        done, _ = await asyncio.wait({task, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        stopper.cancel()
+        if task in done:
+            task.result()
+            return True
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return False
+
+    # -- claiming ---------------------------------------------------------------
+
+    async def _claim_loop(self) -> None:
+        while not self._stopping.is_set():
+            if not await self._until_stopped(self._capacity.acquire()):
+                return
+            reserved = 1
+            while reserved < self.claim_batch and not self._capacity.locked():
+                await self._capacity.acquire()
+                reserved += 1
+            try:
+                jobs = await self.store.claim(self.worker_id, reserved)
+            except Exception:
+                log.exception("[%s] claim failed", self.name)
+                jobs = []
+            for _ in range(reserved - len(jobs)):
+                self._capacity.release()
+            if jobs:
+                for job in jobs:
+                    JOB_QUEUE_WAIT_SECONDS.observe(
+                        float(job.get("queue_wait_seconds") or 0.0),
+                        queue=self.queue_name,
+                        lane=job.get("lane") or "interactive",
+                    )
+                    self._queue.put_nowait(job)
+                WORKER_BUFFERED_JOBS.set(self._queue.qsize(), worker=self.name)
+                continue
+
+            if self.on_idle is not None and (self._idle_task is None or self._idle_task.done()):
+                self._idle_task = asyncio.ensure_future(self._run_idle())
+            await self._until_stopped(self.wakeup.wait())
+
+    async def _run_idle(self) -> None:
+        try:
+            if await self.on_idle():
+                # Idle work ran; have the claimer look for real jobs (and more idle work) again.
+                self.wakeup.wake()
+        except Exception:
+            log.exception("[%s] idle task failed", self.name)
+
+    # -- running ----------------------------------------------------------------
+
+    async def _slot_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            WORKER_BUFFERED_JOBS.set(self._queue.qsize(), worker=self.name)
+            if job is None:
+                return
+            job_id = str(job.get("id"))
+            if job_id in self._lease_lost:
+                self._lease_lost.discard(job_id)
+                self._capacity.release()
+                continue
+
+            started = loop.time()
+            task = asyncio.ensure_future(self.handle(job))
+            self._in_flight[task] = job
+            self._record_busy_slots()
+            try:
+                await task
+                JOB_OUTCOMES.inc(queue=self.queue_name, outcome="processed")
+            except asyncio.CancelledError:
+                if not (task.cancelled() and job_id in self._lease_lost):
+                    if not task.done():
+                        task.cancel()
+                    raise
+                self._lease_lost.discard(job_id)
+                JOB_OUTCOMES.inc(queue=self.queue_name, outcome="lease_lost")
+            except RetryableJobError as exc:
+                await self._retry_or_dead_letter(job, str(exc), exc.retry_after)
+            except TRANSIENT_ERRORS as exc:
+                await self._retry_or_dead_letter(job, f"{type(exc).__name__}: {exc}", None)
+            except Exception as exc:
+                log.exception("[%s] job handler crashed job_id=%s", self.name, job_id)
+                await self._dead_letter(job, str(exc) or type(exc).__name__)
+            finally:
+                JOB_RUN_SECONDS.observe(loop.time() - started, queue=self.queue_name)
+                self._in_flight.pop(task, None)
+                self._record_busy_slots()
+                self._capacity.release()
+
+    async def _retry_or_dead_letter(self, job: Job, error: str, retry_after: Optional[float]) -> None:
+        attempts = int(job.get("attempts") or 1)
+        if attempts >= self.store.queue.max_attempts:
+            await self._dead_letter(job, error)
+            return
+        delay = retry_delay_seconds(attempts, retry_after)
+        try:
+            await self.store.retry_later(job, self.worker_id, error, delay)
+            JOB_OUTCOMES.inc(queue=self.queue_name, outcome="retried")
+            log.warning(
+                "[%s] job retry scheduled job_id=%s attempt=%d delay_s=%.0f error=%s",
+                self.name,
+                job.get("id"),
+                attempts,
+                delay,
+                error[:300],
+            )
+        except Exception:
+            log.exception("[%s] scheduling retry failed job_id=%s", self.name, job.get("id"))
+
+    async def _dead_letter(self, job: Job, error: str, *, already_marked: bool = False) -> None:
+        try:
+            if not already_marked:
+                await self.store.dead_letter(job, error)
+            JOB_OUTCOMES.inc(queue=self.queue_name, outcome="dead_lettered")
+            log.error("[%s] job dead-lettered job_id=%s error=%s", self.name, job.get("id"), error[:300])
+            if self.on_dead_letter is not None:
+                await self.on_dead_letter(job, error)
+        except Exception:
+            log.exception("[%s] dead-lettering failed job_id=%s", self.name, job.get("id"))
+
+    async def _release(self, job: Job, reason: str) -> None:
+        try:
+            await self.store.release(job, self.worker_id)
+            JOB_OUTCOMES.inc(queue=self.queue_name, outcome="requeued")
+            log.info("[%s] requeued job_id=%s reason=%s", self.name, job.get("id"), reason)
+        except Exception:
+            log.exception("[%s] requeue failed job_id=%s", self.name, job.get("id"))
+
+    # -- heartbeat ----------------------------------------------------------------
+
+    def _held_job_ids(self) -> List[str]:
+        ids = [str(job.get("id")) for job in self._in_flight.values()]
+        ids.extend(str(job.get("id")) for job in list(self._queue._queue) if job is not None)  # type: ignore[attr-defined]
+        return ids
+
+    async def heartbeat_once(self) -> None:
+        held_ids = self._held_job_ids()
+        still_held = await self.store.renew(self.worker_id, held_ids)
+        for task, job in list(self._in_flight.items()):
+            job_id = str(job.get("id"))
+            if job_id not in still_held and not task.done():
+                log.warning("[%s] lease lost; abandoning job_id=%s", self.name, job_id)
+                self._lease_lost.add(job_id)
+                task.cancel()
+        for job_id in held_ids:
+            if job_id not in still_held:
+                self._lease_lost.add(job_id)
+
+        await self.store.heartbeat(self.worker_id, self.slots, len(self._in_flight))
+
+        requeued, dead = await self.store.reap_expired()
+        if requeued:
+            JOB_OUTCOMES.inc(requeued, queue=self.queue_name, outcome="reaped")
+            log.warning("[%s] requeued %d job(s) with expired leases", self.name, requeued)
+            self.wakeup.wake()
+        for job in dead:
+            await self._dead_letter(job, LEASE_EXPIRED_ERROR, already_marked=True)
+
+        record_queue_stats(self.queue_name, await self.store.stats())
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            try:
+                await self.heartbeat_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("[%s] heartbeat failed", self.name)
+            await asyncio.sleep(self.heartbeat_seconds)
+
+    # -- lifecycle ----------------------------------------------------------------
+
+    async def run(self) -> None:
+        self._install_signal_handlers()
+        self.wakeup.start()
+        WORKER_SLOTS.set(self.slots, worker=self.name)
+        self._record_busy_slots()
+        metrics_server = None
+        if self.metrics_port > 0:
+            try:
+                metrics_server = await serve_metrics(self.metrics_port)
+            except OSError as exc:
+                log.warning("[%s] metrics endpoint failed to start port=%d err=%s", self.name, self.metrics_port, exc)
+        log.info(
+            "[%s] runtime started worker_id=%s slots=%d claim_ahead=%d claim_batch=%d",
+            self.name,
+            self.worker_id,
+            self.slots,
+            self.claim_ahead,
+            self.claim_batch,
+        )
+        heartbeat = asyncio.create_task(self._heartbeat_loop())
+        slot_tasks = [asyncio.create_task(self._slot_loop()) for _ in range(self.slots)]
+        claimer = asyncio.create_task(self._claim_loop())
+
+        await self._stopping.wait()
+        await claimer
+        if self._idle_task is not None and not self._idle_task.done():
+            self._idle_task.cancel()
+            await asyncio.gather(self._idle_task, return_exceptions=True)
+
+        # Hand buffered (claimed but not started) jobs back, then let the slots finish what they run.
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            if job is not None:
+                await self._release(job, "shutdown")
+        for _ in slot_tasks:
+            self._queue.put_nowait(None)
+
+        _, pending = await asyncio.wait(slot_tasks, timeout=self.drain_seconds)
+        unfinished = list(self._in_flight.values()) if pending else []
+        if pending:
+            log.warning(
+                "[%s] drain timed out after %.0fs; requeueing %d job(s)",
+                self.name,
+                self.drain_seconds,
+                len(unfinished),
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        # Write coalesced progress before handing jobs back, so a requeued job's row is current.
+        flushed = await progress_writer.flush()
+        if flushed:
+            log.info("[%s] flushed buffered progress jobs=%d", self.name, flushed)
+        for job in unfinished:
+            await self._release(job, "drain_timeout")
+
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        try:
+            await self.store.forget_worker(self.worker_id)
+        except Exception:
+            log.exception("[%s] removing heartbeat row failed", self.name)
+        await self.wakeup.stop()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+        self._remove_signal_handlers()
+        log.info("[%s] runtime stopped", self.name)
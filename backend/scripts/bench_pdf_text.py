@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.lib.pdf_extractors import PDF_TEXT_EXTRACTORS, extract_pdf_text  # noqa: E402
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/bench_pdf_text.py file.pdf [file.pdf ...]", file=sys.stderr)
+        return 2
+
+    for arg in sys.argv[1:]:
+        path = Path(arg).expanduser().resolve()
+        data = path.read_bytes()
+        print(path.name)
+        for name in PDF_TEXT_EXTRACTORS:
+            started = time.perf_counter()
+            try:
+                result = extract_pdf_text(data, extractors=(name,), workers=1)
+            except Exception as exc:
+                print(f"  {name:<10} unavailable: {exc}")
+                continue
+            elapsed = time.perf_counter() - started
+            pages = len(result.pages) or 1
+            empty = sum(1 for used in result.page_extractors if used == "none")
+            chars = sum(len(text) for text in result.pages)
+            print(f"  {name:<10} {elapsed * 1000:8.0f} ms  {elapsed * 1000 / pages:6.1f} ms/page  chars={chars} empty_pages={empty}")
+        started = time.perf_counter()
+        result = extract_pdf_text(data)
+        print(
+            f"  {'selected':<10} {(time.perf_counter() - started) * 1000:8.0f} ms  "
+            f"workers={result.workers} pages_by_extractor={result.summary()['pages_by_extractor']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,419 @@
+"""
+Local stand-in for the Groq / OpenAI chat and embeddings APIs, for offline
+load and latency benchmarking.
+
+Point the app at it with the SDKs' own base-url variables, e.g.
+
+    python scripts/fake_llm_server.py --port 8089 --chat-latency lognormal:900,0.5 --rate-429 0.05
+    LLM_PROVIDER=groq GROQ_API_KEY=fake GROQ_BASE_URL=http://127.0.0.1:8089
+    EMBED_PROVIDER=openai OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+
+Responses are deterministic for a given --seed and prompt: quiz prompts get
+exactly the requested number of well-formed items, flashcard prompts get
+cards, grading prompts get a 0/1/2 mark and anything else gets a short
+answer. Latency is drawn from scripted distributions; a --script file lets
+a run move through phases (e.g. warm, then a burst of 429s, then slow).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+# ---------------------------------------------------------------------------
+# Latency distributions
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Latency:
+    """Milliseconds drawn from `fixed:MS`, `uniform:LO-HI`, `normal:MEAN,STD` or `lognormal:MEDIAN,SIGMA`."""
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, _, args = (spec or "fixed:0").partition(":")
+        kind = kind.strip().lower()
+        try:
+            if kind == "fixed":
+                return cls("fixed", float(args or 0))
+            if kind == "uniform":
+                lo, hi = args.split("-", 1)
+                return cls("uniform", float(lo), float(hi))
+            if kind in ("normal", "lognormal"):
+                first, second = args.split(",", 1)
+                return cls(kind, float(first), float(second))
+        except ValueError as exc:
+            raise ValueError(f"invalid latency spec: {spec!r}") from exc
+        raise ValueError(f"unknown latency distribution: {kind!r}")
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.a, self.b))
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(max(self.a, 1e-3)), self.b)
+        return self.a
+
+
+@dataclass
+class Phase:
+    requests: Optional[int] = None  # None = applies until the end of the run
+    chat_latency: Latency = field(default_factory=Latency)
+    embed_latency: Latency = field(default_factory=Latency)
+    ttft: Latency = field(default_factory=Latency)
+    token_interval_ms: float = 0.0
+    rate_429: float = 0.0
+    retry_after_seconds: float = 1.0
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "Phase":
+        return cls(
+            requests=raw.get("requests"),
+            chat_latency=Latency.parse(raw.get("chat_latency", "fixed:0")),
+            embed_latency=Latency.parse(raw.get("embed_latency", "fixed:0")),
+            ttft=Latency.parse(raw.get("ttft", "fixed:0")),
+            token_interval_ms=float(raw.get("token_interval_ms", 0.0)),
+            rate_429=float(raw.get("rate_429", 0.0)),
+            retry_after_seconds=float(raw.get("retry_after_seconds", 1.0)),
+        )
+
+
+class Script:
+    """Phases consumed in order by request count; the last phase sticks."""
+
+    def __init__(self, phases: List[Phase], seed: int):
+        self.phases = phases or [Phase()]
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._served = 0
+        self.stats: Dict[str, int] = {"chat": 0, "embeddings": 0, "rate_limited": 0, "streamed": 0}
+
+    def next_phase(self, kind: str) -> Phase:
+        with self._lock:
+            self._served += 1
+            self.stats[kind] += 1
+            remaining = self._served
+            for phase in self.phases:
+                if phase.requests is None or remaining <= phase.requests:
+                    return phase
+                remaining -= phase.requests
+            return self.phases[-1]
+
+    def draw(self, fn) -> Any:
+        with self._lock:
+            return fn(self.rng)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+
+# ---------------------------------------------------------------------------
+# Deterministic payloads
+# ---------------------------------------------------------------------------
+
+_QUIZ_COUNT_RE = re.compile(r"Generate EXACTLY (\d+) distinct (\w+) quiz items")
+_QUIZ_TYPES_RE = re.compile(r"ALLOWED QUESTION TYPES: \[([^\]]*)\]")
+_QUIZ_NON_MCQ_RE = re.compile(r"non-MCQ types only: \[([^\]]*)\]")
+_QUIZ_DIFFICULTY_RE = re.compile(r"DIFFICULTY: (\w+)")
+_QUIZ_CHUNK_RE = re.compile(r"\(chunk_id=(\d+), pages=(\d+)-(\d+)\)\n([^\n]*)")
+_CARD_COUNT_RE = re.compile(r"Make up to (\d+) high-yield flashcards")
+_GRADE_RE = re.compile(r"Grade \(0/1/2\)")
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z\-]{3,}")
+
+
+def _content_rng(seed: int, *parts: str) -> random.Random:
+    digest = hashlib.sha256("\x1f".join((str(seed),) + parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _quoted_list(raw: str) -> List[str]:
+    return [p.strip().strip("'\"") for p in raw.split(",") if p.strip()]
+
+
+def _terms(text: str, rng: random.Random, k: int = 3) -> List[str]:
+    words = list(dict.fromkeys(w.lower() for w in _WORD_RE.findall(text or "")))
+    if not words:
+        words = ["concept", "process", "structure", "principle", "method"]
+    return [rng.choice(words) for _ in range(k)]
+
+
+def quiz_payload(prompt: str, seed: int) -> Dict[str, Any]:
+    count_match = _QUIZ_COUNT_RE.search(prompt)
+    count = int(count_match.group(1)) if count_match else 5
+    label = count_match.group(2) if count_match else "mixed"
+    allowed = _quoted_list((_QUIZ_TYPES_RE.search(prompt) or [None, "mcq"])[1])
+    non_mcq = _quoted_list((_QUIZ_NON_MCQ_RE.search(prompt) or [None, ""])[1]) or [
+        t for t in allowed if t != "mcq"
+    ] or ["conceptual"]
+    difficulty = (_QUIZ_DIFFICULTY_RE.search(prompt) or [None, "medium"])[1]
+    chunks = [(int(c), int(ps), int(pe), text) for c, ps, pe, text in _QUIZ_CHUNK_RE.findall(prompt)]
+    if not chunks:
+        chunks = [(None, None, None, prompt[-600:])]
+
+    rng = _content_rng(seed, prompt)
+    items = []
+    for i in range(count):
+        chunk_id, page_start, page_end, text = chunks[i % len(chunks)]
+        a, b, c = _terms(text, rng)
+        tag = rng.randint(1000, 9999)
+        source = {"chunk_id": chunk_id, "page_start": page_start, "page_end": page_end}
+        if label == "mcq" or (label != "theory" and "mcq" in allowed and i % 2 == 0):
+            correct = rng.randrange(4)
+            options = [f"{a} relates to {b} ({tag}-{j})" for j in range(4)]
+            options[correct] = f"{a} determines {c} ({tag})"
+            items.append(
+                {
+                    "type": "mcq",
+                    "question": f"Q{i + 1}-{tag}: Which statement best describes how {a} affects {c}?",
+                    "options": options,
+                    "correct_index": correct,
+                    "answer_key": None,
+                    "explanation": f"The context links {a} with {c}.",
+                    "topic": a.title(),
+                    "tags": [a, c],
+                    "difficulty": difficulty,
+                    "source": source,
+                }
+            )
+        else:
+            items.append(
+                {
+                    "type": non_mcq[i % len(non_mcq)],
+                    "question": f"Q{i + 1}-{tag}: Explain the role of {a} in relation to {b}.",
+                    "options": None,
+                    "correct_index": None,
+                    "answer_key": f"{a.title()} shapes {b} through {c}.",
+                    "explanation": f"Derived from the discussion of {a}.",
+                    "topic": a.title(),
+                    "tags": [a, b],
+                    "difficulty": difficulty,
+                    "source": source,
+                }
+            )
+    return {"title": f"Practice quiz: {chunks[0][3][:40].strip() or 'document'}", "items": items}
+
+
+def cards_payload(prompt: str, seed: int) -> Dict[str, Any]:
+    count_match = _CARD_COUNT_RE.search(prompt)
+    count = int(count_match.group(1)) if count_match else 8
+    rng = _content_rng(seed, prompt)
+    cards = []
+    for i in range(count):
+        a, b, c = _terms(prompt, rng)
+        cards.append(
+            {
+                "front": f"What is the relationship between {a} and {b}? (#{i + 1})",
+                "back": f"{a.title()} influences {b} by way of {c}.",
+                "topic": a.title(),
+                "difficulty": rng.choice(["easy", "medium", "hard"]),
+                "source": None,
+                "tags": [a, b],
+            }
+        )
+    return {"cards": cards}
+
+
+def completion_text(system: str, user: str, seed: int) -> str:
+    if _GRADE_RE.search(user):
+        return str(_content_rng(seed, user).choice([0, 1, 2, 2]))
+    if _QUIZ_COUNT_RE.search(user) or '"items"' in user:
+        return json.dumps(quiz_payload(user, seed))
+    if _CARD_COUNT_RE.search(user) or '"cards"' in user:
+        return json.dumps(cards_payload(user, seed))
+    if "Reply with exactly: OK" in user:
+        return "OK"
+    rng = _content_rng(seed, system, user)
+    words = " ".join(_terms(user, rng, k=12))
+    return f"Based on the material, the key ideas are: {words}."
+
+
+def embedding_vector(text: str, dim: int, seed: int) -> List[float]:
+    rng = _content_rng(seed, "embed", text)
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text or "") // 4)
+
+
+# ---------------------------------------------------------------------------
+# HTTP app
+# ---------------------------------------------------------------------------
+
+def _rate_limited(phase: Phase, model: str) -> JSONResponse:
+    retry_after = phase.retry_after_seconds
+    return JSONResponse(
+        status_code=429,
+        headers={"retry-after": f"{retry_after:g}", "x-ratelimit-remaining-requests": "0"},
+        content={
+            "error": {
+                "message": f"Rate limit reached for model `{model}`. Please try again in {retry_after:g}s.",
+                "type": "tokens",
+                "code": "rate_limit_exceeded",
+            }
+        },
+    )
+
+
+def create_app(phases: List[Phase], *, seed: int = 0, embed_dim: int = 1536) -> FastAPI:
+    app = FastAPI(title="fake-llm")
+    script = Script(phases, seed)
+    app.state.script = script
+
+    async def _chat(request: Request):
+        body = await request.json()
+        model = body.get("model") or "fake-model"
+        messages = body.get("messages") or []
+        system = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+        user = "\n".join(m.get("content") or "" for m in messages if m.get("role") != "system")
+
+        phase = script.next_phase("chat")
+        if phase.rate_429 and script.draw(lambda r: r.random()) < phase.rate_429:
+            script.count("rate_limited")
+            return _rate_limited(phase, model)
+
+        text = completion_text(system, user, seed)
+        usage = {
+            "prompt_tokens": _approx_tokens(system + user),
+            "completion_tokens": _approx_tokens(text),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            script.count("streamed")
+            ttft_ms = script.draw(phase.ttft.sample_ms)
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+            def _chunk(delta: Dict[str, Any], finish: Optional[str] = None, **extra: Any) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                    **extra,
+                }
+                return f"data: {json.dumps(payload)}\n\n"
+
+            async def _events():
+                await asyncio.sleep(ttft_ms / 1000)
+                yield _chunk({"role": "assistant", "content": ""})
+                for piece in re.findall(r"\S+\s*", text):
+                    yield _chunk({"content": piece})
+                    if phase.token_interval_ms:
+                        await asyncio.sleep(phase.token_interval_ms / 1000)
+                yield _chunk({}, "stop", **({"usage": usage} if include_usage else {}))
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(_events(), media_type="text/event-stream")
+
+        await asyncio.sleep(script.draw(phase.chat_latency.sample_ms) / 1000)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+            ],
+            "usage": usage,
+        }
+
+    async def _embeddings(request: Request):
+        body = await request.json()
+        model = body.get("model") or "fake-embed"
+        inputs = body.get("input")
+        texts = [inputs] if isinstance(inputs, str) else list(inputs or [])
+        dim = int(body.get("dimensions") or embed_dim)
+
+        phase = script.next_phase("embeddings")
+        if phase.rate_429 and script.draw(lambda r: r.random()) < phase.rate_429:
+            script.count("rate_limited")
+            return _rate_limited(phase, model)
+
+        await asyncio.sleep(script.draw(phase.embed_latency.sample_ms) / 1000)
+        prompt_tokens = sum(_approx_tokens(t) for t in texts)
+        return {
+            "object": "list",
+            "model": model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": embedding_vector(t, dim, seed)}
+                for i, t in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+    # Groq's SDK appends /openai/v1/..., OpenAI/Together clients use {base_url}/... with /v1 in the base.
+    for prefix in ("/v1", "/openai/v1"):
+        app.add_api_route(f"{prefix}/chat/completions", _chat, methods=["POST"])
+        app.add_api_route(f"{prefix}/embeddings", _embeddings, methods=["POST"])
+
+    @app.get("/_fake/stats")
+    def stats():
+        return dict(script.stats)
+
+    return app
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fake Groq/OpenAI server for offline benchmarking")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embed-dim", type=int, default=1536)
+    parser.add_argument("--chat-latency", default="lognormal:800,0.4", help="non-streaming completion latency")
+    parser.add_argument("--embed-latency", default="uniform:20-80")
+    parser.add_argument("--ttft", default="lognormal:300,0.3", help="streaming time to first token")
+    parser.add_argument("--token-interval-ms", type=float, default=15.0)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="probability of a 429 per request")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--script", help="JSON file with a list of phases; overrides the flags above")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import uvicorn
+
+    args = _parse_args(argv)
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as fh:
+            phases = [Phase.from_dict(p) for p in json.load(fh)]
+    else:
+        phases = [
+            Phase(
+                chat_latency=Latency.parse(args.chat_latency),
+                embed_latency=Latency.parse(args.embed_latency),
+                ttft=Latency.parse(args.ttft),
+                token_interval_ms=args.token_interval_ms,
+                rate_429=args.rate_429,
+                retry_after_seconds=args.retry_after,
+            )
+        ]
+    uvicorn.run(create_app(phases, seed=args.seed, embed_dim=args.embed_dim), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
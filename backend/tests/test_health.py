@@ -6,3 +6,34 @@ client = TestClient(app)
 
 def test_health():
     assert client.get("/health").json() == {"status": "ok"}
+
+
+def test_metrics_requires_the_token_and_refreshes_queue_stats_at_most_once_per_ttl(monkeypatch):
+    import app.core.job_scheduling as job_scheduling
+    import app.routers.metrics as metrics_router
+
+    queries = []
+
+    async def fake_queue_stats(table):
+        queries.append(table)
+        return {}
+
+    async def fake_lane_waits(table):
+        return {}
+
+    monkeypatch.setattr(job_scheduling, "queue_stats", fake_queue_stats)
+    monkeypatch.setattr(job_scheduling, "lane_wait_percentiles", fake_lane_waits)
+    monkeypatch.setattr(job_scheduling, "record_queue_stats", lambda queue, stats: None)
+    monkeypatch.setattr(job_scheduling, "_queue_metrics_refreshed_at", None)
+
+    monkeypatch.setattr(metrics_router, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(metrics_router, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert queries == []
+
+    for _ in range(3):
+        assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+    assert sorted(queries) == sorted(job_scheduling.JOB_QUEUE_TABLES.values())
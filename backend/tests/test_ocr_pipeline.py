@@ -1,6 +1,10 @@
+import json
 from pathlib import Path
 
+import numpy as np
+
 from app.services.document_ingestion import ExtractionInput, _native_pdf_reliable, extract_document
+from app.services.ocr.artifacts import page_image_artifacts
 from app.services.ocr.config import OCRConfig
 from app.services.ocr.postprocess import postprocess_block
 from app.services.ocr.schema import OCRBlock
@@ -44,6 +48,30 @@ def test_postprocess_is_conservative_and_auditable():
     assert out.corrections[0].original == "bleck"
 
 
+def test_lexicon_index_matches_brute_force_and_is_shared_across_configs():
+    import itertools
+
+    from app.services.ocr.lexicon import edit_distance, lexicon_index
+
+    words = {"eigenvalue", "eigenvector", "matrix", "vector", "tensor", "derivative", "integral", "Laplace"}
+    index = lexicon_index(words, 2)
+    for token in ["eigenvalve", "vectr", "tenser", "matrx", "laplace", "intgral", "banana", "vecor", "ab"]:
+        brute = sorted((edit_distance(token, w.lower()), w.lower()) for w in words)
+        best = brute[0] if brute[0][0] <= 2 else None
+        found = index.lookup(token)
+        assert (found[1], found[0].lower()) == best if found else best is None
+
+    # Built once per lexicon: pages, blocks and configs with the same words share it.
+    assert lexicon_index(words, 2) is index
+    assert lexicon_index(set(words), 2) is index
+    assert lexicon_index(words, 1) is not index
+
+    large = {"".join(p) for p in itertools.product("abcdefghij", repeat=5)}
+    assert lexicon_index(large, 2).lookup("abcdx") == ("abcda", 1)
+    block = OCRBlock("text", None, "the vectr field", "the vectr field", 0.5, "test")
+    assert postprocess_block(block, OCRConfig(domain_lexicon=words)).normalized_text == "the vector field"
+
+
 def test_flashcard_source_filters_low_confidence_garbage_and_keeps_formula():
     cfg = OCRConfig(flashcard_min_block_confidence=0.58, flashcard_min_page_score=0.1)
     from app.services.ocr.schema import OCRPage, PageMetrics
@@ -70,10 +98,10 @@ def test_image_document_routes_handwriting_filename_without_model(monkeypatch, t
     image_path = tmp_path / "handwritten.png"
     Image.new("RGB", (80, 40), "white").save(image_path)
 
-    def fake_variants(path: Path, output_dir: Path):
+    def fake_variants(image, order=()):
         from app.services.image_enhancement import EnhancementVariant
 
-        return [EnhancementVariant("original", path, {"strategy": "test"})]
+        return [EnhancementVariant("original", image, {"strategy": "test"})]
 
     class FakePrinted:
         name = "fake"
@@ -91,7 +119,7 @@ def test_image_document_routes_handwriting_filename_without_model(monkeypatch, t
                 )
             ]
 
-    monkeypatch.setattr("app.services.document_ingestion.build_enhancement_variants", fake_variants)
+    monkeypatch.setattr("app.services.document_ingestion.iter_enhancement_variants", fake_variants)
     monkeypatch.setattr("app.services.document_ingestion._select_printed_engine", lambda cfg: FakePrinted())
     result = extract_document(
         ExtractionInput(
@@ -113,10 +141,10 @@ def test_formula_region_preserves_latex_from_text_hint(monkeypatch, tmp_path):
     image_path = tmp_path / "formula.png"
     Image.new("RGB", (80, 40), "white").save(image_path)
 
-    def fake_variants(path: Path, output_dir: Path):
+    def fake_variants(image, order=()):
         from app.services.image_enhancement import EnhancementVariant
 
-        return [EnhancementVariant("original", path, {"strategy": "test"})]
+        return [EnhancementVariant("original", image, {"strategy": "test"})]
 
     class FakePrinted:
         name = "fake"
@@ -124,7 +152,7 @@ def test_formula_region_preserves_latex_from_text_hint(monkeypatch, tmp_path):
         def extract(self, image_path: Path):
             return [OCRBlock("text", None, "Newton law: F = m a", "Newton law: F = m a", 0.88, "fake")]
 
-    monkeypatch.setattr("app.services.document_ingestion.build_enhancement_variants", fake_variants)
+    monkeypatch.setattr("app.services.document_ingestion.iter_enhancement_variants", fake_variants)
     monkeypatch.setattr("app.services.document_ingestion._select_printed_engine", lambda cfg: FakePrinted())
     result = extract_document(
         ExtractionInput(
@@ -137,3 +165,401 @@ def test_formula_region_preserves_latex_from_text_hint(monkeypatch, tmp_path):
     )
     assert result.pages[0].page_type in {"mixed_page", "formula_heavy_page"}
     assert "$F = m a$" in result.markdown
+
+
+def test_parallel_page_ocr_keeps_page_order_and_bounds_in_flight_pages(monkeypatch, tmp_path):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import document_ingestion
+    from app.services.ocr.schema import OCRPage
+
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fake_recognize(page_number, image, filename, config):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        # Earlier pages finish last, so completion order differs from page order.
+        time.sleep(0.01 * (7 - page_number))
+        with lock:
+            state["active"] -= 1
+        page = OCRPage(page_number=page_number, page_type="printed_page", blocks=[])
+        return document_ingestion._PageRecognition(
+            page=page,
+            attempts=[{"engine": "fake", "variant": "original", "elapsed_ms": 1}],
+            artifacts=[("original.png", b"png", "image/png")],
+            elapsed_ms=5,
+            worker_pid=0,
+        )
+
+    pool = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(document_ingestion, "_get_page_pool", lambda workers: pool)
+    monkeypatch.setattr(document_ingestion, "_recognize_page", fake_recognize)
+    images = [(n, np.zeros((4, 4, 3), dtype=np.uint8)) for n in range(1, 7)]
+
+    cfg = OCRConfig(page_workers=4, max_inflight_pages=3, inflight_page_memory_mb=0)
+    pages, attempts, parallelism = document_ingestion._ocr_pages(iter(images), "scan.pdf", cfg, lambda name, data, ct: name)
+    pool.shutdown()
+
+    assert [page.page_number for page in pages] == [1, 2, 3, 4, 5, 6]
+    assert pages[0].original_image_key == "pages/page-0001/original.png"
+    assert state["peak"] <= 3
+    assert parallelism["peak_inflight_pages"] == 3
+    totals = [a for a in attempts if a["engine"] == "page_total"]
+    assert [a["page"] for a in totals] == [1, 2, 3, 4, 5, 6]
+    assert all(a["elapsed_ms"] == 5 for a in totals)
+
+
+def test_page_ocr_survives_another_job_shutting_down_the_shared_pool(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import document_ingestion
+    from app.services.ocr.schema import OCRPage
+
+    first, replacement = ThreadPoolExecutor(max_workers=1), ThreadPoolExecutor(max_workers=2)
+    pool_fetches = []
+    recognized = []
+
+    def fake_get_pool(workers):
+        pool_fetches.append(workers)
+        return first if len(pool_fetches) == 1 else replacement
+
+    def fake_recognize(page_number, image, filename, config):
+        if page_number == 2:
+            # What another job's _reset_page_pool does after its worker crashed.
+            first.shutdown(wait=False, cancel_futures=True)
+        recognized.append(page_number)
+        page = OCRPage(page_number=page_number, page_type="printed_page", blocks=[])
+        return document_ingestion._PageRecognition(page=page, attempts=[], artifacts=[], elapsed_ms=1, worker_pid=0)
+
+    monkeypatch.setattr(document_ingestion, "_get_page_pool", fake_get_pool)
+    monkeypatch.setattr(document_ingestion, "_recognize_page", fake_recognize)
+    images = [(n, np.zeros((4, 4, 3), dtype=np.uint8)) for n in range(1, 6)]
+
+    cfg = OCRConfig(page_workers=2, max_inflight_pages=2, inflight_page_memory_mb=0)
+    pages, _attempts, _parallelism = document_ingestion._ocr_pages(iter(images), "scan.pdf", cfg, lambda name, data, ct: name)
+    replacement.shutdown()
+
+    assert [page.page_number for page in pages] == [1, 2, 3, 4, 5]
+    assert sorted(set(recognized)) == [1, 2, 3, 4, 5]
+    assert len(pool_fetches) == 2
+
+
+
+def test_retried_ocr_resumes_from_page_checkpoints(monkeypatch):
+    import pytest
+
+    from app.lib.pdf_extractors import PdfText
+    from app.services import document_ingestion
+    from app.services.ocr.schema import BoundingBox, Correction, OCRPage
+
+    store: dict[str, bytes] = {}
+    recognized: list[int] = []
+    rasterized: list[list[int] | None] = []
+    fail_on = {3}
+
+    def writer(name, data, content_type):
+        store[name] = data
+        return name
+
+    def fake_rasterize(pdf_path, out_dir, dpi, page_numbers=None):
+        rasterized.append(page_numbers)
+        for n in page_numbers or [1, 2, 3, 4]:
+            yield n, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def fake_recognize(page_number, image, filename, config):
+        if page_number in fail_on:
+            raise TimeoutError("worker stopped")
+        recognized.append(page_number)
+        block = OCRBlock(
+            "text",
+            BoundingBox(0, 0, 10, 5),
+            f"page {page_number} vectr",
+            f"page {page_number} vector",
+            0.91,
+            "fake",
+            corrections=[Correction("vectr", "vector", "dictionary", 0.8)],
+        )
+        page = OCRPage(page_number=page_number, page_type="printed_text_page", blocks=[block])
+        return document_ingestion._PageRecognition(
+            page=page, attempts=[], artifacts=[], elapsed_ms=1, worker_pid=0
+        )
+
+    monkeypatch.setattr(document_ingestion, "_native_pdf_text", lambda data: PdfText(pages=["", "", "", ""]))
+    monkeypatch.setattr(document_ingestion, "_iter_rasterized_pdf", fake_rasterize)
+    monkeypatch.setattr(document_ingestion, "_recognize_page", fake_recognize)
+    payload = ExtractionInput(file_id="file-3", filename="scan.pdf", mime_type="application/pdf", data=b"%PDF-scan")
+    cfg = OCRConfig(page_workers=1)
+
+    with pytest.raises(TimeoutError):
+        extract_document(payload, config=cfg, artifact_writer=writer, checkpoint_reader=store.get)
+    assert recognized == [1, 2]
+    assert "ocr/checkpoints/page-0002.json" in store
+
+    recognized.clear()
+    fail_on.clear()
+    result = extract_document(payload, config=cfg, artifact_writer=writer, checkpoint_reader=store.get)
+
+    assert recognized == [3, 4]
+    assert rasterized[-1] == [3, 4]
+    assert result.raw["resumed_pages"] == [1, 2]
+    assert [page.page_number for page in result.pages] == [1, 2, 3, 4]
+    resumed = result.pages[0].blocks[0]
+    assert resumed.bbox == BoundingBox(0, 0, 10, 5)
+    assert resumed.corrections[0].replacement == "vector"
+
+    # Different bytes (a re-uploaded file) must not reuse the old checkpoints.
+    changed = ExtractionInput(file_id="file-3", filename="scan.pdf", mime_type="application/pdf", data=b"%PDF-new")
+    result = extract_document(changed, config=cfg, artifact_writer=writer, checkpoint_reader=store.get)
+    assert "resumed_pages" not in result.raw
+    assert rasterized[-1] == [1, 2, 3, 4]
+
+
+def test_completed_job_removes_only_its_page_checkpoints(monkeypatch, tmp_path):
+    from app.workers import ocr_worker
+
+    monkeypatch.setattr(ocr_worker.settings, "upload_root", str(tmp_path))
+    prefix = "public/u1/class_1/file-1"
+    writer = ocr_worker._make_artifact_writer(prefix, "local")
+    writer("ocr/checkpoints/page-0001.json", b"{}", "application/json")
+    writer("ocr/checkpoints/manifest.json", b"{}", "application/json")
+    writer("ocr/normalized.json", b"{}", "application/json")
+
+    ocr_worker._delete_checkpoints(prefix, "local")
+
+    assert not (tmp_path / prefix / "ocr" / "checkpoints").exists()
+    assert (tmp_path / prefix / "ocr" / "normalized.json").exists()
+
+    deleted = []
+    monkeypatch.setattr(ocr_worker, "delete_prefix", deleted.append)
+    ocr_worker._delete_checkpoints(prefix, "s3")
+    assert deleted == [f"{prefix}/ocr/checkpoints/"]
+
+
+def test_tesseract_api_is_loaded_once_per_process_and_reported(monkeypatch, tmp_path):
+    import sys
+    import types
+
+    from app.services.ocr import engine_pool
+
+    created = []
+
+    class FakeAPI:
+        def __init__(self, path="", lang="eng", psm=None):
+            created.append((lang, psm))
+            self.image = None
+
+        def SetImageFile(self, path):
+            self.image = path
+
+        def GetUTF8Text(self):
+            return f"text from {Path(self.image).name}"
+
+        def MeanTextConf(self):
+            return 91
+
+        def Clear(self):
+            self.image = None
+
+        def End(self):
+            pass
+
+    fake = types.ModuleType("tesserocr")
+    fake.PyTessBaseAPI = FakeAPI
+    fake.PSM = types.SimpleNamespace(SINGLE_BLOCK=6)
+    monkeypatch.setitem(sys.modules, "tesserocr", fake)
+    engine_pool.reset_engines()
+    engine_pool.drain_engine_loads()
+
+    engine_pool.warm_up_engines(OCRConfig())
+    for n in range(3):
+        blocks = engine_pool.printed_engine(OCRConfig()).extract(tmp_path / f"page-{n}.png")
+        assert blocks[0].raw_text == f"text from page-{n}.png"
+        assert blocks[0].engine == "tesseract" and blocks[0].confidence == 0.91
+
+    assert created == [("eng", 6)]
+    loads = engine_pool.drain_engine_loads()
+    assert [name for name, _ in loads] == ["tesseract"]
+    before = engine_pool.OCR_ENGINE_LOAD_SECONDS.count(engine="tesseract")
+    engine_pool.observe_engine_loads(loads)
+    assert engine_pool.OCR_ENGINE_LOAD_SECONDS.count(engine="tesseract") == before + 1
+    engine_pool.reset_engines()
+
+
+def test_variant_search_stops_early_and_follows_historical_winners():
+    from app.services import document_ingestion
+    from app.services.image_enhancement import iter_enhancement_variants
+    from app.services.ocr.schema import OCRPage
+    from app.services.ocr.variant_stats import rank_variants, tally_variant_outcomes
+
+    image = np.full((60, 120, 3), 255, dtype=np.uint8)
+    clean_text = "Eigenvalues of a symmetric matrix are real numbers."
+
+    class FakePrinted:
+        name = "fake"
+
+        def __init__(self, clean_variant):
+            self.clean_variant = clean_variant
+            self.seen = []
+
+        def watch(self, variants):
+            for variant in variants:
+                self.seen.append(variant.name)
+                yield variant
+
+        def extract(self, page_image):
+            assert isinstance(page_image, np.ndarray)
+            confidence = 0.93 if self.seen[-1] == self.clean_variant else 0.4
+            return [OCRBlock("text", None, clean_text, clean_text, confidence, "fake")]
+
+    cfg = OCRConfig()
+    engine = FakePrinted("original")
+    _, selected, attempts, tried = document_ingestion._extract_best_printed(
+        engine.watch(iter_enhancement_variants(image)), engine, cfg
+    )
+    assert engine.seen == ["original"] and selected.name == "original"
+    assert attempts[0]["early_exit"] is True and len(tried) == 1
+
+    order = rank_variants({"gray-denoise": (10, 0), "contrast": (10, 1), "stroke-continuity": (10, 8)})
+    assert order[0] == "stroke-continuity" and order[-1] == "gray-denoise"
+    engine = FakePrinted("contrast")
+    ranked = document_ingestion._variant_order(OCRConfig(variant_order=order))
+    variants = engine.watch(iter_enhancement_variants(image, ranked))
+    _, selected, attempts, tried = document_ingestion._extract_best_printed(variants, engine, cfg)
+    assert engine.seen[:2] == ["original", "stroke-continuity"]
+    assert selected.name == "contrast" and engine.seen[-1] == "contrast"
+    assert "gray-denoise" not in engine.seen
+
+    page = OCRPage(page_number=1, page_type="printed_page", blocks=[], selected_preprocessing=selected.name)
+    tallies = tally_variant_outcomes([page], [{"page": 1, **a} for a in attempts])
+    assert tallies["contrast"] == (1, 1) and tallies["original"] == (1, 0)
+
+    # Only the original and the variants that were OCR'd are encoded, and only as artifacts.
+    artifacts = page_image_artifacts(image, tried, selected, "debug")
+    assert [name for name, _, _ in artifacts] == ["original.webp"] + [f"enhanced/{v.name}.webp" for v in tried[1:]]
+    assert all(data[8:12] == b"WEBP" and ct == "image/webp" for _, data, ct in artifacts)
+
+
+def test_artifact_policy_keeps_selected_images_and_compresses_json():
+    from app.services.image_enhancement import EnhancementVariant
+    from app.services.ocr.artifacts import decode_artifact, encode_json_artifact, normalize_policy, page_image_artifacts
+
+    image = np.full((40, 80, 3), 255, dtype=np.uint8)
+    original = EnhancementVariant("original", image, {})
+    contrast = EnhancementVariant("contrast", np.full((40, 80), 200, dtype=np.uint8), {})
+    threshold = EnhancementVariant("adaptive-threshold", np.full((40, 80), 255, dtype=np.uint8), {})
+    variants = [original, contrast, threshold]
+
+    assert normalize_policy("selected-only") == "selected" and normalize_policy(None) == "selected"
+    assert page_image_artifacts(image, variants, contrast, normalize_policy("minimal")) == []
+    kept = page_image_artifacts(image, variants, contrast, "selected")
+    assert [name for name, _, _ in kept] == ["original.webp", "enhanced/contrast.webp"]
+    # Selecting the original itself stores it once.
+    assert [name for name, _, _ in page_image_artifacts(image, variants, original, "selected")] == ["original.webp"]
+    jpeg = page_image_artifacts(image, variants, contrast, "selected", "jpeg")
+    assert jpeg[0][0] == "original.jpg" and jpeg[0][2] == "image/jpeg"
+
+    payload = {"pages": [{"text": "Eigenvalues " * 50}]}
+    data = encode_json_artifact(payload)
+    assert data[:2] == b"\x1f\x8b" and len(data) < len(str(payload))
+    assert json.loads(decode_artifact(data)) == payload
+    # Artifacts written before compression still read back.
+    assert json.loads(decode_artifact(b'{"a": 1}')) == {"a": 1}
+
+
+def test_pdf_text_falls_back_per_page_and_splits_large_files(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.lib import pdf_extractors
+
+    opened: list[str] = []
+
+    class FakeDoc:
+        page_count = 6
+
+        def __init__(self, name, texts):
+            self.name = name
+            self.texts = texts
+
+        def page_text(self, index):
+            if self.texts[index] is None:
+                raise ValueError("bad page")
+            return self.texts[index]
+
+        def close(self):
+            pass
+
+    def opener(name, texts):
+        def open_doc(data):
+            opened.append(name)
+            return FakeDoc(name, texts)
+
+        return open_doc
+
+    def broken(data):
+        raise ImportError("not installed")
+
+    monkeypatch.setattr(
+        pdf_extractors,
+        "_OPENERS",
+        {
+            "missing": broken,
+            "fast": opener("fast", ["one", "", None, "four", "five", "six"]),
+            "slow": opener("slow", ["ONE", "two", "three", "", "FIVE", "SIX"]),
+        },
+    )
+    order = ("missing", "fast", "slow")
+
+    result = pdf_extractors.extract_pdf_text(b"%PDF", extractors=order, workers=1)
+    assert result.pages == ["one", "two", "three", "four", "five", "six"]
+    assert result.page_extractors == ["fast", "slow", "slow", "fast", "fast", "fast"]
+    assert result.summary()["extractor"] == "fast"
+    assert result.summary()["pages_by_extractor"] == {"fast": 4, "slow": 2}
+    assert "missing" in result.errors
+
+    # Only the pages the fast extractor missed reach the slow one; a clean file never opens it.
+    monkeypatch.setitem(pdf_extractors._OPENERS, "fast", opener("fast", ["a", "b", "c", "d", "e", "f"]))
+    opened.clear()
+    assert pdf_extractors.extract_pdf_text(b"%PDF", extractors=order, workers=1).page_extractors == ["fast"] * 6
+    assert "slow" not in opened
+
+    pool = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(pdf_extractors, "_get_pool", lambda workers: pool)
+    split = pdf_extractors.extract_pdf_text(b"%PDF", extractors=order, workers=3, parallel_min_pages=4)
+    pool.shutdown()
+    assert split.workers == 3
+    assert split.pages == ["a", "b", "c", "d", "e", "f"]
+    assert pdf_extractors._page_ranges(7, 3) == [(0, 3), (3, 6), (6, 7)]
+
+
+def test_pdf_text_batch_extractor_gets_every_missing_page_in_one_call(monkeypatch):
+    from app.lib import pdf_extractors
+
+    batches: list[list[int]] = []
+
+    class ScannedDoc:
+        page_count = 5
+
+        def __init__(self, data):
+            pass
+
+        def page_text(self, index):
+            return "" if index != 3 else "caption"
+
+        def close(self):
+            pass
+
+    class ParseOnceDoc(ScannedDoc):
+        def page_texts(self, indices):
+            batches.append(list(indices))
+            return {index: f"page {index}" for index in indices if index != 0}
+
+    monkeypatch.setattr(pdf_extractors, "_OPENERS", {"fast": ScannedDoc, "pdfminer": ParseOnceDoc})
+    result = pdf_extractors.extract_pdf_text(b"%PDF", extractors=("fast", "pdfminer"), workers=1)
+
+    assert batches == [[0, 1, 2, 4]]
+    assert result.pages == ["", "page 1", "page 2", "caption", "page 4"]
+    assert result.page_extractors == ["none", "pdfminer", "pdfminer", "fast", "pdfminer"]
@@ -0,0 +1,75 @@
+import sys
+import textwrap
+
+import pytest
+
+from app.services import office_converter
+from app.services.office_converter import OfficeConversionError, OfficeConverterPool
+
+FAKE_BRIDGE = textwrap.dedent(
+    """
+    import json, os, sys, time
+
+    print(json.dumps({"ready": True, "pid": os.getpid()}), flush=True)
+    for line in sys.stdin:
+        request = json.loads(line)
+        name = os.path.basename(request["src"])
+        if name.startswith("slow"):
+            time.sleep(30)
+        if name.startswith("crash"):
+            sys.exit(1)
+        with open(request["dst"], "wb") as out:
+            out.write(b"%PDF-" + request["filter"].encode())
+        print(json.dumps({"ok": True}), flush=True)
+    """
+)
+
+
+@pytest.fixture
+def warm_pool(tmp_path, monkeypatch):
+    bridge = tmp_path / "bridge.py"
+    bridge.write_text(FAKE_BRIDGE)
+    monkeypatch.setattr(office_converter, "_BRIDGE_SCRIPT", bridge)
+    monkeypatch.setattr(office_converter, "OFFICE_UNO_PYTHON", sys.executable)
+    monkeypatch.setattr(office_converter, "OFFICE_PROFILE_ROOT", tmp_path / "profiles")
+    monkeypatch.setattr(office_converter, "_UNO_AVAILABLE", True)
+    monkeypatch.setattr(office_converter, "libreoffice_executable", lambda: "soffice")
+    pool = OfficeConverterPool(1)
+    yield pool
+    pool.shutdown()
+
+
+def _source(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"PK")
+    return path
+
+
+def test_warm_instance_is_reused_and_restarted_after_timeout_or_crash(tmp_path, warm_pool):
+    starts = office_converter.OFFICE_INSTANCE_STARTS
+    before = {reason: starts.value(reason=reason) for reason in ("initial", "timeout", "crash")}
+
+    first = tmp_path / "a.pdf"
+    assert warm_pool.convert(_source(tmp_path, "a.pptx"), first, timeout=10) == "warm"
+    assert first.read_bytes() == b"%PDF-impress_pdf_Export"
+    pid = warm_pool._slots[0].proc.pid
+    warm_pool.convert(_source(tmp_path, "b.docx"), tmp_path / "b.pdf", timeout=10)
+    assert (tmp_path / "b.pdf").read_bytes() == b"%PDF-writer_pdf_Export"
+    assert warm_pool._slots[0].proc.pid == pid
+
+    with pytest.raises(OfficeConversionError, match="timed out"):
+        warm_pool.convert(_source(tmp_path, "slow.pptx"), tmp_path / "slow.pdf", timeout=0.5)
+    assert warm_pool._slots[0].proc is None
+    warm_pool.convert(_source(tmp_path, "c.pptx"), tmp_path / "c.pdf", timeout=10)
+
+    with pytest.raises(OfficeConversionError, match="stopped unexpectedly"):
+        warm_pool.convert(_source(tmp_path, "crash.pptx"), tmp_path / "crash.pdf", timeout=10)
+    warm_pool.convert(_source(tmp_path, "d.pptx"), tmp_path / "d.pdf", timeout=10)
+
+    assert {reason: starts.value(reason=reason) - before[reason] for reason in before} == {
+        "initial": 1,
+        "timeout": 1,
+        "crash": 1,
+    }
+    # The slot went back to the queue after every conversion, failed or not.
+    assert warm_pool._idle.qsize() == 1
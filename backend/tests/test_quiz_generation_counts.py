@@ -3,11 +3,15 @@ import random
 import pytest
 
 import app.core.llm as llm
+import app.workers.quiz_worker as quiz_worker
+from app.lib.question_bank import pick_refill_stratum
 from app.lib.quiz_counts import resolve_requested_counts, validate_quiz_counts
 from app.workers.quiz_worker import (
     QuizGenerationCountError,
+    _draw_quiz_from_bank,
     _generate_exact_batch,
     _generate_quiz_items_exact,
+    _question_fingerprint,
 )
 
 
@@ -180,3 +184,86 @@ async def test_quiz_parser_accepts_top_level_item_array(monkeypatch):
 
     assert isinstance(parsed, dict)
     assert len(parsed["items"]) == 2
+
+
+def test_pick_refill_stratum_prefers_emptiest_and_stops_at_target():
+    counts = {(group, diff): 5 for group in ("mcq", "theory") for diff in ("easy", "medium", "hard")}
+    counts[("theory", "hard")] = 1
+    assert pick_refill_stratum(counts, target=5) == ("theory", "hard")
+    counts[("theory", "hard")] = 5
+    assert pick_refill_stratum(counts, target=5) is None
+
+
+@pytest.mark.asyncio
+async def test_draw_quiz_from_bank_skips_recent_questions_and_reports_shortfall(monkeypatch):
+    bank = [
+        {**_mcq("Explain the role of the namenode in HDFS", 1), "bank_id": 1},
+        {**_mcq("Describe how Spark caches resilient datasets", 2), "bank_id": 2},
+        {**_theory("Compare batch processing with stream processing", 3), "bank_id": 3},
+    ]
+
+    async def fake_fetch(file_id, difficulty, types):
+        return [dict(item) for item in bank if item["type"] in types]
+
+    monkeypatch.setattr(quiz_worker, "fetch_bank_items", fake_fetch)
+
+    items = await _draw_quiz_from_bank(
+        file_id="file-1",
+        requested_mcq_count=1,
+        requested_theory_count=1,
+        theory_types=["conceptual"],
+        difficulty="medium",
+        topic_focus="",
+        recent_fps={_question_fingerprint(bank[0]["question"])},
+        recent_questions=[bank[0]["question"]],
+        rng=random.Random(3),
+    )
+    assert items is not None
+    assert [item["bank_id"] for item in items] == [2, 3]
+
+    shortfall = await _draw_quiz_from_bank(
+        file_id="file-1",
+        requested_mcq_count=2,
+        requested_theory_count=0,
+        theory_types=[],
+        difficulty="medium",
+        topic_focus="",
+        recent_fps={_question_fingerprint(bank[0]["question"])},
+        recent_questions=[],
+        rng=random.Random(3),
+    )
+    assert shortfall is None
+
+
+@pytest.mark.asyncio
+async def test_insert_bank_items_counts_only_rows_that_were_inserted(monkeypatch):
+    from contextlib import asynccontextmanager
+
+    import app.lib.question_bank as question_bank
+
+    stored = {"dup-fp"}
+
+    class Cursor:
+        rowcount = -1
+
+        async def execute(self, sql, params):
+            fingerprint = params[14]
+            self.rowcount = 0 if fingerprint in stored else 1
+            stored.add(fingerprint)
+
+    class Conn:
+        async def commit(self):
+            return None
+
+    @asynccontextmanager
+    async def fake_db():
+        yield Conn(), Cursor()
+
+    monkeypatch.setattr(question_bank, "db_conn", fake_db)
+    items = [
+        dict(_mcq("Already banked?", 1), fingerprint="dup-fp"),
+        dict(_mcq("New one?", 1), fingerprint="new-fp"),
+        dict(_mcq("New one again?", 1), fingerprint="new-fp"),
+        _mcq("No fingerprint?", 1),
+    ]
+    assert await question_bank.insert_bank_items("file-1", 7, items) == 1
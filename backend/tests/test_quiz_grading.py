@@ -1,3 +1,8 @@
+import asyncio
+
+import pytest
+
+import app.routers.quizzes as quizzes
 from app.routers.quizzes import grade_written_answer
 
 
@@ -81,3 +86,69 @@ def test_short_answer_wrong():
     assert is_correct is False
     assert "does not match" in feedback.lower()
     assert missing
+
+
+def _theory_key(qid: int, qtype: str = "conceptual", answer_key: str = "Point A\nPoint B\nPoint C") -> dict:
+    return {
+        qid: {
+            "qtype": qtype,
+            "correct_index": None,
+            "answer_key": answer_key,
+            "question": f"Question {qid}",
+            "explanation": None,
+            "topic": "General",
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_grading_pipeline_runs_llm_calls_concurrently(monkeypatch):
+    in_flight = {"now": 0, "peak": 0}
+
+    async def fake_grade(question: str, expected_answer: str, user_answer: str) -> int:
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return 2
+
+    monkeypatch.setattr(quizzes, "grade_theory_answer", fake_grade)
+    monkeypatch.setattr(quizzes, "QUIZ_GRADING_CONCURRENCY", 3)
+    key = {}
+    for qid in range(1, 7):
+        key.update(_theory_key(qid))
+    key[7] = {**_theory_key(7)[7], "qtype": "mcq", "correct_index": 2}
+    answers = [{"question_id": qid, "written_answer": "paraphrased answer"} for qid in range(1, 7)]
+    answers.append({"question_id": 7, "selected_index": 2})
+
+    graded = await quizzes._grade_submitted_answers(answers, key)
+
+    assert [g["question_id"] for g in graded] == list(range(1, 8))
+    assert all(g["marks"] == 2 and g["is_correct"] for g in graded[:6])
+    assert graded[6]["marks"] == 1 and graded[6]["is_correct"] is True
+    assert in_flight["peak"] == 3
+
+
+@pytest.mark.asyncio
+async def test_grading_pipeline_skips_llm_for_conclusive_and_falls_back_on_timeout(monkeypatch):
+    calls = []
+
+    async def slow_grade(question: str, expected_answer: str, user_answer: str) -> int:
+        calls.append(question)
+        await asyncio.sleep(1)
+        return 2
+
+    monkeypatch.setattr(quizzes, "grade_theory_answer", slow_grade)
+    monkeypatch.setattr(quizzes, "QUIZ_GRADING_TIMEOUT_SECONDS", 0.01)
+    key = {**_theory_key(1), **_theory_key(2), **_theory_key(3)}
+    answers = [
+        {"question_id": 1, "written_answer": "Point A, point B, and point C"},
+        {"question_id": 2, "written_answer": "Point A only"},
+        {"question_id": 3, "written_answer": "   "},
+    ]
+
+    graded = await quizzes._grade_submitted_answers(answers, key)
+
+    assert calls == ["Question 2"]
+    assert [g["marks"] for g in graded] == [2, 1, 0]
+    assert [g["is_correct"] for g in graded] == [True, False, False]
@@ -0,0 +1,35 @@
+-- =========================
+-- Pre-generated per-document question bank
+-- =========================
+
+-- Questions generated ahead of time for an indexed file, stratified by
+-- type group (mcq / theory) and difficulty. Quiz jobs draw from here first
+-- and only fall back to live generation when the bank cannot satisfy them.
+CREATE TABLE IF NOT EXISTS quiz_question_bank (
+  id BIGSERIAL PRIMARY KEY,
+  file_id UUID NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+  class_id INT NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+
+  qtype TEXT NOT NULL CHECK (qtype IN ('mcq','conceptual','definition','scenario','short_qa')),
+  question TEXT NOT NULL,
+  options TEXT[] DEFAULT NULL,
+  correct_index INT DEFAULT NULL,
+  answer_key TEXT DEFAULT NULL,
+  explanation TEXT DEFAULT NULL,
+  difficulty TEXT CHECK (difficulty IN ('easy','medium','hard')) DEFAULT 'medium',
+  topic TEXT,
+  tags JSONB NOT NULL DEFAULT '[]'::jsonb,
+
+  source_chunk_id INT REFERENCES file_chunks(id) ON DELETE SET NULL,
+  page_start INT,
+  page_end INT,
+
+  fingerprint TEXT NOT NULL,
+  origin TEXT NOT NULL DEFAULT 'pregenerated',
+  served_count INT NOT NULL DEFAULT 0,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+  UNIQUE (file_id, fingerprint)
+);
+
+CREATE INDEX IF NOT EXISTS quiz_question_bank_file_idx ON quiz_question_bank (file_id, difficulty, qtype);
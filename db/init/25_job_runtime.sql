@@ -0,0 +1,42 @@
+-- Leases, bounded retries and dead-lettering for the worker job queues
+-- (ocr_jobs, quiz_jobs, flashcard_jobs). See backend/app/workers/runtime.py.
+
+ALTER TABLE ocr_jobs ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0;
+ALTER TABLE ocr_jobs ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE ocr_jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+ALTER TABLE ocr_jobs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ;
+ALTER TABLE ocr_jobs ADD COLUMN IF NOT EXISTS last_error TEXT;
+ALTER TABLE ocr_jobs ADD COLUMN IF NOT EXISTS dead_lettered_at TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS ocr_jobs_claim_idx ON ocr_jobs (created_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS ocr_jobs_lease_idx ON ocr_jobs (lease_expires_at) WHERE status = 'running';
+
+ALTER TABLE quiz_jobs ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0;
+ALTER TABLE quiz_jobs ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE quiz_jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+ALTER TABLE quiz_jobs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ;
+ALTER TABLE quiz_jobs ADD COLUMN IF NOT EXISTS last_error TEXT;
+ALTER TABLE quiz_jobs ADD COLUMN IF NOT EXISTS dead_lettered_at TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS quiz_jobs_claim_idx ON quiz_jobs (created_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS quiz_jobs_lease_idx ON quiz_jobs (lease_expires_at) WHERE status = 'running';
+
+ALTER TABLE flashcard_jobs ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0;
+ALTER TABLE flashcard_jobs ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE flashcard_jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+ALTER TABLE flashcard_jobs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ;
+ALTER TABLE flashcard_jobs ADD COLUMN IF NOT EXISTS last_error TEXT;
+ALTER TABLE flashcard_jobs ADD COLUMN IF NOT EXISTS dead_lettered_at TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS flashcard_jobs_claim_idx ON flashcard_jobs (created_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS flashcard_jobs_lease_idx ON flashcard_jobs (lease_expires_at) WHERE status = 'running';
+
+CREATE TABLE IF NOT EXISTS worker_heartbeats (
+  worker_id TEXT PRIMARY KEY,
+  queue TEXT NOT NULL,
+  hostname TEXT,
+  pid INT,
+  slots INT NOT NULL DEFAULT 1,
+  busy_slots INT NOT NULL DEFAULT 0,
+  started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  last_seen_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS worker_heartbeats_queue_idx ON worker_heartbeats (queue, last_seen_at DESC);
@@ -0,0 +1,6 @@
+-- Page watermark for streaming indexing: chunks for pages 1..indexed_page_count are
+-- already searchable while later pages are still being extracted.
+-- See backend/app/lib/indexing.py (StreamingIndexer).
+
+ALTER TABLE files ADD COLUMN IF NOT EXISTS indexed_page_count INT;
+ALTER TABLE files ADD COLUMN IF NOT EXISTS page_count INT;
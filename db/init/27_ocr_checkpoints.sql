@@ -0,0 +1,6 @@
+-- Resumable OCR: a job that stops part way (timeout, lost worker, dead-lettered) keeps the
+-- pages it already indexed searchable and flags the document instead of failing it.
+-- Per-page OCR checkpoints live in object storage under {document prefix}/ocr/checkpoints/.
+-- See backend/app/services/document_ingestion.py (PageCheckpoints) and app/workers/ocr_worker.py.
+
+ALTER TABLE files ADD COLUMN IF NOT EXISTS index_incomplete BOOLEAN NOT NULL DEFAULT FALSE;
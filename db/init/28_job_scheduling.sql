@@ -0,0 +1,22 @@
+-- Fair, priority-aware claiming for the worker job queues: each job has a lane
+-- (interactive, bulk, background) and an owner, and claims round-robin over owners
+-- within the highest lane, with aging. See backend/app/core/job_scheduling.py.
+
+ALTER TABLE ocr_jobs ADD COLUMN IF NOT EXISTS owner_uid TEXT;
+ALTER TABLE ocr_jobs ADD COLUMN IF NOT EXISTS lane TEXT NOT NULL DEFAULT 'interactive';
+ALTER TABLE quiz_jobs ADD COLUMN IF NOT EXISTS lane TEXT NOT NULL DEFAULT 'interactive';
+ALTER TABLE flashcard_jobs ADD COLUMN IF NOT EXISTS lane TEXT NOT NULL DEFAULT 'interactive';
+
+UPDATE ocr_jobs j
+SET owner_uid = c.owner_uid
+FROM files f
+JOIN classes c ON c.id = f.class_id
+WHERE f.id = j.file_id
+  AND j.owner_uid IS NULL
+  AND j.status IN ('queued', 'running');
+
+-- Running jobs per owner are counted on every claim.
+CREATE INDEX IF NOT EXISTS ocr_jobs_owner_running_idx ON ocr_jobs (owner_uid) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS quiz_jobs_owner_running_idx ON quiz_jobs (user_id) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS flashcard_jobs_owner_running_idx ON flashcard_jobs (user_id) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS ocr_jobs_owner_queued_idx ON ocr_jobs (owner_uid) WHERE status = 'queued';
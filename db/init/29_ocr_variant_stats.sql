@@ -0,0 +1,13 @@
+-- Adaptive enhancement-variant search: per source type, how often each image
+-- enhancement variant was OCR'd and how often it produced the selected text.
+-- The OCR worker orders variants by win rate for the next job of that type.
+-- See backend/app/services/ocr/variant_stats.py.
+
+CREATE TABLE IF NOT EXISTS ocr_variant_stats (
+  source_type TEXT NOT NULL,
+  variant TEXT NOT NULL,
+  attempts BIGINT NOT NULL DEFAULT 0,
+  wins BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (source_type, variant)
+);
@@ -0,0 +1,21 @@
+-- Per-page extracted text, stored once per document content (SHA-256 of the file
+-- bytes, as in files.content_hash) and extraction version. The OCR worker writes it;
+-- quiz generation and chunk previews read it back instead of re-extracting the PDF.
+-- See backend/app/services/document_text.py.
+
+CREATE TABLE IF NOT EXISTS document_texts (
+  content_hash TEXT NOT NULL,
+  version TEXT NOT NULL,
+  page_count INT NOT NULL,
+  method TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (content_hash, version)
+);
+
+CREATE TABLE IF NOT EXISTS document_page_texts (
+  content_hash TEXT NOT NULL,
+  version TEXT NOT NULL,
+  page_number INT NOT NULL,
+  text TEXT NOT NULL,
+  PRIMARY KEY (content_hash, version, page_number)
+);
@@ -0,0 +1,52 @@
+-- Content-addressed originals shared across classes and users. A file whose
+-- original is a shared blob has files.blob_hash set; the trigger below keeps
+-- content_blobs.ref_count equal to the number of such files, whichever path
+-- deletes them (single file, class, account). Blobs at zero references are
+-- removed by the OCR worker after BLOB_GC_GRACE_SECONDS.
+-- See backend/app/services/content_blobs.py.
+
+CREATE TABLE IF NOT EXISTS content_blobs (
+  content_hash TEXT PRIMARY KEY,
+  storage_backend TEXT NOT NULL,
+  storage_key TEXT NOT NULL,
+  size_bytes BIGINT,
+  mime_type TEXT,
+  ref_count INT NOT NULL DEFAULT 0,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  last_used_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  released_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS content_blobs_unreferenced_idx
+  ON content_blobs (released_at)
+  WHERE ref_count <= 0;
+
+ALTER TABLE files ADD COLUMN IF NOT EXISTS blob_hash TEXT;
+CREATE INDEX IF NOT EXISTS files_blob_hash_idx ON files (blob_hash) WHERE blob_hash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS files_content_hash_idx ON files (content_hash) WHERE content_hash IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION content_blobs_refcount() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.blob_hash IS NOT NULL
+     AND (TG_OP = 'DELETE' OR NEW.blob_hash IS DISTINCT FROM OLD.blob_hash) THEN
+    UPDATE content_blobs
+    SET ref_count = ref_count - 1,
+        released_at = CASE WHEN ref_count <= 1 THEN now() ELSE released_at END
+    WHERE content_hash = OLD.blob_hash;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.blob_hash IS NOT NULL
+     AND (TG_OP = 'INSERT' OR NEW.blob_hash IS DISTINCT FROM OLD.blob_hash) THEN
+    UPDATE content_blobs
+    SET ref_count = ref_count + 1,
+        released_at = NULL,
+        last_used_at = now()
+    WHERE content_hash = NEW.blob_hash;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS files_blob_refcount ON files;
+CREATE TRIGGER files_blob_refcount
+  AFTER INSERT OR DELETE OR UPDATE OF blob_hash ON files
+  FOR EACH ROW EXECUTE FUNCTION content_blobs_refcount();
@@ -46,13 +46,14 @@ export default function QuizPanel({ classId, files, topicFocus, onQuizCreated }:
   const [error, setError] = useState<string | null>(null);
   const [success, setSuccess] = useState(false);
 
-  const pollIntervalRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  // Job currently being long-polled; cleared to stop the poll loop.
+  const pollingJobRef = useRef<string | null>(null);
   const timeoutRef = useRef<ReturnType<typeof setTimeout> | null>(null);
   const generatingRef = useRef(false);
 
   useEffect(() => {
     return () => {
-      if (pollIntervalRef.current) clearInterval(pollIntervalRef.current);
+      pollingJobRef.current = null;
       if (timeoutRef.current) clearTimeout(timeoutRef.current);
     };
   }, []);
@@ -68,10 +69,7 @@ export default function QuizPanel({ classId, files, topicFocus, onQuizCreated }:
   }, [classId]);
 
   function clearJobTimers() {
-    if (pollIntervalRef.current) {
-      clearInterval(pollIntervalRef.current);
-      pollIntervalRef.current = null;
-    }
+    pollingJobRef.current = null;
     if (timeoutRef.current) {
       clearTimeout(timeoutRef.current);
       timeoutRef.current = null;
@@ -172,9 +170,12 @@ export default function QuizPanel({ classId, files, topicFocus, onQuizCreated }:
       setProgress(Math.max(8, job.progress || 0));
       setProgressLabel(resolveProgressLabel(job.progress || 0, job.status_message));
 
+      let since = 0;
       const pollJob = async () => {
         try {
-          const status = await getQuizJobStatus(job.job_id);
+          const status = await getQuizJobStatus(job.job_id, since);
+          if (pollingJobRef.current !== job.job_id) return;
+          since = status.version ?? since;
           setProgress(status.progress || 0);
           setProgressLabel(resolveProgressLabel(status.progress || 0, status.status_message));
 
@@ -213,12 +214,9 @@ export default function QuizPanel({ classId, files, topicFocus, onQuizCreated }:
         }
       };
 
-      await pollJob();
-      if (!generatingRef.current) return;
-      pollIntervalRef.current = setInterval(pollJob, 900);
-
+      pollingJobRef.current = job.job_id;
       timeoutRef.current = setTimeout(() => {
-        if (pollIntervalRef.current) {
+        if (pollingJobRef.current) {
           clearJobTimers();
           generatingRef.current = false;
           setGenerating(false);
@@ -226,6 +224,11 @@ export default function QuizPanel({ classId, files, topicFocus, onQuizCreated }:
           setError("Quiz generation timeout - please try again");
         }
       }, 300000);
+
+      // Each request returns as soon as the worker reports progress (or after ~25s unchanged).
+      while (pollingJobRef.current === job.job_id) {
+        await pollJob();
+      }
     } catch (err: any) {
       console.error("Error creating quiz:", err);
       clearJobTimers();
@@ -180,6 +180,9 @@ export type FileRow = {
   last_error?: string | null;
   chunk_count?: number | null;
   processing_progress?: number | null;
+  indexed_page_count?: number | null;
+  page_count?: number | null;
+  index_incomplete?: boolean | null;
   source_type?: string | null;
   ocr_provider?: string | null;
   ocr_confidence?: number | null;
@@ -284,6 +287,7 @@ export type FlashcardJob = {
   cardCountMode?: "auto" | "fixed" | "custom" | null;
   warning?: string | null;
   sourceDocumentIds?: string[];
+  version?: number;
 };
 
 export type AnalyticsOverview = {
@@ -595,6 +599,28 @@ export async function listFiles(classId: number): Promise<FileRow[]> {
   return Array.isArray(data) ? data : [];
 }
 
+// Seconds the server may hold a progress long-poll open before answering unchanged.
+export const PROGRESS_LONG_POLL_SECONDS = 25;
+
+export type FileProgress = Pick<
+  FileRow,
+  "id" | "ocr_job_id" | "status" | "processing_progress" | "last_error" | "indexed_page_count" | "page_count"
+>;
+
+export type FileProgressResponse = {
+  version: number;
+  files: FileProgress[];
+};
+
+// Long-polls until a processing file in the class reports progress newer than `since`.
+export async function waitForFileProgress(classId: number, since = 0): Promise<FileProgressResponse> {
+  const { data } = await http.get<FileProgressResponse>(`/files/${classId}/progress`, {
+    params: { since, wait: PROGRESS_LONG_POLL_SECONDS },
+    timeout: (PROGRESS_LONG_POLL_SECONDS + 10) * 1000,
+  });
+  return { version: data?.version ?? since, files: Array.isArray(data?.files) ? data.files : [] };
+}
+
 export async function getDocumentViewUrl(classId: number, documentId: string): Promise<{ url: string; content_type?: string | null }> {
   const headers = await userHeader();
   const { data } = await http.get<{ url: string; content_type?: string | null }>(
@@ -767,9 +793,15 @@ export async function generateFlashcardsAsync(payload: {
   return data;
 }
 
-export async function getFlashcardJobStatus(jobId: string): Promise<FlashcardJob> {
+// With `since` (the `version` of the previous status), long-polls until the job progresses.
+export async function getFlashcardJobStatus(jobId: string, since?: number): Promise<FlashcardJob> {
   const headers = await userHeader();
-  const { data } = await http.get<FlashcardJob>(`/flashcards/job_status/${jobId}`, { headers });
+  const params = since === undefined ? undefined : { since, wait: PROGRESS_LONG_POLL_SECONDS };
+  const { data } = await http.get<FlashcardJob>(`/flashcards/job_status/${jobId}`, {
+    headers,
+    params,
+    timeout: params ? (PROGRESS_LONG_POLL_SECONDS + 10) * 1000 : undefined,
+  });
   return data;
 }
 
@@ -1692,6 +1724,7 @@ export type QuizJobResponse = {
   actual_mcq_count?: number | null;
   actual_theory_count?: number | null;
   timing_ms?: Record<string, number> | null;
+  version?: number;
 };
 
 export type StartAttemptResponse = {
@@ -1740,9 +1773,15 @@ export async function createQuizJob(payload: {
 }
 
 // Get quiz job status
-export async function getQuizJobStatus(jobId: string): Promise<QuizJobResponse> {
+// With `since` (the `version` of the previous status), long-polls until the job progresses.
+export async function getQuizJobStatus(jobId: string, since?: number): Promise<QuizJobResponse> {
   const headers = await userHeader();
-  const { data } = await http.get<QuizJobResponse>(`/quizzes/jobs/${jobId}`, { headers });
+  const params = since === undefined ? undefined : { since, wait: PROGRESS_LONG_POLL_SECONDS };
+  const { data } = await http.get<QuizJobResponse>(`/quizzes/jobs/${jobId}`, {
+    headers,
+    params,
+    timeout: params ? (PROGRESS_LONG_POLL_SECONDS + 10) * 1000 : undefined,
+  });
   return data;
 }
 
@@ -38,6 +38,7 @@ import {
   type ChunkPreview,
   generateFlashcardsAsync,
   getFlashcardJobStatus,
+  waitForFileProgress,
   listFlashcards,
   type Flashcard,
   getWeakCards,
@@ -64,6 +65,25 @@ import {
 } from "../lib/api";
 
 type StudyMsg = ChatMessage & { citations?: any };
+
+// File statuses that keep the class view polling for processing progress.
+const POLLED_FILE_STATUSES = [
+  "UPLOADING",
+  "UPLOADED",
+  "PROCESSING",
+  "EXTRACTING_TEXT",
+  "CHUNKING",
+  "CONVERTING_PREVIEW",
+  "PREVIEW_READY",
+  "FAILED_PREVIEW",
+  "OCR_QUEUED",
+  "GENERATING_EMBEDDINGS",
+  "OCR_DONE",
+  "RUNNING_OCR",
+  "SPLITTING_PAGES",
+  "ENHANCING_IMAGE",
+  "PREPARING_REVIEW",
+];
 type StudyQuickAction = "summary" | "explain" | "quiz" | "key_points";
 
 const EMPTY_STUDY_CHAT_TITLE = "New chat";
@@ -233,6 +253,15 @@ function documentWorkflowLabel(file: FileRow): string {
 function documentStageDetail(file: FileRow): string | null {
   const s = String(file.status || "").toUpperCase();
   if (isStudyGenerationReady(file)) {
+    if (file.index_incomplete) {
+      const pages = file.indexed_page_count ?? 0;
+      return (
+        (file.last_error || "").trim() ||
+        (file.page_count
+          ? `Only pages 1–${pages} of ${file.page_count} are searchable. Retry processing to finish.`
+          : `Only pages 1–${pages} are searchable. Retry processing to finish.`)
+      );
+    }
     if (needsConvertedOfficePreview(file) && !isOfficeViewerReady(file)) {
       const err = (file.conversion_error || file.preview_error || "").trim();
       const viewer = officeViewerStatus(file);
@@ -251,6 +280,12 @@ function documentStageDetail(file: FileRow): string | null {
       ? "PDF preview unavailable; search and assistant still work."
       : "Could not build PDF preview.";
   }
+  const searchablePages = file.indexed_page_count ?? 0;
+  if (searchablePages > 0 && (s === "EXTRACTING_TEXT" || s === "GENERATING_EMBEDDINGS")) {
+    return file.page_count
+      ? `Pages 1–${searchablePages} of ${file.page_count} are searchable…`
+      : `Pages 1–${searchablePages} are searchable…`;
+  }
   const stages: Record<string, string> = {
     UPLOADING: "Uploading your file…",
     UPLOADED: "Just a moment…",
@@ -881,35 +916,50 @@ function ClassesContent() {
     };
   }, [selectionMenu]);
 
+  const needsFilePoll = useMemo(
+    () =>
+      (files ?? []).some(
+        (f) =>
+          officeViewerStatus(f) === "processing" ||
+          POLLED_FILE_STATUSES.includes(String(f.status || "").toUpperCase())
+      ),
+    [files]
+  );
+
   useEffect(() => {
-    if (!selectedId) return;
-    const needsPoll = (files ?? []).some((f) =>
-      officeViewerStatus(f) === "processing" ||
-      [
-        "UPLOADING",
-        "UPLOADED",
-        "PROCESSING",
-        "EXTRACTING_TEXT",
-        "CHUNKING",
-        "CONVERTING_PREVIEW",
-        "PREVIEW_READY",
-        "FAILED_PREVIEW",
-        "OCR_QUEUED",
-        "GENERATING_EMBEDDINGS",
-        "OCR_DONE",
-        "RUNNING_OCR",
-        "SPLITTING_PAGES",
-        "ENHANCING_IMAGE",
-        "PREPARING_REVIEW",
-      ].includes(String(f.status || "").toUpperCase())
-    );
-    if (!needsPoll) return;
-    const id = setInterval(async () => {
-      const fs = await listFiles(selectedId);
-      setFiles(fs ?? []);
-    }, 2000);
-    return () => clearInterval(id);
-  }, [selectedId, files]);
+    if (!selectedId || !needsFilePoll) return;
+    let cancelled = false;
+    const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+    void (async () => {
+      let since = 0;
+      while (!cancelled) {
+        try {
+          // Returns as soon as a processing file reports progress (or after ~25s unchanged).
+          const progress = await waitForFileProgress(selectedId, since);
+          if (cancelled) return;
+          since = progress.version;
+          const live = progress.files;
+          const settled = live.some((f) => !POLLED_FILE_STATUSES.includes(String(f.status || "").toUpperCase()));
+          // Files without an OCR job (upload/preview stages) change outside the progress feed.
+          if (settled || !live.length || live.some((f) => !f.ocr_job_id)) {
+            const fs = await listFiles(selectedId);
+            if (cancelled) return;
+            setFiles(fs ?? []);
+            // Nothing the OCR worker reports on (e.g. a preview conversion); keep the old polling pace.
+            if (!live.length) await sleep(2000);
+          } else {
+            const byId = new Map(live.map((f) => [f.id, f]));
+            setFiles((xs) => (xs ?? []).map((f) => (byId.has(f.id) ? { ...f, ...byId.get(f.id) } : f)));
+          }
+        } catch {
+          await sleep(2000);
+        }
+      }
+    })();
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedId, needsFilePoll]);
 
   useEffect(() => {
     const next: Record<string, string> = {};
@@ -1584,12 +1634,14 @@ function ClassesContent() {
       });
       showToastMessage("Flashcard job queued. Generating in background...");
 
-      const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
       let completed = false;
       let completedSummary: string | null = null;
-      for (let i = 0; i < 90; i++) {
-        await sleep(2000);
-        const status = await getFlashcardJobStatus(job.job_id);
+      let since = 0;
+      // Long-poll: each status request returns as soon as the worker reports progress.
+      const giveUpAt = Date.now() + 180_000;
+      while (Date.now() < giveUpAt) {
+        const status = await getFlashcardJobStatus(job.job_id, since);
+        since = status.version ?? since;
         if (status.status === "completed") {
           completed = true;
           const countText = typeof status.generatedCount === "number"